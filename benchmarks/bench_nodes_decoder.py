@@ -0,0 +1,62 @@
+"""nodes.jsonデコードのベンチマーク
+
+各バックエンドでnodes.jsonを1,000ファイル分デコードしたときの時間を計測する。
+ディスクI/Oの影響を除くため、test_dataのnodes.jsonをメモリ上で繰り返しデコードする。
+
+使い方:
+    python benchmarks/bench_nodes_decoder.py [--files 1000] [--repeat 5]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.nodes_decoder import NodesDecoder
+
+SAMPLE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'test_data', 'video_nodes_GH012562', 'nodes.json')
+
+
+def measure(decode, payloads, repeat):
+    """payloadsをすべてデコードする時間の最小値（秒）を返す"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for raw in payloads:
+            decode(raw)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='nodes.jsonデコードのベンチマーク')
+    parser.add_argument('--files', type=int, default=1000, help='デコードするファイル数')
+    parser.add_argument('--repeat', type=int, default=5, help='計測の繰り返し回数')
+    args = parser.parse_args()
+
+    with open(SAMPLE_PATH, 'rb') as f:
+        sample = f.read()
+    # 同一オブジェクトのキャッシュ効果を避けるため、ファイルごとに別のバイト列を用意する
+    payloads = [bytes(sample) for _ in range(args.files)]
+
+    print(f"サンプル: {SAMPLE_PATH} ({len(sample) / 1024:.1f} KB) x {args.files}ファイル")
+    print(f"{'バックエンド':<24}{'合計[ms]':>12}{'1ファイル[us]':>16}")
+
+    results = [('json (射影なし)', measure(lambda raw: json.loads(raw.decode('utf-8-sig')),
+                                          payloads, args.repeat))]
+    for backend in NodesDecoder.BACKENDS:
+        if NodesDecoder.is_available(backend):
+            decoder = NodesDecoder(backend)
+            results.append((f"{backend} (射影)", measure(decoder.decode, payloads, args.repeat)))
+        else:
+            print(f"{backend}: 未インストールのためスキップ")
+
+    for name, elapsed in results:
+        print(f"{name:<24}{elapsed * 1000:>12.1f}{elapsed / args.files * 1e6:>16.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""記録した応答を使ったパイプライン全体のベンチマーク
+
+Gemini APIを使わずに、VideoEditAgent.runの処理時間・リクエスト数・再試行を計測する。
+最初にtest_dataのクリップでパイプラインを1回実行し、プロンプトから合成した応答を
+RecordingBackendで記録する。その後、記録をReplayBackend（--httpの場合はローカルの
+スタンドインサーバー経由）で、指定した遅延とエラーの割合を加えて再生しながら実行する。
+キャッシュは使わず、シーン選択はセクションごとに並行して行う。
+
+使い方:
+    python benchmarks/bench_pipeline_replay.py [--runs 3] [--latency 0.3] [--latency-jitter 0.2]
+        [--error-rate 0.1] [--rate-limit-rate 0.05] [--keys 2] [--http]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+# .envのAPIキーを読み込ませず、Gemini APIを呼び出さないようにする
+os.environ['GEMINI_API_KEY'] = ''
+from src.llm_backend import LLMBackend, LLMResponse, RecordingBackend, ReplayBackend
+from src.llm_server import StandInServer
+from src.main import VideoEditAgent
+
+CONTENT_ID = re.compile(r'video_nodes_\w+')
+
+
+class SyntheticBackend(LLMBackend):
+    """プロンプトに含まれるコンテンツIDから、シーン選択の応答を合成するバックエンド"""
+
+    requires_api_key = False
+
+    def offline_keys(self):
+        return ['synthetic']
+
+    def generate(self, model_name, prompt, image_hash=None):
+        if 'selected_scenes' not in prompt:
+            return LLMResponse(json.dumps({'concept': '合成したコンセプト'}, ensure_ascii=False))
+        content_ids = list(dict.fromkeys(CONTENT_ID.findall(prompt)))
+        scenes = [{'content_id': content_id, 'scene_index': i, 'reason': '合成した選択'}
+                  for content_id in content_ids for i in range(2)]
+        return LLMResponse(json.dumps({'selected_scenes': scenes}, ensure_ascii=False))
+
+
+def make_config(work_dir, options):
+    """test_dataを入力とする設定を作成"""
+    output_dir = os.path.join(work_dir, 'output')
+    os.makedirs(output_dir, exist_ok=True)
+    shutil.copy(os.path.join(ROOT, 'test_data', 'scenario.json'), os.path.join(output_dir, 'scenario.json'))
+    return {
+        'input_dir': os.path.join(ROOT, 'test_data'),
+        'output_dir': output_dir,
+        'options': dict({
+            'response_cache': False,
+            'selection_cache': False,
+            'incremental_selection': False,
+            'crawl_index': False,
+            'selection_per_section': True
+        }, **options)
+    }
+
+
+def run_agent(config, llm_backend=None):
+    """VideoEditAgent.runを実行し、処理時間（秒）とエージェントを返す"""
+    agent = VideoEditAgent(config, llm_backend=llm_backend)
+    with patch('builtins.input', return_value=''), contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        agent.run()
+        elapsed = time.perf_counter() - started
+    return elapsed, agent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.3, help='応答までの遅延（秒）')
+    parser.add_argument('--latency-jitter', type=float, default=0.2, help='遅延のばらつきの上限（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.1, help='一時的なエラー（503）の割合')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.05, help='上限エラー（429）の割合')
+    parser.add_argument('--retry-after', type=float, default=0.5, help='上限エラーで指定する待ち時間（秒）')
+    parser.add_argument('--keys', type=int, default=2, help='仮のAPIキーの数')
+    parser.add_argument('--http', action='store_true', help='ローカルのスタンドインサーバー経由で再生する')
+    args = parser.parse_args()
+    # 注入したエラーの警告で結果が埋もれないようにする
+    logging.getLogger('src').setLevel(logging.ERROR)
+
+    os.chdir(tempfile.mkdtemp())  # プロンプトのログなどをカレントディレクトリに書き出すため
+    with tempfile.TemporaryDirectory() as work_dir:
+        recordings = os.path.join(work_dir, 'llm_recordings.jsonl')
+        recorder = RecordingBackend(SyntheticBackend(), recordings)
+        elapsed, _ = run_agent(make_config(os.path.join(work_dir, 'record'), {}), recorder)
+        print(f"記録: {recorder.recorded}件の応答（{elapsed * 1000:.0f} ms）")
+
+        replay = ReplayBackend(recordings, latency=args.latency, latency_jitter=args.latency_jitter,
+                               error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+                               retry_after=args.retry_after, key_count=args.keys)
+        options = {'llm_backend': 'replay', 'llm_recordings': recordings, 'llm_latency': args.latency,
+                   'llm_latency_jitter': args.latency_jitter, 'llm_error_rate': args.error_rate,
+                   'llm_rate_limit_rate': args.rate_limit_rate, 'llm_retry_after': args.retry_after,
+                   'llm_offline_keys': args.keys, 'api_max_attempts': 8}
+        server = None
+        if args.http:
+            server = StandInServer(replay).start()
+            options.update({'llm_backend': 'http', 'llm_server_url': server.url})
+
+        timings = []
+        totals = dict.fromkeys(('requests', 'errors', 'rate_limits', 'misses'), 0)
+        try:
+            for i in range(args.runs):
+                elapsed, agent = run_agent(make_config(os.path.join(work_dir, f'run{i}'), dict(options, llm_seed=i)))
+                timings.append(elapsed)
+                if server is None:
+                    for key in totals:
+                        totals[key] += agent.api_client.backend.stats[key]
+        finally:
+            if server is not None:
+                server.stop()
+        if server is not None:
+            totals = {key: replay.stats[key] for key in totals}
+
+    transport = 'スタンドインサーバー経由' if args.http else 'ReplayBackend'
+    print(f"VideoEditAgent.run（{transport}、遅延 {args.latency}±{args.latency_jitter}秒、"
+          f"エラー {args.error_rate:.0%}、上限エラー {args.rate_limit_rate:.0%}、キー {args.keys}個）")
+    print(f"  処理時間: 中央値 {statistics.median(timings) * 1000:.0f} ms "
+          f"（最小 {min(timings) * 1000:.0f} ms / 最大 {max(timings) * 1000:.0f} ms、{args.runs}回）")
+    print(f"  リクエスト: {totals['requests']}件（{totals['requests'] / sum(timings):.1f}件/秒）、"
+          f"再試行の原因 エラー {totals['errors']}件 / 上限エラー {totals['rate_limits']}件、"
+          f"記録なし {totals['misses']}件")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""選択シーン解決のベンチマーク
+
+LLMの応答に含まれる選択シーンを元のシーン情報に解決する時間を、従来の線形探索と
+SceneIndexで比較する。既定では5,000コンテンツ x 10シーンのライブラリから
+50,000件の選択（1割は存在しないID、1割は範囲外の時間）を解決する。
+線形探索は時間がかかるため、先頭の一部だけを計測して全件分に換算する。
+
+使い方:
+    python benchmarks/bench_scene_index.py [--contents 5000] [--scenes 10] [--selections 50000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.scene_index import SceneIndex
+
+
+def make_library(content_count, scene_count):
+    """テスト用のコンテンツを作成"""
+    return [{
+        'content_id': f"video_nodes_{i:06d}",
+        'total_duration': scene_count * 10.0,
+        'scenes': [{'start_time': j * 10.0, 'end_time': (j + 1) * 10.0,
+                    'transcript': f"シーン{j}", 'topics': [], 'effects': []}
+                   for j in range(scene_count)]
+    } for i in range(content_count)]
+
+
+def make_selections(content_count, scene_count, selection_count, seed=0):
+    """テスト用の選択結果を作成（1割は存在しないID、1割は範囲外の時間）"""
+    rng = random.Random(seed)
+    selections = []
+    for i in range(selection_count):
+        content_index = rng.randrange(content_count)
+        scene_index = rng.randrange(scene_count)
+        info = {'content_id': f"video_nodes_{content_index:06d}", 'scene_index': scene_index,
+                'section_id': 'main_1', 'reason': ''}
+        if i % 10 == 0:
+            info['content_id'] = f"video_nodes_x{content_index:06d}"
+        elif i % 10 == 1:
+            info['start_time'] = scene_index * 10.0 - 3
+            info['end_time'] = scene_index * 10.0 + 15
+        selections.append(info)
+    return selections
+
+
+def resolve_linear(contents, selections):
+    """従来の実装と同じく、選択ごとにコンテンツを線形探索して解決する"""
+    selected_scenes = []
+    for scene_info in selections:
+        content_id = scene_info.get("content_id")
+        scene_index = scene_info.get("scene_index")
+        for content in contents:
+            if content["content_id"] == content_id:
+                if 0 <= scene_index < len(content.get('scenes', [])):
+                    scene = content["scenes"][scene_index]
+                    selected_scenes.append({
+                        "content_id": content_id,
+                        "scene_index": scene_index,
+                        "start_time": scene_info.get("start_time", scene.get("start_time", 0)),
+                        "end_time": scene_info.get("end_time", scene.get("end_time", 0)),
+                        "reason": scene_info.get("reason", ""),
+                        "section_id": scene_info.get("section_id", ""),
+                        "transcript": scene.get("transcript", ""),
+                        "topics": scene.get("topics", []),
+                        "effects": scene.get("effects", [])
+                    })
+                break
+    return selected_scenes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='選択シーン解決のベンチマーク')
+    parser.add_argument('--contents', type=int, default=5000, help='コンテンツ数')
+    parser.add_argument('--scenes', type=int, default=10, help='コンテンツあたりのシーン数')
+    parser.add_argument('--selections', type=int, default=50000, help='選択シーン数')
+    parser.add_argument('--linear-sample', type=int, default=1000, help='線形探索で計測する選択数')
+    args = parser.parse_args()
+
+    contents = make_library(args.contents, args.scenes)
+    selections = make_selections(args.contents, args.scenes, args.selections)
+    print(f"ライブラリ: {args.contents}コンテンツ x {args.scenes}シーン / 選択: {args.selections}件")
+
+    sample = selections[:args.linear_sample]
+    start = time.perf_counter()
+    resolve_linear(contents, sample)
+    linear = (time.perf_counter() - start) * len(selections) / max(1, len(sample))
+    print(f"線形探索:   {linear * 1000:>10.1f} ms（{len(sample)}件の計測から換算）")
+
+    start = time.perf_counter()
+    index = SceneIndex(contents)
+    built = time.perf_counter() - start
+    selected, stats = index.resolve(selections)
+    elapsed = time.perf_counter() - start
+    print(f"SceneIndex: {elapsed * 1000:>10.1f} ms（うち辞書の作成 {built * 1000:.1f} ms）")
+    print(f"解決 {stats['resolved']}件 / 時間を補正 {stats['clamped']}件 / "
+          f"存在しないID {len(stats['hallucinated'])}件")
+
+
+if __name__ == '__main__':
+    main()
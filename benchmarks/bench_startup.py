@@ -0,0 +1,98 @@
+"""CLIの起動時間のベンチマーク
+
+`python -X importtime -m src.cli analyze` を空の入力ディレクトリで実行し、
+プロセスの起動から最初の出力までの時間（time-to-first-output）を計測する。
+最初の出力を受け取った時点でプロセスを終了するため、生成AIの呼び出しは含まない。
+あわせて -X importtime の結果から、読み込みに時間がかかったモジュールを表示する。
+
+使い方:
+    python benchmarks/bench_startup.py [--runs 5] [--top 10]
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)')
+
+
+def make_config(work_dir):
+    """空の入力ディレクトリを使う設定ファイルを作成"""
+    input_dir = os.path.join(work_dir, 'input')
+    os.makedirs(input_dir)
+    config_path = os.path.join(work_dir, 'config.json')
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump({'input_dir': input_dir, 'output_dir': os.path.join(work_dir, 'output')}, f)
+    return config_path
+
+
+def run_once(config_path, work_dir):
+    """
+    CLIを1回起動し、最初の出力までの時間とimporttimeの出力を取得
+
+    Returns:
+        (最初の出力までの秒数, -X importtimeの出力)
+    """
+    env = {key: value for key, value in os.environ.items() if not key.startswith('GEMINI_API_KEY')}
+    # .envのキーを読み込ませず、APIを呼び出さないようにする
+    env['GEMINI_API_KEY'] = ''
+    env['PYTHONPATH'] = ROOT
+    env['PYTHONUNBUFFERED'] = '1'
+
+    # importtimeの出力は量が多く、パイプで受けると最初の出力の前に詰まるためファイルに書き出す
+    with tempfile.TemporaryFile('w+', encoding='utf-8', errors='replace') as stderr_file:
+        started = time.perf_counter()
+        process = subprocess.Popen([sys.executable, '-X', 'importtime', '-m', 'src.cli', 'analyze',
+                                    '-c', config_path],
+                                   cwd=work_dir, env=env, stdout=subprocess.PIPE, stderr=stderr_file,
+                                   text=True, encoding='utf-8', errors='replace')
+        first_line = process.stdout.readline()
+        elapsed = time.perf_counter() - started
+        process.kill()
+        process.communicate()
+        stderr_file.seek(0)
+        stderr = stderr_file.read()
+    if not first_line:
+        raise RuntimeError(f"CLIが出力せずに終了しました:\n{stderr[-2000:]}")
+    return elapsed, stderr
+
+
+def slowest_imports(importtime_output, top):
+    """importtimeの出力から、累積の読み込み時間が長いトップレベルのモジュールを取得"""
+    modules = []
+    for line in importtime_output.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match and len(match.group(3)) <= 3:
+            modules.append((int(match.group(2)), match.group(4)))
+    return sorted(modules, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        config_path = make_config(work_dir)
+        timings = []
+        for _ in range(args.runs):
+            elapsed, importtime_output = run_once(config_path, work_dir)
+            timings.append(elapsed)
+
+    print(f"cli.py analyze の最初の出力まで: 中央値 {statistics.median(timings) * 1000:.0f} ms "
+          f"（最小 {min(timings) * 1000:.0f} ms / 最大 {max(timings) * 1000:.0f} ms、{args.runs}回）")
+    print("読み込みに時間がかかったモジュール（最後の実行、累積）:")
+    for cumulative, module in slowest_imports(importtime_output, args.top):
+        print(f"  {cumulative / 1000:8.1f} ms  {module}")
+
+
+if __name__ == '__main__':
+    main()
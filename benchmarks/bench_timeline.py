@@ -0,0 +1,72 @@
+"""タイムライン組み立てのベンチマーク
+
+選択シーンをタイムラインに組み立てる時間を計測する。既定では2時間のクリップ10本から
+選んだ10,000件（重なりを含む）を、5セクションのシナリオの尺に合わせて組み立てる。
+比較として、使用済みの区間をすべて走査して重なりを判定する素朴な実装も計測する。
+
+使い方:
+    python benchmarks/bench_timeline.py [--clips 10] [--clip-length 7200] [--selections 10000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.timeline import TimelineAssembler
+
+
+def make_selections(clip_count, clip_length, selection_count, sections, seed=0):
+    """テスト用の選択結果を作成（シーンは1〜15秒）"""
+    rng = random.Random(seed)
+    selections = []
+    for i in range(selection_count):
+        start = rng.uniform(0, clip_length)
+        selections.append({'content_id': f"video_nodes_{rng.randrange(clip_count):04d}",
+                           'start_time': start, 'end_time': start + rng.uniform(1, 15),
+                           'section_id': sections[i * len(sections) // selection_count]['section_id']})
+    return selections
+
+
+def assemble_linear(selections):
+    """使用済みの区間をすべて走査して重なりを判定する（尺の調整は行わない）"""
+    used = {}
+    timeline = []
+    for scene in selections:
+        spans = used.setdefault(scene['content_id'], [])
+        if any(scene['start_time'] < end and start < scene['end_time'] for start, end in spans):
+            continue
+        spans.append((scene['start_time'], scene['end_time']))
+        timeline.append(scene)
+    return timeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description='タイムライン組み立てのベンチマーク')
+    parser.add_argument('--clips', type=int, default=10, help='クリップ数')
+    parser.add_argument('--clip-length', type=float, default=7200, help='クリップの長さ（秒）')
+    parser.add_argument('--selections', type=int, default=10000, help='選択シーン数')
+    args = parser.parse_args()
+
+    sections = [{'section_id': f"section_{i}", 'duration': args.selections} for i in range(5)]
+    scenario = {'sections': sections}
+    selections = make_selections(args.clips, args.clip_length, args.selections, sections)
+    print(f"クリップ: {args.clips} / 選択: {args.selections}件")
+
+    start = time.perf_counter()
+    assemble_linear(selections)
+    print(f"素朴な実装:       {(time.perf_counter() - start) * 1000:>8.1f} ms")
+
+    start = time.perf_counter()
+    assembler = TimelineAssembler(scenario)
+    timeline = assembler.assemble(selections)
+    elapsed = time.perf_counter() - start
+    stats = assembler.stats
+    print(f"TimelineAssembler: {elapsed * 1000:>8.1f} ms（{len(timeline)}シーン / {assembler.position:.1f}秒、"
+          f"切り詰め {stats['trimmed']}件、重複 {stats['duplicates']}件）")
+
+
+if __name__ == '__main__':
+    main()
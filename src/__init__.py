@@ -2,18 +2,24 @@
 SRT Scene Tools package
 """
 
-from .content_crawler import ContentCrawler
-from .concept_generator import ConceptGenerator
-from .scene_selector import SceneSelector
-from .edl_generator import EDLGenerator
-from .srt_generator import SRTGenerator
-from .ui_manager import UIManager
-from .main import VideoEditAgent
+import importlib
+
+# 公開するクラスと定義しているモジュール
+# （サブモジュールだけを使う場合に、すべての依存を読み込まないよう最初の参照で読み込む）
+_EXPORTS = {
+    'ContentCrawler': '.content_crawler',
+    'ConceptGenerator': '.concept_generator',
+    'SceneSelector': '.scene_selector',
+    'EDLGenerator': '.edl_generator',
+    'SRTGenerator': '.srt_generator',
+    'UIManager': '.ui_manager',
+    'VideoEditAgent': '.main',
+}
 
 __all__ = [
     'ContentCrawler',
     'ConceptGenerator',
-    'SceneSelector', 
+    'SceneSelector',
     'EDLGenerator',
     'SRTGenerator',
     'UIManager',
@@ -21,3 +27,15 @@ __all__ = [
 ]
 
 __version__ = '1.0.0'
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_EXPORTS))
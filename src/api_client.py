@@ -1,22 +1,17 @@
 """API蜻ｼ縺ｳ蜃ｺ縺励け繝ｩ繧､繧｢繝ｳ繝�"""
 
 import os
-import json
-import base64
-import requests
 import logging
-import subprocess
-import numpy as np
-from typing import Dict, List, Tuple, Optional
+import threading
+from typing import Any, Dict, Iterator, List, Tuple, Optional
 from dotenv import load_dotenv
-from pathlib import Path
-import tempfile
-from PIL import Image
-from faster_whisper import WhisperModel
-import torch
-import gc
 import time
-import random
+
+from .llm_backend import GeminiBackend, LLMBackend
+from .prompt_builder import estimate_tokens
+from .rate_limiter import (FATAL, RATE_LIMIT, Backoff, KeyRateLimiter, classify_error, is_api_error,
+                           retry_after_seconds, usage_tokens)
+from .response_cache import ResponseCache
 
 logger = logging.getLogger(__name__)
 
@@ -24,17 +19,60 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 
 class GeminiClient:
-    def __init__(self):
+    # 使用するモデル（キャッシュのキーなどにも使う）
+    DEFAULT_MODEL = 'gemini-1.5-flash'
+    # 画像1枚あたりのトークン数の見積もり（レート制限に使う）
+    IMAGE_TOKENS = 258
+
+    def __init__(self, model_name: str = DEFAULT_MODEL, response_cache: Optional[ResponseCache] = None,
+                 rate_limiter: Optional[KeyRateLimiter] = None, backoff: Optional[Backoff] = None,
+                 max_attempts: int = 4, rpm: Optional[float] = None, tpm: Optional[float] = None,
+                 backend: Optional[LLMBackend] = None, bypass_cache: bool = False):
         """Gemini API繧ｯ繝ｩ繧､繧｢繝ｳ繝医�ｮ蛻晄悄蛹�"""
+        # リクエストを送るバックエンド（APIキーが不要なバックエンドでは、キーが設定されていなければ仮のキーを使う）
+        self.backend = backend or GeminiBackend()
+        self.api_keys = self.load_api_keys()
+        if not self.api_keys and not self.backend.requires_api_key:
+            self.api_keys = self.backend.offline_keys()
+        
+        if not self.api_keys:
+            logger.warning("API繧ｭ繝ｼ縺瑚ｨｭ螳壹＆繧後※縺�縺ｾ縺帙ｓ")
+        else:
+            logger.info(f"{len(self.api_keys)}蛟九�ｮAPI繧ｭ繝ｼ繧定ｪｭ縺ｿ霎ｼ縺ｿ縺ｾ縺励◆")
+        
+        # 迴ｾ蝨ｨ縺ｮAPI繧ｭ繝ｼ縺ｮ繧､繝ｳ繝�繝�繧ｯ繧ｹ
+        self.model_name = model_name
+        self.response_cache = response_cache
+        # Trueの場合は応答キャッシュを読まずに必ずリクエストを送る（成功した応答は保存する）
+        self.bypass_cache = bypass_cache
+        # キーごとのレート制限と、失敗したリクエストを再試行するまでの待ち時間
+        self.rate_limiter = rate_limiter or KeyRateLimiter(len(self.api_keys), rpm=rpm, tpm=tpm)
+        self.backoff = backoff or Backoff()
+        self.max_attempts = max_attempts
+        # 待ち時間が同じ場合に優先するキー（キーの切り替えを減らすための目安で、送信に使うキーは呼び出しごとに確保する）
+        self._preferred_key_index = 0
+        
+        # キーごとのモデル（google.generativeaiの読み込みには時間がかかるため、最初のリクエストで作成する）
+        self._models: Dict[int, Any] = {}
+        self._models_lock = threading.Lock()
+    
+    @staticmethod
+    def load_api_keys() -> List[str]:
+        """
+        環境変数からAPIキーを読み込む
+
+        Returns:
+            GEMINI_API_KEY_1, GEMINI_API_KEY_2, ...、GEMINI_API_KEYの順のAPIキーのリスト
+        """
         # API繧ｭ繝ｼ縺ｮ繝ｭ繝ｼ繝�
-        self.api_keys = []
+        api_keys = []
         
         # 隍�謨ｰ縺ｮ繧ｭ繝ｼ繧堤腸蠅�螟画焚縺九ｉ蜿門ｾ暦ｼ�GEMINI_API_KEY_1, GEMINI_API_KEY_2, ...�ｼ�
         i = 1
         while True:
             key = os.getenv(f'GEMINI_API_KEY_{i}')
             if key:
-                self.api_keys.append(key)
+                api_keys.append(key)
                 i += 1
             else:
                 break
@@ -42,75 +80,310 @@ class GeminiClient:
         # 蜊倅ｸ繧ｭ繝ｼ縺ｮ迺ｰ蠅�螟画焚繧堤｢ｺ隱�
         key = os.getenv('GEMINI_API_KEY')
         if key:
-            self.api_keys.append(key)
-        
-        if not self.api_keys:
-            logger.warning("API繧ｭ繝ｼ縺瑚ｨｭ螳壹＆繧後※縺�縺ｾ縺帙ｓ")
+            api_keys.append(key)
+        return api_keys
+
+    @staticmethod
+    def _require_json(prompt: str) -> str:
+        """
+        JSON形式の応答を求める指示をプロンプトに付ける
+
+        Args:
+            prompt: プロンプト
+
+        Returns:
+            指示を付けたプロンプト
+        """
+        # JSON蠖｢蠑上�ｮ繝ｬ繧ｹ繝昴Φ繧ｹ繧呈�守､ｺ逧�縺ｫ隕∵ｱ�
+        if "JSON蠖｢蠑上〒霑斐＠縺ｦ" not in prompt:
+            prompt = f"{prompt}\n\n蠢�縺壻ｻ･荳九�ｮJSON蠖｢蠑上〒邨先棡繧定ｿ斐＠縺ｦ縺上□縺輔＞縲ゆｻ悶�ｮ譁�遶縺ｯ荳蛻�蜷ｫ繧√↑縺�縺ｧ縺上□縺輔＞�ｼ�"
+        return prompt
+
+    @staticmethod
+    def _strip_json_fence(text: str) -> str:
+        """
+        応答から```jsonの囲みを除く
+
+        Args:
+            text: 応答
+
+        Returns:
+            整形した応答
+        """
+        text = text.strip()
+        if text.startswith("```json"):
+            text = text[7:]
+        if text.endswith("```"):
+            text = text[:-3]
+        return text.strip()
+
+    def _model_for(self, key_index: int) -> Any:
+        """
+        キーでリクエストを送るモデルを取得（キーごとに作成して再利用する）
+
+        Args:
+            key_index: キーのインデックス
+
+        Returns:
+            generate_contentを持つモデル（ライブラリがインストールされていない場合はNone）
+        """
+        with self._models_lock:
+            model = self._models.get(key_index)
+            if model is None:
+                try:
+                    model = self.backend.create_model(self.api_keys[key_index], self.model_name)
+                except ImportError:
+                    logger.error("google-generativeai繝ｩ繧､繝悶Λ繝ｪ縺後う繝ｳ繧ｹ繝医�ｼ繝ｫ縺輔ｌ縺ｦ縺�縺ｾ縺帙ｓ")
+                    return None
+                self._models[key_index] = model
+                logger.info(f"Gemini 1.5 Flash繝｢繝�繝ｫ繧貞�晄悄蛹悶＠縺ｾ縺励◆�ｼ�API繧ｭ繝ｼ {key_index + 1}繧剃ｽｿ逕ｨ�ｼ�")
+            return model
+
+    def _acquire_key(self, tokens: int) -> Tuple[int, Any]:
+        """
+        レート制限の範囲内で送信できるキーを確保する（すべてのキーが上限に達している場合は空くまで待つ）
+
+        複数のスレッドから同時に呼び出されるため、確保したキーとモデルは呼び出し側で保持し、
+        使用量やエラーはそのキーに反映する。
+
+        Args:
+            tokens: リクエストで使うトークン数の見積もり
+
+        Returns:
+            (キーのインデックス, そのキーのモデル（作成できない場合はNone）)
+        """
+        while True:
+            key_index, wait = self.rate_limiter.reserve(tokens, preferred=self._preferred_key_index)
+            if wait <= 0:
+                break
+            logger.info(f"すべてのAPIキーが上限に達しているため{wait:.1f}秒待機します")
+            time.sleep(wait)
+        self._preferred_key_index = key_index
+        return key_index, self._model_for(key_index)
+
+    def _record_usage(self, key_index: int, tokens: int, response) -> None:
+        """
+        応答に含まれる実際のトークン使用量をレート制限に反映
+
+        Args:
+            key_index: リクエストを送ったキーのインデックス
+            tokens: リクエスト前の見積もり
+            response: generate_contentの応答（ストリーミングの場合は最後の断片）
+        """
+        actual = usage_tokens(response)
+        if actual is not None:
+            self.rate_limiter.record_usage(key_index, tokens, actual)
+
+    @staticmethod
+    def _response_text(response) -> str:
+        """
+        応答のテキストを取得
+
+        Args:
+            response: generate_contentの応答
+
+        Returns:
+            テキスト（安全性フィルタでブロックされた場合など、テキストがない場合は空文字列）
+        """
+        try:
+            return response.text or ''
+        except ValueError as e:
+            logger.warning(f"応答にテキストが含まれていません: {str(e)}")
+            return ''
+
+    def _handle_error(self, error: Exception, attempt: int, key_index: int) -> bool:
+        """
+        失敗したリクエストの例外を分類し、再試行の準備をする
+
+        上限に達したキー（429）は待ち時間が過ぎるまで使わず、次の試行では別のキーを選ぶ。
+        一時的なエラーは指数関数的に伸ばした待ち時間（Retry-Afterの指定があればそれ以上）だけ待つ。
+
+        Args:
+            error: 発生した例外
+            attempt: 失敗した試行の回数（0から）
+            key_index: リクエストを送ったキーのインデックス
+
+        Returns:
+            再試行する場合はTrue
+        """
+        kind = classify_error(error)
+        if kind == FATAL:
+            logger.error(f"再試行しても成功しないエラーのため中止します: {str(error)}")
+            return False
+        if attempt + 1 >= self.max_attempts:
+            return False
+        delay = self.backoff.delay(attempt, retry_after_seconds(error))
+        if kind == RATE_LIMIT:
+            self.rate_limiter.block(key_index, delay)
         else:
-            logger.info(f"{len(self.api_keys)}蛟九�ｮAPI繧ｭ繝ｼ繧定ｪｭ縺ｿ霎ｼ縺ｿ縺ｾ縺励◆")
-        
-        # 迴ｾ蝨ｨ縺ｮAPI繧ｭ繝ｼ縺ｮ繧､繝ｳ繝�繝�繧ｯ繧ｹ
-        self._current_key_index = 0
-        
-        # 蛻晄悄蛹匁凾縺ｫ譛蛻昴�ｮAPI繧ｭ繝ｼ縺ｧ險ｭ螳�
-        self._initialize_client()
-    
-    def _initialize_client(self):
-        """迴ｾ蝨ｨ縺ｮAPI繧ｭ繝ｼ縺ｧ繧ｯ繝ｩ繧､繧｢繝ｳ繝医ｒ蛻晄悄蛹�"""
+            time.sleep(delay)
+        return True
+
+    def _cache_key(self, prompt: str, image_path: Optional[str] = None) -> Optional[str]:
+        """
+        応答キャッシュのキーを作成
+
+        Args:
+            prompt: プロンプト
+            image_path: 送信する画像ファイルのパス
+
+        Returns:
+            キャッシュのキー（キャッシュを使わない場合や画像を読み込めない場合はNone）
+        """
+        if self.response_cache is None:
+            return None
+        image_hash = None
+        if image_path:
+            try:
+                image_hash = ResponseCache.hash_file(image_path)
+            except OSError as e:
+                logger.warning(f"画像 {image_path} のハッシュを計算できませんでした: {str(e)}")
+                return None
+        return ResponseCache.make_key(self.model_name, prompt, image_hash)
+
+    def _cached_response(self, key: Optional[str]) -> Optional[str]:
+        """
+        キャッシュされた応答を取得
+
+        Args:
+            key: キャッシュのキー（Noneの場合はキャッシュを使わない）
+
+        Returns:
+            応答（キャッシュがない場合やキャッシュを読まない場合はNone）
+        """
+        if key is None or self.bypass_cache:
+            return None
         try:
-            import google.generativeai as genai
-            if self.api_keys:
-                genai.configure(api_key=self.api_keys[self._current_key_index])
-                self.model = genai.GenerativeModel('gemini-1.5-flash')
-                logger.info(f"Gemini 1.5 Flash繝｢繝�繝ｫ繧貞�晄悄蛹悶＠縺ｾ縺励◆�ｼ�API繧ｭ繝ｼ {self._current_key_index + 1}繧剃ｽｿ逕ｨ�ｼ�")
-            else:
-                logger.error("API繧ｭ繝ｼ縺瑚ｨｭ螳壹＆繧後※縺�縺ｪ縺�縺溘ａ繧ｯ繝ｩ繧､繧｢繝ｳ繝医ｒ蛻晄悄蛹悶〒縺阪∪縺帙ｓ")
-        except ImportError:
-            logger.error("google-generativeai繝ｩ繧､繝悶Λ繝ｪ縺後う繝ｳ繧ｹ繝医�ｼ繝ｫ縺輔ｌ縺ｦ縺�縺ｾ縺帙ｓ")
-    
-    def _rotate_api_key(self):
-        """谺｡縺ｮAPI繧ｭ繝ｼ縺ｫ蛻�繧頑崛縺�"""
-        self._current_key_index = (self._current_key_index + 1) % len(self.api_keys)
-        self._initialize_client()
-        logger.info(f"API繧ｭ繝ｼ繧偵Ο繝ｼ繝�繝ｼ繧ｷ繝ｧ繝ｳ: 繧ｭ繝ｼ{self._current_key_index + 1}縺ｫ蛻�繧頑崛縺�")
-    
+            return self.response_cache.get(key)
+        except Exception as e:
+            logger.warning(f"応答キャッシュを読み込めませんでした: {str(e)}")
+            return None
+
+    def _store_response(self, key: Optional[str], text: str) -> None:
+        """
+        成功した応答をキャッシュに保存
+
+        Args:
+            key: キャッシュのキー（Noneの場合は保存しない）
+            text: 応答
+        """
+        if key is None:
+            return
+        try:
+            self.response_cache.put(key, text, self.model_name)
+        except Exception as e:
+            logger.warning(f"応答をキャッシュに保存できませんでした: {str(e)}")
+
     def text_analysis(self, prompt: str) -> str:
         """繝�繧ｭ繧ｹ繝亥��譫舌Μ繧ｯ繧ｨ繧ｹ繝医ｒ騾∽ｿ｡�ｼ�API繧ｭ繝ｼ縺ｮ繝ｭ繝ｼ繝�繝ｼ繧ｷ繝ｧ繝ｳ繧貞性繧�ｼ�"""
+        # 同じモデル・プロンプトの応答がキャッシュにあればAPIを呼び出さない
+        cache_key = self._cache_key(prompt)
+        cached = self._cached_response(cache_key)
+        if cached is not None:
+            return cached
+
         if not self.api_keys:
             logger.error("API繧ｭ繝ｼ縺瑚ｨｭ螳壹＆繧後※縺�縺ｪ縺�縺溘ａ繝ｪ繧ｯ繧ｨ繧ｹ繝医ｒ騾∽ｿ｡縺ｧ縺阪∪縺帙ｓ")
             return "{}"  # 遨ｺ縺ｮJSON繧ｪ繝悶ず繧ｧ繧ｯ繝�
         
-        # JSON蠖｢蠑上�ｮ繝ｬ繧ｹ繝昴Φ繧ｹ繧呈�守､ｺ逧�縺ｫ隕∵ｱ�
-        if "JSON蠖｢蠑上〒霑斐＠縺ｦ" not in prompt:
-            prompt = f"{prompt}\n\n蠢�縺壻ｻ･荳九�ｮJSON蠖｢蠑上〒邨先棡繧定ｿ斐＠縺ｦ縺上□縺輔＞縲ゆｻ悶�ｮ譁�遶縺ｯ荳蛻�蜷ｫ繧√↑縺�縺ｧ縺上□縺輔＞�ｼ�"
+        prompt = self._require_json(prompt)
         
-        # 譛螟ｧ3蝗槭∪縺ｧ逡ｰ縺ｪ繧帰PI繧ｭ繝ｼ縺ｧ隧ｦ陦�
-        for _ in range(min(3, len(self.api_keys))):
+        # レート制限の範囲内で送信できるキーを選び、失敗した場合はエラーの種類に応じて再試行する
+        tokens = estimate_tokens(prompt)
+        for attempt in range(self.max_attempts):
+            key_index, model = self._acquire_key(tokens)
+            if model is None:
+                break
             try:
-                response = self.model.generate_content(prompt)
+                response = model.generate_content(prompt)
+                self._record_usage(key_index, tokens, response)
+                text = self._response_text(response)
                 
-                if response.text:
-                    logger.info(f"API繧ｭ繝ｼ{self._current_key_index + 1}縺ｧ縺ｮ繝�繧ｭ繧ｹ繝亥��譫舌′謌仙粥縺励∪縺励◆")
-                    
-                    # JSON蠖｢蠑上↓謨ｴ蠖｢
-                    text = response.text.strip()
-                    if text.startswith("```json"):
-                        text = text[7:]
-                    if text.endswith("```"):
-                        text = text[:-3]
-                    
-                    return text.strip()
+                if text:
+                    logger.info(f"API繧ｭ繝ｼ{key_index + 1}縺ｧ縺ｮ繝�繧ｭ繧ｹ繝亥��譫舌′謌仙粥縺励∪縺励◆")
+                    text = self._strip_json_fence(text)
+                    self._store_response(cache_key, text)
+                    return text
                 
             except Exception as e:
-                logger.warning(f"API繧ｭ繝ｼ{self._current_key_index + 1}縺ｧ縺ｮ繝�繧ｭ繧ｹ繝亥��譫舌↓螟ｱ謨�: {str(e)}")
-                self._rotate_api_key()
-                continue
+                if not is_api_error(e):
+                    raise
+                logger.warning(f"API繧ｭ繝ｼ{key_index + 1}縺ｧ縺ｮ繝�繧ｭ繧ｹ繝亥��譫舌↓螟ｱ謨�: {str(e)}")
+                if not self._handle_error(e, attempt, key_index):
+                    break
         
         logger.error("蜈ｨ縺ｦ縺ｮAPI繧ｭ繝ｼ縺ｧ縺ｮ繝�繧ｭ繧ｹ繝亥��譫舌↓螟ｱ謨励＠縺ｾ縺励◆")
         return "{}"  # 遨ｺ縺ｮJSON繧ｪ繝悶ず繧ｧ繧ｯ繝�
     
+    def text_analysis_stream(self, prompt: str) -> Iterator[str]:
+        """
+        テキスト分析リクエストを送信し、応答をストリーミングで少しずつ返す
+
+        最初のチャンクを受け取るまでに失敗した場合はAPIキーをローテーションして再試行する。
+        受け取り始めた後に失敗した場合は、重複を避けるため再試行せずに終了する。
+
+        Args:
+            prompt: プロンプト
+
+        Yields:
+            応答のテキストの断片（失敗した場合は"{}"）
+        """
+        cache_key = self._cache_key(prompt)
+        cached = self._cached_response(cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+        if not self.api_keys:
+            logger.error("APIキーが設定されていないためリクエストを送信できません")
+            yield "{}"
+            return
+
+        prompt = self._require_json(prompt)
+        
+        # レート制限の範囲内で送信できるキーを選び、失敗した場合はエラーの種類に応じて再試行する
+        tokens = estimate_tokens(prompt)
+        for attempt in range(self.max_attempts):
+            key_index, model = self._acquire_key(tokens)
+            if model is None:
+                break
+            parts: List[str] = []
+            last_chunk = None
+            try:
+                for chunk in model.generate_content(prompt, stream=True):
+                    last_chunk = chunk
+                    text = self._response_text(chunk)
+                    if text:
+                        parts.append(text)
+                        yield text
+                # 使用量は最後の断片に含まれる
+                if last_chunk is not None:
+                    self._record_usage(key_index, tokens, last_chunk)
+                if parts:
+                    logger.info(f"APIキー{key_index + 1}でのストリーミングが完了しました")
+                    self._store_response(cache_key, self._strip_json_fence(''.join(parts)))
+                    return
+            except Exception as e:
+                if not is_api_error(e):
+                    raise
+                if parts:
+                    logger.error(f"ストリーミングの途中で失敗しました: {str(e)}")
+                    return
+                logger.warning(f"APIキー{key_index + 1}でのストリーミングに失敗: {str(e)}")
+                if not self._handle_error(e, attempt, key_index):
+                    break
+
+        logger.error("全てのAPIキーでのストリーミングに失敗しました")
+        yield "{}"
+
     def analyze_image(self, image_path: str, prompt: str = None) -> str:
         """逕ｻ蜒丞��譫舌Μ繧ｯ繧ｨ繧ｹ繝医ｒ騾∽ｿ｡"""
+        # 同じモデル・プロンプト・画像の応答がキャッシュにあればAPIを呼び出さない
+        cache_key = self._cache_key(prompt or '', image_path)
+        cached = self._cached_response(cache_key)
+        if cached is not None:
+            return cached
+
         if not self.api_keys:
             logger.error("API繧ｭ繝ｼ縺瑚ｨｭ螳壹＆繧後※縺�縺ｪ縺�縺溘ａ繝ｪ繧ｯ繧ｨ繧ｹ繝医ｒ騾∽ｿ｡縺ｧ縺阪∪縺帙ｓ")
             return "{}"  # 遨ｺ縺ｮJSON繧ｪ繝悶ず繧ｧ繧ｯ繝�
@@ -118,37 +391,40 @@ class GeminiClient:
         if not prompt:
             prompt = "縺薙�ｮ逕ｻ蜒上↓縺､縺�縺ｦ隧ｳ縺励￥蛻�譫舌＠縲゛SON縺ｧ霑斐＠縺ｦ縺上□縺輔＞縲�"
         
-        # JSON蠖｢蠑上�ｮ繝ｬ繧ｹ繝昴Φ繧ｹ繧呈�守､ｺ逧�縺ｫ隕∵ｱ�
-        if "JSON蠖｢蠑上〒霑斐＠縺ｦ" not in prompt:
-            prompt = f"{prompt}\n\n蠢�縺壻ｻ･荳九�ｮJSON蠖｢蠑上〒邨先棡繧定ｿ斐＠縺ｦ縺上□縺輔＞縲ゆｻ悶�ｮ譁�遶縺ｯ荳蛻�蜷ｫ繧√↑縺�縺ｧ縺上□縺輔＞�ｼ�"
+        prompt = self._require_json(prompt)
         
-        # 譛螟ｧ3蝗槭∪縺ｧ逡ｰ縺ｪ繧帰PI繧ｭ繝ｼ縺ｧ隧ｦ陦�
-        for _ in range(min(3, len(self.api_keys))):
+        # 逕ｻ蜒上�ｮ隱ｭ縺ｿ霎ｼ縺ｿ
+        try:
+            from IPython.display import Image as IPImage
+
+            image = IPImage(filename=image_path)
+        except Exception as e:
+            logger.error(f"画像 {image_path} を読み込めませんでした: {str(e)}")
+            return "{}"
+        
+        # レート制限の範囲内で送信できるキーを選び、失敗した場合はエラーの種類に応じて再試行する
+        tokens = estimate_tokens(prompt) + self.IMAGE_TOKENS
+        for attempt in range(self.max_attempts):
+            key_index, model = self._acquire_key(tokens)
+            if model is None:
+                break
             try:
-                # 逕ｻ蜒上�ｮ隱ｭ縺ｿ霎ｼ縺ｿ
-                import google.generativeai as genai
-                from IPython.display import Image as IPImage
-                
-                image = IPImage(filename=image_path)
-                
-                response = self.model.generate_content([prompt, image])
+                response = model.generate_content([prompt, image])
+                self._record_usage(key_index, tokens, response)
+                text = self._response_text(response)
                 
-                if response.text:
-                    logger.info(f"API繧ｭ繝ｼ{self._current_key_index + 1}縺ｧ縺ｮ逕ｻ蜒丞��譫舌′謌仙粥縺励∪縺励◆")
-                    
-                    # JSON蠖｢蠑上↓謨ｴ蠖｢
-                    text = response.text.strip()
-                    if text.startswith("```json"):
-                        text = text[7:]
-                    if text.endswith("```"):
-                        text = text[:-3]
-                    
-                    return text.strip()
+                if text:
+                    logger.info(f"API繧ｭ繝ｼ{key_index + 1}縺ｧ縺ｮ逕ｻ蜒丞��譫舌′謌仙粥縺励∪縺励◆")
+                    text = self._strip_json_fence(text)
+                    self._store_response(cache_key, text)
+                    return text
                 
             except Exception as e:
-                logger.warning(f"API繧ｭ繝ｼ{self._current_key_index + 1}縺ｧ縺ｮ逕ｻ蜒丞��譫舌↓螟ｱ謨�: {str(e)}")
-                self._rotate_api_key()
-                continue
+                if not is_api_error(e):
+                    raise
+                logger.warning(f"API繧ｭ繝ｼ{key_index + 1}縺ｧ縺ｮ逕ｻ蜒丞��譫舌↓螟ｱ謨�: {str(e)}")
+                if not self._handle_error(e, attempt, key_index):
+                    break
         
         logger.error("蜈ｨ縺ｦ縺ｮAPI繧ｭ繝ｼ縺ｧ縺ｮ逕ｻ蜒丞��譫舌↓螟ｱ謨励＠縺ｾ縺励◆")
         return "{}"  # 遨ｺ縺ｮJSON繧ｪ繝悶ず繧ｧ繧ｯ繝�
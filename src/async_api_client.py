@@ -0,0 +1,328 @@
+"""非同期のAPI呼び出しクライアント"""
+
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set
+
+from .api_client import GeminiClient
+from .llm_backend import GeminiKeyModel
+from .prompt_builder import estimate_tokens
+from .rate_limiter import (FATAL, RATE_LIMIT, Backoff, KeyRateLimiter, classify_error, is_api_error,
+                           retry_after_seconds, usage_tokens)
+from .response_cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncGeminiClient:
+    """
+    複数のAPIキーに同時にリクエストを振り分ける非同期のGeminiクライアント
+
+    GeminiClientは1つのキーを使い続け、失敗したときだけ次のキーに切り替えるが、
+    このクライアントはキーごとにセッションを持ち、各キーでper_key_concurrency件まで
+    同時にリクエストを送る。リクエストは実行中の件数が少ないキーから順に割り当てるため、
+    キー全体に均等に振り分けられる。キーごとのRPM・TPMの上限とエラーの分類、再試行の
+    待ち時間はGeminiClientと同じKeyRateLimiterとBackoffで扱い、失敗したリクエストは
+    まだ試していないキーで再試行する。プロンプトの整形と応答キャッシュのキーもGeminiClientと同じ。
+    """
+
+    # 画像分析の既定のプロンプト
+    DEFAULT_IMAGE_PROMPT = "この画像について詳しく分析し、JSONで返してください。"
+
+    def __init__(self, api_keys: Optional[Sequence[str]] = None,
+                 model_name: str = GeminiClient.DEFAULT_MODEL,
+                 per_key_concurrency: int = 2, max_attempts: int = 4,
+                 response_cache: Optional[ResponseCache] = None,
+                 rate_limiter: Optional[KeyRateLimiter] = None, backoff: Optional[Backoff] = None,
+                 session_factory: Optional[Callable[[str], Any]] = None):
+        """
+        コンストラクタ
+
+        Args:
+            api_keys: APIキーのリスト（Noneの場合は環境変数から読み込む）
+            model_name: 使用するモデル
+            per_key_concurrency: キーごとに同時に送るリクエスト数の上限
+            max_attempts: 1件のリクエストを試行する回数の上限
+            response_cache: 応答キャッシュ（Noneの場合はキャッシュしない）
+            rate_limiter: キーごとのレート制限（Noneの場合は上限を設けず、429を受けたキーだけ避ける）
+            backoff: 再試行までの待ち時間の計算方法
+            session_factory: APIキーからgenerate_content_asyncを持つセッションを作成する関数
+                （Noneの場合はキーごとにGeminiKeyModelを作成）
+        """
+        if per_key_concurrency < 1:
+            raise ValueError(f"per_key_concurrencyは1以上を指定してください: {per_key_concurrency}")
+        self.api_keys = list(api_keys) if api_keys is not None else GeminiClient.load_api_keys()
+        self.model_name = model_name
+        self.per_key_concurrency = per_key_concurrency
+        self.max_attempts = max_attempts
+        self.response_cache = response_cache
+        self.rate_limiter = rate_limiter or KeyRateLimiter(len(self.api_keys))
+        self.backoff = backoff or Backoff()
+        self.requests_per_key = [0] * len(self.api_keys)
+        self._session_factory = session_factory or self._create_session
+        self._sessions: Dict[int, Any] = {}
+        self._in_flight = [0] * len(self.api_keys)
+        self._available: Optional[asyncio.Condition] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        if not self.api_keys:
+            logger.warning("APIキーが設定されていません")
+
+    def _create_session(self, api_key: str) -> Any:
+        """
+        APIキーを指定した非同期クライアントでリクエストを送るモデルを作成
+
+        Args:
+            api_key: APIキー
+
+        Returns:
+            GeminiKeyModel
+        """
+        return GeminiKeyModel(api_key, self.model_name)
+
+    def _prepare_loop(self) -> None:
+        """実行中のイベントループで使う同期オブジェクトとセッションを用意する"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        # Conditionや非同期クライアントはイベントループに結び付くため、ループごとに作り直す
+        self._loop = loop
+        self._sessions = {}
+        self._in_flight = [0] * len(self.api_keys)
+        self._available = asyncio.Condition()
+
+    async def _acquire(self, tried: Set[int], tokens: int) -> int:
+        """
+        同時実行数とレート制限に空きのあるキーを1つ確保する（空きがない場合は待つ）
+
+        Args:
+            tried: このリクエストですでに試したキーのインデックス
+                （すべてのキーを試した場合を除き、これらのキーは選ばない）
+            tokens: リクエストで使うトークン数の見積もり
+
+        Returns:
+            確保したキーのインデックス
+        """
+        async with self._available:
+            while True:
+                free = [i for i, count in enumerate(self._in_flight) if count < self.per_key_concurrency]
+                if len(tried) < len(self.api_keys):
+                    free = [i for i in free if i not in tried]
+                wait = None
+                if free:
+                    free.sort(key=lambda i: (self._in_flight[i], self.requests_per_key[i]))
+                    key_index, wait = self.rate_limiter.reserve(tokens, candidates=free)
+                    if wait <= 0:
+                        self._in_flight[key_index] += 1
+                        self.requests_per_key[key_index] += 1
+                        return key_index
+                # 他のリクエストが枠を解放するか、レート制限が補充されるまで待つ
+                try:
+                    await asyncio.wait_for(self._available.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _release(self, key_index: int) -> None:
+        """確保したキーを解放する"""
+        async with self._available:
+            self._in_flight[key_index] -= 1
+            self._available.notify_all()
+
+    def _session(self, key_index: int) -> Any:
+        """キーのセッションを取得（初回は作成する）"""
+        session = self._sessions.get(key_index)
+        if session is None:
+            session = self._sessions[key_index] = self._session_factory(self.api_keys[key_index])
+        return session
+
+    async def _generate(self, contents: Any, tokens: int) -> Optional[str]:
+        """
+        空いているキーでリクエストを送信し、失敗した場合はまだ試していないキーで再試行する
+
+        Args:
+            contents: generate_content_asyncに渡す内容
+            tokens: リクエストで使うトークン数の見積もり
+
+        Returns:
+            整形した応答（すべての試行に失敗した場合はNone）
+        """
+        self._prepare_loop()
+        tried: Set[int] = set()
+        for attempt in range(self.max_attempts):
+            key_index = await self._acquire(tried, tokens)
+            tried.add(key_index)
+            delay = 0.0
+            try:
+                session = self._session(key_index)
+            except ImportError:
+                await self._release(key_index)
+                logger.error("google-generativeaiライブラリがインストールされていません")
+                return None
+            try:
+                response = await session.generate_content_async(contents)
+                actual = usage_tokens(response)
+                if actual is not None:
+                    self.rate_limiter.record_usage(key_index, tokens, actual)
+                text = GeminiClient._response_text(response)
+                if text:
+                    return GeminiClient._strip_json_fence(text)
+            except Exception as e:
+                if not is_api_error(e):
+                    raise
+                kind = classify_error(e)
+                logger.warning(f"APIキー{key_index + 1}でのリクエストに失敗（{kind}）: {str(e)}")
+                if kind == FATAL or attempt + 1 >= self.max_attempts:
+                    return None
+                delay = self.backoff.delay(attempt, retry_after_seconds(e))
+                if kind == RATE_LIMIT:
+                    # 上限に達したキーは待ち時間が過ぎるまで使わず、別のキーですぐに再試行する
+                    self.rate_limiter.block(key_index, delay)
+                    delay = 0.0
+            finally:
+                await self._release(key_index)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        return None
+
+    def _cached(self, key: Optional[str]) -> Optional[str]:
+        """キャッシュされた応答を取得（キャッシュを使わない場合はNone）"""
+        if key is None:
+            return None
+        try:
+            return self.response_cache.get(key)
+        except Exception as e:
+            logger.warning(f"応答キャッシュを読み込めませんでした: {str(e)}")
+            return None
+
+    def _store(self, key: Optional[str], text: str) -> None:
+        """成功した応答をキャッシュに保存"""
+        if key is None:
+            return
+        try:
+            self.response_cache.put(key, text, self.model_name)
+        except Exception as e:
+            logger.warning(f"応答をキャッシュに保存できませんでした: {str(e)}")
+
+    async def text_analysis(self, prompt: str) -> str:
+        """
+        テキスト分析リクエストを送信
+
+        Args:
+            prompt: プロンプト
+
+        Returns:
+            JSON形式の応答（失敗した場合は"{}"）
+        """
+        cache_key = None
+        if self.response_cache is not None:
+            cache_key = ResponseCache.make_key(self.model_name, prompt)
+        cached = self._cached(cache_key)
+        if cached is not None:
+            return cached
+        if not self.api_keys:
+            logger.error("APIキーが設定されていないためリクエストを送信できません")
+            return "{}"
+
+        prompt = GeminiClient._require_json(prompt)
+        text = await self._generate(prompt, estimate_tokens(prompt))
+        if text is None:
+            logger.error("全ての試行でテキスト分析に失敗しました")
+            return "{}"
+        self._store(cache_key, text)
+        return text
+
+    async def analyze_image(self, image_path: str, prompt: Optional[str] = None) -> str:
+        """
+        画像分析リクエストを送信
+
+        Args:
+            image_path: 画像ファイルのパス
+            prompt: プロンプト（Noneの場合はDEFAULT_IMAGE_PROMPT）
+
+        Returns:
+            JSON形式の応答（失敗した場合は"{}"）
+        """
+        cache_key = None
+        if self.response_cache is not None:
+            try:
+                image_hash = await asyncio.to_thread(ResponseCache.hash_file, image_path)
+                cache_key = ResponseCache.make_key(self.model_name, prompt or '', image_hash)
+            except OSError as e:
+                logger.warning(f"画像 {image_path} のハッシュを計算できませんでした: {str(e)}")
+        cached = self._cached(cache_key)
+        if cached is not None:
+            return cached
+        if not self.api_keys:
+            logger.error("APIキーが設定されていないためリクエストを送信できません")
+            return "{}"
+
+        try:
+            image = await asyncio.to_thread(self._load_image, image_path)
+        except Exception as e:
+            logger.error(f"画像 {image_path} を読み込めませんでした: {str(e)}")
+            return "{}"
+        prompt = GeminiClient._require_json(prompt or self.DEFAULT_IMAGE_PROMPT)
+        text = await self._generate([prompt, image], estimate_tokens(prompt) + GeminiClient.IMAGE_TOKENS)
+        if text is None:
+            logger.error("全ての試行で画像分析に失敗しました")
+            return "{}"
+        self._store(cache_key, text)
+        return text
+
+    @staticmethod
+    def _load_image(image_path: str) -> Any:
+        """画像ファイルを読み込む"""
+        from PIL import Image
+
+        with Image.open(image_path) as image:
+            image.load()
+            return image.copy()
+
+    async def gather_text_analysis(self, prompts: Sequence[str]) -> List[str]:
+        """
+        複数のテキスト分析リクエストを同時に送信
+
+        Args:
+            prompts: プロンプトのリスト
+
+        Returns:
+            プロンプトと同じ順の応答のリスト
+        """
+        return list(await asyncio.gather(*(self.text_analysis(prompt) for prompt in prompts)))
+
+    async def gather_image_analysis(self, image_paths: Sequence[str], prompt: Optional[str] = None) -> List[str]:
+        """
+        複数の画像分析リクエストを同時に送信
+
+        Args:
+            image_paths: 画像ファイルのパスのリスト
+            prompt: すべての画像に使うプロンプト
+
+        Returns:
+            画像と同じ順の応答のリスト
+        """
+        return list(await asyncio.gather(*(self.analyze_image(path, prompt) for path in image_paths)))
+
+    def text_analysis_batch(self, prompts: Sequence[str]) -> List[str]:
+        """
+        gather_text_analysisを同期的に実行（イベントループの外から呼び出す）
+
+        Args:
+            prompts: プロンプトのリスト
+
+        Returns:
+            プロンプトと同じ順の応答のリスト
+        """
+        return asyncio.run(self.gather_text_analysis(prompts))
+
+    def analyze_image_batch(self, image_paths: Sequence[str], prompt: Optional[str] = None) -> List[str]:
+        """
+        gather_image_analysisを同期的に実行（イベントループの外から呼び出す）
+
+        Args:
+            image_paths: 画像ファイルのパスのリスト
+            prompt: すべての画像に使うプロンプト
+
+        Returns:
+            画像と同じ順の応答のリスト
+        """
+        return asyncio.run(self.gather_image_analysis(image_paths, prompt))
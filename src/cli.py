@@ -5,7 +5,6 @@ import json
 import os
 from typing import Dict, Any
 from .main import VideoEditAgent
-from .gui import main as gui_main
 
 def load_config(config_path: str) -> Dict[str, Any]:
     """險ｭ螳壹ヵ繧｡繧､繝ｫ繧定ｪｭ縺ｿ霎ｼ繧"""
@@ -28,6 +27,8 @@ def main():
     # select 繧ｳ繝槭Φ繝�
     select_parser = subparsers.add_parser('select', help='繧ｷ繝翫Μ繧ｪ縺ｫ蝓ｺ縺･縺�縺ｦ繧ｷ繝ｼ繝ｳ繧帝∈謚�')
     select_parser.add_argument('-c', '--config', required=True, help='險ｭ螳壹ヵ繧｡繧､繝ｫ縺ｮ繝代せ')
+    select_parser.add_argument('--no-cache', action='store_true',
+                               help='シーン選択と応答のキャッシュを読まずに生成AIを呼び出す')
     
     # generate 繧ｳ繝槭Φ繝�
     generate_parser = subparsers.add_parser('generate', help='EDL縺ｨSRT繝輔ぃ繧､繝ｫ繧堤函謌�')
@@ -36,6 +37,16 @@ def main():
     # run 繧ｳ繝槭Φ繝会ｼ亥�ｨ繝輔ぉ繝ｼ繧ｺ繧貞ｮ溯｡鯉ｼ�
     run_parser = subparsers.add_parser('run', help='縺吶∋縺ｦ縺ｮ繝輔ぉ繝ｼ繧ｺ繧帝�逡ｪ縺ｫ螳溯｡�')
     run_parser.add_argument('-c', '--config', required=True, help='險ｭ螳壹ヵ繧｡繧､繝ｫ縺ｮ繝代せ')
+    run_parser.add_argument('--no-cache', action='store_true',
+                            help='シーン選択と応答のキャッシュを読まずに生成AIを呼び出す')
+    
+    # watch コマンド
+    watch_parser = subparsers.add_parser('watch', help='入力ディレクトリを監視し、追加されたコンテンツを取り込み続ける')
+    watch_parser.add_argument('-c', '--config', required=True, help='險ｭ螳壹ヵ繧｡繧､繝ｫ縺ｮ繝代せ')
+    watch_parser.add_argument('--interval', type=float, default=5.0, help='走査間隔（秒）')
+    watch_parser.add_argument('--settle', type=float, default=2.0,
+                              help='nodes.jsonの更新が止まってから取り込むまでの待ち時間（秒）')
+    watch_parser.add_argument('--no-concept', action='store_true', help='変更時にコンセプトを再生成しない')
     
     args = parser.parse_args()
     
@@ -44,28 +55,37 @@ def main():
         return
     
     if args.command == 'gui':
+        # GUIの依存（tkinterなど）はGUIモードでのみ読み込む
+        from .gui import main as gui_main
         gui_main()
         return
     
     try:
         # 險ｭ螳壹ヵ繧｡繧､繝ｫ繧定ｪｭ縺ｿ霎ｼ繧
         config = load_config(args.config)
+        if getattr(args, 'no_cache', False):
+            options = config.setdefault('options', {})
+            options['selection_cache_bypass'] = True
+            options['response_cache_bypass'] = True
         agent = VideoEditAgent(config)
         
         if args.command == 'analyze':
             agent.analyze_contents()
             
         elif args.command == 'select':
-            contents = agent.analyze_contents()
-            agent.select_scenes(contents)
+            # analyzeで保存したcontents.jsonと、作成したscenario.jsonからシーンを選択する
+            agent.select_scenes(os.path.join(config['output_dir'], 'scenario.json'))
             
         elif args.command == 'generate':
-            contents = agent.analyze_contents()
-            selected_scenes, scenario = agent.select_scenes(contents)
-            agent.generate_outputs(selected_scenes, scenario)
+            # selectで保存したselected.jsonからEDLとSRTを生成する
+            agent.generate_outputs(os.path.join(config['output_dir'], 'selected.json'))
+            
+        elif args.command == 'watch':
+            agent.watch_contents(interval=args.interval, settle_seconds=args.settle,
+                                 update_concept=not args.no_concept)
             
         elif args.command == 'run':
-            agent.process()
+            agent.run()
             
     except Exception as e:
         print(f"繧ｨ繝ｩ繝ｼ縺檎匱逕溘＠縺ｾ縺励◆: {str(e)}")
@@ -0,0 +1,108 @@
+"""遅延読み込みコンテンツモジュール"""
+
+import threading
+from collections.abc import Mapping
+from typing import Dict, Any, Callable, Iterator, List, Sequence
+
+
+class Content(Mapping):
+    """
+    クリップ単位の情報だけを保持し、シーンは初回参照時に読み込むコンテンツ
+
+    content_id、total_duration、scene_count、topicsはクロール時に読み込み、
+    'scenes'を参照したときに初めてローダーを呼び出してシーンとトランスクリプトを構築する。
+    読み込んだシーンは保持され、releaseで解放すると次回の参照時に再度読み込む。
+    従来のコンテンツ辞書と同じキー（content_id、scenes、total_duration）で参照できる。
+    """
+
+    KEYS = ('content_id', 'scenes', 'total_duration')
+    # ヘッダーに含まれる場合だけ参照できるキー
+    OPTIONAL_KEYS = ('clip', 'source_root')
+
+    def __init__(self, header: Dict[str, Any], loader: Callable[[], Sequence[Dict[str, Any]]]):
+        """
+        コンストラクタ
+
+        Args:
+            header: content_id、total_duration、scene_count、topicsを含む辞書
+                （detailedの場合はclip、複数の入力ディレクトリをクロールした場合はsource_rootも）
+            loader: シーンのリストを返す関数
+        """
+        self.header = header
+        self._loader = loader
+        self._scenes = None
+        self._lock = threading.Lock()
+
+    @property
+    def content_id(self) -> str:
+        """コンテンツID"""
+        return self.header['content_id']
+
+    @property
+    def total_duration(self) -> float:
+        """総再生時間（秒）"""
+        return self.header.get('total_duration', 0.0)
+
+    @property
+    def scene_count(self) -> int:
+        """シーン数（シーンを読み込まずに参照できる）"""
+        return self.header.get('scene_count', 0)
+
+    @property
+    def topics(self) -> List[str]:
+        """クリップのトピック（シーンを読み込まずに参照できる）"""
+        return self.header.get('topics', [])
+
+    @property
+    def is_loaded(self) -> bool:
+        """シーンを読み込み済みかどうか"""
+        return self._scenes is not None
+
+    def load_scenes(self) -> Sequence[Dict[str, Any]]:
+        """
+        シーンを読み込む（読み込み済みの場合は保持しているものを返す）
+
+        Returns:
+            シーン情報のリスト
+        """
+        scenes = self._scenes
+        if scenes is None:
+            with self._lock:
+                if self._scenes is None:
+                    self._scenes = self._loader()
+                scenes = self._scenes
+        return scenes
+
+    def release(self) -> None:
+        """読み込んだシーンを解放する"""
+        with self._lock:
+            self._scenes = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        従来形式のコンテンツ辞書に変換（シーンを読み込む）
+
+        Returns:
+            コンテンツ情報
+        """
+        return dict(self)
+
+    def __getitem__(self, key: str) -> Any:
+        if key == 'scenes':
+            return self.load_scenes()
+        if (key in ('content_id', 'total_duration') or key in self.OPTIONAL_KEYS) and key in self.header:
+            return self.header[key]
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.KEYS
+        for key in self.OPTIONAL_KEYS:
+            if key in self.header:
+                yield key
+
+    def __len__(self) -> int:
+        return len(self.KEYS) + sum(key in self.header for key in self.OPTIONAL_KEYS)
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self.is_loaded else 'unloaded'
+        return f"Content({self.content_id!r}, scenes={self.scene_count}, {state})"
@@ -1,32 +1,359 @@
 """繧ｳ繝ｳ繝�繝ｳ繝�謗｢邏｢繝｢繧ｸ繝･繝ｼ繝ｫ"""
 
 import os
-import json
-from typing import List, Dict, Any
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+from typing import TYPE_CHECKING, List, Dict, Any, Iterator, Optional
+
+from .content import Content
+from .content_discovery import DirectoryScanner
+from .crawl_index import CrawlIndex
+from .nodes_decoder import NodesDecoder
+
+if TYPE_CHECKING:
+    from .scene_table import StringPool
 
 class ContentCrawler:
-    def __init__(self):
-        pass
+    def __init__(self, max_workers: int = 1, use_processes: bool = False,
+                 index_path: Optional[str] = None, compact: bool = False,
+                 json_backend: str = 'auto', scanner: Optional[DirectoryScanner] = None,
+                 detailed: bool = False, lazy: bool = False):
+        """
+        コンストラクタ
+
+        Args:
+            max_workers: nodes.jsonを並行して読み込むワーカー数（1の場合は逐次処理）
+            use_processes: JSONのデコードをプロセスプールで行うかどうか
+            index_path: クロールインデックスの保存先（Noneの場合は毎回すべて読み込む）
+            compact: シーンをSceneTable（列指向の省メモリ形式）で返すかどうか
+            json_backend: nodes.jsonのデコードに使うバックエンド（'auto'、'msgspec'、'orjson'、'json'）
+            scanner: コンテンツディレクトリの探索に使うDirectoryScanner（Noneの場合は入力ディレクトリ直下のみ）
+            detailed: クリップ情報、トランスクリプトの区間、コンテキスト分析のタグも読み込むかどうか
+            lazy: シーンを初回参照時に読み込むContentを返すかどうか
+        """
+        self.max_workers = max(1, int(max_workers))
+        self.use_processes = use_processes
+        self.lazy = lazy
+        # lazyの場合、インデックスにはシーンを含まないヘッダーだけを保存する
+        profile = ('detailed' if detailed else 'default') + ('+lazy' if lazy else '')
+        self.index = CrawlIndex(index_path, profile) if index_path else None
+        self.last_changes: Dict[str, List[str]] = {'added': [], 'modified': [], 'removed': []}
+        self.root_changes: Dict[str, Dict[str, List[str]]] = {}
+        self._digests: Dict[str, str] = {}
+        self.compact = compact
+        self.string_pool: Optional['StringPool'] = None
+        if compact:
+            # scene_tableはnumpyを使うため、compactの場合だけ読み込む（numpyの読み込みには時間がかかる）
+            from .scene_table import StringPool
+            self.string_pool = StringPool()
+        self.decoder = NodesDecoder(json_backend, detailed=detailed)
+        self.scanner = scanner if scanner is not None else DirectoryScanner(max_depth=1)
 
     def crawl(self, input_dir: str) -> List[Dict[str, Any]]:
         """謖�螳壹＆繧後◆繝�繧｣繝ｬ繧ｯ繝医Μ縺九ｉ繧ｳ繝ｳ繝�繝ｳ繝�繧呈爾邏｢"""
         contents = []
         
         try:
-            # 繝�繧｣繝ｬ繧ｯ繝医Μ蜀�縺ｮvideo_nodes_縺ｧ蟋九∪繧九ョ繧｣繝ｬ繧ｯ繝医Μ繧呈爾邏｢
-            for item in os.listdir(input_dir):
-                item_path = os.path.join(input_dir, item)
-                if os.path.isdir(item_path) and item.startswith('video_nodes_'):
-                    content = self._load_content(item_path)
-                    if content:
-                        contents.append(content)
+            for content in self.iter_contents(input_dir):
+                contents.append(content)
         except Exception as e:
             print(f"隴ｦ蜻�: 繧ｳ繝ｳ繝�繝ｳ繝�縺ｮ謗｢邏｢荳ｭ縺ｫ繧ｨ繝ｩ繝ｼ縺檎匱逕溘＠縺ｾ縺励◆: {str(e)}")
         
         return contents
 
-    def _load_content(self, content_dir: str) -> Dict[str, Any]:
-        """繧ｳ繝ｳ繝�繝ｳ繝�繝�繧｣繝ｬ繧ｯ繝医Μ縺九ｉ繝�繝ｼ繧ｿ繧定ｪｭ縺ｿ霎ｼ縺ｿ"""
+    def iter_contents(self, input_dir: str, read_ahead: int = 0,
+                      io_pool: Optional[ThreadPoolExecutor] = None) -> Iterator[Dict[str, Any]]:
+        """
+        コンテンツを1件読み込むごとに返すジェネレータ（順序はcrawlと同じ）
+
+        Args:
+            input_dir: 入力ディレクトリ
+            read_ahead: 先読みするディレクトリ数の上限（0の場合はmax_workersに従う）
+            io_pool: nodes.jsonの読み込みに使うスレッドプール（Noneの場合は必要に応じて作成する。
+                指定した場合は複数の入力ディレクトリで共有でき、終了時にシャットダウンしない）
+
+        Yields:
+            整形済みのコンテンツ情報
+        """
+        try:
+            content_dirs = self._find_content_dirs(input_dir)
+        except Exception as e:
+            print(f"隴ｦ蜻�: 繧ｳ繝ｳ繝�繝ｳ繝�縺ｮ謗｢邏｢荳ｭ縺ｫ繧ｨ繝ｩ繝ｼ縺檎匱逕溘＠縺ｾ縺励◆: {str(e)}")
+            return
+
+        if self.index is None:
+            loaded = self._iter_loaded(content_dirs, read_ahead, io_pool)
+        else:
+            loaded = self._iter_loaded_indexed(input_dir, content_dirs, read_ahead, io_pool)
+
+        for content in loaded:
+            if content:
+                yield self._finish(content)
+
+    def refresh(self, content_dir: str) -> Optional[Dict[str, Any]]:
+        """
+        1つのコンテンツディレクトリを読み込み直す
+
+        クロールインデックスを使用している場合は、変更がなければインデックスの内容を返し、
+        読み込んだ場合はインデックスのエントリを更新する（保存はsave_indexで行う）。
+
+        Args:
+            content_dir: コンテンツディレクトリのパス
+
+        Returns:
+            コンテンツ情報（読み込めなかった場合はNone）
+        """
+        if self.index is None:
+            content = self._load_content(content_dir)
+        else:
+            stat = self._stat_nodes(content_dir)
+            if self.index.is_fresh(content_dir, stat):
+                content = self.index.get_content(content_dir)
+            else:
+                self._digests.pop(content_dir, None)
+                content = self._load_content(content_dir)
+                digest = self._digests.pop(content_dir, None)
+                if content is None or digest is None or stat is None:
+                    self.index.remove(content_dir)
+                else:
+                    self.index.put(content_dir, stat, digest, content)
+
+        return self._finish(content) if content else content
+
+    def save_index(self) -> None:
+        """クロールインデックスを使用している場合は保存する"""
+        if self.index is not None:
+            self.index.save()
+
+    def _find_content_dirs(self, input_dir: str) -> List[str]:
+        """
+        入力ディレクトリ配下のvideo_nodes_ディレクトリを列挙
+
+        Args:
+            input_dir: 入力ディレクトリ
+
+        Returns:
+            コンテンツディレクトリのリスト
+        """
+        return self.scanner.scan(input_dir)
+
+    def _iter_loaded_indexed(self, input_dir: str, content_dirs: List[str], read_ahead: int = 0,
+                             io_pool: Optional[ThreadPoolExecutor] = None) -> Iterator[Optional[Dict[str, Any]]]:
+        """
+        クロールインデックスを使い、変更のあったディレクトリだけを読み込む
+
+        nodes.jsonの更新時刻とサイズが一致するディレクトリはファイルを開かずに
+        インデックスの内容を使う。一致しない場合も内容ハッシュが同じであればデコードを省略する。
+        すべて読み終えた時点で、追加・変更・削除されたコンテンツIDをlast_changesと
+        root_changes（入力ディレクトリごと）に記録する。
+
+        Args:
+            input_dir: クロールした入力ディレクトリ
+            content_dirs: コンテンツディレクトリのリスト
+            read_ahead: 先読みするディレクトリ数の上限
+            io_pool: nodes.jsonの読み込みに使うスレッドプール
+
+        Yields:
+            コンテンツ（失敗したディレクトリはNone）
+        """
+        stats = {content_dir: self._stat_nodes(content_dir) for content_dir in content_dirs}
+        stale_dirs = [d for d in content_dirs if not self.index.is_fresh(d, stats[d])]
+        stale_set = set(stale_dirs)
+
+        loaded = self._iter_loaded(stale_dirs, read_ahead, io_pool)
+
+        added, modified, removed = [], [], []
+        for content_dir in content_dirs:
+            if content_dir not in stale_set:
+                yield self.index.get_content(content_dir)
+                continue
+
+            content = next(loaded)
+
+            content_id = os.path.basename(content_dir)
+            digest = self._digests.pop(content_dir, None)
+            if content is None or digest is None or stats[content_dir] is None:
+                # 読み込めなかったディレクトリは次回再試行する
+                if self.index.contains(content_dir):
+                    removed.append(content_id)
+                self.index.remove(content_dir)
+                yield None
+                continue
+
+            if not self.index.contains(content_dir):
+                added.append(content_id)
+            elif self.index.get_digest(content_dir) != digest:
+                modified.append(content_id)
+            self.index.put(content_dir, stats[content_dir], digest, content)
+            yield content
+
+        removed.extend(os.path.basename(d) for d in self.index.prune(input_dir, content_dirs))
+        self.last_changes = {'added': added, 'modified': modified, 'removed': removed}
+        self.root_changes[input_dir] = self.last_changes
+
+        if stale_dirs or removed:
+            self.index.save()
+
+        reused = len(content_dirs) - len(added) - len(modified)
+        print(f"クロールインデックス: 追加 {len(added)}件 / 変更 {len(modified)}件 / "
+              f"削除 {len(removed)}件 / 再利用 {reused}件")
+
+    def _iter_loaded(self, content_dirs: List[str], read_ahead: int = 0,
+                     io_pool: Optional[ThreadPoolExecutor] = None) -> Iterator[Optional[Dict[str, Any]]]:
+        """
+        複数のコンテンツディレクトリを順番に読み込む
+
+        max_workersが2以上、またはread_aheadが指定された場合はスレッドプールで
+        nodes.jsonを先読みする。先読み数はmax(read_ahead, max_workers)件までに抑える。
+        use_processesが有効な場合はJSONのデコードをプロセスプールに任せる。
+        io_pool が指定された場合はそのプールで先読みし、先読み数はread_aheadに従う。
+        返す順序は常にcontent_dirsの順序と一致する。
+
+        Args:
+            content_dirs: コンテンツディレクトリのリスト
+            read_ahead: 先読みするディレクトリ数の上限
+            io_pool: nodes.jsonの読み込みに使う共有のスレッドプール
+
+        Yields:
+            読み込んだコンテンツ（失敗したディレクトリはNone）
+        """
+        shared_pool = io_pool is not None
+        if (not shared_pool and self.max_workers <= 1 and read_ahead <= 0) or not content_dirs:
+            for content_dir in content_dirs:
+                yield self._load_content(content_dir)
+            return
+
+        if shared_pool:
+            window = max(read_ahead, 1)
+        else:
+            window = max(read_ahead, self.max_workers)
+            io_pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        decode_pool = ProcessPoolExecutor(max_workers=self.max_workers) if self.use_processes else None
+        pending = deque()
+        try:
+            remaining = iter(content_dirs)
+            pending.extend(
+                io_pool.submit(self._load_content, content_dir, decode_pool)
+                for content_dir in islice(remaining, window)
+            )
+            while pending:
+                content = pending.popleft().result()
+                next_dir = next(remaining, None)
+                if next_dir is not None:
+                    pending.append(io_pool.submit(self._load_content, next_dir, decode_pool))
+                yield content
+        finally:
+            if shared_pool:
+                for future in pending:
+                    future.cancel()
+            else:
+                io_pool.shutdown(wait=True, cancel_futures=True)
+            if decode_pool is not None:
+                decode_pool.shutdown(wait=True, cancel_futures=True)
+
+    def _finish(self, content: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        読み込んだコンテンツを返す形式に変換
+
+        lazyの場合はヘッダーからContentを作成し、compactの場合はシーンをSceneTableにする。
+
+        Args:
+            content: 整形済みのコンテンツ情報（lazyの場合はヘッダー）
+
+        Returns:
+            呼び出し元に返すコンテンツ
+        """
+        if self.lazy:
+            return Content(content, partial(self._load_scenes, content['content_dir']))
+        return self._compact(content) if self.compact else content
+
+    def _load_scenes(self, content_dir: str) -> List[Dict[str, Any]]:
+        """
+        Contentのシーンを読み込む（lazyの場合に初回参照時に呼ばれる）
+
+        Args:
+            content_dir: コンテンツディレクトリのパス
+
+        Returns:
+            シーン情報のリスト（compactの場合はSceneTable、読み込めない場合は空のリスト）
+        """
+        raw = self._read_nodes(content_dir)
+        if raw is None:
+            return []
+        try:
+            scenes = _build_content(content_dir, raw, self.decoder)['scenes']
+        except Exception as e:
+            print(f"警告: {content_dir} のシーンを読み込めませんでした: {str(e)}")
+            return []
+        if not self.compact:
+            return scenes
+        from .scene_table import SceneTable
+        return SceneTable.from_scenes(scenes, self.string_pool)
+
+    def _compact(self, content: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        コンテンツのシーンリストをSceneTableに置き換えた浅いコピーを返す
+
+        キーワードとトピックはクローラー全体で共有するStringPoolにインターンされる。
+
+        Args:
+            content: 整形済みのコンテンツ情報
+
+        Returns:
+            シーンがSceneTableになったコンテンツ情報
+        """
+        from .scene_table import SceneTable
+        compacted = dict(content)
+        compacted['scenes'] = SceneTable.from_scenes(content.get('scenes', []), self.string_pool)
+        return compacted
+
+    def _stat_nodes(self, content_dir: str) -> Optional[os.stat_result]:
+        """
+        nodes.jsonのstat結果を取得
+
+        Args:
+            content_dir: コンテンツディレクトリのパス
+
+        Returns:
+            stat結果（存在しない場合はNone）
+        """
+        try:
+            return os.stat(os.path.join(content_dir, 'nodes.json'))
+        except OSError:
+            return None
+
+    def _reuse_by_digest(self, content_dir: str, raw: bytes) -> Optional[Dict[str, Any]]:
+        """
+        内容ハッシュがインデックスと一致する場合、デコードせずに整形済みコンテンツを返す
+
+        Args:
+            content_dir: コンテンツディレクトリのパス
+            raw: nodes.jsonのバイト列
+
+        Returns:
+            インデックスのコンテンツ（インデックス未使用・不一致の場合はNone）
+        """
+        if self.index is None:
+            return None
+
+        digest = CrawlIndex.digest(raw)
+        self._digests[content_dir] = digest
+        if self.index.get_digest(content_dir) == digest:
+            return self.index.get_content(content_dir)
+        return None
+
+    def _read_nodes(self, content_dir: str) -> Optional[bytes]:
+        """
+        コンテンツディレクトリのnodes.jsonをバイト列として読み込む
+
+        Args:
+            content_dir: コンテンツディレクトリのパス
+
+        Returns:
+            nodes.jsonの内容（存在しない・読み込めない場合はNone）
+        """
         try:
             # nodes.json繝輔ぃ繧､繝ｫ縺ｮ繝代せ繧呈ｧ狗ｯ�
             nodes_file = os.path.join(content_dir, 'nodes.json')
@@ -36,40 +363,133 @@ class ContentCrawler:
                 return None
             
             # 繝輔ぃ繧､繝ｫ繧定ｪｭ縺ｿ霎ｼ縺ｿ
-            with open(nodes_file, 'r', encoding='utf-8-sig') as f:
-                data = json.load(f)
-            
-            # 繧ｳ繝ｳ繝�繝ｳ繝ИD繧定ｨｭ螳�
-            content_id = os.path.basename(content_dir)
-            
-            # 繧ｷ繝ｼ繝ｳ諠�蝣ｱ繧呈紛蠖｢
-            scenes = []
-            for scene in data.get('scenes', []):
-                # 繝医Λ繝ｳ繧ｹ繧ｯ繝ｪ繝励ヨ繧堤ｵ仙粋
-                transcript = ''
-                for t in scene.get('transcripts', []):
-                    transcript += t.get('text', '') + ' '
-                transcript = transcript.strip()
-                
-                # 繧ｷ繝ｼ繝ｳ諠�蝣ｱ繧剃ｽ懈��
-                scene_info = {
-                    'start_time': float(scene.get('start', 0)),
-                    'end_time': float(scene.get('end', 0)),
-                    'transcript': transcript,
-                    'keywords': scene.get('context_analysis', {}).get('activity', []),
-                    'topics': data.get('summary', {}).get('topics', [])
-                }
-                scenes.append(scene_info)
-            
-            # 繧ｷ繝ｼ繝ｳ繧呈凾髢馴�縺ｫ繧ｽ繝ｼ繝�
-            scenes.sort(key=lambda x: x['start_time'])
-            
-            return {
-                'content_id': content_id,
-                'scenes': scenes,
-                'total_duration': float(data.get('metadata', {}).get('duration', 0))
-            }
-            
+            with open(nodes_file, 'rb') as f:
+                return f.read()
+        except Exception as e:
+            print(f"隴ｦ蜻�: {content_dir} 縺ｮ隱ｭ縺ｿ霎ｼ縺ｿ荳ｭ縺ｫ繧ｨ繝ｩ繝ｼ縺檎匱逕溘＠縺ｾ縺励◆: {str(e)}")
+            return None
+
+    def _load_content(self, content_dir: str,
+                      decode_pool: Optional[ProcessPoolExecutor] = None) -> Dict[str, Any]:
+        """繧ｳ繝ｳ繝�繝ｳ繝�繝�繧｣繝ｬ繧ｯ繝医Μ縺九ｉ繝�繝ｼ繧ｿ繧定ｪｭ縺ｿ霎ｼ縺ｿ"""
+        raw = self._read_nodes(content_dir)
+        if raw is None:
+            return None
+
+        cached = self._reuse_by_digest(content_dir, raw)
+        if cached is not None:
+            return cached
+
+        build = _build_header if self.lazy else _build_content
+        try:
+            if decode_pool is not None:
+                return decode_pool.submit(build, content_dir, raw, self.decoder).result()
+            return build(content_dir, raw, self.decoder)
         except Exception as e:
             print(f"隴ｦ蜻�: {content_dir} 縺ｮ隱ｭ縺ｿ霎ｼ縺ｿ荳ｭ縺ｫ繧ｨ繝ｩ繝ｼ縺檎匱逕溘＠縺ｾ縺励◆: {str(e)}")
             return None
+
+
+def _build_content(content_dir: str, raw: bytes, decoder: NodesDecoder) -> Dict[str, Any]:
+    """
+    nodes.jsonの内容からコンテンツ情報を構築
+
+    プロセスプールからも呼び出せるようにモジュールレベルの関数として定義する。
+
+    Args:
+        content_dir: コンテンツディレクトリのパス
+        raw: nodes.jsonのバイト列
+        decoder: 必要なフィールドだけを取り出すデコーダー
+
+    Returns:
+        整形済みのコンテンツ情報
+    """
+    data = decoder.decode(raw)
+    
+    # 繧ｳ繝ｳ繝�繝ｳ繝ИD繧定ｨｭ螳�
+    content_id = os.path.basename(content_dir)
+
+    # 繧ｷ繝ｼ繝ｳ諠�蝣ｱ繧呈紛蠖｢
+    scenes = []
+    for scene in data.get('scenes', []):
+        # 繝医Λ繝ｳ繧ｹ繧ｯ繝ｪ繝励ヨ繧堤ｵ仙粋
+        transcript = ''
+        for t in scene.get('transcripts', []):
+            transcript += t.get('text', '') + ' '
+        transcript = transcript.strip()
+
+        # 繧ｷ繝ｼ繝ｳ諠�蝣ｱ繧剃ｽ懈��
+        scene_info = {
+            'start_time': float(scene.get('start', 0)),
+            'end_time': float(scene.get('end', 0)),
+            'transcript': transcript,
+            'keywords': scene.get('context_analysis', {}).get('activity', []),
+            'topics': data.get('summary', {}).get('topics', [])
+        }
+        if decoder.detailed:
+            scene_info['description'] = scene.get('description') or ''
+            scene_info['segments'] = [
+                {'start_time': float(t.get('start', 0)), 'end_time': float(t.get('end', 0)),
+                 'text': t.get('text', '')}
+                for t in scene.get('transcripts', [])
+            ]
+            scene_info['tags'] = _extract_tags(scene.get('context_analysis', {}))
+        scenes.append(scene_info)
+
+    # 繧ｷ繝ｼ繝ｳ繧呈凾髢馴�縺ｫ繧ｽ繝ｼ繝�
+    scenes.sort(key=lambda x: x['start_time'])
+
+    content = {
+        'content_id': content_id,
+        'scenes': scenes,
+        'total_duration': float(data.get('metadata', {}).get('duration', 0))
+    }
+    if decoder.detailed:
+        content['clip'] = dict(data.get('metadata', {}), **data.get('summary', {}))
+    return content
+
+
+def _build_header(content_dir: str, raw: bytes, decoder: NodesDecoder) -> Dict[str, Any]:
+    """
+    nodes.jsonの内容からContent用のヘッダーを構築
+
+    Args:
+        content_dir: コンテンツディレクトリのパス
+        raw: nodes.jsonのバイト列
+        decoder: 必要なフィールドだけを取り出すデコーダー
+
+    Returns:
+        content_id、content_dir、total_duration、scene_count、topics（detailedの場合はclipも）を含む辞書
+    """
+    data = decoder.decode_header(raw)
+    header = {
+        'content_id': os.path.basename(content_dir),
+        'content_dir': content_dir,
+        'total_duration': float(data.get('metadata', {}).get('duration', 0)),
+        'scene_count': data['scene_count'],
+        'topics': data.get('summary', {}).get('topics', [])
+    }
+    if decoder.detailed:
+        header['clip'] = dict(data.get('metadata', {}), **data.get('summary', {}))
+    return header
+
+
+def _extract_tags(context_analysis: Dict[str, Any]) -> Dict[str, List[str]]:
+    """
+    コンテキスト分析の項目をカテゴリごとのタグのリストに変換
+
+    Args:
+        context_analysis: nodes.jsonのcontext_analysis
+
+    Returns:
+        カテゴリ名をキー、タグのリストを値とする辞書
+    """
+    tags = {}
+    for category, value in context_analysis.items():
+        if isinstance(value, str):
+            value = [value]
+        if isinstance(value, list):
+            values = [v for v in value if isinstance(v, str) and v]
+            if values:
+                tags[category] = values
+    return tags
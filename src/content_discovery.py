@@ -0,0 +1,147 @@
+"""コンテンツディレクトリ探索モジュール"""
+
+import os
+import fnmatch
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+
+class DirectoryScanner:
+    """
+    os.scandirで入力ディレクトリを再帰的に走査し、video_nodes_ディレクトリを列挙するクラス
+
+    DirEntryが保持するファイル種別とinode番号を使うため、通常のディレクトリについては
+    追加のstatを行わない。statが必要になるのはルートと、たどるシンボリックリンクだけである。
+    """
+
+    DEFAULT_INCLUDE = ('video_nodes_*',)
+
+    def __init__(self, max_depth: Optional[int] = None,
+                 include: Optional[Sequence[str]] = None,
+                 exclude: Optional[Sequence[str]] = None,
+                 follow_symlinks: bool = False):
+        """
+        コンストラクタ
+
+        Args:
+            max_depth: 探索する深さ（1の場合は入力ディレクトリ直下のみ、Noneの場合は無制限）
+            include: コンテンツディレクトリとみなすglobパターン
+            exclude: 探索から除外するディレクトリのglobパターン
+            follow_symlinks: ディレクトリへのシンボリックリンクの中を探索するかどうか
+                （コンテンツディレクトリ自体がシンボリックリンクの場合はこの設定によらず列挙する）
+
+        globパターンは'/'を含む場合は入力ディレクトリからの相対パス、
+        含まない場合はディレクトリ名と照合する。
+        """
+        if max_depth is not None and max_depth < 1:
+            raise ValueError(f"max_depthは1以上を指定してください: {max_depth}")
+        self.max_depth = max_depth
+        self.include = list(include) if include else list(self.DEFAULT_INCLUDE)
+        self.exclude = list(exclude) if exclude else []
+        self.follow_symlinks = follow_symlinks
+        self.stats: Dict[str, int] = {'scanned_dirs': 0, 'entries': 0, 'stat_calls': 0}
+
+    def scan(self, input_dir: str) -> List[str]:
+        """
+        入力ディレクトリ配下のコンテンツディレクトリを列挙
+
+        Args:
+            input_dir: 入力ディレクトリ
+
+        Returns:
+            コンテンツディレクトリのパスのリスト（パス順）
+        """
+        return list(self.iter_scan(input_dir))
+
+    def iter_scan(self, input_dir: str) -> Iterator[str]:
+        """
+        入力ディレクトリ配下のコンテンツディレクトリを1つずつ返す
+
+        各ディレクトリの中身は名前順に走査するため、結果はパス順になる。
+        コンテンツディレクトリの中はそれ以上探索しない。
+
+        Args:
+            input_dir: 入力ディレクトリ
+
+        Yields:
+            コンテンツディレクトリのパス
+        """
+        self.stats = {'scanned_dirs': 0, 'entries': 0, 'stat_calls': 1}
+        root_stat = os.stat(input_dir)
+        visited: Set[Tuple[int, int]] = {(root_stat.st_dev, root_stat.st_ino)}
+        yield from self._walk(input_dir, '', 1, root_stat.st_dev, visited)
+
+    def _walk(self, path: str, rel_path: str, depth: int, device: int,
+              visited: Set[Tuple[int, int]]) -> Iterator[str]:
+        """
+        1つのディレクトリを走査し、必要に応じてサブディレクトリへ再帰する
+
+        Args:
+            path: 走査するディレクトリのパス
+            rel_path: 入力ディレクトリからの相対パス
+            depth: 走査するエントリの深さ（入力ディレクトリ直下が1）
+            device: 走査するディレクトリのデバイス番号
+            visited: 走査済みディレクトリの(デバイス番号, inode番号)の集合
+        """
+        try:
+            with os.scandir(path) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError as e:
+            print(f"警告: {path} を走査できませんでした: {str(e)}")
+            return
+        self.stats['scanned_dirs'] += 1
+        self.stats['entries'] += len(entries)
+
+        for entry in entries:
+            try:
+                if not entry.is_dir():
+                    continue
+                is_symlink = entry.is_symlink()
+            except OSError:
+                continue
+
+            entry_rel = f"{rel_path}/{entry.name}" if rel_path else entry.name
+            if self._matches(self.exclude, entry.name, entry_rel):
+                continue
+            if self._matches(self.include, entry.name, entry_rel):
+                yield entry.path
+                continue
+            if self.max_depth is not None and depth >= self.max_depth:
+                continue
+            if is_symlink and not self.follow_symlinks:
+                continue
+
+            if is_symlink:
+                # リンク先の実体で判定し、祖先や走査済みのディレクトリへのループを防ぐ
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                self.stats['stat_calls'] += 1
+                key = (stat.st_dev, stat.st_ino)
+                entry_device = stat.st_dev
+            else:
+                key = (device, entry.inode())
+                entry_device = device
+            if key in visited:
+                continue
+            visited.add(key)
+            yield from self._walk(entry.path, entry_rel, depth + 1, entry_device, visited)
+
+    @staticmethod
+    def _matches(patterns: Sequence[str], name: str, rel_path: str) -> bool:
+        """
+        ディレクトリがglobパターンのいずれかに一致するか判定
+
+        Args:
+            patterns: globパターンのリスト
+            name: ディレクトリ名
+            rel_path: 入力ディレクトリからの相対パス
+
+        Returns:
+            一致する場合はTrue
+        """
+        for pattern in patterns:
+            target = rel_path if '/' in pattern else name
+            if fnmatch.fnmatchcase(target, pattern):
+                return True
+        return False
@@ -0,0 +1,183 @@
+"""コンテンツ監視モジュール"""
+
+import os
+import time
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+from .content import Content
+from .content_crawler import ContentCrawler
+from .content_discovery import DirectoryScanner
+
+
+class ContentWatcher:
+    """入力ディレクトリを監視し、追加・更新されたvideo_nodes_ディレクトリだけを取り込むクラス"""
+
+    def __init__(self, crawler: ContentCrawler, input_dir: str,
+                 settle_seconds: float = 2.0, clock: Callable[[], float] = time.time,
+                 scanner: Optional[DirectoryScanner] = None):
+        """
+        コンストラクタ
+
+        Args:
+            crawler: nodes.jsonの読み込みに使うContentCrawler
+            input_dir: 監視する入力ディレクトリ
+            settle_seconds: nodes.jsonが最後に更新されてから取り込むまでの待ち時間（秒）
+            clock: 現在時刻を返す関数（テスト用）
+            scanner: コンテンツディレクトリの探索に使うDirectoryScanner
+                （Noneの場合はクローラーと同じ設定で探索する）
+        """
+        self.crawler = crawler
+        self.scanner = scanner if scanner is not None else crawler.scanner
+        self.input_dir = input_dir
+        self.settle_seconds = settle_seconds
+        self.clock = clock
+
+        # 取り込み済みのコンテンツ（キーはコンテンツディレクトリ）
+        self.contents: Dict[str, Dict[str, Any]] = {}
+
+        # stat結果のキャッシュ
+        self._root_mtime_ns: Optional[int] = None
+        self._content_dirs: List[str] = []
+        self._ingested: Dict[str, Tuple[int, int]] = {}
+        self._pending: Dict[str, Tuple[int, int]] = {}
+
+    def poll(self) -> Dict[str, List[str]]:
+        """
+        入力ディレクトリを1回走査し、変更を取り込む
+
+        DirectoryScannerでコンテンツディレクトリの一覧を取り直し（入力ディレクトリ直下だけを
+        探索する場合は、入力ディレクトリ自体の更新時刻が変わったときだけ）、
+        既知のディレクトリはnodes.jsonのstatだけで変更を判定する。
+        書き込み途中のnodes.jsonを避けるため、更新からsettle_seconds経過し、
+        前回の走査からサイズと更新時刻が変わっていないものだけを取り込む。
+
+        Returns:
+            追加・変更・削除されたコンテンツIDの辞書
+        """
+        changes = {'added': [], 'modified': [], 'removed': []}
+
+        self._refresh_content_dirs()
+        known_dirs = set(self._content_dirs)
+        for content_dir in list(self.contents):
+            if content_dir not in known_dirs:
+                changes['removed'].append(self.contents.pop(content_dir)['content_id'])
+                self._ingested.pop(content_dir, None)
+
+        now = self.clock()
+        for content_dir in self._content_dirs:
+            signature, mtime = self._stat_nodes(content_dir)
+            if signature is None:
+                if self.contents.pop(content_dir, None) is not None:
+                    changes['removed'].append(os.path.basename(content_dir))
+                self._ingested.pop(content_dir, None)
+                continue
+            if self._ingested.get(content_dir) == signature:
+                continue
+
+            settled = now - mtime >= self.settle_seconds
+            unchanged = self._pending.get(content_dir, signature) == signature
+            self._pending[content_dir] = signature
+            if not (settled and unchanged):
+                continue
+
+            del self._pending[content_dir]
+            # 読み込みに失敗した場合も、nodes.jsonが再び更新されるまでは再試行しない
+            self._ingested[content_dir] = signature
+            content = self.crawler.refresh(content_dir)
+            if content is None:
+                if self.contents.pop(content_dir, None) is not None:
+                    changes['removed'].append(os.path.basename(content_dir))
+                continue
+
+            key = 'modified' if content_dir in self.contents else 'added'
+            changes[key].append(content['content_id'])
+            self.contents[content_dir] = content
+
+        if any(changes.values()):
+            self.crawler.save_index()
+        return changes
+
+    def watch(self, on_change: Callable[[Dict[str, List[str]]], None],
+              interval: float = 5.0, max_polls: Optional[int] = None) -> None:
+        """
+        一定間隔でpollを繰り返し、変更があればコールバックを呼び出す
+
+        Args:
+            on_change: 変更内容を受け取るコールバック
+            interval: 走査間隔（秒）
+            max_polls: 最大走査回数（Noneの場合は中断されるまで続ける）
+        """
+        polls = 0
+        while max_polls is None or polls < max_polls:
+            changes = self.poll()
+            if any(changes.values()):
+                on_change(changes)
+            polls += 1
+            if max_polls is None or polls < max_polls:
+                time.sleep(interval)
+
+    def get_contents(self) -> List[Dict[str, Any]]:
+        """
+        取り込み済みのコンテンツをディレクトリ名順で取得
+
+        Returns:
+            コンテンツ情報のリスト
+        """
+        return [self.contents[d] for d in sorted(self.contents)]
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        取り込み済みコンテンツの統計情報を計算
+
+        Returns:
+            コンテンツ数・シーン数・合計時間を含む統計情報
+        """
+        contents = self.contents.values()
+        return {
+            'content_count': len(self.contents),
+            'scene_count': sum(c.scene_count if isinstance(c, Content) else len(c.get('scenes', []))
+                               for c in contents),
+            'total_duration': sum(float(c.get('total_duration', 0)) for c in contents)
+        }
+
+    def _refresh_content_dirs(self) -> None:
+        """
+        ディレクトリ一覧を取り直す
+
+        サブディレクトリの変更は入力ディレクトリの更新時刻に反映されないため、
+        入力ディレクトリ直下だけを探索する場合に限り、更新時刻が変わらなければ一覧を再利用する。
+        """
+        try:
+            root_mtime_ns = os.stat(self.input_dir).st_mtime_ns
+        except OSError as e:
+            print(f"警告: {self.input_dir} を参照できません: {str(e)}")
+            self._root_mtime_ns = None
+            self._content_dirs = []
+            return
+
+        if self.scanner.max_depth == 1 and root_mtime_ns == self._root_mtime_ns:
+            return
+
+        self._root_mtime_ns = root_mtime_ns
+        try:
+            self._content_dirs = self.scanner.scan(self.input_dir)
+        except OSError as e:
+            print(f"警告: {self.input_dir} を参照できません: {str(e)}")
+            self._root_mtime_ns = None
+            self._content_dirs = []
+
+    def _stat_nodes(self, content_dir: str) -> Tuple[Optional[Tuple[int, int]], float]:
+        """
+        nodes.jsonのサイズと更新時刻を取得
+
+        Args:
+            content_dir: コンテンツディレクトリのパス
+
+        Returns:
+            (サイズと更新時刻の組, 更新時刻[秒])。存在しない場合は(None, 0.0)
+        """
+        try:
+            stat = os.stat(os.path.join(content_dir, 'nodes.json'))
+        except OSError:
+            return None, 0.0
+        return (stat.st_size, stat.st_mtime_ns), stat.st_mtime
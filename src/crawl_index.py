@@ -0,0 +1,174 @@
+"""クロールインデックスモジュール"""
+
+import os
+import json
+import hashlib
+import threading
+from typing import Dict, Any, List, Optional
+
+
+class CrawlIndex:
+    """video_nodes_ディレクトリごとのnodes.jsonの状態と整形済みコンテンツを保持するインデックス"""
+
+    VERSION = 1
+
+    def __init__(self, index_path: str, profile: str = 'default'):
+        """
+        コンストラクタ
+
+        Args:
+            index_path: インデックスファイルのパス
+            profile: 保存するコンテンツの形式（異なる形式で保存されたインデックスは使わない）
+        """
+        self.index_path = index_path
+        self.profile = profile
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        # 複数の入力ディレクトリを並行してクロールする場合に更新と保存を直列化する
+        self._lock = threading.RLock()
+        self.load()
+
+    @staticmethod
+    def digest(raw: bytes) -> str:
+        """
+        nodes.jsonの内容ハッシュを計算
+
+        Args:
+            raw: nodes.jsonのバイト列
+
+        Returns:
+            16進数のハッシュ文字列
+        """
+        return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+    def load(self) -> None:
+        """インデックスファイルを読み込む（存在しない・壊れている場合は空で開始）"""
+        self.entries = {}
+        if not os.path.exists(self.index_path):
+            return
+
+        try:
+            with open(self.index_path, 'r', encoding='utf-8-sig') as f:
+                data = json.load(f)
+            if data.get('version') == self.VERSION and data.get('profile', 'default') == self.profile:
+                self.entries = data.get('entries', {})
+        except Exception as e:
+            print(f"警告: クロールインデックス {self.index_path} を読み込めませんでした: {str(e)}")
+
+    def save(self) -> None:
+        """インデックスファイルを書き出す（一時ファイル経由で置き換える）"""
+        index_dir = os.path.dirname(self.index_path)
+        if index_dir:
+            os.makedirs(index_dir, exist_ok=True)
+
+        tmp_path = self.index_path + '.tmp'
+        with self._lock:
+            with open(tmp_path, 'w', encoding='utf-8-sig') as f:
+                json.dump({'version': self.VERSION, 'profile': self.profile, 'entries': self.entries},
+                          f, ensure_ascii=False)
+            os.replace(tmp_path, self.index_path)
+
+    def is_fresh(self, content_dir: str, stat: Optional[os.stat_result]) -> bool:
+        """
+        nodes.jsonの更新時刻とサイズがインデックスと一致するか判定
+
+        Args:
+            content_dir: コンテンツディレクトリのパス
+            stat: nodes.jsonのstat結果（存在しない場合はNone）
+
+        Returns:
+            一致する場合はTrue
+        """
+        entry = self.entries.get(self._key(content_dir))
+        if entry is None or stat is None:
+            return False
+        return entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size
+
+    def get_content(self, content_dir: str) -> Optional[Dict[str, Any]]:
+        """
+        インデックスに保存された整形済みコンテンツを取得
+
+        Args:
+            content_dir: コンテンツディレクトリのパス
+
+        Returns:
+            コンテンツ情報（登録されていない場合はNone）
+        """
+        entry = self.entries.get(self._key(content_dir))
+        return entry['content'] if entry else None
+
+    def get_digest(self, content_dir: str) -> Optional[str]:
+        """
+        インデックスに保存された内容ハッシュを取得
+
+        Args:
+            content_dir: コンテンツディレクトリのパス
+
+        Returns:
+            内容ハッシュ（登録されていない場合はNone）
+        """
+        entry = self.entries.get(self._key(content_dir))
+        return entry['digest'] if entry else None
+
+    def contains(self, content_dir: str) -> bool:
+        """
+        ディレクトリがインデックスに登録されているか判定
+
+        Args:
+            content_dir: コンテンツディレクトリのパス
+
+        Returns:
+            登録されている場合はTrue
+        """
+        return self._key(content_dir) in self.entries
+
+    def put(self, content_dir: str, stat: os.stat_result, digest: str,
+            content: Dict[str, Any]) -> None:
+        """
+        エントリを登録・更新
+
+        Args:
+            content_dir: コンテンツディレクトリのパス
+            stat: nodes.jsonのstat結果
+            digest: nodes.jsonの内容ハッシュ
+            content: 整形済みのコンテンツ情報
+        """
+        with self._lock:
+            self.entries[self._key(content_dir)] = {
+                'mtime_ns': stat.st_mtime_ns,
+                'size': stat.st_size,
+                'digest': digest,
+                'content': content
+            }
+
+    def remove(self, content_dir: str) -> None:
+        """
+        エントリを削除
+
+        Args:
+            content_dir: コンテンツディレクトリのパス
+        """
+        with self._lock:
+            self.entries.pop(self._key(content_dir), None)
+
+    def prune(self, root_dir: str, seen_dirs: List[str]) -> List[str]:
+        """
+        root_dir配下で今回見つからなかったエントリを削除
+
+        Args:
+            root_dir: クロールした入力ディレクトリ
+            seen_dirs: 今回見つかったコンテンツディレクトリのリスト
+
+        Returns:
+            削除されたコンテンツディレクトリのリスト
+        """
+        root = self._key(root_dir).rstrip(os.sep) + os.sep
+        seen = {self._key(d) for d in seen_dirs}
+        with self._lock:
+            removed = [key for key in self.entries if key.startswith(root) and key not in seen]
+            for key in removed:
+                del self.entries[key]
+        return removed
+
+    def _key(self, content_dir: str) -> str:
+        """ディレクトリパスを正規化してインデックスのキーにする"""
+        return os.path.normcase(os.path.abspath(content_dir))
@@ -1,13 +1,13 @@
 """EDL繝輔ぃ繧､繝ｫ逕滓�舌Δ繧ｸ繝･繝ｼ繝ｫ"""
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Optional
 import os
 
 class EDLGenerator:
     def __init__(self):
         pass
 
-    def generate(self, scenes: List[Dict[str, Any]], output_path: str) -> None:
+    def generate(self, scenes: Iterable[Dict[str, Any]], output_path: str) -> None:
         """EDL繝輔ぃ繧､繝ｫ繧堤函謌�"""
         # 蜃ｺ蜉帙ョ繧｣繝ｬ繧ｯ繝医Μ縺ｮ菴懈��
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
@@ -21,34 +21,39 @@ class EDLGenerator:
         edl_lines.append("")  # 遨ｺ陦�
         
         # 繧ｷ繝ｼ繝ｳ縺ｮ蜃ｦ逅�
-        for i, scene in enumerate(scenes, 1):
-            try:
-                # 繧ｿ繧､繝繧ｳ繝ｼ繝峨�ｮ螟画鋤
-                start_tc = self._seconds_to_timecode(scene['start_time'])
-                end_tc = self._seconds_to_timecode(scene['end_time'])
-                
-                # EDL繧ｨ繝ｳ繝医Μ縺ｮ菴懈��
-                entry = self._create_edl_entry(
-                    i, scene['content_id'], start_tc, end_tc,
-                    scene.get('transcript', ''), scene.get('effects', [])
-                )
-                edl_lines.append(entry)
-            except Exception as e:
-                print(f"隴ｦ蜻�: 繧ｷ繝ｼ繝ｳ {i} 縺ｮ蜃ｦ逅�荳ｭ縺ｫ繧ｨ繝ｩ繝ｼ縺檎匱逕溘＠縺ｾ縺励◆: {str(e)}")
-                continue
-        
-        # 繝輔ぃ繧､繝ｫ縺ｮ譖ｸ縺崎ｾｼ縺ｿ
+        # 選択結果をストリーミングで受け取る場合に備え、エントリができるたびに書き出す
         with open(output_path, 'w', encoding='utf-8-sig', newline='\n') as f:
             f.write('\n'.join(edl_lines))
+            for i, scene in enumerate(scenes, 1):
+                try:
+                    # 繧ｿ繧､繝繧ｳ繝ｼ繝峨�ｮ螟画鋤
+                    start_tc = self._seconds_to_timecode(scene['start_time'])
+                    end_tc = self._seconds_to_timecode(scene['end_time'])
+                    # タイムラインを組み立てた場合は、編集後の位置をレコード側のタイムコードにする
+                    rec_start_tc = self._seconds_to_timecode(scene.get('record_start', scene['start_time']))
+                    rec_end_tc = self._seconds_to_timecode(scene.get('record_end', scene['end_time']))
+                
+                    # EDL繧ｨ繝ｳ繝医Μ縺ｮ菴懈��
+                    entry = self._create_edl_entry(
+                        i, scene['content_id'], start_tc, end_tc,
+                        scene.get('transcript', ''), scene.get('effects', []),
+                        rec_start_tc, rec_end_tc
+                    )
+                    f.write('\n' + entry)
+                    f.flush()
+                except Exception as e:
+                    print(f"隴ｦ蜻�: 繧ｷ繝ｼ繝ｳ {i} 縺ｮ蜃ｦ逅�荳ｭ縺ｫ繧ｨ繝ｩ繝ｼ縺檎匱逕溘＠縺ｾ縺励◆: {str(e)}")
+                    continue
 
     def _create_edl_entry(self, index: int, clip_name: str,
                          start_tc: str, end_tc: str,
-                         transcript: str, effects: List[str]) -> str:
+                         transcript: str, effects: List[str],
+                         rec_start_tc: Optional[str] = None, rec_end_tc: Optional[str] = None) -> str:
         """EDL繧ｨ繝ｳ繝医Μ繧堤函謌�"""
         # 繧ｨ繝ｳ繝医Μ縺ｮ蝓ｺ譛ｬ讒矩
         entry = [
             f"{index:03d}  {index:03d}     V     C        ",
-            f"{start_tc} {end_tc} {start_tc} {end_tc}"
+            f"{start_tc} {end_tc} {rec_start_tc or start_tc} {rec_end_tc or end_tc}"
         ]
         
         # 繧ｯ繝ｪ繝�繝怜錐縺ｨ繝医Λ繝ｳ繧ｹ繧ｯ繝ｪ繝励ヨ
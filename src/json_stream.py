@@ -0,0 +1,161 @@
+"""JSONの逐次パースモジュール"""
+
+import json
+from typing import Any, Iterable, Iterator, List
+
+
+class JSONArrayStream:
+    """
+    生成AIの応答を少しずつ受け取り、指定したキーの配列の要素を完成した順に取り出すパーサー
+
+    応答全体を待たずに、例えば{"selected_scenes": [...]}の各要素を、閉じ括弧を受け取った
+    時点でjson.loadsして返す。配列の外にある文字（```jsonのような囲みや説明文）は無視する。
+    文字列中の括弧やエスケープを追跡するため、要素の中にどのような文字列があっても正しく区切れる。
+    """
+
+    def __init__(self, key: str):
+        """
+        コンストラクタ
+
+        Args:
+            key: 要素を取り出す配列のキー（トップレベルのオブジェクトのキー）
+        """
+        self.key = key
+        self.errors = 0
+        self._state = 'seek_key'
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._token: List[str] = []
+        self._element: List[str] = []
+        self._element_depth = 0
+
+    @property
+    def finished(self) -> bool:
+        """配列の閉じ括弧まで受け取ったかどうか"""
+        return self._state == 'done'
+
+    def feed(self, text: str) -> List[Any]:
+        """
+        応答の一部を受け取り、完成した要素を返す
+
+        Args:
+            text: 応答の一部
+
+        Returns:
+            このチャンクで完成した要素のリスト（解析できなかった要素は除きerrorsに数える）
+        """
+        items = []
+        for char in text:
+            if self._state == 'done':
+                break
+            if self._state == 'array':
+                item = self._feed_array(char)
+                if item is not None:
+                    items.append(item)
+                continue
+
+            # 配列の開始を探す間は、トップレベルのオブジェクトのキーだけを見る
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1 and ''.join(self._token) == self.key:
+                        self._state = 'seek_colon'
+                    continue
+                if self._depth == 1:
+                    self._token.append(char)
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._token = []
+                if self._state != 'seek_key':
+                    self._state = 'seek_key'
+            elif char in '{[':
+                if self._state == 'seek_value' and char == '[':
+                    self._state = 'array'
+                    continue
+                self._depth += 1
+                self._state = 'seek_key'
+            elif char in '}]':
+                self._depth = max(0, self._depth - 1)
+                self._state = 'seek_key'
+            elif char == ':' and self._state == 'seek_colon':
+                self._state = 'seek_value'
+            elif not char.isspace() and self._state in ('seek_colon', 'seek_value'):
+                self._state = 'seek_key'
+        return items
+
+    def _feed_array(self, char: str) -> Any:
+        """
+        配列の中の1文字を処理し、要素が完成した場合はその値を返す
+
+        Args:
+            char: 1文字
+
+        Returns:
+            完成した要素（完成していない場合はNone）
+        """
+        if self._element_depth == 0 and not self._in_string:
+            if char == ']':
+                self._state = 'done'
+                return self._flush_scalar()
+            if char == ',':
+                return self._flush_scalar()
+
+        self._element.append(char)
+        if self._in_string:
+            if self._escaped:
+                self._escaped = False
+            elif char == '\\':
+                self._escaped = True
+            elif char == '"':
+                self._in_string = False
+        elif char == '"':
+            self._in_string = True
+        elif char in '{[':
+            self._element_depth += 1
+        elif char in '}]':
+            self._element_depth -= 1
+            if self._element_depth == 0:
+                return self._parse_element()
+        return None
+
+    def _flush_scalar(self) -> Any:
+        """区切りまでに溜まった括弧のない要素（数値など）を解析する"""
+        if ''.join(self._element).strip():
+            return self._parse_element()
+        self._element = []
+        return None
+
+    def _parse_element(self) -> Any:
+        """溜まった要素の文字列を解析する"""
+        raw = ''.join(self._element).strip()
+        self._element = []
+        try:
+            return json.loads(raw)
+        except ValueError:
+            self.errors += 1
+            return None
+
+
+def iter_array_items(chunks: Iterable[str], key: str) -> Iterator[Any]:
+    """
+    応答のチャンクから、指定したキーの配列の要素を完成した順に取り出す
+
+    Args:
+        chunks: 応答のチャンク
+        key: 配列のキー
+
+    Yields:
+        配列の要素
+    """
+    parser = JSONArrayStream(key)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+        if parser.finished:
+            return
@@ -0,0 +1,476 @@
+"""生成AIのバックエンドモジュール
+
+GeminiClientはAPIキーごとにバックエンドからモデルを作成し、generate_contentでリクエストを送る。
+既定のGeminiBackendはGemini APIを呼び出す。RecordingBackendは別のバックエンドの応答を
+プロンプトと組にして記録し、ReplayBackendは記録した応答を、指定した遅延とエラーの割合を
+加えて返す。HTTPBackendはllm_serverのローカルのスタンドインサーバーに送信する。
+Gemini APIを使わずに、パイプラインのスループット・再試行・処理時間を計測するために使う。
+"""
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .response_cache import ResponseCache
+
+
+class InjectedError(Exception):
+    """ReplayBackendが注入したエラー（codeはHTTPステータス）"""
+
+    def __init__(self, message: str, code: int, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.code = code
+        self.retry_after = retry_after
+
+
+class ReplayMissError(LookupError):
+    """記録にないリクエスト（再試行しても成功しないため404として扱う）"""
+
+    code = 404
+
+
+class HTTPBackendError(Exception):
+    """スタンドインサーバーがエラーを返した（codeはHTTPステータス）"""
+
+    def __init__(self, message: str, code: int, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.code = code
+        self.retry_after = retry_after
+
+
+class LLMResponse:
+    """generate_contentの応答（Geminiの応答と同じくtextとusage_metadataを持つ）"""
+
+    def __init__(self, text: str, total_tokens: Optional[int] = None):
+        self.text = text
+        self.usage_metadata = SimpleNamespace(total_token_count=total_tokens)
+
+
+def split_contents(contents: Any) -> Tuple[str, Optional[str]]:
+    """
+    generate_contentに渡す内容を、プロンプトと画像のハッシュに分ける
+
+    Args:
+        contents: プロンプト、またはプロンプトと画像のリスト
+
+    Returns:
+        (プロンプト, 画像の内容のハッシュ（画像がない場合はNone）)
+    """
+    parts = contents if isinstance(contents, (list, tuple)) else [contents]
+    texts: List[str] = []
+    hashes: List[str] = []
+    for part in parts:
+        if isinstance(part, str):
+            texts.append(part)
+            continue
+        filename = getattr(part, 'filename', None)
+        data = getattr(part, 'data', None)
+        if filename and os.path.isfile(filename):
+            hashes.append(ResponseCache.hash_file(filename))
+        elif isinstance(data, bytes):
+            hashes.append(hashlib.blake2b(data, digest_size=20).hexdigest())
+        else:
+            hashes.append(type(part).__name__)
+    return '\n'.join(texts), ':'.join(hashes) or None
+
+
+def chunk_text(text: str, size: int) -> Iterator[LLMResponse]:
+    """ストリーミングの応答として、テキストをsize文字ずつの断片に分ける"""
+    for start in range(0, len(text), size):
+        yield LLMResponse(text[start:start + size])
+
+
+class BackendModel:
+    """バックエンドのgenerateをGenerativeModelと同じ形で呼び出すためのモデル"""
+
+    def __init__(self, backend: 'LLMBackend', model_name: str, stream_chunk_size: int = 64):
+        self.backend = backend
+        self.model_name = model_name
+        self.stream_chunk_size = stream_chunk_size
+
+    def generate_content(self, contents: Any, stream: bool = False) -> Any:
+        prompt, image_hash = split_contents(contents)
+        response = self.backend.generate(self.model_name, prompt, image_hash)
+        if stream:
+            return chunk_text(response.text, self.stream_chunk_size)
+        return response
+
+
+class LLMBackend:
+    """
+    生成AIのバックエンドの基底クラス
+
+    サブクラスはgenerate（プロンプトから応答を返す）を実装するか、
+    create_model（generate_contentを持つモデルを返す）を上書きする。
+    """
+
+    # APIキーが必要か（不要な場合、キーが設定されていなければoffline_keysを使う）
+    requires_api_key = True
+
+    def create_model(self, api_key: str, model_name: str) -> Any:
+        """
+        APIキーでリクエストを送るモデルを作成
+
+        Args:
+            api_key: APIキー
+            model_name: 使用するモデル
+
+        Returns:
+            generate_content(contents, stream=False)を持つモデル
+        """
+        return BackendModel(self, model_name)
+
+    def generate(self, model_name: str, prompt: str, image_hash: Optional[str] = None) -> LLMResponse:
+        """
+        リクエストを送信して応答を取得
+
+        Args:
+            model_name: 使用するモデル
+            prompt: プロンプト
+            image_hash: 画像の内容のハッシュ（画像を送らない場合はNone）
+
+        Returns:
+            応答
+        """
+        raise NotImplementedError
+
+    def offline_keys(self) -> List[str]:
+        """APIキーが設定されていない場合に使う仮のキー（APIキーが必要なバックエンドでは空）"""
+        return []
+
+
+class GeminiKeyModel:
+    """
+    1つのAPIキーでGemini APIを呼び出すモデル
+
+    genai.configureはプロセス全体の設定を変えるため、複数のキーを同時に使うと
+    別のスレッドのリクエストが別のキーで送られてしまう。このモデルはキーごとに
+    client_optionsを指定した公開のクライアント（GenerativeServiceClient、
+    GenerativeServiceAsyncClient）を作成し、GenerativeModelと同じ形で呼び出せるようにする。
+    """
+
+    def __init__(self, api_key: str, model_name: str):
+        """
+        コンストラクタ
+
+        Args:
+            api_key: APIキー
+            model_name: 使用するモデル
+        """
+        # ライブラリがない場合はモデルの作成時にImportErrorにする（google.generativeaiの読み込みには時間がかかる）
+        from google.ai import generativelanguage as glm
+        from google.generativeai import types
+
+        self._glm = glm
+        self._types = types
+        self.api_key = api_key
+        self.model_name = model_name if model_name.startswith('models/') else f'models/{model_name}'
+        self._client = None
+        self._async_client = None
+
+    def _request(self, contents: Any) -> Any:
+        """generate_contentに渡す内容からリクエストを作成"""
+        request = self._glm.GenerateContentRequest(model=self.model_name,
+                                                   contents=self._types.content_types.to_contents(contents))
+        if request.contents and not request.contents[-1].role:
+            request.contents[-1].role = 'user'
+        return request
+
+    def generate_content(self, contents: Any, stream: bool = False) -> Any:
+        """
+        リクエストを送信
+
+        Args:
+            contents: プロンプト、またはプロンプトと画像のリスト
+            stream: 応答を断片ごとに受け取る場合はTrue
+
+        Returns:
+            GenerateContentResponse（streamの場合は断片を返すイテレータ）
+        """
+        if self._client is None:
+            self._client = self._glm.GenerativeServiceClient(client_options={'api_key': self.api_key})
+        request = self._request(contents)
+        if stream:
+            return self._types.GenerateContentResponse.from_iterator(self._client.stream_generate_content(request))
+        return self._types.GenerateContentResponse.from_response(self._client.generate_content(request))
+
+    async def generate_content_async(self, contents: Any) -> Any:
+        """
+        リクエストを非同期で送信
+
+        Args:
+            contents: プロンプト、またはプロンプトと画像のリスト
+
+        Returns:
+            AsyncGenerateContentResponse
+        """
+        if self._async_client is None:
+            self._async_client = self._glm.GenerativeServiceAsyncClient(client_options={'api_key': self.api_key})
+        response = await self._async_client.generate_content(self._request(contents))
+        return self._types.AsyncGenerateContentResponse.from_response(response)
+
+
+class GeminiBackend(LLMBackend):
+    """Gemini APIを呼び出すバックエンド（既定）"""
+
+    def create_model(self, api_key: str, model_name: str) -> Any:
+        return GeminiKeyModel(api_key, model_name)
+
+
+class RecordingBackend(LLMBackend):
+    """
+    別のバックエンドの応答を、プロンプトと組にしてJSON Lines形式で記録するバックエンド
+
+    記録したファイルはReplayBackendで読み込める。同じリクエストを複数回記録した場合は、
+    ReplayBackendでは最後の応答を使う。
+    """
+
+    def __init__(self, inner: LLMBackend, path: str):
+        """
+        コンストラクタ
+
+        Args:
+            inner: 実際にリクエストを送るバックエンド
+            path: 記録するファイルのパス（追記する）
+        """
+        self.inner = inner
+        self.path = path
+        self.recorded = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @property
+    def requires_api_key(self) -> bool:
+        return self.inner.requires_api_key
+
+    def offline_keys(self) -> List[str]:
+        return self.inner.offline_keys()
+
+    def create_model(self, api_key: str, model_name: str) -> Any:
+        return _RecordingModel(self, self.inner.create_model(api_key, model_name), model_name)
+
+    def record(self, model_name: str, prompt: str, image_hash: Optional[str], text: str,
+               total_tokens: Optional[int] = None) -> None:
+        """
+        応答を記録
+
+        Args:
+            model_name: 使用したモデル
+            prompt: プロンプト
+            image_hash: 画像の内容のハッシュ
+            text: 応答
+            total_tokens: 応答に含まれるトークン使用量
+        """
+        record = {'key': ResponseCache.make_key(model_name, prompt, image_hash), 'model': model_name,
+                  'prompt': prompt, 'image_hash': image_hash, 'response': text, 'total_tokens': total_tokens}
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+            self.recorded += 1
+
+
+class _RecordingModel:
+    """応答を記録しながら内側のモデルを呼び出すモデル"""
+
+    def __init__(self, backend: RecordingBackend, model: Any, model_name: str):
+        self.backend = backend
+        self.model = model
+        self.model_name = model_name
+
+    def generate_content(self, contents: Any, stream: bool = False) -> Any:
+        prompt, image_hash = split_contents(contents)
+        if stream:
+            return self._record_stream(self.model.generate_content(contents, stream=True), prompt, image_hash)
+        response = self.model.generate_content(contents)
+        usage = getattr(getattr(response, 'usage_metadata', None), 'total_token_count', None)
+        self.backend.record(self.model_name, prompt, image_hash, self._text(response), usage)
+        return response
+
+    @staticmethod
+    def _text(response: Any) -> str:
+        """
+        応答のテキストを取得（GeminiClient._response_textと同じく、テキストがない場合は空文字列）
+
+        安全性フィルタでブロックされた応答などではtextがValueErrorを送出するため、
+        空文字列として記録し、警告はGeminiClientに任せる。
+        """
+        try:
+            return getattr(response, 'text', '') or ''
+        except ValueError:
+            return ''
+
+    def _record_stream(self, chunks: Any, prompt: str, image_hash: Optional[str]) -> Iterator[Any]:
+        """断片をそのまま返し、最後まで受け取った場合に結合した応答を記録する"""
+        parts = []
+        for chunk in chunks:
+            parts.append(self._text(chunk))
+            yield chunk
+        self.backend.record(self.model_name, prompt, image_hash, ''.join(parts))
+
+
+class ReplayBackend(LLMBackend):
+    """
+    記録した応答を返すバックエンド
+
+    リクエストはモデル名・プロンプト・画像のハッシュから求めたキーで記録と照合する。
+    latency（とlatency_jitterまでのばらつき）だけ待ってから応答を返し、error_rateの割合で
+    一時的なエラー（503）、rate_limit_rateの割合で上限エラー（429、retry_after秒後に再試行）を返す。
+    遅延とエラーはseedとリクエストのキー・同じキーの何回目のリクエストかから決めるため、
+    同時に送っても、同じ記録と設定であれば毎回同じ結果になる。
+    """
+
+    requires_api_key = False
+
+    def __init__(self, path: Optional[str] = None, latency: float = 0.0, latency_jitter: float = 0.0,
+                 error_rate: float = 0.0, rate_limit_rate: float = 0.0, retry_after: float = 1.0,
+                 seed: int = 0, key_count: int = 1, sleep: Callable[[float], None] = time.sleep):
+        """
+        コンストラクタ
+
+        Args:
+            path: RecordingBackendで記録したファイルのパス（Noneの場合は空の記録で始める）
+            latency: 応答までの遅延（秒）
+            latency_jitter: 遅延に加えるばらつきの上限（秒）
+            error_rate: 一時的なエラー（503）を返す割合
+            rate_limit_rate: 上限エラー（429）を返す割合
+            retry_after: 上限エラーで指定する再試行までの待ち時間（秒）
+            seed: 遅延とエラーを決める乱数のシード
+            key_count: APIキーが設定されていない場合に使う仮のキーの数
+            sleep: 待機する関数（テスト用）
+        """
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.seed = seed
+        self.key_count = key_count
+        self._sleep = sleep
+        self._responses: Dict[str, LLMResponse] = {}
+        self._calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'hits': 0, 'misses': 0, 'errors': 0, 'rate_limits': 0}
+        if path is not None:
+            self.load(path)
+
+    def load(self, path: str) -> int:
+        """
+        記録を読み込む
+
+        Args:
+            path: RecordingBackendで記録したファイルのパス
+
+        Returns:
+            読み込んだ記録の数
+        """
+        count = 0
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                self.add(record['model'], record['prompt'], record['response'],
+                         image_hash=record.get('image_hash'), total_tokens=record.get('total_tokens'))
+                count += 1
+        return count
+
+    def add(self, model_name: str, prompt: str, text: str, image_hash: Optional[str] = None,
+            total_tokens: Optional[int] = None) -> None:
+        """
+        応答を追加
+
+        Args:
+            model_name: モデル名
+            prompt: プロンプト
+            text: 応答
+            image_hash: 画像の内容のハッシュ
+            total_tokens: トークン使用量
+        """
+        key = ResponseCache.make_key(model_name, prompt, image_hash)
+        with self._lock:
+            self._responses[key] = LLMResponse(text, total_tokens)
+
+    def offline_keys(self) -> List[str]:
+        return [f'offline-{i + 1}' for i in range(self.key_count)]
+
+    def generate(self, model_name: str, prompt: str, image_hash: Optional[str] = None) -> LLMResponse:
+        key = ResponseCache.make_key(model_name, prompt, image_hash)
+        with self._lock:
+            call = self._calls.get(key, 0)
+            self._calls[key] = call + 1
+            self.stats['requests'] += 1
+        rng = random.Random(f"{self.seed}:{key}:{call}")
+        delay = self.latency + rng.uniform(0, self.latency_jitter)
+        roll = rng.random()
+        if delay > 0:
+            self._sleep(delay)
+
+        with self._lock:
+            if roll < self.rate_limit_rate:
+                self.stats['rate_limits'] += 1
+                raise InjectedError("429 Resource exhausted (injected)", 429, self.retry_after)
+            if roll < self.rate_limit_rate + self.error_rate:
+                self.stats['errors'] += 1
+                raise InjectedError("503 Service unavailable (injected)", 503)
+            response = self._responses.get(key)
+            if response is None:
+                self.stats['misses'] += 1
+                raise ReplayMissError(f"記録にないリクエストです（モデル {model_name}）")
+            self.stats['hits'] += 1
+            return response
+
+
+class HTTPBackend(LLMBackend):
+    """
+    llm_serverのスタンドインサーバーにHTTPでリクエストを送るバックエンド
+
+    ストリーミングでは、サーバーから受け取った応答を断片に分けて返す。
+    """
+
+    requires_api_key = False
+
+    def __init__(self, url: str, timeout: float = 60.0, key_count: int = 1):
+        """
+        コンストラクタ
+
+        Args:
+            url: サーバーのURL（例: http://127.0.0.1:8765）
+            timeout: 応答を待つ時間の上限（秒）
+            key_count: APIキーが設定されていない場合に使う仮のキーの数
+        """
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.key_count = key_count
+
+    def offline_keys(self) -> List[str]:
+        return [f'offline-{i + 1}' for i in range(self.key_count)]
+
+    def generate(self, model_name: str, prompt: str, image_hash: Optional[str] = None) -> LLMResponse:
+        import socket
+        import urllib.error
+        import urllib.request
+
+        body = json.dumps({'model': model_name, 'prompt': prompt, 'image_hash': image_hash}).encode('utf-8')
+        request = urllib.request.Request(f"{self.url}/v1/generate", data=body, method='POST',
+                                         headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                payload = json.loads(response.read().decode('utf-8'))
+        except urllib.error.HTTPError as e:
+            retry_after = e.headers.get('Retry-After') if e.headers else None
+            message = e.read().decode('utf-8', errors='replace')
+            raise HTTPBackendError(f"{e.code} {message}", e.code,
+                                   float(retry_after) if retry_after else None) from e
+        except socket.timeout as e:
+            raise TimeoutError(str(e)) from e
+        except urllib.error.URLError as e:
+            raise ConnectionError(str(e.reason)) from e
+        return LLMResponse(payload.get('text', ''), payload.get('total_tokens'))
@@ -0,0 +1,143 @@
+"""生成AIのローカルのスタンドインサーバー
+
+ReplayBackendなどのバックエンドの応答をHTTPで返す。HTTPBackendから接続し、
+Gemini APIの代わりに負荷試験やベンチマークに使う。
+
+使い方:
+    python -m src.llm_server --recordings output/llm_recordings.jsonl [--port 8765]
+        [--latency 0.5] [--latency-jitter 0.2] [--error-rate 0.05] [--rate-limit-rate 0.05]
+"""
+
+import argparse
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from .llm_backend import LLMBackend, ReplayBackend
+
+logger = logging.getLogger(__name__)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """POST /v1/generate でバックエンドの応答を返すハンドラ"""
+
+    server: 'StandInServer'
+
+    def do_POST(self):
+        if self.path != '/v1/generate':
+            self._send(404, {'error': f"不明なパスです: {self.path}"})
+            return
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            request = json.loads(self.rfile.read(length).decode('utf-8'))
+            response = self.server.backend.generate(request['model'], request['prompt'], request.get('image_hash'))
+        except (KeyError, ValueError) as e:
+            status = getattr(e, 'code', None) or 400
+            self._send(status, {'error': str(e)})
+            return
+        except Exception as e:
+            # 注入したエラーなどはcodeとretry_afterをHTTPステータスとRetry-Afterヘッダーで返す
+            status = getattr(e, 'code', None) or 500
+            retry_after = getattr(e, 'retry_after', None)
+            headers = {'Retry-After': f"{retry_after:g}"} if retry_after is not None else {}
+            self._send(status, {'error': str(e)}, headers)
+            return
+        self._send(200, {'text': response.text,
+                         'total_tokens': getattr(response.usage_metadata, 'total_token_count', None)})
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+class StandInServer(ThreadingHTTPServer):
+    """
+    バックエンドの応答をHTTPで返すサーバー
+
+    startでバックグラウンドのスレッドで起動し、stopで停止する。withでも使える。
+    """
+
+    daemon_threads = True
+
+    def __init__(self, backend: LLMBackend, host: str = '127.0.0.1', port: int = 0):
+        """
+        コンストラクタ
+
+        Args:
+            backend: 応答を返すバックエンド（generateを実装したもの）
+            host: 待ち受けるアドレス
+            port: 待ち受けるポート（0の場合は空いているポート）
+        """
+        super().__init__((host, port), _Handler)
+        self.backend = backend
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """HTTPBackendに指定するURL"""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'StandInServer':
+        """バックグラウンドのスレッドで起動"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """停止してソケットを閉じる"""
+        if self._thread is not None:
+            self.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.server_close()
+
+    def __enter__(self) -> 'StandInServer':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def main():
+    """コマンドライン実行エントリーポイント"""
+    parser = argparse.ArgumentParser(description='生成AIのローカルのスタンドインサーバー')
+    parser.add_argument('--recordings', required=True, help='RecordingBackendで記録したファイルのパス')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='応答までの遅延（秒）')
+    parser.add_argument('--latency-jitter', type=float, default=0.0, help='遅延のばらつきの上限（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='一時的なエラー（503）を返す割合')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='上限エラー（429）を返す割合')
+    parser.add_argument('--retry-after', type=float, default=1.0, help='上限エラーで指定する待ち時間（秒）')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    backend = ReplayBackend(latency=args.latency, latency_jitter=args.latency_jitter,
+                            error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+                            retry_after=args.retry_after, seed=args.seed)
+    count = backend.load(args.recordings)
+    server = StandInServer(backend, args.host, args.port)
+    print(f"スタンドインサーバーを起動しました: {server.url}（記録 {count}件）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"リクエスト: {backend.stats}")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,55 +3,168 @@
 import argparse
 import json
 import os
-from typing import Dict, Any, List
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional
 
+from .content import Content
 from .content_crawler import ContentCrawler
+from .content_discovery import DirectoryScanner
+from .content_watcher import ContentWatcher
+from .scene_catalog import SceneCatalog
+from .volume_crawler import VolumeCrawler
+from .prompt_builder import PromptBuilder
 from .scenario_writer import ScenarioWriter
 from .scene_selector import SceneSelector
+from .selection_cache import SelectionCache
+from .timeline import TimelineAssembler
 from .edl_generator import EDLGenerator
 from .srt_generator import SRTGenerator
 from .api_client import GeminiClient
+from .llm_backend import GeminiBackend, HTTPBackend, LLMBackend, RecordingBackend, ReplayBackend
+from .response_cache import ResponseCache
 import dotenv
 
 dotenv.load_dotenv()
 
 class VideoEditAgent:
-    def __init__(self, config: Dict[str, Any]):
-        """ビデオ編集エージェントの初期化"""
+    def __init__(self, config: Dict[str, Any], llm_backend: Optional[LLMBackend] = None):
+        """
+        ビデオ編集エージェントの初期化
+
+        Args:
+            config: 設定
+            llm_backend: 生成AIのバックエンド（Noneの場合はオプションのllm_backendに従って作成）
+        """
         self.config = config
 
-        # API クライアントを初期化
-        self.api_client = GeminiClient()
+        # API クライアントを初期化（同じリクエストの応答はキャッシュから返す）
+        options = config.get('options', {})
+        self.response_cache = None
+        if options.get('response_cache', True) and config.get('output_dir'):
+            ttl_hours = options.get('response_cache_ttl_hours')
+            self.response_cache = ResponseCache(
+                os.path.join(config['output_dir'], 'response_cache.sqlite3'),
+                max_bytes=int(options.get('response_cache_max_mb', 256) * 1024 * 1024),
+                ttl=ttl_hours * 3600 if ttl_hours else None
+            )
+        self.api_client = GeminiClient(
+            response_cache=self.response_cache,
+            max_attempts=options.get('api_max_attempts', 4),
+            rpm=options.get('api_rpm_per_key'),
+            tpm=options.get('api_tpm_per_key'),
+            backend=llm_backend or self._llm_backend(),
+            bypass_cache=options.get('response_cache_bypass', False)
+        )
 
         # 各コンポーネントを初期化
-        self.content_crawler = ContentCrawler()
-        self.scenario_writer = ScenarioWriter(api_client=self.api_client)
-        self.scene_selector = SceneSelector(api_client=self.api_client)
+        index_path = None
+        if options.get('crawl_index', True) and config.get('output_dir'):
+            index_path = os.path.join(config['output_dir'], 'crawl_index.json')
+        scanner = DirectoryScanner(
+            max_depth=options.get('crawl_max_depth') if options.get('crawl_recursive', False) else 1,
+            include=options.get('crawl_include'),
+            exclude=options.get('crawl_exclude'),
+            follow_symlinks=options.get('crawl_follow_symlinks', False)
+        )
+        self.content_crawler = ContentCrawler(
+            max_workers=options.get('crawl_workers', 1),
+            use_processes=options.get('crawl_use_processes', False),
+            index_path=index_path,
+            compact=options.get('compact_scenes', False),
+            json_backend=options.get('json_backend', 'auto'),
+            scanner=scanner,
+            detailed=options.get('scene_catalog', False),
+            lazy=options.get('lazy_scenes', False)
+        )
+        self.volume_crawler = VolumeCrawler(
+            self.content_crawler,
+            device_workers=options.get('crawl_device_workers', 2),
+            device_limits=options.get('crawl_device_limits'),
+            buffer_size=options.get('crawl_buffer_size', 64)
+        )
+        prompt_builder = None
+        if options.get('prompt_token_budget'):
+            prompt_builder = PromptBuilder(
+                options['prompt_token_budget'],
+                max_workers=options.get('prompt_workers', 4)
+            )
+        self.scenario_writer = ScenarioWriter(api_client=self.api_client, prompt_builder=prompt_builder)
+        selection_cache = None
+        if options.get('selection_cache', True) and config.get('output_dir'):
+            selection_cache = SelectionCache(os.path.join(config['output_dir'], 'selection_cache'))
+        self.scene_selector = SceneSelector(
+            api_client=self.api_client,
+            candidates_per_section=options.get('selection_candidates_per_section'),
+            per_section=options.get('selection_per_section', False),
+            section_workers=options.get('selection_workers'),
+            prompt_builder=prompt_builder,
+            strategy=options.get('selection_strategy', 'llm'),
+            ranking=options.get('selection_ranking', 'bm25'),
+            vector_index_path=os.path.join(config['output_dir'], 'scene_vectors.npy')
+            if options.get('selection_ranking') == 'vector' and config.get('output_dir') else None,
+            cache=selection_cache,
+            bypass_cache=options.get('selection_cache_bypass', False)
+        )
         self.edl_generator = EDLGenerator()
         self.srt_generator = SRTGenerator()
 
+    def _llm_backend(self) -> LLMBackend:
+        """
+        オプションに従って生成AIのバックエンドを作成
+
+        Returns:
+            llm_backendが"record"の場合は応答を記録するバックエンド、"replay"の場合は記録した応答を
+            返すバックエンド、"http"の場合はスタンドインサーバーに送るバックエンド、それ以外はGemini API
+        """
+        options = self.config.get('options', {})
+        mode = options.get('llm_backend', 'gemini')
+        recordings = options.get('llm_recordings') or os.path.join(self.config.get('output_dir', ''),
+                                                                   'llm_recordings.jsonl')
+        key_count = options.get('llm_offline_keys', 1)
+        if mode == 'record':
+            return RecordingBackend(GeminiBackend(), recordings)
+        if mode == 'replay':
+            return ReplayBackend(
+                recordings,
+                latency=options.get('llm_latency', 0.0),
+                latency_jitter=options.get('llm_latency_jitter', 0.0),
+                error_rate=options.get('llm_error_rate', 0.0),
+                rate_limit_rate=options.get('llm_rate_limit_rate', 0.0),
+                retry_after=options.get('llm_retry_after', 1.0),
+                seed=options.get('llm_seed', 0),
+                key_count=key_count
+            )
+        if mode == 'http':
+            return HTTPBackend(options.get('llm_server_url', 'http://127.0.0.1:8765'), key_count=key_count)
+        return GeminiBackend()
+
     def analyze_contents(self):
         """コンテンツ分析フェーズ"""
         try:
-            # コンテンツを探索
+            # コンテンツを探索しながら、読み込んだものから順にプロンプトへ反映する
             print("映像コンテンツを探索中...")
-            contents = self.content_crawler.crawl(self.config['input_dir'])
-
-            # コンセプトを生成
+            contents = []
             print("コンセプトを生成中...")
-            concept = self.scenario_writer.generate_concept(contents)
+            concept = self.scenario_writer.generate_concept(self._stream_contents(contents))
+            print(f"読み込んだコンテンツ数: {len(contents)}")
             print(f"生成されたコンセプト: {concept['concept']}")
 
             # コンセプトを保存
             os.makedirs(self.config['output_dir'], exist_ok=True)
             concept_path = os.path.join(self.config['output_dir'], 'concept.json')
             self.scenario_writer.save_concept(concept, concept_path)
+            self._save_contents(contents, os.path.join(self.config['output_dir'], 'contents.json'))
+            self._update_catalog(contents)
 
             # シナリオテンプレートの作成
             print("シナリオテンプレートを生成中...")
-            template = self.scenario_writer.generate_template(concept)
+            template = self.scenario_writer.create_scenario_template(concept)
             template_path = os.path.join(self.config['output_dir'], 'scenario_template.json')
-            self.scenario_writer.save_template(template, template_path)
+            with open(template_path, 'w', encoding='utf-8-sig') as f:
+                json.dump(template, f, ensure_ascii=False, indent=2)
 
             print(f"コンテンツ分析が完了しました")
             return {
@@ -63,6 +176,117 @@ class VideoEditAgent:
             print(f"コンテンツ分析エラー: {e}")
             raise
     
+    def watch_contents(self, interval: float = 5.0, settle_seconds: float = 2.0,
+                       update_concept: bool = True, max_polls: Optional[int] = None) -> ContentWatcher:
+        """
+        監視フェーズ: 入力ディレクトリに追加・更新されたコンテンツを取り込み続ける
+
+        変更があるたびにcontents.jsonとstatistics.jsonを更新し、
+        update_conceptが有効な場合はconcept.jsonも再生成する。
+
+        Args:
+            interval: 走査間隔（秒）
+            settle_seconds: nodes.jsonの書き込み完了とみなすまでの待ち時間（秒）
+            update_concept: 変更時にコンセプトを再生成するかどうか
+            max_polls: 最大走査回数（Noneの場合はCtrl+Cで中断されるまで続ける）
+
+        Returns:
+            使用したContentWatcher
+        """
+        output_dir = self.config['output_dir']
+        os.makedirs(output_dir, exist_ok=True)
+        input_dir = self.config.get('input_dir')
+        if not input_dir:
+            input_dir = self.config['input_dirs'][0]
+            if len(self.config['input_dirs']) > 1:
+                print(f"警告: 監視モードは1つの入力ディレクトリのみ対応しています。{input_dir} を監視します")
+        watcher = ContentWatcher(self.content_crawler, input_dir, settle_seconds)
+
+        def on_change(changes: Dict[str, List[str]]) -> None:
+            print(f"変更を検出しました: 追加 {len(changes['added'])}件 / "
+                  f"変更 {len(changes['modified'])}件 / 削除 {len(changes['removed'])}件")
+            contents = watcher.get_contents()
+            self._save_contents(contents, os.path.join(output_dir, 'contents.json'))
+
+            statistics = watcher.get_statistics()
+            statistics['updated_at'] = datetime.now().isoformat()
+            statistics['last_changes'] = changes
+            with open(os.path.join(output_dir, 'statistics.json'), 'w', encoding='utf-8') as f:
+                json.dump(statistics, f, indent=2, ensure_ascii=False)
+
+            self._update_catalog(contents)
+
+            if update_concept and contents:
+                concept = self.scenario_writer.generate_concept(contents)
+                self.scenario_writer.save_concept(concept, os.path.join(output_dir, 'concept.json'))
+                print(f"コンセプトを更新しました: {concept.get('concept', '')}")
+
+        print(f"{input_dir} の監視を開始します（Ctrl+Cで終了）")
+        try:
+            watcher.watch(on_change, interval=interval, max_polls=max_polls)
+        except KeyboardInterrupt:
+            print("監視を終了しました")
+        return watcher
+
+    def _save_contents(self, contents: List[Dict[str, Any]], contents_path: str) -> None:
+        """
+        コンテンツ一覧をJSONファイルに保存（SceneTableは辞書のリスト、Contentは辞書に変換する）
+
+        Args:
+            contents: コンテンツ情報のリスト
+            contents_path: 保存先のパス
+        """
+        serializable = []
+        for content in contents:
+            loaded = not isinstance(content, Content) or content.is_loaded
+            scenes = content.get('scenes', [])
+            if hasattr(scenes, 'to_list'):
+                scenes = scenes.to_list()
+            serializable.append(dict(content, scenes=scenes))
+            if not loaded:
+                # 保存のためだけに読み込んだシーンは解放する
+                content.release()
+
+        with open(contents_path, 'w', encoding='utf-8') as f:
+            json.dump(serializable, f, indent=2, ensure_ascii=False)
+
+    def _update_catalog(self, contents: List[Dict[str, Any]]) -> None:
+        """
+        scene_catalogオプションが有効な場合、コンテンツをシーンカタログに登録
+
+        Args:
+            contents: コンテンツ情報のリスト
+        """
+        if not self.config.get('options', {}).get('scene_catalog', False):
+            return
+        catalog_path = os.path.join(self.config['output_dir'], 'scene_catalog.db')
+        with SceneCatalog(catalog_path) as catalog:
+            catalog.load(contents)
+            statistics = catalog.get_statistics()
+        print(f"シーンカタログを更新しました: {statistics['content_count']}クリップ / "
+              f"{statistics['scene_count']}シーン ({catalog_path})")
+
+    def _stream_contents(self, collected: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        クローラーから読み込んだコンテンツを逐次返しつつ、collectedにも蓄積する
+
+        Args:
+            collected: 読み込んだコンテンツを追加するリスト
+
+        Yields:
+            コンテンツ情報
+        """
+        input_dirs = self.config.get('input_dirs')
+        if input_dirs:
+            # 複数の入力ディレクトリはデバイスごとに並行して読み込む
+            loaded = self.volume_crawler.iter_contents(input_dirs)
+        else:
+            read_ahead = self.config.get('options', {}).get('crawl_read_ahead', 0)
+            loaded = self.content_crawler.iter_contents(self.config['input_dir'], read_ahead=read_ahead)
+        for content in loaded:
+            collected.append(content)
+            yield content
+
     def select_scenes(self, scenario_path: str):
         """シーン選択フェーズ"""
         try:
@@ -77,13 +301,17 @@ class VideoEditAgent:
             with open(contents_path, 'r', encoding='utf-8') as f:
                 contents = json.load(f)
             
-            # シーンを選択
+            # シーンを選択（前回の選択結果があれば、内容が変わったセクションだけを選択し直す）
             print("シーンを選択中...")
-            selected = self.scene_selector.select(contents, scenario)
+            selected_path = os.path.join(self.config['output_dir'], 'selected.json')
+            previous = None
+            if self.config.get('options', {}).get('incremental_selection', True):
+                previous = self._load_previous_selection(selected_path)
+            scenes = self.scene_selector.reselect(contents, scenario, previous)
+            selected = self.scene_selector.selection_record(contents, scenario, scenes)
             print(f"選択されたシーン数: {len(selected['scenes'])}")
             
             # 選択結果を保存
-            selected_path = os.path.join(self.config['output_dir'], 'selected.json')
             with open(selected_path, 'w', encoding='utf-8') as f:
                 json.dump(selected, f, indent=2, ensure_ascii=False)
             
@@ -93,6 +321,27 @@ class VideoEditAgent:
             print(f"シーン選択エラー: {e}")
             raise
     
+    @staticmethod
+    def _load_previous_selection(selected_path: str) -> Optional[Dict[str, Any]]:
+        """
+        前回の選択結果を読み込む
+
+        Args:
+            selected_path: selected.jsonのパス
+
+        Returns:
+            選択に使ったシナリオを含む前回の選択結果（ない場合や古い形式の場合はNone）
+        """
+        if not os.path.exists(selected_path):
+            return None
+        try:
+            with open(selected_path, 'r', encoding='utf-8') as f:
+                previous = json.load(f)
+        except Exception as e:
+            print(f"警告: 前回の選択結果 {selected_path} を読み込めませんでした: {str(e)}")
+            return None
+        return previous if isinstance(previous, dict) and 'scenario' in previous else None
+
     def generate_outputs(self, selected_path: str):
         """出力生成フェーズ"""
         try:
@@ -100,6 +349,18 @@ class VideoEditAgent:
             print("選択結果を読み込み中...")
             with open(selected_path, 'r', encoding='utf-8') as f:
                 selected = json.load(f)
+            # 選択に使ったシナリオと一緒に保存した形式の場合はシーンのリストを取り出す
+            scenario = None
+            if isinstance(selected, dict):
+                scenario = selected.get('scenario')
+                selected = selected.get('scenes', [])
+            
+            # 重なりを除き、セクションの尺に合わせてタイムラインを組み立てる
+            assembler = self._timeline_assembler(scenario)
+            if assembler is not None:
+                print("タイムラインを組み立て中...")
+                selected = assembler.assemble(selected)
+                self._report_timeline(assembler)
             
             # EDLファイルを生成
             print("EDLファイルを生成中...")
@@ -120,6 +381,104 @@ class VideoEditAgent:
             print(f"出力生成エラー: {e}")
             raise
     
+    def _timeline_assembler(self, scenario: Optional[Dict[str, Any]]) -> Optional[TimelineAssembler]:
+        """
+        オプションに従ってTimelineAssemblerを作成
+
+        Args:
+            scenario: 選択に使ったシナリオ（ない場合は尺の調整を行わない）
+
+        Returns:
+            TimelineAssembler（タイムラインを組み立てない設定の場合はNone）
+        """
+        options = self.config.get('options', {})
+        if not options.get('timeline_assembly', True):
+            return None
+        return TimelineAssembler(scenario, min_length=options.get('timeline_min_length', 0.5))
+
+    @staticmethod
+    def _report_timeline(assembler: TimelineAssembler) -> None:
+        """
+        タイムラインの組み立て結果を表示
+
+        Args:
+            assembler: 組み立てを終えたTimelineAssembler
+        """
+        stats = assembler.stats
+        print(f"タイムライン: {stats['entries']}シーン / {assembler.position:.1f}秒"
+              f"（重複 {stats['duplicates']}件、切り詰め {stats['trimmed']}件、"
+              f"尺の超過 {stats['overflow'] + stats['shortened']}件、不正な時間 {stats['invalid']}件）")
+        for section in assembler.section_report():
+            if section['gap'] > 0:
+                print(f"警告: セクション {section['section_id']} の尺が{section['gap']:.1f}秒不足しています"
+                      f"（{section['duration']:.1f}秒 / {section['target']:.1f}秒）")
+
+    def stream_outputs(self, scenario_path: str) -> Dict[str, str]:
+        """
+        シーン選択の応答をストリーミングで受け取り、選ばれたシーンから順にEDLとSRTに書き出す
+
+        EDLは呼び出し元のスレッド、SRTは別スレッドで書き出し、すべて受け取った後に
+        selected.jsonを保存する。
+
+        Args:
+            scenario_path: シナリオファイルのパス
+
+        Returns:
+            edl_path、srt_path、selected_pathを含む辞書
+        """
+        with open(scenario_path, 'r', encoding='utf-8') as f:
+            scenario = json.load(f)
+        contents_path = os.path.join(self.config['output_dir'], 'contents.json')
+        with open(contents_path, 'r', encoding='utf-8') as f:
+            contents = json.load(f)
+
+        edl_path = os.path.join(self.config['output_dir'], 'output.edl')
+        srt_path = os.path.join(self.config['output_dir'], 'output.srt')
+        selected_path = os.path.join(self.config['output_dir'], 'selected.json')
+
+        srt_queue: queue.Queue = queue.Queue()
+
+        def drain() -> Iterator[Dict[str, Any]]:
+            while True:
+                scene = srt_queue.get()
+                if scene is None:
+                    return
+                yield scene
+
+        srt_thread = threading.Thread(target=self.srt_generator.generate, args=(drain(), srt_path))
+        srt_thread.start()
+
+        scenes: List[Dict[str, Any]] = []
+        assembler = self._timeline_assembler(scenario)
+        started = time.perf_counter()
+
+        def tee() -> Iterator[Dict[str, Any]]:
+            for scene in self.scene_selector.select_stream(contents, scenario):
+                if not scenes:
+                    print(f"最初のシーンを受け取りました（{time.perf_counter() - started:.1f}秒）")
+                scenes.append(scene)
+                entry = scene if assembler is None else assembler.add(scene)
+                if entry is None:
+                    continue
+                srt_queue.put(entry)
+                yield entry
+
+        print("シーンを選択しながら出力を生成中...")
+        try:
+            self.edl_generator.generate(tee(), edl_path)
+        finally:
+            # EDLの書き出しがtee()を読む前に失敗した場合も、SRTのスレッドを終了させる
+            srt_queue.put(None)
+            srt_thread.join()
+        print(f"選択されたシーン数: {len(scenes)}（{time.perf_counter() - started:.1f}秒）")
+        if assembler is not None:
+            self._report_timeline(assembler)
+
+        with open(selected_path, 'w', encoding='utf-8') as f:
+            json.dump(self.scene_selector.selection_record(contents, scenario, scenes),
+                      f, indent=2, ensure_ascii=False)
+        return {'edl_path': edl_path, 'srt_path': srt_path, 'selected_path': selected_path}
+
     def run(self):
         """すべてのフェーズを実行"""
         print("ビデオ編集エージェントを開始します...")
@@ -132,13 +491,26 @@ class VideoEditAgent:
         print(f"シナリオを {scenario_path} に作成してください")
         input("シナリオが作成されたらEnterキーを押してください...")
         
-        # シーン選択フェーズ
-        selected = self.select_scenes(scenario_path)
-        selected_path = os.path.join(self.config['output_dir'], 'selected.json')
-        
-        # 出力生成フェーズ
-        outputs = self.generate_outputs(selected_path)
+        if self.config.get('options', {}).get('selection_stream', False):
+            # シーン選択と出力生成を並行して行う
+            outputs = self.stream_outputs(scenario_path)
+        else:
+            # シーン選択フェーズ
+            selected = self.select_scenes(scenario_path)
+            selected_path = os.path.join(self.config['output_dir'], 'selected.json')
+            
+            # 出力生成フェーズ
+            outputs = self.generate_outputs(selected_path)
         
+        if self.response_cache is not None:
+            stats = self.response_cache.stats()
+            print(f"応答キャッシュ: ヒット {stats['hits']}件 / ミス {stats['misses']}件"
+                  f"（{stats['entries']}件、{stats['bytes'] / 1024 / 1024:.1f}MB を保存）")
+        backend = self.api_client.backend
+        if isinstance(backend, ReplayBackend):
+            stats = backend.stats
+            print(f"再生した応答: リクエスト {stats['requests']}件 / 記録なし {stats['misses']}件"
+                  f" / 注入したエラー {stats['errors']}件 / 注入した上限エラー {stats['rate_limits']}件")
         print("ビデオ編集エージェントが完了しました")
         print(f"EDLファイル: {outputs['edl_path']}")
         print(f"SRTファイル: {outputs['srt_path']}")
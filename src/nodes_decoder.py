@@ -0,0 +1,369 @@
+"""nodes.jsonデコードモジュール"""
+
+import codecs
+import functools
+import json
+import typing
+from typing import Dict, Any, Callable, List, Optional, Tuple, TypedDict
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# パイプラインで使用するフィールドだけを宣言した射影スキーマ
+# （editing_suggestions、landscape_summary、トランスクリプトの時刻などは読み飛ばす）
+# オブジェクトと配列のフィールドはnullを許し、デコード後に空のオブジェクト・配列として扱う
+class _TranscriptNode(TypedDict, total=False):
+    text: str
+
+
+class _ContextAnalysisNode(TypedDict, total=False):
+    activity: Optional[List[str]]
+
+
+class _SceneNode(TypedDict, total=False):
+    start: float
+    end: float
+    transcripts: Optional[List[_TranscriptNode]]
+    context_analysis: Optional[_ContextAnalysisNode]
+
+
+class _MetadataNode(TypedDict, total=False):
+    duration: float
+
+
+class _SummaryNode(TypedDict, total=False):
+    topics: Optional[List[str]]
+
+
+class _ProjectedNodes(TypedDict, total=False):
+    metadata: Optional[_MetadataNode]
+    summary: Optional[_SummaryNode]
+    scenes: Optional[List[_SceneNode]]
+
+
+# シーンカタログ用の詳細な射影スキーマ（トランスクリプトの区間とコンテキスト分析のタグを含む）
+class _DetailedTranscriptNode(TypedDict, total=False):
+    start: float
+    end: float
+    text: str
+
+
+class _DetailedSceneNode(TypedDict, total=False):
+    start: float
+    end: float
+    description: Optional[str]
+    transcripts: Optional[List[_DetailedTranscriptNode]]
+    context_analysis: Optional[Dict[str, Any]]
+
+
+class _DetailedMetadataNode(TypedDict, total=False):
+    filename: Optional[str]
+    duration: float
+    created_at: Optional[str]
+
+
+class _DetailedSummaryNode(TypedDict, total=False):
+    title: Optional[str]
+    overview: Optional[str]
+    topics: Optional[List[str]]
+    filming_date: Optional[str]
+    location: Optional[str]
+
+
+class _DetailedNodes(TypedDict, total=False):
+    metadata: Optional[_DetailedMetadataNode]
+    summary: Optional[_DetailedSummaryNode]
+    scenes: Optional[List[_DetailedSceneNode]]
+
+
+# ヘッダー（クリップ情報とシーン数）だけを取り出すスキーマ。シーンの中身は読み飛ばす
+class _SkippedNode(TypedDict, total=False):
+    pass
+
+
+class _HeaderNodes(TypedDict, total=False):
+    metadata: Optional[_MetadataNode]
+    summary: Optional[_SummaryNode]
+    scenes: Optional[List[_SkippedNode]]
+
+
+class _DetailedHeaderNodes(TypedDict, total=False):
+    metadata: Optional[_DetailedMetadataNode]
+    summary: Optional[_DetailedSummaryNode]
+    scenes: Optional[List[_SkippedNode]]
+
+
+class SchemaError(ValueError):
+    """nodes.jsonの値の型がスキーマと合わない"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+        self.path: List[str] = []
+
+    def __str__(self) -> str:
+        return f"$.{''.join(self.path).lstrip('.')} {self.reason}"
+
+
+def _unwrap_optional(tp: Any) -> Tuple[Any, bool]:
+    """Optional[X]の場合は(X, True)、それ以外は(型, False)を返す"""
+    if typing.get_origin(tp) is typing.Union:
+        args = [arg for arg in typing.get_args(tp) if arg is not type(None)]
+        if len(args) == 1:
+            return args[0], True
+    return tp, False
+
+
+def _is_typed_dict(tp: Any) -> bool:
+    return isinstance(tp, type) and issubclass(tp, dict) and hasattr(tp, '__annotations__')
+
+
+def _empty_factory(tp: Any) -> Optional[Callable[[], Any]]:
+    """nullの代わりに使う空のオブジェクト・配列を作る関数（オブジェクト・配列の型でない場合はNone）"""
+    if _is_typed_dict(tp) or typing.get_origin(tp) is dict:
+        return dict
+    if typing.get_origin(tp) is list:
+        return list
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def _converter(tp: Any) -> Callable[[Any], Any]:
+    """
+    デコード済みの値をスキーマに合わせて射影・検証する関数を作成（msgspecのstrict=Falseと同じ規則）
+
+    作成した関数はスキーマにないフィールドを除き、Optionalのオブジェクト・配列のnullを空にする。
+    値がスキーマの型と合わない場合はSchemaErrorを発生させる。
+
+    Args:
+        tp: スキーマの型
+
+    Returns:
+        値を変換する関数
+    """
+    inner, optional = _unwrap_optional(tp)
+    if optional:
+        convert_inner = _converter(inner)
+        empty = _empty_factory(inner)
+
+        def convert_optional(value):
+            if value is None:
+                return empty() if empty is not None else None
+            return convert_inner(value)
+        return convert_optional
+
+    if tp is Any:
+        return lambda value: value
+    if _is_typed_dict(tp):
+        fields = [(key, _converter(field_type)) for key, field_type in typing.get_type_hints(tp).items()]
+
+        def convert_object(value):
+            if not isinstance(value, dict):
+                raise SchemaError(f"はオブジェクトである必要があります（{type(value).__name__}）")
+            result = {}
+            for key, convert in fields:
+                if key in value:
+                    try:
+                        result[key] = convert(value[key])
+                    except SchemaError as e:
+                        e.path.insert(0, f".{key}")
+                        raise
+            return result
+        return convert_object
+    if typing.get_origin(tp) is dict:
+        def convert_dict(value):
+            if not isinstance(value, dict):
+                raise SchemaError(f"はオブジェクトである必要があります（{type(value).__name__}）")
+            return value
+        return convert_dict
+    if typing.get_origin(tp) is list:
+        convert_item = _converter(typing.get_args(tp)[0])
+
+        def convert_list(value):
+            if not isinstance(value, list):
+                raise SchemaError(f"は配列である必要があります（{type(value).__name__}）")
+            result = []
+            for item in value:
+                try:
+                    result.append(convert_item(item))
+                except SchemaError as e:
+                    e.path.insert(0, f"[{len(result)}]")
+                    raise
+            return result
+        return convert_list
+    if tp is float:
+        def convert_float(value):
+            if isinstance(value, float):
+                return value
+            if isinstance(value, (int, str)) and not isinstance(value, bool):
+                try:
+                    return float(value)
+                except ValueError:
+                    pass
+            raise SchemaError(f"は数値である必要があります（{type(value).__name__}）")
+        return convert_float
+    if tp is str:
+        def convert_str(value):
+            if not isinstance(value, str):
+                raise SchemaError(f"は文字列である必要があります（{type(value).__name__}）")
+            return value
+        return convert_str
+    raise TypeError(f"未対応のスキーマの型です: {tp}")
+
+
+@functools.lru_cache(maxsize=None)
+def _null_filler(tp: Any) -> Optional[Callable[[Any], None]]:
+    """
+    msgspecでデコードした値のうち、Optionalのオブジェクト・配列のnullを空に置き換える関数を作成
+
+    Args:
+        tp: スキーマの型
+
+    Returns:
+        値をその場で書き換える関数（置き換えるnullを含み得ない型の場合はNone）
+    """
+    tp, _ = _unwrap_optional(tp)
+    if _is_typed_dict(tp):
+        plan = []
+        for key, field_type in typing.get_type_hints(tp).items():
+            inner, optional = _unwrap_optional(field_type)
+            empty = _empty_factory(inner) if optional else None
+            fill = _null_filler(inner)
+            if empty is not None or fill is not None:
+                plan.append((key, empty, fill))
+        if not plan:
+            return None
+
+        def fill_object(value):
+            for key, empty, fill in plan:
+                item = value.get(key)
+                if item is None:
+                    if empty is not None and key in value:
+                        value[key] = empty()
+                elif fill is not None:
+                    fill(item)
+        return fill_object
+    if typing.get_origin(tp) is list:
+        fill_item = _null_filler(typing.get_args(tp)[0])
+        if fill_item is None:
+            return None
+
+        def fill_list(value):
+            for item in value:
+                fill_item(item)
+        return fill_list
+    return None
+
+
+class NodesDecoder:
+    """nodes.jsonから必要なフィールドだけを取り出すデコーダー"""
+
+    BACKENDS = ('msgspec', 'orjson', 'json')
+
+    def __init__(self, backend: str = 'auto', detailed: bool = False):
+        """
+        コンストラクタ
+
+        Args:
+            backend: 使用するバックエンド（'auto'の場合はmsgspec、orjson、jsonの順に利用可能なもの）
+            detailed: クリップ情報・トランスクリプトの区間・コンテキスト分析も取り出すかどうか
+        """
+        if backend == 'auto':
+            backend = 'msgspec' if msgspec is not None else 'orjson' if orjson is not None else 'json'
+        if backend not in self.BACKENDS:
+            raise ValueError(f"未対応のバックエンドです: {backend}")
+        if not self.is_available(backend):
+            print(f"警告: {backend} がインストールされていないため標準のjsonを使用します")
+            backend = 'json'
+        self.backend = backend
+        self.detailed = detailed
+
+    @staticmethod
+    def is_available(backend: str) -> bool:
+        """
+        バックエンドが利用可能か判定
+
+        Args:
+            backend: バックエンド名
+
+        Returns:
+            利用可能な場合はTrue
+        """
+        if backend == 'msgspec':
+            return msgspec is not None
+        if backend == 'orjson':
+            return orjson is not None
+        return backend == 'json'
+
+    def decode(self, raw: bytes) -> Dict[str, Any]:
+        """
+        nodes.jsonをデコードし、射影したフィールドだけを含む辞書を返す
+
+        返す辞書はnodes.jsonと同じ構造で、metadata.duration、summary.topics、
+        scenes[].start/end/transcripts[].text/context_analysis.activityのみを含む。
+        detailedの場合はさらにmetadata.filename/created_at、summary.title/overview/
+        filming_date/location、scenes[].description、transcripts[].start/end、
+        context_analysis全体を含む。
+        どのバックエンドでも同じスキーマで検証し、オブジェクト・配列のnullは空として扱う。
+
+        Args:
+            raw: nodes.jsonのバイト列（BOM付きも可）
+
+        Returns:
+            射影済みのnodes.jsonの内容
+
+        Raises:
+            ValueError: JSONが不正な場合や、値の型がスキーマと合わない場合
+        """
+        schema = _DetailedNodes if self.detailed else _ProjectedNodes
+        return self._decode(raw, schema)
+
+    def decode_header(self, raw: bytes) -> Dict[str, Any]:
+        """
+        nodes.jsonからクリップ単位の情報とシーン数だけを取り出す
+
+        msgspecではシーンの中身を生成せずに読み飛ばす。それ以外のバックエンドでは
+        全体をデコードしたうえでヘッダー部分だけを残す。
+
+        Args:
+            raw: nodes.jsonのバイト列（BOM付きも可）
+
+        Returns:
+            metadata、summary（decodeと同じ射影）とscene_countを含む辞書
+        """
+        schema = _DetailedHeaderNodes if self.detailed else _HeaderNodes
+        data = self._decode(raw, schema)
+        header: Dict[str, Any] = {section: data[section] for section in ('metadata', 'summary')
+                                  if data.get(section)}
+        header['scene_count'] = len(data.get('scenes', []))
+        return header
+
+    def _decode(self, raw: bytes, schema: type) -> Dict[str, Any]:
+        """
+        nodes.jsonをデコードし、スキーマで射影・検証する
+
+        Args:
+            raw: nodes.jsonのバイト列（BOM付きも可）
+            schema: 射影に使うTypedDictのスキーマ
+
+        Returns:
+            射影済みのnodes.jsonの内容
+        """
+        if raw.startswith(codecs.BOM_UTF8):
+            raw = raw[len(codecs.BOM_UTF8):]
+
+        if self.backend == 'msgspec':
+            # 型付きスキーマでデコードし、宣言していないフィールドは生成しない
+            data = msgspec.json.decode(raw, type=schema, strict=False)
+            _null_filler(schema)(data)
+            return data
+        data = orjson.loads(raw) if self.backend == 'orjson' else json.loads(raw)
+        return _converter(schema)(data)
@@ -0,0 +1,151 @@
+"""トークン予算付きプロンプト構築モジュール"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Sequence
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    テキストのトークン数を概算
+
+    トークナイザーを使わずに、日本語などの非ASCII文字は1文字1トークン、
+    ASCII文字は4文字1トークンとして数える（実際より多めに見積もる）。
+
+    Args:
+        text: 対象のテキスト
+
+    Returns:
+        推定トークン数
+    """
+    ascii_count = sum(1 for c in text if c < '\x80')
+    return (len(text) - ascii_count) + (ascii_count + 3) // 4
+
+
+class MapReduceError(RuntimeError):
+    """すべてのチャンクのmapに失敗したことを表す例外"""
+
+
+class PromptBuilder:
+    """
+    プロンプトをトークン予算内に収めるため、テキストのブロックをチャンクに分けて
+    map-reduceで処理するクラス
+
+    mapでは各チャンクを並行して処理し（候補の絞り込みや要約）、
+    reduceではmapの結果をまとめて最終的なプロンプトを作る。
+    """
+
+    def __init__(self, token_budget: int, max_workers: int = 4):
+        """
+        コンストラクタ
+
+        Args:
+            token_budget: 1回のプロンプトに使えるトークン数の上限
+            max_workers: mapで同時に処理するチャンク数
+        """
+        if token_budget <= 0:
+            raise ValueError(f"token_budgetは1以上を指定してください: {token_budget}")
+        self.token_budget = token_budget
+        self.max_workers = max(1, int(max_workers))
+
+    def fits(self, prompt: str) -> bool:
+        """
+        プロンプトが予算内に収まるか判定
+
+        Args:
+            prompt: プロンプト
+
+        Returns:
+            収まる場合はTrue
+        """
+        return estimate_tokens(prompt) <= self.token_budget
+
+    def pack(self, blocks: Sequence[str], overhead: int = 0) -> List[List[str]]:
+        """
+        ブロックを順番を保ったままチャンクに詰める
+
+        各チャンクはoverhead（プロンプトの固定部分）と合わせて予算内に収まる。
+        1つで予算を超えるブロックは切り詰めて単独のチャンクにする。
+
+        Args:
+            blocks: テキストのブロック
+            overhead: チャンクごとに加わる固定部分のトークン数
+
+        Returns:
+            ブロックのリストのリスト
+        """
+        available = self.token_budget - overhead
+        if available <= 0:
+            raise ValueError(f"プロンプトの固定部分（約{overhead}トークン）だけで予算を超えています")
+
+        chunks: List[List[str]] = []
+        current: List[str] = []
+        used = 0
+        for block in blocks:
+            tokens = estimate_tokens(block)
+            if tokens > available:
+                block = self.truncate(block, available)
+                tokens = estimate_tokens(block)
+            if current and used + tokens > available:
+                chunks.append(current)
+                current, used = [], 0
+            current.append(block)
+            used += tokens
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def map_reduce(self, chunks: Sequence[Any], map_fn: Callable[[Any], Any],
+                   reduce_fn: Callable[[List[Any]], Any]) -> Any:
+        """
+        チャンクをmap_fnで並行して処理し、結果をreduce_fnでまとめる
+
+        map_fnで例外が発生したチャンクは警告を出して結果から除く。
+        すべてのチャンクで例外が発生した場合は、reduce_fnを呼ばずにMapReduceErrorを送出する。
+
+        Args:
+            chunks: チャンクのリスト
+            map_fn: チャンク1つを処理する関数
+            reduce_fn: mapの結果のリスト（チャンクの順）を受け取る関数
+
+        Returns:
+            reduce_fnの戻り値
+
+        Raises:
+            MapReduceError: すべてのチャンクの処理に失敗した場合
+        """
+        def run(indexed_chunk) -> Optional[Any]:
+            index, chunk = indexed_chunk
+            try:
+                return map_fn(chunk)
+            except Exception as e:
+                print(f"警告: チャンク {index + 1}/{len(chunks)} の処理中にエラーが発生しました: {str(e)}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, max(1, len(chunks)))) as pool:
+            results = [result for result in pool.map(run, enumerate(chunks)) if result is not None]
+        if chunks and not results:
+            raise MapReduceError(f"すべてのチャンク（{len(chunks)}件）の処理に失敗しました")
+        return reduce_fn(results)
+
+    @staticmethod
+    def truncate(text: str, max_tokens: int) -> str:
+        """
+        テキストを推定トークン数がmax_tokens以下になるように末尾から切り詰める
+
+        Args:
+            text: 対象のテキスト
+            max_tokens: トークン数の上限
+
+        Returns:
+            切り詰めたテキスト
+        """
+        if estimate_tokens(text) <= max_tokens:
+            return text
+        low, high = 0, len(text)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if estimate_tokens(text[:middle]) + 1 <= max_tokens:
+                low = middle
+            else:
+                high = middle - 1
+        return text[:low] + '…'
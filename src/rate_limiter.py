@@ -0,0 +1,331 @@
+"""APIキーごとのレート制限と再試行の待ち時間を扱うモジュール"""
+
+import random
+import re
+import threading
+import time
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+# エラーの分類
+RATE_LIMIT = 'rate_limit'
+TRANSIENT = 'transient'
+FATAL = 'fatal'
+
+# 一時的なエラーとみなすHTTPステータス
+_TRANSIENT_STATUSES = {408, 500, 502, 503, 504}
+_RATE_LIMIT_PATTERN = re.compile(r'\b429\b|resource.?exhausted|quota|rate.?limit|too many requests', re.I)
+_TRANSIENT_PATTERN = re.compile(r'\b50[0234]\b|unavailable|timed? ?out|deadline|connection|temporar', re.I)
+# APIの例外を定義しているライブラリ
+_API_ERROR_MODULES = ('google.api_core', 'google.auth', 'google.generativeai', 'grpc', 'requests', 'urllib3',
+                      'httpx', 'aiohttp')
+_RETRY_AFTER_PATTERNS = [
+    re.compile(r'retry[ _-]?after[":= ]+(\d+(?:\.\d+)?)', re.I),
+    re.compile(r'retry in (\d+(?:\.\d+)?)\s*s', re.I),
+    re.compile(r'retry_delay\s*\{\s*seconds:\s*(\d+)', re.I),
+]
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    """例外からHTTPステータスを取得（取得できない場合はNone）"""
+    for value in (getattr(error, 'code', None), getattr(error, 'status_code', None),
+                  getattr(getattr(error, 'response', None), 'status_code', None)):
+        try:
+            if value is not None and not callable(value):
+                return int(value)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def is_api_error(error: BaseException) -> bool:
+    """
+    APIの呼び出しで発生した例外（SDK・HTTP・通信の例外）かどうかを判定
+
+    それ以外の例外（プログラムの誤りなど）は再試行やキーの切り替えの対象にせず、呼び出し元に伝える。
+
+    Args:
+        error: 発生した例外
+
+    Returns:
+        APIの例外の場合はTrue
+    """
+    if _status_code(error) is not None or isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    return type(error).__module__.startswith(_API_ERROR_MODULES)
+
+
+def classify_error(error: BaseException) -> str:
+    """
+    APIの例外を、再試行の方法に応じて分類
+
+    Args:
+        error: APIの呼び出しで発生した例外
+
+    Returns:
+        RATE_LIMIT（キーの上限に達した）、TRANSIENT（時間をおいて再試行できる）、
+        FATAL（再試行しても成功しない）のいずれか
+    """
+    status = _status_code(error)
+    if status == 429:
+        return RATE_LIMIT
+    if status in _TRANSIENT_STATUSES:
+        return TRANSIENT
+    if status is not None and 400 <= status < 500:
+        return FATAL
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return TRANSIENT
+    # 安全性フィルタによるブロックなど、SDKが応答を検証して発生させた例外は再試行しても変わらない
+    if type(error).__module__.startswith('google.generativeai'):
+        return FATAL
+
+    message = f"{type(error).__name__}: {error}"
+    if _RATE_LIMIT_PATTERN.search(message):
+        return RATE_LIMIT
+    if _TRANSIENT_PATTERN.search(message):
+        return TRANSIENT
+    # 分類できない例外は、従来どおり別のキーで再試行できるよう一時的なエラーとして扱う
+    return TRANSIENT if status is None else FATAL
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """
+    例外に含まれる再試行までの待ち時間を取得
+
+    retry_after属性、応答のRetry-Afterヘッダー、google.rpc.RetryInfo、
+    メッセージ中の「retry in 12s」などの表記を順に探す。
+
+    Args:
+        error: APIの呼び出しで発生した例外
+
+    Returns:
+        待ち時間（秒、含まれない場合はNone）
+    """
+    value = getattr(error, 'retry_after', None)
+    if value is None:
+        headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+        try:
+            value = headers.get('retry-after') or headers.get('Retry-After')
+        except AttributeError:
+            value = None
+    if value is None:
+        for detail in getattr(error, 'details', None) or []:
+            delay = getattr(detail, 'retry_delay', None)
+            if delay is not None:
+                value = getattr(delay, 'seconds', 0) + getattr(delay, 'nanos', 0) / 1e9
+                break
+    if value is None:
+        message = str(error)
+        for pattern in _RETRY_AFTER_PATTERNS:
+            match = pattern.search(message)
+            if match:
+                value = match.group(1)
+                break
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class Backoff:
+    """
+    指数関数的に伸ばし、ランダムにばらつかせた再試行の待ち時間を計算するクラス
+
+    待ち時間は0からbase×2^attempt（max_delayが上限）までの一様乱数（full jitter）で、
+    複数のリクエストが同時に失敗しても再試行の時刻が揃わないようにする。
+    サーバーから待ち時間が指定された場合は、それより短くはしない。
+    """
+
+    def __init__(self, base: float = 1.0, max_delay: float = 60.0, rng: Optional[random.Random] = None):
+        """
+        コンストラクタ
+
+        Args:
+            base: 最初の再試行の待ち時間の上限（秒）
+            max_delay: 待ち時間の上限（秒）
+            rng: 乱数生成器（テスト用）
+        """
+        self.base = base
+        self.max_delay = max_delay
+        self._rng = rng or random.Random()
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        再試行までの待ち時間を計算
+
+        Args:
+            attempt: 失敗した試行の回数（0から）
+            retry_after: サーバーが指定した待ち時間（秒）
+
+        Returns:
+            待ち時間（秒）
+        """
+        delay = self._rng.uniform(0, min(self.max_delay, self.base * (2 ** attempt)))
+        if retry_after is not None:
+            # 指定された時刻に再試行が集中しないよう、少しだけ後ろにずらす
+            delay = retry_after + self._rng.uniform(0, min(self.base, retry_after * 0.1 + 0.1))
+        return delay
+
+
+class TokenBucket:
+    """
+    1分あたりの上限を、一定の速度で補充されるトークンとして管理するクラス
+    """
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        コンストラクタ
+
+        Args:
+            per_minute: 1分あたりに補充する量
+            capacity: 貯められる量の上限（Noneの場合はper_minute、つまり1分間分）
+            clock: 現在時刻（秒）を返す関数
+        """
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """
+        指定した量を使えるようになるまでの時間を取得
+
+        Args:
+            amount: 使う量（capacityを超える場合はcapacityとして扱う）
+
+        Returns:
+            待ち時間（秒、すぐに使える場合は0）
+        """
+        self._refill()
+        shortage = min(amount, self.capacity) - self._tokens
+        return shortage / self.rate if shortage > 0 else 0.0
+
+    def consume(self, amount: float) -> None:
+        """
+        指定した量を使う（実際の使用量で補正する場合は残りが負になることもある）
+
+        Args:
+            amount: 使う量
+        """
+        self._refill()
+        self._tokens -= min(amount, self.capacity) if amount > 0 else amount
+
+
+class KeyRateLimiter:
+    """
+    APIキーごとに、1分あたりのリクエスト数（RPM）とトークン数（TPM）の上限を守るクラス
+
+    リクエストごとに、すぐに送れるキー（なければ最も早く送れるようになるキー）を選ぶ。
+    上限に達したという応答を受けたキーはblockで指定した時刻まで選ばない。
+    スレッドから呼び出しても安全で、待つ処理は呼び出し側が行う（同期・非同期の両方で使える）。
+    """
+
+    def __init__(self, key_count: int, rpm: Optional[float] = None, tpm: Optional[float] = None,
+                 burst: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        """
+        コンストラクタ
+
+        Args:
+            key_count: APIキーの数
+            rpm: キーごとの1分あたりのリクエスト数の上限（Noneの場合は制限しない）
+            tpm: キーごとの1分あたりのトークン数の上限（Noneの場合は制限しない）
+            burst: キーごとに続けて送れるリクエスト数（Noneの場合は1秒間分、最低1件。
+                1分間分をまとめて送ると、直近1分間で数えるサーバーの上限を超えることがある）
+            clock: 現在時刻（秒）を返す関数
+        """
+        self.rpm = rpm
+        self.tpm = tpm
+        self._clock = clock
+        self._lock = threading.Lock()
+        if rpm and burst is None:
+            burst = max(1.0, rpm / 60.0)
+        self._requests = [TokenBucket(rpm, capacity=burst, clock=clock) if rpm else None for _ in range(key_count)]
+        self._tokens = [TokenBucket(tpm, clock=clock) if tpm else None for _ in range(key_count)]
+        self._blocked_until = [0.0] * key_count
+
+    def _wait_time(self, key_index: int, tokens: float) -> float:
+        """キーでリクエストを送れるようになるまでの時間"""
+        wait = self._blocked_until[key_index] - self._clock()
+        if self._requests[key_index] is not None:
+            wait = max(wait, self._requests[key_index].wait_time(1))
+        if self._tokens[key_index] is not None:
+            wait = max(wait, self._tokens[key_index].wait_time(tokens))
+        return wait if wait > 1e-9 else 0.0
+
+    def reserve(self, tokens: float = 0, candidates: Optional[Sequence[int]] = None,
+                preferred: Optional[int] = None) -> Tuple[int, float]:
+        """
+        リクエストを送るキーを選び、すぐに送れる場合はその分の上限を使う
+
+        Args:
+            tokens: リクエストで使うトークン数の見積もり
+            candidates: 選んでよいキーのインデックス（Noneの場合はすべて）
+            preferred: 待ち時間が同じ場合に優先するキー（切り替えを減らすため）
+
+        Returns:
+            (キーのインデックス, 待ち時間)。待ち時間が0の場合は上限を使ったので送信してよい。
+            0より大きい場合は上限を使っていないため、待ってから再度呼び出す
+        """
+        with self._lock:
+            keys = list(candidates) if candidates is not None else list(range(len(self._blocked_until)))
+            if not keys:
+                raise ValueError("選択できるAPIキーがありません")
+            key_index = min(keys, key=lambda i: (self._wait_time(i, tokens), i != preferred))
+            wait = self._wait_time(key_index, tokens)
+            if wait <= 0:
+                if self._requests[key_index] is not None:
+                    self._requests[key_index].consume(1)
+                if self._tokens[key_index] is not None:
+                    self._tokens[key_index].consume(tokens)
+            return key_index, wait
+
+    def record_usage(self, key_index: int, estimated: float, actual: float) -> None:
+        """
+        見積もったトークン数と実際の使用量の差を反映
+
+        Args:
+            key_index: キーのインデックス
+            estimated: reserveで使った見積もり
+            actual: 応答に含まれる実際の使用量
+        """
+        with self._lock:
+            if self._tokens[key_index] is not None:
+                self._tokens[key_index].consume(actual - estimated)
+
+    def block(self, key_index: int, seconds: float) -> None:
+        """
+        上限に達したキーを、指定した時間が経つまで選ばないようにする
+
+        Args:
+            key_index: キーのインデックス
+            seconds: 選ばない時間（秒）
+        """
+        with self._lock:
+            self._blocked_until[key_index] = max(self._blocked_until[key_index], self._clock() + seconds)
+
+    def blocked_keys(self) -> List[int]:
+        """現在選ばないようにしているキーのインデックス"""
+        with self._lock:
+            now = self._clock()
+            return [i for i, until in enumerate(self._blocked_until) if until > now]
+
+
+def usage_tokens(response: Any) -> Optional[int]:
+    """
+    応答に含まれる実際のトークン使用量を取得
+
+    Args:
+        response: generate_contentの応答
+
+    Returns:
+        合計トークン数（含まれない場合はNone）
+    """
+    usage = getattr(response, 'usage_metadata', None)
+    total = getattr(usage, 'total_token_count', None)
+    return total if isinstance(total, int) and total > 0 else None
@@ -0,0 +1,168 @@
+"""生成AIの応答キャッシュモジュール"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Optional
+
+
+class ResponseCache:
+    """
+    生成AIの応答を、リクエストの内容から求めたキーでSQLiteに保存するキャッシュ
+
+    キーはモデル名、プロンプトのハッシュ、画像ファイルの内容のハッシュから作成するため、
+    同じ入力であればAPIを呼び出さずに前回の応答を返す。保存した応答の合計サイズが
+    max_bytesを超えた場合は、最後に参照した時刻が古いものから削除する（LRU）。
+    ttlを指定した場合は、保存してからttl秒を過ぎた応答は使わずに削除する。
+    """
+
+    def __init__(self, db_path: str, max_bytes: int = 256 * 1024 * 1024, ttl: Optional[float] = None):
+        """
+        コンストラクタ
+
+        Args:
+            db_path: SQLiteのデータベースファイルのパス
+            max_bytes: 保存する応答の合計サイズの上限（バイト）
+            ttl: 応答の有効期間（秒、Noneの場合は無期限）
+        """
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+
+    @staticmethod
+    def hash_file(path: str) -> str:
+        """
+        ファイルの内容のハッシュを計算
+
+        Args:
+            path: ファイルのパス
+
+        Returns:
+            16進数のハッシュ文字列
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def make_key(model_name: str, prompt: str, image_hash: Optional[str] = None) -> str:
+        """
+        キャッシュのキーを作成
+
+        Args:
+            model_name: 生成AIのモデル名
+            prompt: プロンプト
+            image_hash: 画像ファイルの内容のハッシュ（画像を送らない場合はNone）
+
+        Returns:
+            16進数のハッシュ文字列
+        """
+        prompt_hash = hashlib.blake2b(prompt.encode('utf-8'), digest_size=20).hexdigest()
+        payload = '\0'.join([model_name, prompt_hash, image_hash or ''])
+        return hashlib.blake2b(payload.encode('utf-8'), digest_size=20).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        キャッシュされた応答を取得
+
+        Args:
+            key: キャッシュのキー
+
+        Returns:
+            応答（キャッシュがない・有効期間を過ぎた場合はNone）
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT response, created_at FROM responses WHERE key = ?",
+                                     (key,)).fetchone()
+            if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, response: str, model_name: str = '') -> None:
+        """
+        応答を保存し、合計サイズが上限を超えた場合は古いものから削除する
+
+        Args:
+            key: キャッシュのキー
+            response: 応答
+            model_name: 生成AIのモデル名（確認用に記録する）
+        """
+        size = len(response.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, model, response, size, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", (key, model_name, response, size, now, now))
+                self._evict()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _evict(self) -> None:
+        """合計サイズが上限以下になるまで、最後に参照した時刻が古い応答から削除する"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at, rowid"):
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self.evictions += len(victims)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        キャッシュの統計を取得
+
+        Returns:
+            hits、misses、evictions、entries（保存している応答の数）、bytes（合計サイズ）を含む辞書
+        """
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'entries': entries, 'bytes': total}
+
+    def close(self) -> None:
+        """データベースを閉じる"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,57 @@
+"""シナリオの差分検出モジュール"""
+
+from typing import Dict, Any, List, Optional
+
+from .selection_cache import SelectionCache
+
+
+def section_key(section: Dict[str, Any], position: int) -> str:
+    """
+    セクションを対応付けるキーを取得
+
+    Args:
+        section: シナリオのセクション
+        position: シナリオ内でのセクションの位置
+
+    Returns:
+        section_id（ない場合は位置の文字列）
+    """
+    return section.get('section_id') or str(position)
+
+
+def diff_scenarios(previous: Optional[Dict[str, Any]], current: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    前回のシナリオと今回のシナリオをセクション単位で比較
+
+    セクションはsection_idで対応付け、正規化（キーの順序と文字列の前後の空白を無視）した
+    内容が同じであれば変更なしとする。セクション以外の項目（タイトルやコンセプトなど）が
+    変わった場合は、すべてのセクションの選択に影響するためglobal_changedをTrueにする。
+
+    Args:
+        previous: 前回のシナリオ（Noneの場合はすべてのセクションを変更ありとする）
+        current: 今回のシナリオ
+
+    Returns:
+        changed（内容が変わった・追加されたセクションのID）、unchanged（変わらないセクションのID）、
+        removed（削除されたセクションのID）、global_changed（セクション以外の変更の有無）を含む辞書
+        （changedとunchangedは今回のシナリオの順）
+    """
+    current_sections = {section_key(s, i): s for i, s in enumerate(current.get('sections', []))}
+    if previous is None:
+        return {'changed': list(current_sections), 'unchanged': [], 'removed': [], 'global_changed': True}
+
+    previous_sections = {section_key(s, i): s for i, s in enumerate(previous.get('sections', []))}
+    normalize = SelectionCache.normalize_scenario
+    global_changed = (normalize({k: v for k, v in previous.items() if k != 'sections'})
+                      != normalize({k: v for k, v in current.items() if k != 'sections'}))
+
+    changed: List[str] = []
+    unchanged: List[str] = []
+    for section_id, section in current_sections.items():
+        before = previous_sections.get(section_id)
+        if before is not None and normalize(before) == normalize(section):
+            unchanged.append(section_id)
+        else:
+            changed.append(section_id)
+    removed = [section_id for section_id in previous_sections if section_id not in current_sections]
+    return {'changed': changed, 'unchanged': unchanged, 'removed': removed, 'global_changed': global_changed}
@@ -1,30 +1,36 @@
 """繧ｷ繝翫Μ繧ｪ菴懈�先髪謠ｴ繝｢繧ｸ繝･繝ｼ繝ｫ"""
 
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, List, Optional
 import json
 from .api_client import GeminiClient
+from .content import Content
+from .prompt_builder import MapReduceError, PromptBuilder, estimate_tokens
 import os
 
 class ScenarioWriter:
-    def __init__(self, api_client: GeminiClient):
-        """繧ｷ繝翫Μ繧ｪ繝ｩ繧､繧ｿ繝ｼ縺ｮ蛻晄悄蛹�"""
-        self.api_client = api_client
+    # コンテンツ概要の要約（map-reduce）を繰り返す最大回数
+    MAX_DIGEST_ROUNDS = 3
 
-    def generate_concept(self, contents: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """繧ｳ繝ｳ繝�繝ｳ繝�縺九ｉ繧ｿ繧､繝医Ν縺ｨ繧ｳ繝ｳ繧ｻ繝励ヨ繧堤函謌�"""
-        prompt = f"""莉･荳九�ｮ譏蜒上さ繝ｳ繝�繝ｳ繝�縺九ｉ縲∽ｽ懷刀縺ｮ繧ｿ繧､繝医Ν縺ｨ繧ｳ繝ｳ繧ｻ繝励ヨ繧堤函謌舌＠縺ｦ縺上□縺輔＞�ｼ�
+    def __init__(self, api_client: GeminiClient, prompt_builder: Optional[PromptBuilder] = None):
+        """
+        繧ｷ繝翫Μ繧ｪ繝ｩ繧､繧ｿ繝ｼ縺ｮ蛻晄悄蛹�
 
-繧ｳ繝ｳ繝�繝ｳ繝�讎りｦ�:
-{self._format_contents_summary(contents)}
+        Args:
+            api_client: 生成AIのクライアント
+            prompt_builder: プロンプトのトークン予算（Noneの場合は予算を設けない）。
+                予算を超える場合はコンテンツ概要をチャンクごとに要約してからコンセプトを生成する
+        """
+        self.api_client = api_client
+        self.prompt_builder = prompt_builder
 
-莉･荳九�ｮ蠖｢蠑上〒JSON蜃ｺ蜉帙＠縺ｦ縺上□縺輔＞�ｼ�
-{{
-    "title": "菴懷刀繧ｿ繧､繝医Ν",
-    "concept": "菴懷刀繧ｳ繝ｳ繧ｻ繝励ヨ�ｼ�200譁�蟄嶺ｻ･蜀��ｼ�",
-    "themes": ["繝�繝ｼ繝�1", "繝�繝ｼ繝�2", ...],
-    "suggested_duration": "謗ｨ螂ｨ邱乗凾髢難ｼ亥���ｼ�",
-    "key_scenes": ["驥崎ｦ√↑繧ｷ繝ｼ繝ｳ1", "驥崎ｦ√↑繧ｷ繝ｼ繝ｳ2", ...]
-}}"""
+    def generate_concept(self, contents: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """繧ｳ繝ｳ繝�繝ｳ繝�縺九ｉ繧ｿ繧､繝医Ν縺ｨ繧ｳ繝ｳ繧ｻ繝励ヨ繧堤函謌�"""
+        summaries = self._content_summaries(contents)
+        prompt = self._build_concept_prompt('\n'.join(summaries))
+        if self.prompt_builder is not None and not self.prompt_builder.fits(prompt):
+            # トークン予算を超える場合は、コンテンツ概要をチャンクごとに要約（map）し、
+            # 要約を結合したものからコンセプトを生成する（reduce）
+            prompt = self._build_concept_prompt(self._digest_summaries(summaries))
 
         # 繝励Ο繝ｳ繝励ヨ繧偵Ο繧ｰ繝輔ぃ繧､繝ｫ縺ｫ菫晏ｭ�
         log_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'logs')
@@ -49,26 +55,128 @@ class ScenarioWriter:
                 "key_scenes": []
             }
 
-    def _format_contents_summary(self, contents: List[Dict[str, Any]]) -> str:
+    def _build_concept_prompt(self, content_summary: str) -> str:
+        """
+        コンセプト生成のプロンプトを作成
+
+        Args:
+            content_summary: コンテンツ概要
+
+        Returns:
+            プロンプト
+        """
+        return f"""莉･荳九�ｮ譏蜒上さ繝ｳ繝�繝ｳ繝�縺九ｉ縲∽ｽ懷刀縺ｮ繧ｿ繧､繝医Ν縺ｨ繧ｳ繝ｳ繧ｻ繝励ヨ繧堤函謌舌＠縺ｦ縺上□縺輔＞�ｼ�
+
+繧ｳ繝ｳ繝�繝ｳ繝�讎りｦ�:
+{content_summary}
+
+莉･荳九�ｮ蠖｢蠑上〒JSON蜃ｺ蜉帙＠縺ｦ縺上□縺輔＞�ｼ�
+{{
+    "title": "菴懷刀繧ｿ繧､繝医Ν",
+    "concept": "菴懷刀繧ｳ繝ｳ繧ｻ繝励ヨ�ｼ�200譁�蟄嶺ｻ･蜀��ｼ�",
+    "themes": ["繝�繝ｼ繝�1", "繝�繝ｼ繝�2", ...],
+    "suggested_duration": "謗ｨ螂ｨ邱乗凾髢難ｼ亥���ｼ�",
+    "key_scenes": ["驥崎ｦ√↑繧ｷ繝ｼ繝ｳ1", "驥崎ｦ√↑繧ｷ繝ｼ繝ｳ2", ...]
+}}"""
+
+    def _digest_summaries(self, summaries: List[str]) -> str:
+        """
+        コンテンツ概要をトークン予算内のチャンクに分け、チャンクごとに並行して要約する
+
+        要約を結合してもプロンプトが予算を超える場合は、要約に対して同じ処理を繰り返す。
+        すべてのチャンクの要約に失敗した場合は、その回の要約前の概要を使う。
+
+        Args:
+            summaries: コンテンツごとの概要
+
+        Returns:
+            要約を結合したコンテンツ概要
+        """
+        overhead = estimate_tokens(self._build_digest_prompt(''))
+
+        def map_chunk(chunk: List[str]) -> str:
+            result = json.loads(self.api_client.text_analysis(self._build_digest_prompt('\n'.join(chunk))))
+            # API呼び出しに失敗した場合は"{}"が返されるため、失敗したチャンクとして扱う
+            if 'summary' not in result:
+                raise ValueError("応答にsummaryが含まれていません")
+            return f"""
+要約（{len(chunk)}件分）: {result['summary']}
+主なテーマ: {', '.join(result.get('themes', []))}
+"""
+
+        blocks = summaries
+        for _ in range(self.MAX_DIGEST_ROUNDS):
+            chunks = self.prompt_builder.pack(blocks, overhead)
+            print(f"コンテンツ概要を要約中: {len(blocks)}件 / {len(chunks)}チャンク")
+            try:
+                blocks = self.prompt_builder.map_reduce(chunks, map_chunk, list)
+            except MapReduceError as e:
+                print(f"警告: コンテンツ概要を要約できなかったため、要約前の概要を使います: {str(e)}")
+                break
+            if len(chunks) == 1 or self.prompt_builder.fits(self._build_concept_prompt('\n'.join(blocks))):
+                break
+        return '\n'.join(blocks)
+
+    @staticmethod
+    def _build_digest_prompt(content_summary: str) -> str:
+        """
+        コンテンツ概要を要約するmapステップのプロンプトを作成
+
+        Args:
+            content_summary: チャンクに含まれるコンテンツ概要
+
+        Returns:
+            プロンプト
+        """
+        return f"""以下の映像コンテンツの概要を、作品のコンセプトを考えるための材料として要約してください。
+
+コンテンツ概要:
+{content_summary}
+
+以下の形式でJSON出力してください:
+{{
+    "summary": "コンテンツ群の要約（300文字以内）",
+    "themes": ["テーマ1", "テーマ2", ...]
+}}"""
+
+    def _format_contents_summary(self, contents: Iterable[Dict[str, Any]]) -> str:
         """繧ｳ繝ｳ繝�繝ｳ繝�縺ｮ讎りｦ√ｒ繝輔か繝ｼ繝槭ャ繝�"""
+        return '\n'.join(self._content_summaries(contents))
+
+    def _content_summaries(self, contents: Iterable[Dict[str, Any]]) -> List[str]:
+        """
+        コンテンツごとの概要をフォーマット
+
+        Args:
+            contents: コンテンツ情報
+
+        Returns:
+            コンテンツごとの概要のリスト
+        """
         summary = []
         for content in contents:
-            # 繧ｷ繝ｼ繝ｳ繝ｪ繧ｹ繝医′蟄伜惠縺吶ｋ縺狗｢ｺ隱阪＠縲∫ｩｺ縺ｮ蝣ｴ蜷医�ｯ螳牙�ｨ縺ｫ蜃ｦ逅�
-            scenes = content.get('scenes', [])
+            if isinstance(content, Content):
+                # 遅延読み込みのコンテンツはシーンを読み込まずにヘッダーの情報だけを使う
+                scene_count, topics = content.scene_count, content.topics
+            else:
+                # 繧ｷ繝ｼ繝ｳ繝ｪ繧ｹ繝医′蟄伜惠縺吶ｋ縺狗｢ｺ隱阪＠縲∫ｩｺ縺ｮ蝣ｴ蜷医�ｯ螳牙�ｨ縺ｫ蜃ｦ逅�
+                scenes = content.get('scenes', [])
             
-            # 繝医ヴ繝�繧ｯ縺ｮ蜿門ｾ励ｒ螳牙�ｨ縺ｫ陦後≧
-            topics = []
-            if scenes and len(scenes) > 0:
-                topics = scenes[0].get('topics', [])
+                # 繝医ヴ繝�繧ｯ縺ｮ蜿門ｾ励ｒ螳牙�ｨ縺ｫ陦後≧
+                topics = []
+                if scenes and len(scenes) > 0:
+                    topics = scenes[0].get('topics', [])
             
+                scene_count = len(scenes)
+
             content_summary = f"""
 繧ｳ繝ｳ繝�繝ｳ繝ИD: {content.get('content_id', 'unknown')}
 邱丞�咲函譎る俣: {content.get('total_duration', 0)}遘�
-繧ｷ繝ｼ繝ｳ謨ｰ: {len(scenes)}
+繧ｷ繝ｼ繝ｳ謨ｰ: {scene_count}
 荳ｻ縺ｪ繝医ヴ繝�繧ｯ: {', '.join(topics)}
 """
             summary.append(content_summary)
-        return '\n'.join(summary)
+        return summary
 
     def save_concept(self, concept: Dict[str, Any], output_path: str) -> None:
         """逕滓�舌＆繧後◆繧ｳ繝ｳ繧ｻ繝励ヨ繧剃ｿ晏ｭ�"""
@@ -0,0 +1,444 @@
+"""シーンカタログモジュール"""
+
+import json
+import sqlite3
+from typing import Dict, Any, Iterable, List, Optional, Sequence
+
+
+class SceneCatalog:
+    """
+    ContentCrawlerの出力をSQLiteに格納し、キーワード・時間範囲・タグで検索するカタログ
+
+    クリップ（metadata/summary）、シーン、トランスクリプトの区間、コンテキスト分析のタグを
+    テーブルに分けて保持し、トランスクリプトにはFTS5の全文検索インデックスを張る。
+    日本語を部分一致で検索できるよう、利用可能な場合はtrigramトークナイザーを使う。
+    """
+
+    SCHEMA_VERSION = 1
+
+    # 検索語がこの文字数未満の場合はtrigramで検索できないためLIKEで検索する
+    MIN_FTS_TERM_LENGTH = 3
+
+    # IN句に渡すパラメータ数の上限
+    _CHUNK_SIZE = 500
+
+    def __init__(self, db_path: str = ':memory:'):
+        """
+        コンストラクタ
+
+        Args:
+            db_path: SQLiteデータベースのパス（':memory:'の場合はメモリ上に作成）
+        """
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA foreign_keys = ON')
+        self.fts_tokenizer: Optional[str] = None
+        self._create_schema()
+
+    @property
+    def has_fts(self) -> bool:
+        """FTS5の全文検索インデックスが使えるかどうか"""
+        return self.fts_tokenizer is not None
+
+    def load(self, contents: Iterable[Dict[str, Any]], replace: bool = True) -> int:
+        """
+        コンテンツをまとめて登録（同じcontent_idのクリップは置き換える）
+
+        Args:
+            contents: ContentCrawlerが返すコンテンツ情報
+            replace: 今回含まれなかったクリップを削除するかどうか
+
+        Returns:
+            登録したクリップ数
+        """
+        content_ids = []
+        with self.conn:
+            for content in contents:
+                self._insert_content(content)
+                content_ids.append(content['content_id'])
+            if replace:
+                rows = self.conn.execute('SELECT content_id FROM clips').fetchall()
+                for content_id in {row['content_id'] for row in rows} - set(content_ids):
+                    self._delete_clip(content_id)
+        return len(content_ids)
+
+    def add_content(self, content: Dict[str, Any]) -> None:
+        """
+        コンテンツを1件登録（同じcontent_idのクリップは置き換える）
+
+        Args:
+            content: ContentCrawlerが返すコンテンツ情報
+        """
+        with self.conn:
+            self._insert_content(content)
+
+    def remove_content(self, content_id: str) -> None:
+        """
+        コンテンツを削除
+
+        Args:
+            content_id: 削除するコンテンツID
+        """
+        with self.conn:
+            self._delete_clip(content_id)
+
+    def get_clips(self) -> List[Dict[str, Any]]:
+        """
+        登録されているクリップの一覧を取得
+
+        Returns:
+            クリップ情報のリスト（content_id順）
+        """
+        rows = self.conn.execute('''
+            SELECT c.*, COUNT(s.scene_id) AS scene_count
+            FROM clips c LEFT JOIN scenes s ON s.clip_id = c.clip_id
+            GROUP BY c.clip_id ORDER BY c.content_id
+        ''').fetchall()
+        clips = []
+        for row in rows:
+            clip = dict(row)
+            del clip['clip_id']
+            clip['topics'] = json.loads(clip['topics'])
+            clips.append(clip)
+        return clips
+
+    def search_transcripts(self, query: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        トランスクリプトを全文検索
+
+        空白で区切った語はすべてを含む区間だけに絞り込む。
+
+        Args:
+            query: 検索語
+            limit: 最大件数
+
+        Returns:
+            一致したトランスクリプトの区間のリスト（content_id、scene_index、区間の時刻、テキスト）
+        """
+        terms = query.split()
+        if not terms:
+            return []
+
+        select = '''
+            SELECT c.content_id, s.scene_index, g.start_time, g.end_time, g.text
+            FROM segments g
+            JOIN scenes s ON s.scene_id = g.scene_id
+            JOIN clips c ON c.clip_id = s.clip_id
+        '''
+        if self.has_fts and (self.fts_tokenizer != 'trigram'
+                             or min(len(t) for t in terms) >= self.MIN_FTS_TERM_LENGTH):
+            match = ' '.join('"' + t.replace('"', '""') + '"' for t in terms)
+            rows = self.conn.execute(select + '''
+                JOIN segments_fts f ON f.rowid = g.segment_id
+                WHERE segments_fts MATCH ? ORDER BY f.rank LIMIT ?
+            ''', (match, limit)).fetchall()
+        else:
+            where = ' AND '.join("g.text LIKE ? ESCAPE '\\'" for _ in terms)
+            params = [f"%{self._escape_like(t)}%" for t in terms]
+            rows = self.conn.execute(select + f'''
+                WHERE {where} ORDER BY c.content_id, g.start_time LIMIT ?
+            ''', params + [limit]).fetchall()
+        return [dict(row) for row in rows]
+
+    def find_scenes(self, content_id: Optional[str] = None, tag: Optional[str] = None,
+                    category: Optional[str] = None, topic: Optional[str] = None,
+                    start_time: Optional[float] = None, end_time: Optional[float] = None,
+                    min_duration: Optional[float] = None,
+                    limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        条件に一致するシーンを検索
+
+        Args:
+            content_id: クリップのコンテンツID
+            tag: コンテキスト分析のタグ
+            category: タグのカテゴリ（activity、environmentなど）。tagを省略した場合はカテゴリの有無で絞り込む
+            topic: クリップのトピック
+            start_time: この時刻（秒）以降に終わるシーンに絞り込む
+            end_time: この時刻（秒）より前に始まるシーンに絞り込む
+            min_duration: シーンの最小の長さ（秒）
+            limit: 最大件数
+
+        Returns:
+            シーン情報のリスト（content_id、scene_index順）。keywordsとtagsを含む
+        """
+        conditions, params = [], []
+        if content_id is not None:
+            conditions.append('c.content_id = ?')
+            params.append(content_id)
+        if tag is not None or category is not None:
+            tag_conditions = ['t.scene_id = s.scene_id']
+            if tag is not None:
+                tag_conditions.append('t.tag = ?')
+                params.append(tag)
+            if category is not None:
+                tag_conditions.append('t.category = ?')
+                params.append(category)
+            conditions.append(f"EXISTS (SELECT 1 FROM tags t WHERE {' AND '.join(tag_conditions)})")
+        if topic is not None:
+            conditions.append('EXISTS (SELECT 1 FROM clip_topics p WHERE p.clip_id = c.clip_id AND p.topic = ?)')
+            params.append(topic)
+        if start_time is not None:
+            conditions.append('s.end_time > ?')
+            params.append(start_time)
+        if end_time is not None:
+            conditions.append('s.start_time < ?')
+            params.append(end_time)
+        if min_duration is not None:
+            conditions.append('s.duration >= ?')
+            params.append(min_duration)
+
+        sql = '''
+            SELECT s.scene_id, c.content_id, s.scene_index, s.start_time, s.end_time,
+                   s.duration, s.transcript, s.description, c.topics
+            FROM scenes s JOIN clips c ON c.clip_id = s.clip_id
+        '''
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY c.content_id, s.scene_index'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+
+        rows = self.conn.execute(sql, params).fetchall()
+        tags = self._fetch_tags([row['scene_id'] for row in rows])
+        scenes = []
+        for row in rows:
+            scene = dict(row)
+            scene_tags = tags.get(scene.pop('scene_id'), {})
+            scene['topics'] = json.loads(scene['topics'])
+            scene['keywords'] = scene_tags.get('activity', [])
+            scene['tags'] = scene_tags
+            scenes.append(scene)
+        return scenes
+
+    def get_tags(self, category: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        タグの一覧を出現シーン数の多い順に取得
+
+        Args:
+            category: 絞り込むカテゴリ（Noneの場合はすべて）
+
+        Returns:
+            category、tag、scene_countを含む辞書のリスト
+        """
+        sql = 'SELECT category, tag, COUNT(DISTINCT scene_id) AS scene_count FROM tags'
+        params = []
+        if category is not None:
+            sql += ' WHERE category = ?'
+            params.append(category)
+        sql += ' GROUP BY category, tag ORDER BY scene_count DESC, category, tag'
+        return [dict(row) for row in self.conn.execute(sql, params).fetchall()]
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        カタログの統計情報を取得
+
+        Returns:
+            クリップ数・シーン数・区間数・タグ数・合計時間を含む統計情報
+        """
+        row = self.conn.execute('''
+            SELECT (SELECT COUNT(*) FROM clips) AS content_count,
+                   (SELECT COUNT(*) FROM scenes) AS scene_count,
+                   (SELECT COUNT(*) FROM segments) AS segment_count,
+                   (SELECT COUNT(*) FROM tags) AS tag_count,
+                   (SELECT COALESCE(SUM(duration), 0) FROM clips) AS total_duration
+        ''').fetchone()
+        return dict(row)
+
+    def close(self) -> None:
+        """データベースを閉じる"""
+        self.conn.close()
+
+    def __enter__(self) -> 'SceneCatalog':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def _create_schema(self) -> None:
+        """テーブルとインデックスを作成（スキーマのバージョンが異なる場合は作り直す）"""
+        version = self.conn.execute('PRAGMA user_version').fetchone()[0]
+        with self.conn:
+            if version not in (0, self.SCHEMA_VERSION):
+                for table in ('segments_fts', 'tags', 'segments', 'scenes', 'clip_topics', 'clips'):
+                    self.conn.execute(f'DROP TABLE IF EXISTS {table}')
+
+            self.conn.executescript('''
+                CREATE TABLE IF NOT EXISTS clips (
+                    clip_id INTEGER PRIMARY KEY,
+                    content_id TEXT NOT NULL UNIQUE,
+                    filename TEXT,
+                    title TEXT,
+                    overview TEXT,
+                    filming_date TEXT,
+                    location TEXT,
+                    created_at TEXT,
+                    duration REAL NOT NULL DEFAULT 0,
+                    topics TEXT NOT NULL DEFAULT '[]'
+                );
+                CREATE TABLE IF NOT EXISTS clip_topics (
+                    clip_id INTEGER NOT NULL REFERENCES clips(clip_id) ON DELETE CASCADE,
+                    topic TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_clip_topics_topic ON clip_topics(topic);
+                CREATE TABLE IF NOT EXISTS scenes (
+                    scene_id INTEGER PRIMARY KEY,
+                    clip_id INTEGER NOT NULL REFERENCES clips(clip_id) ON DELETE CASCADE,
+                    scene_index INTEGER NOT NULL,
+                    start_time REAL NOT NULL,
+                    end_time REAL NOT NULL,
+                    duration REAL NOT NULL,
+                    transcript TEXT NOT NULL DEFAULT '',
+                    description TEXT NOT NULL DEFAULT ''
+                );
+                CREATE INDEX IF NOT EXISTS idx_scenes_clip_time ON scenes(clip_id, start_time);
+                CREATE TABLE IF NOT EXISTS segments (
+                    segment_id INTEGER PRIMARY KEY,
+                    scene_id INTEGER NOT NULL REFERENCES scenes(scene_id) ON DELETE CASCADE,
+                    start_time REAL NOT NULL,
+                    end_time REAL NOT NULL,
+                    text TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_segments_scene ON segments(scene_id);
+                CREATE TABLE IF NOT EXISTS tags (
+                    scene_id INTEGER NOT NULL REFERENCES scenes(scene_id) ON DELETE CASCADE,
+                    category TEXT NOT NULL,
+                    tag TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_tags_tag ON tags(tag, category);
+                CREATE INDEX IF NOT EXISTS idx_tags_category ON tags(category, tag);
+                CREATE INDEX IF NOT EXISTS idx_tags_scene ON tags(scene_id);
+            ''')
+            self.conn.execute(f'PRAGMA user_version = {self.SCHEMA_VERSION}')
+
+        self.fts_tokenizer = self._create_fts()
+
+    def _create_fts(self) -> Optional[str]:
+        """
+        トランスクリプトの全文検索インデックスを作成
+
+        Returns:
+            使用したトークナイザー名（FTS5が使えない場合はNone）
+        """
+        row = self.conn.execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'segments_fts'").fetchone()
+        if row is not None:
+            return 'trigram' if 'trigram' in row['sql'] else 'unicode61'
+
+        for tokenizer in ('trigram', 'unicode61'):
+            try:
+                with self.conn:
+                    self.conn.execute(
+                        f"CREATE VIRTUAL TABLE segments_fts USING fts5(text, tokenize='{tokenizer}')")
+                    self.conn.execute(
+                        'INSERT INTO segments_fts(rowid, text) SELECT segment_id, text FROM segments')
+                return tokenizer
+            except sqlite3.OperationalError:
+                continue
+        print("警告: SQLiteのFTS5が利用できないため、トランスクリプトの検索にLIKEを使用します")
+        return None
+
+    def _insert_content(self, content: Dict[str, Any]) -> None:
+        """
+        コンテンツ1件分の行を挿入（トランザクションは呼び出し側で管理する）
+
+        ContentCrawler(detailed=True)の出力であればclip・segments・tagsを使い、
+        そうでない場合はシーンのトランスクリプトとキーワードから補う。
+
+        Args:
+            content: コンテンツ情報
+        """
+        content_id = content['content_id']
+        self._delete_clip(content_id)
+
+        scenes = content.get('scenes', [])
+        clip = content.get('clip') or {}
+        topics = clip.get('topics')
+        if topics is None:
+            topics = list(scenes[0].get('topics', [])) if len(scenes) else []
+
+        cursor = self.conn.execute('''
+            INSERT INTO clips (content_id, filename, title, overview, filming_date,
+                               location, created_at, duration, topics)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (content_id, clip.get('filename'), clip.get('title'), clip.get('overview'),
+              clip.get('filming_date'), clip.get('location'), clip.get('created_at'),
+              float(content.get('total_duration', clip.get('duration', 0)) or 0),
+              json.dumps(topics, ensure_ascii=False)))
+        clip_id = cursor.lastrowid
+        self.conn.executemany('INSERT INTO clip_topics (clip_id, topic) VALUES (?, ?)',
+                              [(clip_id, topic) for topic in topics])
+
+        for scene_index, scene in enumerate(scenes):
+            start, end = float(scene['start_time']), float(scene['end_time'])
+            transcript = scene.get('transcript', '')
+            cursor = self.conn.execute('''
+                INSERT INTO scenes (clip_id, scene_index, start_time, end_time, duration,
+                                    transcript, description)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (clip_id, scene_index, start, end, end - start, transcript,
+                  scene.get('description', '')))
+            scene_id = cursor.lastrowid
+
+            segments = scene.get('segments')
+            if segments is None:
+                segments = [{'start_time': start, 'end_time': end, 'text': transcript}] if transcript else []
+            for segment in segments:
+                cursor = self.conn.execute(
+                    'INSERT INTO segments (scene_id, start_time, end_time, text) VALUES (?, ?, ?, ?)',
+                    (scene_id, float(segment['start_time']), float(segment['end_time']), segment['text']))
+                if self.has_fts:
+                    self.conn.execute('INSERT INTO segments_fts (rowid, text) VALUES (?, ?)',
+                                      (cursor.lastrowid, segment['text']))
+
+            tags = scene.get('tags')
+            if tags is None:
+                tags = {'activity': list(scene.get('keywords', []))}
+            self.conn.executemany(
+                'INSERT INTO tags (scene_id, category, tag) VALUES (?, ?, ?)',
+                [(scene_id, category, tag) for category, values in tags.items() for tag in values])
+
+    def _delete_clip(self, content_id: str) -> None:
+        """
+        クリップと関連する行を削除（トランザクションは呼び出し側で管理する）
+
+        Args:
+            content_id: 削除するコンテンツID
+        """
+        row = self.conn.execute('SELECT clip_id FROM clips WHERE content_id = ?', (content_id,)).fetchone()
+        if row is None:
+            return
+        if self.has_fts:
+            self.conn.execute('''
+                DELETE FROM segments_fts WHERE rowid IN (
+                    SELECT g.segment_id FROM segments g JOIN scenes s ON s.scene_id = g.scene_id
+                    WHERE s.clip_id = ?)
+            ''', (row['clip_id'],))
+        self.conn.execute('DELETE FROM clips WHERE clip_id = ?', (row['clip_id'],))
+
+    def _fetch_tags(self, scene_ids: Sequence[int]) -> Dict[int, Dict[str, List[str]]]:
+        """
+        シーンごとのタグをまとめて取得
+
+        Args:
+            scene_ids: シーンIDのリスト
+
+        Returns:
+            シーンIDをキー、カテゴリごとのタグのリストを値とする辞書
+        """
+        tags: Dict[int, Dict[str, List[str]]] = {}
+        for i in range(0, len(scene_ids), self._CHUNK_SIZE):
+            chunk = scene_ids[i:i + self._CHUNK_SIZE]
+            placeholders = ', '.join('?' for _ in chunk)
+            rows = self.conn.execute(
+                f'SELECT scene_id, category, tag FROM tags WHERE scene_id IN ({placeholders}) ORDER BY rowid',
+                list(chunk)).fetchall()
+            for row in rows:
+                tags.setdefault(row['scene_id'], {}).setdefault(row['category'], []).append(row['tag'])
+        return tags
+
+    @staticmethod
+    def _escape_like(term: str) -> str:
+        """LIKEのワイルドカード文字をエスケープ"""
+        return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
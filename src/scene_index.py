@@ -0,0 +1,134 @@
+"""選択シーンの解決モジュール"""
+
+from typing import Dict, Any, Iterable, List, Optional, Sequence, Tuple
+
+
+class SceneIndex:
+    """
+    LLMが選択したシーン（content_idとscene_index）を元のシーン情報に解決するクラス
+
+    content_id → コンテンツの辞書を1回だけ作成し、(content_id, scene_index) → シーンの
+    範囲はコンテンツごとに初回参照時に作成する。選択シーンの数やライブラリの規模によらず
+    1件あたり定数時間で解決でき、遅延読み込みのコンテンツは選ばれたものだけが読み込まれる。
+    """
+
+    def __init__(self, contents: Iterable[Dict[str, Any]]):
+        """
+        コンストラクタ
+
+        Args:
+            contents: コンテンツ情報
+        """
+        self._contents: Dict[str, Dict[str, Any]] = {}
+        for content in contents:
+            # 同じIDのコンテンツが複数ある場合は、従来の線形探索と同じく先のものを使う
+            self._contents.setdefault(content['content_id'], content)
+        self._bounds: Dict[Tuple[str, int], Tuple[float, float]] = {}
+        self._indexed = set()
+
+    def __len__(self) -> int:
+        return len(self._contents)
+
+    def get_content(self, content_id: str) -> Optional[Dict[str, Any]]:
+        """
+        コンテンツを取得
+
+        Args:
+            content_id: コンテンツID
+
+        Returns:
+            コンテンツ情報（存在しない場合はNone）
+        """
+        return self._contents.get(content_id)
+
+    def bounds(self, content_id: str, scene_index: Any) -> Optional[Tuple[float, float]]:
+        """
+        シーンの開始・終了時間を取得
+
+        Args:
+            content_id: コンテンツID
+            scene_index: コンテンツ内のシーン番号
+
+        Returns:
+            (開始時間, 終了時間)（シーンが存在しない場合はNone）
+        """
+        if content_id not in self._indexed:
+            content = self._contents.get(content_id)
+            if content is None:
+                return None
+            for i, scene in enumerate(content.get('scenes', [])):
+                start = float(scene.get('start_time', 0) or 0)
+                self._bounds[(content_id, i)] = (start, max(start, float(scene.get('end_time', 0) or 0)))
+            self._indexed.add(content_id)
+        if not isinstance(scene_index, int) or isinstance(scene_index, bool):
+            return None
+        return self._bounds.get((content_id, scene_index))
+
+    def resolve(self, scene_infos: Sequence[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        LLMの選択結果をまとめてシーン情報に解決する
+
+        存在しないcontent_idやscene_indexの選択は除外して統計のhallucinatedに記録する。
+        start_time・end_timeはシーンの範囲に収め、範囲が空になる場合や数値でない場合は
+        シーン全体を使う。複数のスレッドから同時に呼び出せる。
+
+        Args:
+            scene_infos: LLMが返したselected_scenesの各要素
+
+        Returns:
+            選択シーンのリスト（選択順）と、resolved（解決した件数）、clamped（時間を
+            範囲に収めた件数）、hallucinated（除外した選択のリスト）を含む統計のタプル
+        """
+        selected_scenes = []
+        hallucinated = []
+        clamped = 0
+        for scene_info in scene_infos:
+            content_id = scene_info.get("content_id")
+            scene_index = scene_info.get("scene_index")
+            bounds = self.bounds(content_id, scene_index) if isinstance(content_id, str) else None
+            if bounds is None:
+                hallucinated.append({'content_id': content_id, 'scene_index': scene_index})
+                continue
+
+            start_time, end_time = self._clamp(scene_info.get("start_time"), scene_info.get("end_time"), bounds)
+            if (start_time, end_time) != (scene_info.get("start_time", start_time),
+                                          scene_info.get("end_time", end_time)):
+                clamped += 1
+            scene = self._contents[content_id]["scenes"][scene_index]
+            selected_scenes.append({
+                "content_id": content_id,
+                "scene_index": scene_index,
+                "start_time": start_time,
+                "end_time": end_time,
+                "reason": scene_info.get("reason", ""),
+                "section_id": scene_info.get("section_id", ""),
+                "transcript": scene.get("transcript", ""),
+                "topics": scene.get("topics", []),
+                "effects": scene.get("effects", [])
+            })
+
+        return selected_scenes, {'resolved': len(selected_scenes), 'clamped': clamped,
+                                 'hallucinated': hallucinated}
+
+    @staticmethod
+    def _clamp(start_time: Any, end_time: Any, bounds: Tuple[float, float]) -> Tuple[float, float]:
+        """
+        開始・終了時間をシーンの範囲に収める
+
+        Args:
+            start_time: LLMが指定した開始時間（未指定の場合はNone）
+            end_time: LLMが指定した終了時間（未指定の場合はNone）
+            bounds: シーンの(開始時間, 終了時間)
+
+        Returns:
+            範囲に収めた(開始時間, 終了時間)
+        """
+        scene_start, scene_end = bounds
+        try:
+            start = scene_start if start_time is None else min(max(float(start_time), scene_start), scene_end)
+            end = scene_end if end_time is None else min(max(float(end_time), scene_start), scene_end)
+        except (TypeError, ValueError):
+            return bounds
+        if start >= end:
+            return bounds
+        return start, end
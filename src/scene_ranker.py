@@ -0,0 +1,180 @@
+"""シーンの事前ランキングモジュール"""
+
+import math
+import re
+from collections import Counter
+from typing import Dict, Any, Iterable, List, Tuple
+
+from .scenario_diff import section_key
+
+# 英数字の単語と、それ以外（日本語など）の連続した文字列に分割する
+_TOKEN_PATTERN = re.compile(r'[0-9A-Za-z]+|[^\s0-9A-Za-z!-/:-@\[-`{-~、。，．・「」『』（）【】！？：；…〜]+')
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    テキストを検索用のトークンに分割
+
+    日本語は形態素解析を使わず、連続した文字列を文字bigram（1文字の場合はunigram）に分割する。
+    英数字は小文字化した単語をそのまま使う。
+
+    Args:
+        text: 分割するテキスト
+
+    Returns:
+        トークンのリスト
+    """
+    tokens = []
+    for match in _TOKEN_PATTERN.finditer(text or ''):
+        word = match.group()
+        if word.isascii():
+            tokens.append(word.lower())
+        elif len(word) == 1:
+            tokens.append(word)
+        else:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+class SceneRanker:
+    """
+    シナリオのセクションに関連するシーンをBM25で事前に絞り込むクラス
+
+    シーンのトランスクリプト・キーワード・トピックを文書とし、セクションの
+    title、description、key_messagesを検索語としてスコアを計算する。
+    LLMに渡す候補をセクションごとに上位k件に抑えることで、プロンプトの大きさが
+    ライブラリ全体の規模に比例しないようにする。
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """
+        コンストラクタ
+
+        Args:
+            k1: BM25の単語頻度の飽和パラメータ
+            b: BM25の文書長による正規化の強さ
+        """
+        self.k1 = k1
+        self.b = b
+        self.refs: List[Tuple[str, int]] = []
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        self._lengths: List[int] = []
+        self._avg_length = 0.0
+
+    def fit(self, contents: Iterable[Dict[str, Any]]) -> 'SceneRanker':
+        """
+        コンテンツのシーンから転置インデックスを作成
+
+        Args:
+            contents: コンテンツ情報
+
+        Returns:
+            自身
+        """
+        self.refs = []
+        self._postings = {}
+        self._lengths = []
+        for content in contents:
+            for scene_index, scene in enumerate(content.get('scenes', [])):
+                doc_id = len(self.refs)
+                self.refs.append((content['content_id'], scene_index))
+                terms = self._scene_terms(scene)
+                self._lengths.append(len(terms))
+                for term, tf in Counter(terms).items():
+                    self._postings.setdefault(term, []).append((doc_id, tf))
+        self._avg_length = sum(self._lengths) / len(self._lengths) if self._lengths else 0.0
+        return self
+
+    def score(self, query: str) -> Dict[int, float]:
+        """
+        検索語に対する各シーンのBM25スコアを計算
+
+        Args:
+            query: 検索語
+
+        Returns:
+            シーン番号（refsの添字）をキー、スコアを値とする辞書（スコアが0のシーンは含まない）
+        """
+        scores: Dict[int, float] = {}
+        doc_count = len(self.refs)
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            df = len(postings)
+            idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+            for doc_id, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / (self._avg_length or 1))
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    def rank(self, query: str, top_k: int) -> List[Dict[str, Any]]:
+        """
+        検索語に関連するシーンを上位top_k件まで取得
+
+        関連するシーンがtop_k件に満たない場合は、ライブラリ全体から等間隔に選んだシーンで補う。
+
+        Args:
+            query: 検索語
+            top_k: 取得する件数
+
+        Returns:
+            content_id、scene_index、scoreを含む辞書のリスト（スコアの高い順）
+        """
+        scores = self.score(query)
+        ranked = sorted(scores, key=lambda doc_id: (-scores[doc_id], doc_id))[:top_k]
+
+        shortage = min(top_k, len(self.refs)) - len(ranked)
+        if shortage > 0:
+            chosen = set(ranked)
+            rest = [doc_id for doc_id in range(len(self.refs)) if doc_id not in chosen]
+            step = len(rest) / shortage
+            ranked.extend(rest[int(i * step)] for i in range(shortage))
+
+        return [{'content_id': self.refs[doc_id][0], 'scene_index': self.refs[doc_id][1],
+                 'score': scores.get(doc_id, 0.0)} for doc_id in ranked]
+
+    def rank_sections(self, scenario: Dict[str, Any], top_k: int) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        シナリオの各セクションについて候補シーンを取得
+
+        Args:
+            scenario: シナリオ
+            top_k: セクションごとの候補数
+
+        Returns:
+            section_idをキー、候補シーンのリストを値とする辞書
+        """
+        return {section_key(section, i): self.rank(self.section_query(section), top_k)
+                for i, section in enumerate(scenario.get('sections', []))}
+
+    @staticmethod
+    def section_query(section: Dict[str, Any]) -> str:
+        """
+        セクションから検索語を作成
+
+        Args:
+            section: シナリオのセクション
+
+        Returns:
+            title、description、key_messagesを連結した検索語
+        """
+        parts = [section.get('title', ''), section.get('description', '')]
+        parts.extend(section.get('key_messages', []))
+        return ' '.join(p for p in parts if p)
+
+    @staticmethod
+    def _scene_terms(scene: Dict[str, Any]) -> List[str]:
+        """
+        シーンの検索対象の語を取得
+
+        Args:
+            scene: シーン情報
+
+        Returns:
+            トークンのリスト
+        """
+        terms = tokenize(scene.get('transcript', ''))
+        for label in list(scene.get('keywords', [])) + list(scene.get('topics', [])):
+            terms.extend(tokenize(label))
+        return terms
@@ -1,36 +1,429 @@
 """繧ｷ繝ｼ繝ｳ驕ｸ謚槭Δ繧ｸ繝･繝ｼ繝ｫ"""
 
-from typing import List, Dict, Any
+from typing import TYPE_CHECKING, List, Dict, Any, Iterable, Iterator, Optional, Union
 import json
 import time
+from concurrent.futures import ThreadPoolExecutor
 from .api_client import GeminiClient
+from .json_stream import JSONArrayStream
+from .prompt_builder import MapReduceError, PromptBuilder, estimate_tokens
+from .scenario_diff import diff_scenarios, section_key
+from .scene_index import SceneIndex
+from .scene_ranker import SceneRanker
+from .scene_solver import SceneSolver
+from .selection_cache import SelectionCache
 import os
 
+if TYPE_CHECKING:
+    from .scene_vectors import SceneVectorIndex
+
 class SceneSelector:
-    def __init__(self, api_client: GeminiClient):
-        """繧ｷ繝ｼ繝ｳ驕ｸ謚槫勣縺ｮ蛻晄悄蛹�"""
+    # 候補の絞り込み（map-reduce）を繰り返す最大回数
+    MAX_SHORTLIST_ROUNDS = 3
+    STRATEGIES = ('llm', 'solver')
+    RANKINGS = ('bm25', 'vector')
+
+    def __init__(self, api_client: GeminiClient, candidates_per_section: Optional[int] = None,
+                 per_section: bool = False, section_workers: Optional[int] = None,
+                 prompt_builder: Optional[PromptBuilder] = None, shortlist_per_chunk: int = 20,
+                 strategy: str = 'llm', ranking: str = 'bm25', vector_index_path: Optional[str] = None,
+                 cache: Optional[SelectionCache] = None, bypass_cache: bool = False):
+        """
+        シーン選択器の初期化
+
+        Args:
+            api_client: 生成AIのクライアント
+            candidates_per_section: LLMに渡すセクションごとの候補シーン数
+                （Noneの場合は事前ランキングを行わず全シーンを渡す）
+            per_section: セクションごとに別々のリクエストで並行して選択するかどうか
+            section_workers: per_sectionの場合の同時リクエスト数（Noneの場合はセクション数）
+            prompt_builder: プロンプトのトークン予算（Noneの場合は予算を設けない）。
+                予算を超える場合はシーンをチャンクに分けて候補を絞り込んでから選択する
+            shortlist_per_chunk: 絞り込みでチャンクごとに残す候補シーン数の上限
+            strategy: 選択方法（'llm'は生成AIで選択、'solver'はLLMを使わずにSceneSolverで
+                各セクションの尺を関連度の高いシーンで埋める）
+            ranking: 候補の絞り込みとsolverで使う関連度（'bm25'はキーワードの一致、
+                'vector'はSceneVectorIndexによる文字n-gramベクトルのコサイン類似度）
+            vector_index_path: rankingが'vector'の場合にベクトル行列を保存する.npyのパス
+                （Noneの場合は保存せず毎回作成する）
+            cache: 選択結果のキャッシュ（Noneの場合はキャッシュしない）
+            bypass_cache: キャッシュを読まずに必ず生成AIを呼び出すかどうか（結果は保存する）
+        """
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"未対応の選択方法です: {strategy}（{', '.join(self.STRATEGIES)}のいずれか）")
+        if ranking not in self.RANKINGS:
+            raise ValueError(f"未対応の関連度です: {ranking}（{', '.join(self.RANKINGS)}のいずれか）")
         self.api_client = api_client
         self.max_retries = 3
         self.retry_delay = 1.0  # 遘�
+        self.candidates_per_section = candidates_per_section
+        self.per_section = per_section
+        self.section_workers = section_workers
+        self.prompt_builder = prompt_builder
+        self.shortlist_per_chunk = shortlist_per_chunk
+        self.strategy = strategy
+        self.ranking = ranking
+        self.vector_index_path = vector_index_path
+        self.cache = cache
+        self.bypass_cache = bypass_cache
+        self.model_name = str(getattr(api_client, 'model_name', type(api_client).__name__))
+        self.solver = SceneSolver(candidates_per_section or 200)
 
     def select(self, contents: List[Dict[str, Any]], scenario: Dict[str, Any]) -> List[Dict[str, Any]]:
         """繧ｷ繝翫Μ繧ｪ縺ｫ蝓ｺ縺･縺�縺ｦ繧ｷ繝ｼ繝ｳ繧帝∈謚�"""
         try:
             # 繧ｷ繝ｼ繝ｳ繧帝∈謚�
-            selected_scenes = self._select_scenes_with_ai(contents, scenario)
+            if self.strategy == 'solver':
+                return self.solver.solve(contents, scenario, ranker=self._build_ranker(contents))
+            # キャッシュのキーに使うフィンガープリントは、セクションごとに選択する場合も1回だけ計算する
+            fingerprint = SelectionCache.fingerprint(contents) if self.cache is not None else None
+            if self.per_section:
+                return self._select_per_section(contents, scenario, fingerprint)
+            selected_scenes = self._select_scenes_with_ai(contents, scenario, fingerprint=fingerprint)
             return selected_scenes
         except Exception as e:
             print(f"隴ｦ蜻�: 繧ｷ繝ｼ繝ｳ驕ｸ謚樔ｸｭ縺ｫ繧ｨ繝ｩ繝ｼ縺檎匱逕溘＠縺ｾ縺励◆: {str(e)}")
             return []
 
+    def select_stream(self, contents: List[Dict[str, Any]], scenario: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        シーンを選択し、生成AIの応答を待たずに選択されたシーンから順に返す
+
+        api_clientがtext_analysis_streamを持つ場合はストリーミングで応答を受け取り、
+        selected_scenesの要素が完成するたびに解決して返す。持たない場合や、solverと
+        per_sectionの場合は、まとめて選択した結果を順に返す。
+
+        Args:
+            contents: コンテンツ情報
+            scenario: シナリオ
+
+        Yields:
+            selectと同じ形式の選択シーン
+        """
+        if self.strategy == 'solver' or self.per_section:
+            yield from self.select(contents, scenario)
+            return
+
+        cache_key = self._cache_key(contents, scenario)
+        if cache_key is not None and not self.bypass_cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                print(f"キャッシュからシーン選択の結果を読み込みました: {cache_key}")
+                yield from cached
+                return
+
+        prompt = self._prepare_prompt(contents, scenario)
+        stream = getattr(self.api_client, 'text_analysis_stream', None)
+        chunks = stream(prompt) if callable(stream) else [self.api_client.text_analysis(prompt)]
+
+        index = SceneIndex(contents)
+        parser = JSONArrayStream("selected_scenes")
+        selected_scenes: List[Dict[str, Any]] = []
+        totals: Dict[str, Any] = {'resolved': 0, 'clamped': 0, 'hallucinated': []}
+        for chunk in chunks:
+            for item in parser.feed(chunk):
+                if not isinstance(item, dict):
+                    continue
+                scenes, stats = index.resolve([item])
+                totals['clamped'] += stats['clamped']
+                totals['hallucinated'].extend(stats['hallucinated'])
+                for scene in scenes:
+                    selected_scenes.append(scene)
+                    yield scene
+            if parser.finished:
+                break
+        self._report_resolution(totals)
+        if parser.errors:
+            print(f"警告: 解析できなかった選択が{parser.errors}件ありました")
+
+        if cache_key is not None and selected_scenes and parser.finished:
+            self.cache.put(cache_key, selected_scenes, self.model_name)
+
+    def reselect(self, contents: List[Dict[str, Any]], scenario: Dict[str, Any],
+                 previous: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        前回の選択結果を使い、内容が変わったセクションだけを選択し直す
+
+        前回の選択に使ったシナリオとセクション単位で比較し、変わらないセクションは前回の
+        選択（現在のコンテンツで検証し直したもの）を残す。セクション以外の項目やコンテンツが
+        変わった場合、前回の記録がない場合はすべてを選択し直す。結果はシナリオのセクション順に
+        並べ、前回から残したシーンと同じシーンが新たに選ばれた場合は前回の選択を優先する。
+
+        Args:
+            contents: コンテンツ情報
+            scenario: シナリオ
+            previous: 前回のselection_recordの戻り値（Noneの場合はすべてを選択する）
+
+        Returns:
+            セクション順に並べた選択シーンのリスト
+        """
+        if not previous or previous.get('contents_fingerprint') != SelectionCache.fingerprint(contents):
+            return self.select(contents, scenario)
+        diff = diff_scenarios(previous.get('scenario'), scenario)
+        if diff['global_changed']:
+            return self.select(contents, scenario)
+
+        changed, unchanged = set(diff['changed']), set(diff['unchanged'])
+        print(f"選択し直すセクション: {', '.join(diff['changed']) or 'なし'} / "
+              f"前回の選択を使うセクション: {', '.join(diff['unchanged']) or 'なし'}")
+        kept, stats = SceneIndex(contents).resolve(
+            [scene for scene in previous.get('scenes', []) if scene.get('section_id') in unchanged])
+        self._report_resolution(stats)
+
+        sections = scenario.get('sections', [])
+        fresh = []
+        if changed:
+            # section_idのないセクションは位置で対応付けるため、元のシナリオでの位置を保持する
+            changed_sections = [(i, s) for i, s in enumerate(sections) if section_key(s, i) in changed]
+            fresh = self.select(contents, dict(scenario, sections=[s for _, s in changed_sections]))
+            # 選択し直したシナリオ内の位置によるキーを、元のシナリオでのキーに戻す
+            keys = {section_key(s, j): section_key(s, i) for j, (i, s) in enumerate(changed_sections)}
+            for scene in fresh:
+                if len(changed_sections) == 1:
+                    scene['section_id'] = section_key(changed_sections[0][1], changed_sections[0][0])
+                else:
+                    scene['section_id'] = keys.get(scene.get('section_id'), scene.get('section_id'))
+
+        by_section: Dict[str, List[Dict[str, Any]]] = {}
+        seen = {(scene['content_id'], scene['scene_index']) for scene in kept}
+        for scene in kept:
+            by_section.setdefault(scene['section_id'], []).append(scene)
+        for scene in fresh:
+            key = (scene['content_id'], scene['scene_index'])
+            if scene.get('section_id') in changed and key not in seen:
+                seen.add(key)
+                by_section.setdefault(scene['section_id'], []).append(scene)
+
+        return [scene for i, section in enumerate(sections)
+                for scene in by_section.get(section_key(section, i), [])]
+
+    @staticmethod
+    def selection_record(contents: List[Dict[str, Any]], scenario: Dict[str, Any],
+                         scenes: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        次回のreselectで使うため、選択結果と選択に使った入力をまとめる
+
+        Args:
+            contents: コンテンツ情報
+            scenario: シナリオ
+            scenes: 選択シーンのリスト
+
+        Returns:
+            scenario、contents_fingerprint、scenesを含む辞書（selected.jsonの内容）
+        """
+        return {'scenario': scenario, 'contents_fingerprint': SelectionCache.fingerprint(contents),
+                'scenes': scenes}
+
+    def _select_per_section(self, contents: List[Dict[str, Any]], scenario: Dict[str, Any],
+                            fingerprint: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        セクションごとに1つのリクエストを並行して送り、結果を結合する
+
+        各リクエストのシナリオには対象のセクションだけを含める。失敗したセクションは
+        警告を出して空として扱うため、他のセクションの選択結果は失われない。
+        複数のセクションで同じシーンが選ばれた場合は、先のセクションの選択を残す。
+
+        Args:
+            contents: コンテンツ情報
+            scenario: シナリオ
+            fingerprint: キャッシュのキーに使うコンテンツのフィンガープリント
+
+        Returns:
+            セクション順に並べた選択シーンのリスト
+        """
+        sections = scenario.get('sections', [])
+        if not sections:
+            return self._select_scenes_with_ai(contents, scenario, fingerprint=fingerprint)
+
+        ranker = self._build_ranker(contents) if self.candidates_per_section else None
+        index = SceneIndex(contents)
+
+        def select_section(position: int, section: Dict[str, Any]) -> List[Dict[str, Any]]:
+            section_id = section_key(section, position)
+            section_scenario = dict(scenario, sections=[section])
+            try:
+                selected = self._select_scenes_with_ai(
+                    contents, section_scenario, ranker=ranker,
+                    log_name=f"scene_selection_prompt_{section_id}.txt", index=index,
+                    fingerprint=fingerprint)
+            except Exception as e:
+                print(f"警告: セクション {section_id} のシーン選択中にエラーが発生しました: {str(e)}")
+                return []
+            for scene in selected:
+                scene['section_id'] = section_id
+            return selected
+
+        workers = self.section_workers or len(sections)
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            results = list(pool.map(select_section, range(len(sections)), sections))
+
+        merged, seen = [], set()
+        for selected in results:
+            for scene in selected:
+                key = (scene['content_id'], scene['scene_index'])
+                if key in seen:
+                    continue
+                seen.add(key)
+                merged.append(scene)
+        return merged
+
     def _select_scenes_with_ai(self, contents: List[Dict[str, Any]], 
-                              scenario: Dict[str, Any]) -> List[Dict[str, Any]]:
+                              scenario: Dict[str, Any], ranker: Optional[Union[SceneRanker, 'SceneVectorIndex']] = None,
+                              log_name: str = 'scene_selection_prompt.txt',
+                              index: Optional[SceneIndex] = None,
+                              fingerprint: Optional[str] = None) -> List[Dict[str, Any]]:
         """逕滓�植I繧剃ｽｿ逕ｨ縺励※繧ｷ繝ｼ繝ｳ繧帝∈謚�"""
+        cache_key = self._cache_key(contents, scenario, fingerprint)
+        if cache_key is not None and not self.bypass_cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                print(f"キャッシュからシーン選択の結果を読み込みました: {cache_key}")
+                return cached
+
+        prompt = self._prepare_prompt(contents, scenario, ranker, log_name)
+
+        # 逕滓�植I縺ｫ繝ｪ繧ｯ繧ｨ繧ｹ繝�
+        response = self.api_client.text_analysis(prompt)
+        
+        try:
+            # 繝ｬ繧ｹ繝昴Φ繧ｹ繧偵ヱ繝ｼ繧ｹ
+            result = json.loads(response)
+            
+            # 驕ｸ謚槭＆繧後◆繧ｷ繝ｼ繝ｳ繧貞叙蠕�
+            if index is None:
+                index = SceneIndex(contents)
+            selected_scenes, stats = index.resolve(result.get("selected_scenes", []))
+            self._report_resolution(stats)
+            
+            # 失敗して空になった結果は保存せず、次回は生成AIを呼び出す
+            if cache_key is not None and selected_scenes:
+                self.cache.put(cache_key, selected_scenes, self.model_name)
+            return selected_scenes
+            
+        except Exception as e:
+            print(f"隴ｦ蜻�: 繧ｷ繝ｼ繝ｳ驕ｸ謚樒ｵ先棡縺ｮ蜃ｦ逅�荳ｭ縺ｫ繧ｨ繝ｩ繝ｼ縺檎匱逕溘＠縺ｾ縺励◆: {str(e)}")
+            return []
+
+    def _cache_key(self, contents: List[Dict[str, Any]], scenario: Dict[str, Any],
+                   fingerprint: Optional[str] = None) -> Optional[str]:
+        """
+        選択結果のキャッシュのキーを作成
+
+        Args:
+            contents: コンテンツ情報
+            scenario: シナリオ
+            fingerprint: 計算済みのコンテンツのフィンガープリント
+
+        Returns:
+            キャッシュのキー（キャッシュを使わない場合はNone）
+        """
+        if self.cache is None:
+            return None
+        return self.cache.make_key(scenario, fingerprint or SelectionCache.fingerprint(contents),
+                                   self.model_name, self._cache_settings())
+
+    def _prepare_prompt(self, contents: List[Dict[str, Any]], scenario: Dict[str, Any],
+                        ranker: Optional[Union[SceneRanker, 'SceneVectorIndex']] = None,
+                        log_name: str = 'scene_selection_prompt.txt') -> str:
+        """
+        候補シーンを準備してシーン選択のプロンプトを作成し、ログファイルに保存
+
+        Args:
+            contents: コンテンツ情報
+            scenario: シナリオ
+            ranker: 作成済みのSceneRankerまたはSceneVectorIndex
+            log_name: プロンプトを保存するログファイル名
+
+        Returns:
+            プロンプト
+        """
         # 繧ｳ繝ｳ繝�繝ｳ繝�縺ｮ讎りｦ√ｒ貅門ｙ
-        content_summary = self._format_contents_summary(contents)
+        if self.candidates_per_section:
+            # BM25（またはベクトル検索）でセクションごとの候補シーンに絞り込み、プロンプトの大きさを一定に保つ
+            ranker = ranker or self._build_ranker(contents)
+            candidates = ranker.rank_sections(scenario, self.candidates_per_section)
+            content_summary = self._format_candidates_summary(contents, candidates)
+        else:
+            candidates = None
+            content_summary = self._format_contents_summary(contents)
         
+        prompt = self._build_prompt(scenario, content_summary)
+        if self.prompt_builder is not None and not self.prompt_builder.fits(prompt):
+            # トークン予算を超える場合は、チャンクごとに候補を絞り込み（map）、
+            # 残った候補だけで最終的な選択を行う（reduce）
+            candidates = self._shortlist(contents, scenario, candidates)
+            if candidates is not None:
+                content_summary = self._format_candidates_summary(contents, candidates)
+                prompt = self._build_prompt(scenario, content_summary)
+
+        # 繝励Ο繝ｳ繝励ヨ繧偵Ο繧ｰ繝輔ぃ繧､繝ｫ縺ｫ菫晏ｭ�
+        log_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'logs')
+        os.makedirs(log_dir, exist_ok=True)
+        log_path = os.path.join(log_dir, log_name)
+        with open(log_path, 'w', encoding='utf-8-sig') as f:
+            f.write(prompt)
+        print(f"繧ｷ繝ｼ繝ｳ驕ｸ謚槭�励Ο繝ｳ繝励ヨ繧剃ｿ晏ｭ倥＠縺ｾ縺励◆: {log_path}")
+
+        return prompt
+
+    def _build_ranker(self, contents: List[Dict[str, Any]]) -> Union[SceneRanker, 'SceneVectorIndex']:
+        """
+        rankingに応じて候補シーンの関連度を計算するインスタンスを作成
+
+        Args:
+            contents: コンテンツ情報
+
+        Returns:
+            SceneRankerまたはSceneVectorIndex
+        """
+        if self.ranking == 'vector':
+            # scene_vectorsはnumpyを使うため、ベクトル検索の場合だけ読み込む（numpyの読み込みには時間がかかる）
+            from .scene_vectors import SceneVectorIndex
+            return SceneVectorIndex.load_or_fit(self.vector_index_path, contents)
+        return SceneRanker().fit(contents)
+
+    def _cache_settings(self) -> Dict[str, Any]:
+        """
+        選択結果に影響する設定（キャッシュのキーに含める）
+
+        Returns:
+            設定の辞書
+        """
+        return {
+            'candidates_per_section': self.candidates_per_section,
+            'ranking': self.ranking,
+            'token_budget': self.prompt_builder.token_budget if self.prompt_builder is not None else None,
+            'shortlist_per_chunk': self.shortlist_per_chunk,
+        }
+
+    @staticmethod
+    def _report_resolution(stats: Dict[str, Any]) -> None:
+        """
+        選択シーンの解決結果について警告を出力
+
+        Args:
+            stats: SceneIndex.resolveが返す統計
+        """
+        hallucinated = stats['hallucinated']
+        if hallucinated:
+            examples = ', '.join(f"{h['content_id']}/{h['scene_index']}" for h in hallucinated[:5])
+            print(f"警告: 存在しないシーンが{len(hallucinated)}件選択されたため除外しました: {examples}")
+        if stats['clamped']:
+            print(f"警告: {stats['clamped']}件のシーンの開始・終了時間をシーンの範囲に収めました")
+
+    def _build_prompt(self, scenario: Dict[str, Any], content_summary: str) -> str:
+        """
+        シーン選択のプロンプトを作成
+
+        Args:
+            scenario: シナリオ
+            content_summary: 候補となるシーンの一覧
+
+        Returns:
+            プロンプト
+        """
         # 繝励Ο繝ｳ繝励ヨ繝�繝ｳ繝励Ξ繝ｼ繝�
-        prompt = f"""莉･荳九�ｮ繧ｷ繝翫Μ繧ｪ縺ｨ繧ｳ繝ｳ繝�繝ｳ繝�縺ｫ蝓ｺ縺･縺�縺ｦ縲∵怙驕ｩ縺ｪ繧ｷ繝ｼ繝ｳ繧帝∈謚槭＠縺ｦ縺上□縺輔＞�ｼ�
+        return f"""莉･荳九�ｮ繧ｷ繝翫Μ繧ｪ縺ｨ繧ｳ繝ｳ繝�繝ｳ繝�縺ｫ蝓ｺ縺･縺�縺ｦ縲∵怙驕ｩ縺ｪ繧ｷ繝ｼ繝ｳ繧帝∈謚槭＠縺ｦ縺上□縺輔＞�ｼ�
 
 繧ｷ繝翫Μ繧ｪ:
 {json.dumps(scenario, ensure_ascii=False, indent=2)}
@@ -53,52 +446,104 @@ class SceneSelector:
     ]
 }}"""
 
-        # 繝励Ο繝ｳ繝励ヨ繧偵Ο繧ｰ繝輔ぃ繧､繝ｫ縺ｫ菫晏ｭ�
-        log_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'logs')
-        os.makedirs(log_dir, exist_ok=True)
-        log_path = os.path.join(log_dir, 'scene_selection_prompt.txt')
-        with open(log_path, 'w', encoding='utf-8-sig') as f:
-            f.write(prompt)
-        print(f"繧ｷ繝ｼ繝ｳ驕ｸ謚槭�励Ο繝ｳ繝励ヨ繧剃ｿ晏ｭ倥＠縺ｾ縺励◆: {log_path}")
+    def _shortlist(self, contents: List[Dict[str, Any]], scenario: Dict[str, Any],
+                   candidates: Optional[Dict[str, List[Dict[str, Any]]]] = None
+                   ) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        """
+        シーンをトークン予算内のチャンクに分け、チャンクごとに並行して候補を絞り込む
 
-        # 逕滓�植I縺ｫ繝ｪ繧ｯ繧ｨ繧ｹ繝�
-        response = self.api_client.text_analysis(prompt)
-        
-        try:
-            # 繝ｬ繧ｹ繝昴Φ繧ｹ繧偵ヱ繝ｼ繧ｹ
-            result = json.loads(response)
-            
-            # 驕ｸ謚槭＆繧後◆繧ｷ繝ｼ繝ｳ繧貞叙蠕�
-            selected_scenes = []
-            for scene_info in result.get("selected_scenes", []):
-                content_id = scene_info.get("content_id")
-                scene_index = scene_info.get("scene_index")
-                
-                # 蟇ｾ蠢懊☆繧九さ繝ｳ繝�繝ｳ繝�縺ｨ繧ｷ繝ｼ繝ｳ繧呈爾縺�
-                for content in contents:
-                    if content["content_id"] == content_id:
-                        if scene_index >= 0 and scene_index < len(content.get('scenes', [])):
-                            scene = content["scenes"][scene_index]
-                            selected_scenes.append({
-                                "content_id": content_id,
-                                "scene_index": scene_index,
-                                "start_time": scene_info.get("start_time", scene.get("start_time", 0)),
-                                "end_time": scene_info.get("end_time", scene.get("end_time", 0)),
-                                "reason": scene_info.get("reason", ""),
-                                "section_id": scene_info.get("section_id", ""),
-                                "transcript": scene.get("transcript", ""),
-                                "topics": scene.get("topics", []),
-                                "effects": scene.get("effects", [])
-                            })
-                        break
-            
-            return selected_scenes
-            
-        except Exception as e:
-            print(f"隴ｦ蜻�: 繧ｷ繝ｼ繝ｳ驕ｸ謚樒ｵ先棡縺ｮ蜃ｦ逅�荳ｭ縺ｫ繧ｨ繝ｩ繝ｼ縺檎匱逕溘＠縺ｾ縺励◆: {str(e)}")
-            return []
+        絞り込んだ候補でもプロンプトが予算を超える場合は、候補に対して同じ処理を繰り返す。
+        すべてのチャンクの絞り込みに失敗した場合は、その回の絞り込み前の候補を返す。
+
+        Args:
+            contents: コンテンツ情報
+            scenario: シナリオ
+            candidates: 事前ランキング済みの候補（Noneの場合は全シーンが対象）
 
-    def _format_contents_summary(self, contents: List[Dict[str, Any]]) -> str:
+        Returns:
+            section_idをキー、絞り込んだ候補シーンのリストを値とする辞書
+            （1回目の絞り込みに失敗した場合はcandidatesをそのまま返す）
+        """
+        contents_by_id = {content['content_id']: content for content in contents}
+        if candidates is None:
+            refs = [(content['content_id'], i) for content in contents
+                    for i in range(len(content.get('scenes', [])))]
+        else:
+            refs = list(dict.fromkeys((c['content_id'], c['scene_index'])
+                                      for section in candidates.values() for c in section))
+
+        overhead = estimate_tokens(self._build_shortlist_prompt(scenario, ''))
+        shortlisted = candidates
+        for _ in range(self.MAX_SHORTLIST_ROUNDS):
+            valid = set(refs)
+            blocks = [self._format_scene_block(cid, i, contents_by_id[cid]['scenes'][i]) for cid, i in refs]
+            chunks = self.prompt_builder.pack(blocks, overhead)
+            print(f"シーン候補を絞り込み中: {len(refs)}シーン / {len(chunks)}チャンク")
+
+            def map_chunk(chunk: List[str]) -> List[Dict[str, Any]]:
+                prompt = self._build_shortlist_prompt(scenario, '\n'.join(chunk))
+                result = json.loads(self.api_client.text_analysis(prompt))
+                # API呼び出しに失敗した場合は"{}"が返されるため、失敗したチャンクとして扱う
+                if 'selected_scenes' not in result:
+                    raise ValueError("応答にselected_scenesが含まれていません")
+                return [scene for scene in result['selected_scenes']
+                        if (scene.get('content_id'), scene.get('scene_index')) in valid]
+
+            def reduce_chunks(results: List[List[Dict[str, Any]]]) -> Dict[str, List[Dict[str, Any]]]:
+                grouped: Dict[str, List[Dict[str, Any]]] = {}
+                seen = set()
+                for scene in (scene for result in results for scene in result):
+                    key = (scene['content_id'], scene['scene_index'])
+                    if key not in seen:
+                        seen.add(key)
+                        grouped.setdefault(scene.get('section_id') or 'unassigned', []).append(
+                            {'content_id': key[0], 'scene_index': key[1]})
+                return grouped
+
+            try:
+                shortlisted = self.prompt_builder.map_reduce(chunks, map_chunk, reduce_chunks)
+            except MapReduceError as e:
+                print(f"警告: シーン候補を絞り込めなかったため、絞り込み前の候補で選択します: {str(e)}")
+                break
+            prompt = self._build_prompt(scenario, self._format_candidates_summary(contents, shortlisted))
+            next_refs = [(c['content_id'], c['scene_index']) for section in shortlisted.values() for c in section]
+            if self.prompt_builder.fits(prompt) or len(next_refs) >= len(refs):
+                break
+            refs = next_refs
+        return shortlisted
+
+    def _build_shortlist_prompt(self, scenario: Dict[str, Any], scene_blocks: str) -> str:
+        """
+        候補を絞り込むmapステップのプロンプトを作成
+
+        Args:
+            scenario: シナリオ
+            scene_blocks: チャンクに含まれるシーンの一覧
+
+        Returns:
+            プロンプト
+        """
+        return f"""以下のシナリオに使えそうなシーンを、候補シーンの中から最大{self.shortlist_per_chunk}件まで選んでください。
+
+シナリオ:
+{json.dumps(scenario, ensure_ascii=False, indent=2)}
+
+候補シーン:
+{scene_blocks}
+
+以下の形式で出力してください:
+{{
+    "selected_scenes": [
+        {{
+            "content_id": "コンテンツID",
+            "scene_index": シーン番号,
+            "section_id": "対応するセクションID"
+        }},
+        ...
+    ]
+}}"""
+
+    def _format_contents_summary(self, contents: Iterable[Dict[str, Any]]) -> str:
         """繧ｳ繝ｳ繝�繝ｳ繝�縺ｮ讎りｦ√ｒ繝輔か繝ｼ繝槭ャ繝�"""
         summary = []
         for content in contents:
@@ -121,3 +566,52 @@ class SceneSelector:
             
             summary.append(content_summary)
         return '\n'.join(summary)
+
+    def _format_candidates_summary(self, contents: Iterable[Dict[str, Any]],
+                                   candidates: Dict[str, List[Dict[str, Any]]]) -> str:
+        """
+        セクションごとの候補シーンをフォーマット
+
+        scene_indexは元のコンテンツ内の番号のまま出力するため、応答の解釈は全シーンを渡す場合と同じ。
+
+        Args:
+            contents: コンテンツ情報
+            candidates: section_idをキー、候補シーンのリストを値とする辞書
+
+        Returns:
+            プロンプトに埋め込む候補シーンの一覧
+        """
+        contents_by_id = {content['content_id']: content for content in contents}
+        summary = []
+        for section_id, section_candidates in candidates.items():
+            section_summary = f"""
+セクション {section_id} の候補シーン（関連度順）:
+"""
+            for candidate in section_candidates:
+                content = contents_by_id[candidate['content_id']]
+                scene = content['scenes'][candidate['scene_index']]
+                section_summary += self._format_scene_block(candidate['content_id'],
+                                                            candidate['scene_index'], scene)
+            summary.append(section_summary)
+        return '\n'.join(summary)
+
+    @staticmethod
+    def _format_scene_block(content_id: str, scene_index: int, scene: Dict[str, Any]) -> str:
+        """
+        候補シーン1件をフォーマット
+
+        Args:
+            content_id: コンテンツID
+            scene_index: コンテンツ内のシーン番号
+            scene: シーン情報
+
+        Returns:
+            シーンの説明
+        """
+        return f"""
+コンテンツID: {content_id} / シーン {scene_index}:
+- 開始時間: {scene.get('start_time', 0)}秒
+- 終了時間: {scene.get('end_time', 0)}秒
+- トピック: {', '.join(scene.get('topics', []))}
+- トランスクリプト: {scene.get('transcript', '')[:100]}...
+"""
@@ -0,0 +1,207 @@
+"""LLMを使わないシーン選択モジュール"""
+
+import math
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+from .scenario_diff import section_key
+from .scene_index import SceneIndex
+from .scene_ranker import SceneRanker
+
+
+class SceneSolver:
+    """
+    シナリオの各セクションの尺を、ローカルで計算した関連度の高いシーンで埋めるクラス
+
+    関連度はSceneRankerのBM25スコア（セクションのtitle、description、key_messages、
+    scene_requirementsのrequired_elementsを検索語とする）を使う。セクションごとに、
+    scene_requirementsのmin_duration未満のシーンを除き、max_durationを超えるシーンは
+    先頭から切り出したうえで、尺（duration）を容量とする0/1ナップサックを動的計画法で解く。
+    同じコンテンツで時間が重なるシーンは選ばず、各セクション内は撮影順（コンテンツの順、
+    開始時間の順）に並べる。LLMへのリクエストは行わない。
+    """
+
+    # セクションの尺が指定されていない場合の尺（秒）
+    DEFAULT_SECTION_DURATION = 30.0
+
+    def __init__(self, candidates_per_section: int = 200, resolution: float = 0.5):
+        """
+        コンストラクタ
+
+        Args:
+            candidates_per_section: セクションごとにナップサックの対象とする候補シーン数
+                （関連度の高い順。関連するシーンが足りない場合は等間隔に選んだシーンで補う）
+            resolution: ナップサックで尺を離散化する単位（秒）
+        """
+        if resolution <= 0:
+            raise ValueError(f"resolutionは0より大きい値を指定してください: {resolution}")
+        self.candidates_per_section = candidates_per_section
+        self.resolution = resolution
+
+    def solve(self, contents: Sequence[Dict[str, Any]], scenario: Dict[str, Any],
+              ranker: Optional[SceneRanker] = None) -> List[Dict[str, Any]]:
+        """
+        シナリオの各セクションにシーンを割り当てる
+
+        Args:
+            contents: コンテンツ情報
+            scenario: シナリオ
+            ranker: 作成済みのSceneRankerまたはSceneVectorIndex
+                （Noneの場合はcontentsからSceneRankerを作成）
+
+        Returns:
+            SceneSelector.selectと同じ形式の選択シーンのリスト（セクション順）
+        """
+        sections = scenario.get('sections', [])
+        if not sections:
+            return []
+        ranker = ranker or SceneRanker().fit(contents)
+        index = SceneIndex(contents)
+        order = {content['content_id']: i for i, content in enumerate(contents)}
+        default_duration = scenario.get('total_duration', 0) / len(sections) or self.DEFAULT_SECTION_DURATION
+
+        # (content_id) → 選択済みの区間のリスト。セクションをまたいで重複を防ぐ
+        used: Dict[str, List[Tuple[float, float]]] = {}
+        scene_infos = []
+        for i, section in enumerate(sections):
+            section_id = section_key(section, i)
+            picks = self._solve_section(section, ranker, index, used, default_duration)
+            picks.sort(key=lambda p: (order[p['content_id']], p['start_time']))
+            for pick in picks:
+                used.setdefault(pick['content_id'], []).append((pick['start_time'], pick['end_time']))
+                pick['section_id'] = section_id
+            scene_infos.extend(picks)
+
+        selected, _ = index.resolve(scene_infos)
+        return selected
+
+    def _solve_section(self, section: Dict[str, Any], ranker: SceneRanker, index: SceneIndex,
+                       used: Dict[str, List[Tuple[float, float]]],
+                       default_duration: float) -> List[Dict[str, Any]]:
+        """
+        1つのセクションの尺を埋めるシーンを選ぶ
+
+        Args:
+            section: シナリオのセクション
+            ranker: SceneRanker
+            index: SceneIndex
+            used: コンテンツごとの選択済みの区間
+            default_duration: セクションの尺が指定されていない場合の尺（秒）
+
+        Returns:
+            content_id、scene_index、start_time、end_time、reasonを含む辞書のリスト
+        """
+        duration = float(section.get('duration') or default_duration)
+        requirements = section.get('scene_requirements', {})
+        min_duration = float(requirements.get('min_duration') or 0)
+        max_duration = float(requirements.get('max_duration') or duration)
+
+        query = ' '.join([SceneRanker.section_query(section)] + list(requirements.get('required_elements', [])))
+        items = []
+        for candidate in ranker.rank(query, self.candidates_per_section):
+            bounds = index.bounds(candidate['content_id'], candidate['scene_index'])
+            if bounds is None:
+                continue
+            start, end = bounds
+            end = min(end, start + max_duration)
+            length = end - start
+            if length <= 0 or length < min_duration or length > duration:
+                continue
+            if self._overlaps(used.get(candidate['content_id'], []), start, end):
+                continue
+            items.append({'content_id': candidate['content_id'], 'scene_index': candidate['scene_index'],
+                          'start_time': start, 'end_time': end, 'score': candidate['score']})
+
+        chosen = self._knapsack(items, duration)
+        return self._repair(chosen, items, duration)
+
+    def _knapsack(self, items: List[Dict[str, Any]], duration: float) -> List[Dict[str, Any]]:
+        """
+        尺の合計がduration以下で、関連度×長さの合計が最大になるシーンの組み合わせを求める
+
+        関連度が0のシーンにも長さに比例したわずかな価値を与え、関連するシーンが足りない
+        場合でも尺を埋めるようにする。
+
+        Args:
+            items: 候補シーン
+            duration: セクションの尺（秒）
+
+        Returns:
+            選んだ候補シーンのリスト
+        """
+        capacity = int(duration / self.resolution + 1e-9)
+        weights = [max(1, math.ceil((item['end_time'] - item['start_time']) / self.resolution - 1e-9))
+                   for item in items]
+        best = [0.0] * (capacity + 1)
+        keep = []
+        for item, weight in zip(items, weights):
+            value = (item['score'] + 0.01) * weight
+            taken = bytearray(capacity + 1)
+            for c in range(capacity, weight - 1, -1):
+                candidate = best[c - weight] + value
+                if candidate > best[c]:
+                    best[c] = candidate
+                    taken[c] = 1
+            keep.append(taken)
+
+        chosen = []
+        c = max(range(capacity + 1), key=lambda k: (best[k], -k))
+        for i in range(len(items) - 1, -1, -1):
+            if keep[i][c]:
+                chosen.append(items[i])
+                c -= weights[i]
+        chosen.reverse()
+        return chosen
+
+    @classmethod
+    def _repair(cls, chosen: List[Dict[str, Any]], items: List[Dict[str, Any]],
+                duration: float) -> List[Dict[str, Any]]:
+        """
+        同じコンテンツで時間が重なるシーンを関連度の低い順に外し、空いた尺を候補で埋め直す
+
+        Args:
+            chosen: ナップサックで選んだシーン
+            items: 候補シーン（関連度の高い順）
+            duration: セクションの尺（秒）
+
+        Returns:
+            重なりのないシーンのリスト
+        """
+        picks: List[Dict[str, Any]] = []
+        intervals: Dict[str, List[Tuple[float, float]]] = {}
+
+        def add(item: Dict[str, Any]) -> bool:
+            spans = intervals.setdefault(item['content_id'], [])
+            if cls._overlaps(spans, item['start_time'], item['end_time']):
+                return False
+            spans.append((item['start_time'], item['end_time']))
+            picks.append(item)
+            return True
+
+        for item in sorted(chosen, key=lambda item: -item['score']):
+            add(item)
+        remaining = duration - sum(p['end_time'] - p['start_time'] for p in picks)
+        for item in items:
+            if any(item is p for p in picks):
+                continue
+            length = item['end_time'] - item['start_time']
+            if length <= remaining + 1e-9 and add(item):
+                remaining -= length
+
+        return [{'content_id': p['content_id'], 'scene_index': p['scene_index'],
+                 'start_time': p['start_time'], 'end_time': p['end_time'],
+                 'reason': f"関連度 {p['score']:.2f}"} for p in picks]
+
+    @staticmethod
+    def _overlaps(spans: List[Tuple[float, float]], start: float, end: float) -> bool:
+        """
+        区間が選択済みの区間のいずれかと重なるか判定
+
+        Args:
+            spans: 選択済みの区間
+            start: 開始時間
+            end: 終了時間
+
+        Returns:
+            重なる場合はTrue
+        """
+        return any(start < span_end and span_start < end for span_start, span_end in spans)
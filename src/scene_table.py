@@ -0,0 +1,235 @@
+"""列指向シーンテーブルモジュール"""
+
+import threading
+from collections.abc import Mapping, Sequence
+from typing import Dict, Any, Iterator, List, Optional
+
+import numpy as np
+
+
+class StringPool:
+    """
+    キーワードやトピックの文字列をインターンし、整数IDで参照するためのテーブル
+
+    クローラーのスレッド間で共有されるため、登録はロックで保護する。
+    """
+
+    def __init__(self):
+        """コンストラクタ"""
+        self._ids: Dict[str, int] = {}
+        self._strings: List[str] = []
+        self._lock = threading.Lock()
+
+    def intern(self, value: str) -> int:
+        """
+        文字列を登録してIDを返す（登録済みの場合は既存のID）
+
+        Args:
+            value: 登録する文字列
+
+        Returns:
+            文字列のID
+        """
+        string_id = self._ids.get(value)
+        if string_id is not None:
+            return string_id
+        with self._lock:
+            string_id = self._ids.get(value)
+            if string_id is None:
+                string_id = len(self._strings)
+                self._strings.append(value)
+                self._ids[value] = string_id
+            return string_id
+
+    def lookup(self, string_id: int) -> str:
+        """
+        IDから文字列を取得
+
+        Args:
+            string_id: 文字列のID
+
+        Returns:
+            登録された文字列
+        """
+        return self._strings[string_id]
+
+    def __len__(self) -> int:
+        return len(self._strings)
+
+
+class SceneView(Mapping):
+    """
+    SceneTableの1行を従来のシーン辞書と同じキーで参照するビュー
+
+    列に持たないキー（descriptionやsegmentsなど）は、テーブルの行ごとの追加フィールドから返す。
+    """
+
+    KEYS = ('start_time', 'end_time', 'transcript', 'keywords', 'topics')
+
+    __slots__ = ('_table', '_row')
+
+    def __init__(self, table: 'SceneTable', row: int):
+        """
+        コンストラクタ
+
+        Args:
+            table: 参照元のシーンテーブル
+            row: 行番号
+        """
+        self._table = table
+        self._row = row
+
+    def __getitem__(self, key: str) -> Any:
+        if key == 'start_time':
+            return float(self._table.start[self._row])
+        if key == 'end_time':
+            return float(self._table.end[self._row])
+        if key == 'transcript':
+            return self._table.transcripts[self._row]
+        if key == 'keywords':
+            return self._table.keywords(self._row)
+        extra = self._table.extras[self._row]
+        if extra and key in extra:
+            return extra[key]
+        if key == 'topics':
+            return self._table.topics()
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.KEYS
+        extra = self._table.extras[self._row]
+        if extra:
+            yield from (key for key in extra if key not in self.KEYS)
+
+    def __len__(self) -> int:
+        extra = self._table.extras[self._row]
+        return len(self.KEYS) + sum(1 for key in extra or () if key not in self.KEYS)
+
+    def __repr__(self) -> str:
+        return f"SceneView({dict(self)!r})"
+
+
+class SceneTable(Sequence):
+    """
+    1クリップ分のシーン情報を列指向で保持するテーブル
+
+    開始・終了・長さはNumPy配列、キーワードはStringPoolのIDをCSR形式
+    （keyword_offsets/keyword_ids）で保持し、トピックはクリップ単位で1つだけ持つ。
+    それ以外のフィールドは行ごとの追加フィールド（extras）にそのまま保持する。
+    インデックスアクセスでSceneViewを返すため、従来のシーン辞書のリストと同じように扱える。
+    """
+
+    def __init__(self, start: np.ndarray, end: np.ndarray, transcripts: List[str],
+                 keyword_offsets: np.ndarray, keyword_ids: np.ndarray,
+                 topic_ids: np.ndarray, pool: StringPool,
+                 extras: Optional[List[Optional[Dict[str, Any]]]] = None):
+        """
+        コンストラクタ
+
+        Args:
+            start: 開始時間（秒）の配列
+            end: 終了時間（秒）の配列
+            transcripts: トランスクリプトのリスト
+            keyword_offsets: 各シーンのキーワード範囲を示すオフセット配列（長さはシーン数+1）
+            keyword_ids: キーワードIDを連結した配列
+            topic_ids: クリップ共通のトピックIDの配列
+            pool: 文字列IDを解決するStringPool
+            extras: 行ごとの追加フィールドの辞書のリスト（追加フィールドがない行はNone）
+        """
+        self.start = start
+        self.end = end
+        self.duration = end - start
+        self.transcripts = transcripts
+        self.keyword_offsets = keyword_offsets
+        self.keyword_ids = keyword_ids
+        self.topic_ids = topic_ids
+        self.pool = pool
+        self.extras = extras if extras is not None else [None] * len(transcripts)
+
+    @classmethod
+    def from_scenes(cls, scenes: List[Dict[str, Any]],
+                    pool: Optional[StringPool] = None) -> 'SceneTable':
+        """
+        シーン辞書のリストからテーブルを作成
+
+        トピックはクリップ内で共通のため、先頭シーンのものをクリップ全体のトピックとして扱う
+        （先頭シーンと異なるトピックを持つシーンは、そのシーンの追加フィールドに保持する）。
+
+        Args:
+            scenes: ContentCrawlerが整形したシーン辞書のリスト
+            pool: 共有するStringPool（Noneの場合は新規作成）
+
+        Returns:
+            作成したシーンテーブル
+        """
+        pool = pool if pool is not None else StringPool()
+        count = len(scenes)
+
+        start = np.fromiter((s.get('start_time', 0) for s in scenes), dtype=np.float64, count=count)
+        end = np.fromiter((s.get('end_time', 0) for s in scenes), dtype=np.float64, count=count)
+        transcripts = [s.get('transcript', '') for s in scenes]
+
+        keyword_offsets = np.zeros(count + 1, dtype=np.int32)
+        keyword_ids: List[int] = []
+        for i, scene in enumerate(scenes):
+            keyword_ids.extend(pool.intern(k) for k in scene.get('keywords', []))
+            keyword_offsets[i + 1] = len(keyword_ids)
+
+        topics = scenes[0].get('topics', []) if scenes else []
+        topic_ids = np.array([pool.intern(t) for t in topics], dtype=np.int32)
+
+        extras: List[Optional[Dict[str, Any]]] = []
+        for scene in scenes:
+            extra = {key: value for key, value in scene.items() if key not in SceneView.KEYS}
+            if scene.get('topics', []) != topics:
+                extra['topics'] = scene.get('topics', [])
+            extras.append(extra or None)
+
+        return cls(start, end, transcripts, keyword_offsets,
+                   np.array(keyword_ids, dtype=np.int32), topic_ids, pool, extras)
+
+    def keywords(self, row: int) -> List[str]:
+        """
+        指定行のキーワードを取得
+
+        Args:
+            row: 行番号
+
+        Returns:
+            キーワードのリスト
+        """
+        begin, end = self.keyword_offsets[row], self.keyword_offsets[row + 1]
+        return [self.pool.lookup(int(i)) for i in self.keyword_ids[begin:end]]
+
+    def topics(self) -> List[str]:
+        """
+        クリップ共通のトピックを取得
+
+        Returns:
+            トピックのリスト
+        """
+        return [self.pool.lookup(int(i)) for i in self.topic_ids]
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """
+        従来形式のシーン辞書のリストに変換（JSON保存用）
+
+        Returns:
+            シーン辞書のリスト
+        """
+        return [dict(view) for view in self]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [SceneView(self, i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('scene index out of range')
+        return SceneView(self, index)
+
+    def __len__(self) -> int:
+        return len(self.transcripts)
+
+    def __repr__(self) -> str:
+        return f"SceneTable(scenes={len(self)})"
@@ -0,0 +1,303 @@
+"""シーンのベクトル検索モジュール"""
+
+import json
+import os
+import re
+import unicodedata
+import zlib
+from typing import Dict, Any, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .scenario_diff import section_key
+from .scene_ranker import SceneRanker
+
+# 空白と記号は n-gram に含めない
+_SEPARATOR_PATTERN = re.compile(r'[\s!-/:-@\[-`{-~、。，．・「」『』（）【】！？：；…〜]+')
+
+
+class SceneVectorIndex:
+    """
+    ネットワークを使わずにシーンを意味的に検索するためのベクトルインデックス
+
+    シーンのトランスクリプト、description、context_analysisのactivity（keywords）、
+    トピックを文字n-gramに分割し、ハッシュで固定次元のベクトルに変換する（feature hashing）。
+    言い換えや表記の揺れでも共通する部分文字列があれば類似度が高くなる。
+    全シーンのベクトルはL2正規化した1つのfloat32行列として保持し、複数の検索語の
+    上位k件のコサイン類似度検索を1回の行列積で行う。行列は.npyとして保存し、
+    読み込み時はメモリマップするため、大きなライブラリでも読み込みは一瞬で済む。
+    """
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, dim: int = 512, ngram_sizes: Sequence[int] = (2, 3)):
+        """
+        コンストラクタ
+
+        Args:
+            dim: ベクトルの次元数
+            ngram_sizes: 使う文字n-gramの長さ
+        """
+        if dim <= 0:
+            raise ValueError(f"dimは1以上を指定してください: {dim}")
+        self.dim = dim
+        self.ngram_sizes = tuple(ngram_sizes)
+        self.refs: List[Tuple[str, int]] = []
+        self.matrix = np.zeros((0, dim), dtype=np.float32)
+        self.idf = np.ones(dim, dtype=np.float32)
+        self.fingerprint = 0
+
+    def __len__(self) -> int:
+        return len(self.refs)
+
+    def fit(self, contents: Iterable[Dict[str, Any]]) -> 'SceneVectorIndex':
+        """
+        コンテンツのシーンからベクトル行列を作成
+
+        Args:
+            contents: コンテンツ情報
+
+        Returns:
+            自身
+        """
+        self.refs, texts = self._scene_texts(contents)
+        self.fingerprint = self._fingerprint(texts)
+
+        counts = self._hash_counts(texts)
+        # ハッシュのバケットごとの文書頻度からidfを求め、頻出するn-gramの重みを下げる
+        df = np.count_nonzero(counts, axis=0).astype(np.float32)
+        self.idf = np.log((1 + len(texts)) / (1 + df)).astype(np.float32) + 1
+        self.matrix = self._normalize(np.log1p(counts) * self.idf)
+        return self
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        テキストをL2正規化したベクトルに変換
+
+        Args:
+            texts: テキストのリスト
+
+        Returns:
+            (テキスト数, dim)の行列
+        """
+        return self._normalize(np.log1p(self._hash_counts(texts)) * self.idf)
+
+    def search(self, queries: Sequence[str], top_k: int) -> List[List[Dict[str, Any]]]:
+        """
+        複数の検索語について、コサイン類似度の高いシーンを上位top_k件まで取得
+
+        Args:
+            queries: 検索語のリスト
+            top_k: 検索語ごとの取得件数
+
+        Returns:
+            検索語ごとの、content_id、scene_index、scoreを含む辞書のリスト（スコアの高い順）
+        """
+        if not queries:
+            return []
+        scores = self.embed(queries) @ self.matrix.T
+        k = min(top_k, len(self.refs))
+        if k <= 0:
+            return [[] for _ in queries]
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        # スコアの高い順、同点の場合はシーンの順に並べる
+        order = np.lexsort((top, -top_scores), axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+
+        results = []
+        for row, doc_ids in enumerate(top):
+            results.append([{'content_id': self.refs[doc_id][0], 'scene_index': self.refs[doc_id][1],
+                             'score': float(scores[row, doc_id])} for doc_id in doc_ids.tolist()])
+        return results
+
+    def rank(self, query: str, top_k: int) -> List[Dict[str, Any]]:
+        """
+        検索語に関連するシーンを上位top_k件まで取得（SceneRanker.rankと同じ形式）
+
+        Args:
+            query: 検索語
+            top_k: 取得する件数
+
+        Returns:
+            content_id、scene_index、scoreを含む辞書のリスト（スコアの高い順）
+        """
+        return self.search([query], top_k)[0]
+
+    def rank_sections(self, scenario: Dict[str, Any], top_k: int) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        シナリオの全セクションの候補シーンを1回の行列積で取得（SceneRanker.rank_sectionsと同じ形式）
+
+        Args:
+            scenario: シナリオ
+            top_k: セクションごとの候補数
+
+        Returns:
+            section_idをキー、候補シーンのリストを値とする辞書
+        """
+        sections = scenario.get('sections', [])
+        results = self.search([SceneRanker.section_query(section) for section in sections], top_k)
+        return {section_key(section, i): result
+                for i, (section, result) in enumerate(zip(sections, results))}
+
+    def save(self, path: str) -> None:
+        """
+        ベクトル行列を.npyに、シーンの対応などを同名の.jsonに保存
+
+        Args:
+            path: 行列の保存先（.npy）
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.save(path, self.matrix)
+        meta = {
+            'version': self.FORMAT_VERSION,
+            'dim': self.dim,
+            'ngram_sizes': list(self.ngram_sizes),
+            'refs': [list(ref) for ref in self.refs],
+            'fingerprint': self.fingerprint,
+            'idf': self.idf.tolist(),
+        }
+        with open(self._meta_path(path), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'SceneVectorIndex':
+        """
+        保存したインデックスを読み込む
+
+        Args:
+            path: 行列の保存先（.npy）
+            mmap: 行列をメモリマップで読み込むかどうか
+
+        Returns:
+            SceneVectorIndex
+        """
+        with open(cls._meta_path(path), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != cls.FORMAT_VERSION:
+            raise ValueError(f"未対応のベクトルインデックスの形式です: {meta.get('version')}")
+        index = cls(meta['dim'], meta['ngram_sizes'])
+        index.refs = [tuple(ref) for ref in meta['refs']]
+        index.idf = np.asarray(meta['idf'], dtype=np.float32)
+        index.fingerprint = meta.get('fingerprint', 0)
+        index.matrix = np.load(path, mmap_mode='r' if mmap else None)
+        if index.matrix.shape != (len(index.refs), index.dim):
+            raise ValueError(f"ベクトルインデックスが壊れています: {path}")
+        return index
+
+    @classmethod
+    def load_or_fit(cls, path: Optional[str], contents: Sequence[Dict[str, Any]],
+                    **kwargs: Any) -> 'SceneVectorIndex':
+        """
+        保存したインデックスがコンテンツと一致する場合は読み込み、一致しない場合は作成して保存
+
+        Args:
+            path: 行列の保存先（.npy、Noneの場合は保存しない）
+            contents: コンテンツ情報
+            **kwargs: インデックスを作成する場合のコンストラクタの引数
+
+        Returns:
+            SceneVectorIndex
+        """
+        index = cls(**kwargs)
+        if path and os.path.exists(path):
+            try:
+                saved = cls.load(path)
+                refs, texts = cls._scene_texts(contents)
+                if ((saved.dim, saved.ngram_sizes) == (index.dim, index.ngram_sizes)
+                        and saved.refs == refs and saved.fingerprint == cls._fingerprint(texts)):
+                    return saved
+            except (OSError, ValueError, KeyError) as e:
+                print(f"警告: ベクトルインデックスを読み込めませんでした: {str(e)}")
+        index.fit(contents)
+        if path:
+            index.save(path)
+        return index
+
+    @classmethod
+    def _scene_texts(cls, contents: Iterable[Dict[str, Any]]) -> Tuple[List[Tuple[str, int]], List[str]]:
+        """
+        全シーンの(content_id, scene_index)と検索対象のテキストを取得
+
+        Args:
+            contents: コンテンツ情報
+
+        Returns:
+            (シーンの対応のリスト, テキストのリスト)
+        """
+        refs, texts = [], []
+        for content in contents:
+            for scene_index, scene in enumerate(content.get('scenes', [])):
+                refs.append((content['content_id'], scene_index))
+                texts.append(cls.scene_text(scene))
+        return refs, texts
+
+    @staticmethod
+    def _fingerprint(texts: Sequence[str]) -> int:
+        """シーンのテキストが変わったことを検出するためのチェックサム"""
+        checksum = 0
+        for text in texts:
+            checksum = zlib.crc32(text.encode('utf-8') + b'\0', checksum)
+        return checksum
+
+    @staticmethod
+    def scene_text(scene: Dict[str, Any]) -> str:
+        """
+        シーンの検索対象のテキストを作成
+
+        Args:
+            scene: シーン情報
+
+        Returns:
+            トランスクリプト、description、keywords、トピックを連結したテキスト
+        """
+        parts = [scene.get('transcript', ''), scene.get('description', '')]
+        parts.extend(scene.get('keywords', []))
+        parts.extend(scene.get('topics', []))
+        return ' '.join(p for p in parts if p)
+
+    def _hash_counts(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        テキストごとの文字n-gramをハッシュのバケットに数える
+
+        Args:
+            texts: テキストのリスト
+
+        Returns:
+            (テキスト数, dim)のfloat32行列
+        """
+        rows, cols = [], []
+        shortest = min(self.ngram_sizes)
+        for row, text in enumerate(texts):
+            for word in _SEPARATOR_PATTERN.split(unicodedata.normalize('NFKC', text or '').lower()):
+                if not word:
+                    continue
+                # 最も短いnより短い語（1文字の漢字など）はそのまま使う
+                grams = [word] if len(word) < shortest else [
+                    word[i:i + n] for n in self.ngram_sizes for i in range(len(word) - n + 1)]
+                for gram in grams:
+                    rows.append(row)
+                    cols.append(zlib.crc32(gram.encode('utf-8')) % self.dim)
+        counts = np.zeros((len(texts), self.dim), dtype=np.float32)
+        if rows:
+            np.add.at(counts, (np.asarray(rows), np.asarray(cols)), 1.0)
+        return counts
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        """
+        行ごとにL2正規化（ゼロベクトルはそのまま）
+
+        Args:
+            matrix: 行列
+
+        Returns:
+            正規化したfloat32行列
+        """
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return (matrix / np.where(norms == 0, 1, norms)).astype(np.float32)
+
+    @staticmethod
+    def _meta_path(path: str) -> str:
+        """行列の保存先に対応するメタデータの保存先"""
+        return os.path.splitext(path)[0] + '.json'
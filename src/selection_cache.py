@@ -0,0 +1,153 @@
+"""シーン選択結果のキャッシュモジュール"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Any, Iterable, List, Optional
+
+
+class SelectionCache:
+    """
+    シーン選択の結果を、入力の内容から求めたキーで保存するキャッシュ
+
+    キーは正規化したシナリオ、コンテンツのフィンガープリント、モデル名、選択の設定の
+    ハッシュで、入力が同じであればLLMを呼び出さずに前回と同じ結果を返す。
+    エントリはキーをファイル名とするJSONファイルとして保存する。
+    """
+
+    VERSION = 1
+
+    def __init__(self, cache_dir: str):
+        """
+        コンストラクタ
+
+        Args:
+            cache_dir: キャッシュを保存するディレクトリ
+        """
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize_scenario(scenario: Any) -> Any:
+        """
+        シナリオを正規化（文字列の前後の空白を除き、キーの順序に依存しない形にする）
+
+        Args:
+            scenario: シナリオ（またはその一部）
+
+        Returns:
+            正規化したシナリオ
+        """
+        if isinstance(scenario, dict):
+            return {str(k): SelectionCache.normalize_scenario(v) for k, v in sorted(scenario.items())}
+        if isinstance(scenario, (list, tuple)):
+            return [SelectionCache.normalize_scenario(v) for v in scenario]
+        if isinstance(scenario, str):
+            return scenario.strip()
+        return scenario
+
+    @staticmethod
+    def fingerprint(contents: Iterable[Dict[str, Any]]) -> str:
+        """
+        コンテンツのフィンガープリントを計算
+
+        content_idと各シーンの内容（時間、トランスクリプトなど）が同じであれば同じ値になる。
+
+        Args:
+            contents: コンテンツ情報
+
+        Returns:
+            16進数のハッシュ文字列
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for content in contents:
+            digest.update(json.dumps(content['content_id'], ensure_ascii=False).encode('utf-8'))
+            for scene in content.get('scenes', []):
+                digest.update(json.dumps(scene, ensure_ascii=False, sort_keys=True,
+                                         default=str).encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def make_key(self, scenario: Dict[str, Any], fingerprint: str, model_name: str,
+                 settings: Optional[Dict[str, Any]] = None) -> str:
+        """
+        キャッシュのキーを作成
+
+        Args:
+            scenario: シナリオ
+            fingerprint: コンテンツのフィンガープリント
+            model_name: 生成AIのモデル名
+            settings: 結果に影響する選択の設定
+
+        Returns:
+            16進数のハッシュ文字列
+        """
+        payload = json.dumps({
+            'version': self.VERSION,
+            'scenario': self.normalize_scenario(scenario),
+            'contents': fingerprint,
+            'model': model_name,
+            'settings': settings or {},
+        }, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+        return hashlib.blake2b(payload.encode('utf-8'), digest_size=20).hexdigest()
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        キャッシュされた選択結果を取得
+
+        Args:
+            key: キャッシュのキー
+
+        Returns:
+            選択シーンのリスト（キャッシュがない・読み込めない場合はNone）
+        """
+        path = self._entry_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            if entry.get('version') != self.VERSION or entry.get('key') != key:
+                raise ValueError("キャッシュの形式が一致しません")
+            result = entry['selected_scenes']
+        except FileNotFoundError:
+            result = None
+        except Exception as e:
+            print(f"警告: シーン選択のキャッシュ {path} を読み込めませんでした: {str(e)}")
+            result = None
+
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return result
+
+    def put(self, key: str, selected_scenes: List[Dict[str, Any]], model_name: str = '') -> None:
+        """
+        選択結果を保存（一時ファイル経由で置き換える）
+
+        Args:
+            key: キャッシュのキー
+            selected_scenes: 選択シーンのリスト
+            model_name: 生成AIのモデル名（確認用に記録する）
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._entry_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        entry = {
+            'version': self.VERSION,
+            'key': key,
+            'model': model_name,
+            'created_at': datetime.now().isoformat(),
+            'selected_scenes': selected_scenes,
+        }
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _entry_path(self, key: str) -> str:
+        """キーに対応するエントリのパス"""
+        return os.path.join(self.cache_dir, f"{key}.json")
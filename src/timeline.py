@@ -0,0 +1,202 @@
+"""タイムライン組み立てモジュール"""
+
+from bisect import bisect_left, bisect_right
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+from .scenario_diff import section_key
+
+
+class IntervalSet:
+    """
+    1つのクリップで使用済みの区間を、重なりのない区間の開始時間順のリストとして保持するクラス
+
+    追加した区間は隣接・重なる区間と結合するため、常に互いに素な区間の列になり、
+    区間の検索は二分探索でO(log n)、追加は結合する区間の数kに対してO(log n + k)で行える。
+    """
+
+    def __init__(self):
+        """コンストラクタ"""
+        self._starts: List[float] = []
+        self._ends: List[float] = []
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def uncovered(self, start: float, end: float) -> List[Tuple[float, float]]:
+        """
+        区間のうち、まだ使われていない部分を取得
+
+        Args:
+            start: 開始時間
+            end: 終了時間
+
+        Returns:
+            使われていない部分の区間のリスト（開始時間順）
+        """
+        pieces = []
+        cursor = start
+        i = bisect_right(self._ends, start)
+        while i < len(self._starts) and self._starts[i] < end:
+            if self._starts[i] > cursor:
+                pieces.append((cursor, self._starts[i]))
+            cursor = max(cursor, self._ends[i])
+            i += 1
+        if cursor < end:
+            pieces.append((cursor, end))
+        return pieces
+
+    def add(self, start: float, end: float) -> None:
+        """
+        区間を使用済みにする（隣接・重なる区間とは結合する）
+
+        Args:
+            start: 開始時間
+            end: 終了時間
+        """
+        lo = bisect_left(self._ends, start)
+        hi = bisect_right(self._starts, end)
+        if lo < hi:
+            start = min(start, self._starts[lo])
+            end = max(end, self._ends[hi - 1])
+        self._starts[lo:hi] = [start]
+        self._ends[lo:hi] = [end]
+
+
+class TimelineAssembler:
+    """
+    選択シーンを、重なりのない編集後のタイムラインに組み立てるクラス
+
+    シーンは渡された順（選択の優先順）に処理する。同じクリップで先に使った区間と重なる
+    シーンは、使われていない部分のうち最も長い区間に切り詰め、残りがmin_length未満なら
+    重複として除く。シナリオのセクションに尺（duration）がある場合は、セクションの尺を
+    超えるシーンを切り詰め・除き、足りない尺はsection_reportで不足として報告する。
+    採用したシーンには編集後のタイムライン上の位置（record_start、record_end）を付ける。
+
+    各シーンは到着順に確定するため、ストリーミングで受け取る選択結果にもそのまま使える。
+    1つのインスタンスで組み立てるタイムラインは1つ。
+    """
+
+    def __init__(self, scenario: Optional[Dict[str, Any]] = None, min_length: float = 0.5):
+        """
+        コンストラクタ
+
+        Args:
+            scenario: シナリオ（Noneの場合やセクションに尺がない場合は尺の調整を行わない）
+            min_length: タイムラインに残すシーンの最短の長さ（秒）
+        """
+        self.min_length = min_length
+        self.position = 0.0
+        self.stats = {'entries': 0, 'trimmed': 0, 'duplicates': 0, 'shortened': 0, 'overflow': 0, 'invalid': 0}
+        self._clips: Dict[str, IntervalSet] = {}
+        self._targets = self._section_targets(scenario)
+        self._filled: Dict[str, float] = {section_id: 0.0 for section_id in self._targets}
+
+    @staticmethod
+    def _section_targets(scenario: Optional[Dict[str, Any]]) -> Dict[str, float]:
+        """
+        セクションIDごとの目標の尺を取得
+
+        Args:
+            scenario: シナリオ
+
+        Returns:
+            セクションID → 尺（秒）の辞書（尺の指定がない場合は空）
+        """
+        sections = (scenario or {}).get('sections', [])
+        if not sections:
+            return {}
+        default_duration = float(scenario.get('total_duration') or 0) / len(sections)
+        targets = {}
+        for i, section in enumerate(sections):
+            try:
+                duration = float(section.get('duration') or default_duration)
+            except (TypeError, ValueError):
+                duration = default_duration
+            if duration > 0:
+                targets[section_key(section, i)] = duration
+        return targets
+
+    def add(self, scene: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        シーンをタイムラインの末尾に追加
+
+        Args:
+            scene: 選択シーン（content_id、start_time、end_timeを含む）
+
+        Returns:
+            record_startとrecord_endを付けたシーン（除いた場合はNone）
+        """
+        try:
+            start = float(scene['start_time'])
+            end = float(scene['end_time'])
+            clip = self._clips.setdefault(scene['content_id'], IntervalSet())
+        except (KeyError, TypeError, ValueError):
+            self.stats['invalid'] += 1
+            return None
+        if end - start < self.min_length:
+            self.stats['invalid'] += 1
+            return None
+
+        pieces = clip.uncovered(start, end)
+        piece_start, piece_end = max(pieces, key=lambda p: p[1] - p[0], default=(start, start))
+        if piece_end - piece_start < self.min_length:
+            self.stats['duplicates'] += 1
+            return None
+        if (piece_start, piece_end) != (start, end):
+            self.stats['trimmed'] += 1
+
+        section_id = scene.get('section_id')
+        if section_id in self._targets:
+            remaining = self._targets[section_id] - self._filled[section_id]
+            if remaining < self.min_length:
+                self.stats['overflow'] += 1
+                return None
+            if piece_end - piece_start > remaining:
+                piece_end = piece_start + remaining
+                self.stats['shortened'] += 1
+            self._filled[section_id] += piece_end - piece_start
+
+        clip.add(piece_start, piece_end)
+        entry = dict(scene, start_time=piece_start, end_time=piece_end,
+                     record_start=self.position, record_end=self.position + piece_end - piece_start)
+        self.position = entry['record_end']
+        self.stats['entries'] += 1
+        return entry
+
+    def stream(self, scenes: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        選択シーンを順に追加し、採用したシーンを返す
+
+        Args:
+            scenes: 選択シーン
+
+        Yields:
+            record_startとrecord_endを付けたシーン
+        """
+        for scene in scenes:
+            entry = self.add(scene)
+            if entry is not None:
+                yield entry
+
+    def assemble(self, scenes: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        選択シーンからタイムラインを組み立てる
+
+        Args:
+            scenes: 選択シーン
+
+        Returns:
+            record_startとrecord_endを付けたシーンのリスト（タイムライン順）
+        """
+        return list(self.stream(scenes))
+
+    def section_report(self) -> List[Dict[str, Any]]:
+        """
+        セクションごとの尺の過不足を取得
+
+        Returns:
+            section_id、target（目標の尺）、duration（組み立てた尺）、gap（不足する尺）を含む辞書のリスト
+        """
+        return [{'section_id': section_id, 'target': target, 'duration': self._filled[section_id],
+                 'gap': max(0.0, target - self._filled[section_id])}
+                for section_id, target in self._targets.items()]
@@ -0,0 +1,196 @@
+"""複数ボリュームのクロールモジュール"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterator, List, Optional
+
+from .content import Content
+from .content_crawler import ContentCrawler
+
+
+class VolumeCrawler:
+    """
+    複数の入力ディレクトリ（SDカードリーダー、USBディスクなど）を並行してクロールするクラス
+
+    入力ディレクトリをデバイス（st_dev）ごとにまとめ、デバイスごとに別のスレッドプールで
+    nodes.jsonを読み込む。遅いカードの読み込み待ちが速いSSDの読み込みを妨げないように、
+    同時読み込み数の上限はデバイス単位で管理する。
+    読み込んだコンテンツは入力ディレクトリごとの上限付きキューで順に受け渡すため、
+    まだ返す順番が来ていない入力ディレクトリもbuffer_size件より先には読み込まない。
+    """
+
+    # キューで受け渡す項目の種類
+    _CONTENT, _DONE, _FAILED = range(3)
+
+    def __init__(self, crawler: ContentCrawler, device_workers: int = 2,
+                 device_limits: Optional[Dict[str, int]] = None, buffer_size: int = 64):
+        """
+        コンストラクタ
+
+        Args:
+            crawler: nodes.jsonの読み込みに使うContentCrawler
+            device_workers: 1デバイスあたりの同時読み込み数
+            device_limits: 入力ディレクトリごとの同時読み込み数の指定
+                （同じデバイス上の入力ディレクトリで指定が異なる場合は最大値を使う）
+            buffer_size: 入力ディレクトリごとに、返す前に保持するコンテンツ数の上限
+        """
+        self.crawler = crawler
+        self.device_workers = max(1, int(device_workers))
+        self.device_limits = device_limits or {}
+        self.buffer_size = max(1, int(buffer_size))
+        self.last_stats: List[Dict[str, Any]] = []
+
+    def crawl(self, input_dirs: List[str]) -> List[Dict[str, Any]]:
+        """
+        すべての入力ディレクトリをクロールし、結果を入力ディレクトリの順に結合して返す
+
+        Args:
+            input_dirs: 入力ディレクトリのリスト
+
+        Returns:
+            source_rootを付与したコンテンツ情報のリスト
+        """
+        return list(self.iter_contents(input_dirs))
+
+    def iter_contents(self, input_dirs: List[str]) -> Iterator[Dict[str, Any]]:
+        """
+        入力ディレクトリを並行してクロールし、入力ディレクトリの順にコンテンツを返す
+
+        すべての入力ディレクトリの読み込みを同時に開始し、先頭の入力ディレクトリから
+        読み込んだコンテンツを順に返す。途中で返すのをやめた場合は読み込みを中止する。
+
+        Args:
+            input_dirs: 入力ディレクトリのリスト
+
+        Yields:
+            source_rootを付与したコンテンツ情報
+        """
+        devices = self._group_by_device(input_dirs)
+        roots = [root for root in input_dirs if root in devices]
+        self.last_stats = []
+        if not roots:
+            return
+
+        limits: Dict[int, int] = {}
+        for root in roots:
+            limit = int(self.device_limits.get(root, self.device_workers))
+            limits[devices[root]] = max(limits.get(devices[root], 1), limit)
+        io_pools = {device: ThreadPoolExecutor(max_workers=limit,
+                                               thread_name_prefix=f"crawl-dev{device}")
+                    for device, limit in limits.items()}
+        root_pool = ThreadPoolExecutor(max_workers=len(roots))
+        stop = threading.Event()
+        queues = [queue.Queue(maxsize=self.buffer_size) for _ in roots]
+        try:
+            for root, results in zip(roots, queues):
+                root_pool.submit(self._crawl_root, root, devices[root],
+                                 io_pools[devices[root]], limits[devices[root]], results, stop)
+            for results in queues:
+                while True:
+                    kind, value = results.get()
+                    if kind == self._CONTENT:
+                        yield value
+                    elif kind == self._DONE:
+                        self.last_stats.append(value)
+                        break
+                    else:
+                        raise value
+        finally:
+            # 読み込み中のスレッドがキューの空きを待ち続けないよう、中止を伝えてから終了を待つ
+            stop.set()
+            root_pool.shutdown(wait=True, cancel_futures=True)
+            for pool in io_pools.values():
+                pool.shutdown(wait=True, cancel_futures=True)
+
+        changes = {'added': [], 'modified': [], 'removed': []}
+        for root in roots:
+            for key, content_ids in self.crawler.root_changes.get(root, {}).items():
+                changes[key].extend(content_ids)
+        self.crawler.last_changes = changes
+
+    def _group_by_device(self, input_dirs: List[str]) -> Dict[str, int]:
+        """
+        入力ディレクトリのデバイス番号を取得（参照できないディレクトリは除く）
+
+        Args:
+            input_dirs: 入力ディレクトリのリスト
+
+        Returns:
+            入力ディレクトリをキー、デバイス番号を値とする辞書
+        """
+        devices = {}
+        for root in input_dirs:
+            try:
+                devices[root] = os.stat(root).st_dev
+            except OSError as e:
+                print(f"警告: 入力ディレクトリ {root} を参照できません: {str(e)}")
+        return devices
+
+    @staticmethod
+    def _put(results: queue.Queue, item: tuple, stop: threading.Event) -> bool:
+        """
+        キューに空きができるまで待って項目を入れる
+
+        Returns:
+            入れた場合はTrue（中止された場合はFalse）
+        """
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _crawl_root(self, root: str, device: int, io_pool: ThreadPoolExecutor, limit: int,
+                    results: queue.Queue, stop: threading.Event) -> None:
+        """
+        1つの入力ディレクトリをクロールし、読み込んだコンテンツから順にキューに入れる
+
+        最後にスループットの統計情報を、失敗した場合は例外をキューに入れる。
+
+        Args:
+            root: 入力ディレクトリ
+            device: 入力ディレクトリのデバイス番号
+            io_pool: デバイスで共有するスレッドプール
+            limit: デバイスの同時読み込み数
+            results: コンテンツを受け渡す上限付きのキュー
+            stop: 読み込みの中止を伝えるイベント
+        """
+        start = time.perf_counter()
+        content_count = 0
+        scene_count = 0
+        contents = self.crawler.iter_contents(root, read_ahead=limit, io_pool=io_pool)
+        try:
+            for content in contents:
+                if isinstance(content, Content):
+                    scene_count += content.scene_count
+                    content.header = dict(content.header, source_root=root)
+                else:
+                    scene_count += len(content.get('scenes', []))
+                    content = dict(content, source_root=root)
+                if not self._put(results, (self._CONTENT, content), stop):
+                    return
+                content_count += 1
+        except Exception as e:
+            self._put(results, (self._FAILED, e), stop)
+            return
+        finally:
+            contents.close()
+        elapsed = time.perf_counter() - start
+
+        stats = {
+            'root': root,
+            'device': device,
+            'workers': limit,
+            'content_count': content_count,
+            'scene_count': scene_count,
+            'seconds': elapsed,
+            'contents_per_second': content_count / elapsed if elapsed > 0 else 0.0
+        }
+        print(f"{root}: {content_count}件 / {scene_count}シーン / {elapsed:.2f}秒 "
+              f"({stats['contents_per_second']:.1f}件/秒, デバイス {device}, 同時読み込み {limit})")
+        self._put(results, (self._DONE, stats), stop)
@@ -0,0 +1,156 @@
+"""非同期のAPI呼び出しクライアントのテスト"""
+
+import unittest
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from google.api_core import exceptions as api_exceptions
+
+# テスト対象のモジュールパスを追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.async_api_client import AsyncGeminiClient
+from src.rate_limiter import Backoff, KeyRateLimiter
+from src.response_cache import ResponseCache
+
+
+class FakeSession:
+    """キーごとの同時リクエスト数を記録するセッション"""
+
+    def __init__(self, api_key, log, fail=False):
+        self.api_key = api_key
+        self.log = log
+        self.fail = fail
+        self.active = 0
+
+    async def generate_content_async(self, contents):
+        self.active += 1
+        self.log['max_active'][self.api_key] = max(self.log['max_active'].get(self.api_key, 0), self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        self.log['keys'].append(self.api_key)
+        if self.fail:
+            raise api_exceptions.ServiceUnavailable("503 unavailable")
+        prompt = contents if isinstance(contents, str) else contents[0]
+        return MagicMock(text=f'```json\n{{"prompt": "{prompt.splitlines()[0]}"}}\n```')
+
+
+class TestAsyncGeminiClient(unittest.TestCase):
+    """AsyncGeminiClientクラスのテスト"""
+
+    def setUp(self):
+        self.log = {'keys': [], 'max_active': {}}
+        self.failing = set()
+
+    def make_client(self, keys, **kwargs):
+        return AsyncGeminiClient(
+            api_keys=keys,
+            session_factory=lambda key: FakeSession(key, self.log, fail=key in self.failing),
+            backoff=Backoff(base=0.001),
+            **kwargs
+        )
+
+    def test_requests_are_spread_across_keys(self):
+        """リクエストがキー全体に振り分けられ、キーごとの同時実行数を超えないかテスト"""
+        client = self.make_client(['k1', 'k2', 'k3'], per_key_concurrency=2)
+        prompts = [f"p{i}" for i in range(30)]
+
+        results = client.text_analysis_batch(prompts)
+
+        self.assertEqual(results, [f'{{"prompt": "p{i}"}}' for i in range(30)])
+        self.assertEqual(client.requests_per_key, [10, 10, 10])
+        self.assertEqual(self.log['max_active'], {'k1': 2, 'k2': 2, 'k3': 2})
+
+    def test_failed_request_is_retried_on_another_key(self):
+        """失敗したリクエストを別のキーで再試行するかテスト"""
+        self.failing.add('k1')
+        client = self.make_client(['k1', 'k2'], per_key_concurrency=1)
+
+        results = client.text_analysis_batch(["a", "b"])
+
+        self.assertEqual(results, ['{"prompt": "a"}', '{"prompt": "b"}'])
+        self.assertEqual(self.log['keys'].count('k2'), 2)
+
+    def test_all_attempts_fail(self):
+        """すべての試行に失敗した場合は空のJSONを返すかテスト"""
+        self.failing.update(['k1', 'k2'])
+        client = self.make_client(['k1', 'k2'])
+
+        self.assertEqual(client.text_analysis_batch(["a"]), ["{}"])
+        self.assertEqual(len(self.log['keys']), client.max_attempts)
+
+    def test_rate_limited_key_is_skipped(self):
+        """429を返したキーを避け、別のキーで再試行するかテスト"""
+        client = self.make_client(['k1', 'k2'], per_key_concurrency=1)
+
+        async def run():
+            client._prepare_loop()
+            client._sessions[0] = MagicMock()
+            client._sessions[0].generate_content_async.side_effect = \
+                api_exceptions.ResourceExhausted("429 quota, retry in 30s")
+            return await client.gather_text_analysis(["a", "b", "c"])
+
+        results = asyncio.run(run())
+
+        self.assertEqual(results, ['{"prompt": "a"}', '{"prompt": "b"}', '{"prompt": "c"}'])
+        self.assertEqual(client._sessions[0].generate_content_async.call_count, 1)
+        self.assertEqual(client.rate_limiter.blocked_keys(), [0])
+
+    def test_rpm_limit_spreads_over_time(self):
+        """キーごとのRPMの上限を超えてリクエストを送らないかテスト"""
+        limiter = KeyRateLimiter(2, rpm=600, burst=2)
+        client = self.make_client(['k1', 'k2'], per_key_concurrency=4, rate_limiter=limiter)
+
+        client.text_analysis_batch([f"p{i}" for i in range(8)])
+
+        # 各キーは2件まですぐに送れ、その後は0.1秒に1件ずつ補充される
+        self.assertEqual(sorted(self.log['keys']), ['k1'] * 4 + ['k2'] * 4)
+        self.assertEqual(max(self.log['max_active'].values()), 2)
+
+    def test_programming_error_is_raised(self):
+        """APIの例外でないエラーは再試行せず、呼び出し元に伝えるかテスト"""
+        client = self.make_client(['k1', 'k2'])
+        client._session_factory = lambda key: MagicMock(generate_content_async=MagicMock(side_effect=TypeError("bug")))
+
+        with self.assertRaises(TypeError):
+            client.text_analysis_batch(["a"])
+
+    def test_default_session_uses_key_client(self):
+        """既定のセッションが、キーを指定した公開の非同期クライアントでリクエストを送るかテスト"""
+        from google.ai import generativelanguage as glm
+
+        response = glm.GenerateContentResponse(candidates=[{'content': {'parts': [{'text': '{"ok": true}'}]}}])
+        with patch('google.ai.generativelanguage.GenerativeServiceAsyncClient') as client_class:
+            client_class.return_value.generate_content = AsyncMock(return_value=response)
+            client = AsyncGeminiClient(api_keys=['k1', 'k2'], per_key_concurrency=1)
+            results = client.text_analysis_batch(["a", "b"])
+
+        self.assertEqual(results, ['{"ok": true}', '{"ok": true}'])
+        self.assertEqual(sorted(call.kwargs['client_options']['api_key'] for call in client_class.call_args_list),
+                         ['k1', 'k2'])
+
+    def test_no_keys(self):
+        """APIキーがない場合は空のJSONを返すかテスト"""
+        self.assertEqual(self.make_client([]).text_analysis_batch(["a"]), ["{}"])
+
+    def test_response_cache_is_shared(self):
+        """応答キャッシュを使い、同じプロンプトはリクエストしないかテスト"""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            cache = ResponseCache(os.path.join(temp_dir, 'responses.sqlite3'))
+            client = self.make_client(['k1'], response_cache=cache)
+            client.text_analysis_batch(["a", "b"])
+            client.text_analysis_batch(["a", "b", "c"])
+
+            self.assertEqual(len(self.log['keys']), 3)
+            self.assertEqual(cache.hits, 2)
+            cache.close()
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
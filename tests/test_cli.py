@@ -0,0 +1,104 @@
+"""CLIのテスト"""
+
+import unittest
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+from unittest.mock import patch
+
+# テスト対象のモジュールパスを追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import cli
+from src.llm_backend import LLMBackend, LLMResponse
+from src.main import VideoEditAgent
+from tests.test_scenario_diff import respond_by_section
+from tests.test_scene_ranker import make_contents
+from tests.test_scene_selector import SCENARIO
+
+
+class SectionBackend(LLMBackend):
+    """プロンプトに含まれるセクションごとにシーンを選んだ応答を返すバックエンド"""
+
+    requires_api_key = False
+
+    def __init__(self):
+        self.calls = 0
+
+    def offline_keys(self):
+        return ['offline-1']
+
+    def generate(self, model_name, prompt, image_hash=None):
+        self.calls += 1
+        return LLMResponse(respond_by_section(prompt))
+
+
+class TestCLI(unittest.TestCase):
+    """select・generateコマンドのテスト"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.output_dir = os.path.join(self.temp_dir, 'output')
+        os.makedirs(self.output_dir)
+        for name, data in (('contents.json', make_contents(3)), ('scenario.json', SCENARIO)):
+            with open(os.path.join(self.output_dir, name), 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+        self.config_path = os.path.join(self.temp_dir, 'config.json')
+        with open(self.config_path, 'w', encoding='utf-8') as f:
+            json.dump({'output_dir': self.output_dir, 'options': {'incremental_selection': False}}, f)
+        self.backend = SectionBackend()
+        env = patch.dict(os.environ, {'GEMINI_API_KEY': ''})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def run_cli(self, *args):
+        """CLIを実行し、終了コードと作成したエージェントを返す"""
+        agents = []
+
+        def create_agent(config):
+            agents.append(VideoEditAgent(config, llm_backend=self.backend))
+            return agents[-1]
+
+        with patch.object(sys, 'argv', ['cli', *args, '-c', self.config_path]), \
+                patch('src.cli.VideoEditAgent', side_effect=create_agent), \
+                contextlib.redirect_stdout(io.StringIO()):
+            code = cli.main()
+        for agent in agents:
+            agent.response_cache.close()
+        return code, agents[0]
+
+    def test_select_and_generate(self):
+        """selectでselected.jsonを保存し、generateでそこからEDLとSRTを生成するかテスト"""
+        code, _ = self.run_cli('select')
+        self.assertEqual(code, 0)
+        with open(os.path.join(self.output_dir, 'selected.json'), encoding='utf-8') as f:
+            self.assertEqual([s['section_id'] for s in json.load(f)['scenes']], ['intro', 'main_1', 'outro'])
+
+        code, _ = self.run_cli('generate')
+        self.assertEqual(code, 0)
+        self.assertTrue(os.path.exists(os.path.join(self.output_dir, 'output.edl')))
+        self.assertTrue(os.path.exists(os.path.join(self.output_dir, 'output.srt')))
+
+    def test_no_cache_skips_selection_and_response_caches(self):
+        """--no-cacheで、シーン選択と応答のキャッシュを読まずに生成AIを呼び出すかテスト"""
+        self.run_cli('select')
+        self.assertEqual(self.backend.calls, 1)
+        self.run_cli('select')
+        self.assertEqual(self.backend.calls, 1)
+
+        code, agent = self.run_cli('select', '--no-cache')
+
+        self.assertEqual(code, 0)
+        self.assertTrue(agent.scene_selector.bypass_cache)
+        self.assertTrue(agent.api_client.bypass_cache)
+        self.assertEqual(self.backend.calls, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,269 @@
+"""ContentCrawlerのテスト"""
+
+import unittest
+import json
+import os
+import sys
+import tempfile
+import shutil
+from unittest.mock import MagicMock, patch
+
+# テスト対象のモジュールパスを追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.content import Content
+from src.content_crawler import ContentCrawler
+from src.content_discovery import DirectoryScanner
+from src.scenario_writer import ScenarioWriter
+from src.scene_table import SceneTable
+
+
+def write_nodes(root, name, scenes, duration=60.0, topics=None):
+    """テスト用のvideo_nodes_ディレクトリを作成"""
+    content_dir = os.path.join(root, name)
+    os.makedirs(content_dir, exist_ok=True)
+    data = {
+        "metadata": {"duration": duration},
+        "summary": {"topics": topics or ["登山"]},
+        "scenes": scenes
+    }
+    with open(os.path.join(content_dir, 'nodes.json'), 'w', encoding='utf-8-sig') as f:
+        json.dump(data, f, ensure_ascii=False)
+    return content_dir
+
+
+class TestContentCrawler(unittest.TestCase):
+    """ContentCrawlerクラスのテスト"""
+
+    def setUp(self):
+        self.input_dir = tempfile.mkdtemp()
+        for i in range(6):
+            write_nodes(self.input_dir, f"video_nodes_GH01{i:04d}", [
+                {"start": 10.0, "end": 20.0,
+                 "transcripts": [{"text": "こんにちは"}, {"text": "山です"}],
+                 "context_analysis": {"activity": ["歩いている"]}},
+                {"start": 0.0, "end": 10.0, "transcripts": []}
+            ], duration=20.0 + i)
+        # 壊れたnodes.jsonと、nodes.jsonのないディレクトリ
+        broken_dir = os.path.join(self.input_dir, "video_nodes_broken")
+        os.makedirs(broken_dir)
+        with open(os.path.join(broken_dir, 'nodes.json'), 'w', encoding='utf-8') as f:
+            f.write("{not json")
+        os.makedirs(os.path.join(self.input_dir, "video_nodes_empty"))
+        os.makedirs(os.path.join(self.input_dir, "other_dir"))
+
+    def tearDown(self):
+        shutil.rmtree(self.input_dir)
+
+    def test_crawl_serial(self):
+        """逐次クロールでシーンが整形されるかテスト"""
+        contents = ContentCrawler().crawl(self.input_dir)
+
+        self.assertEqual(len(contents), 6)
+        content = contents[0]
+        self.assertTrue(content['content_id'].startswith('video_nodes_GH01'))
+        # 開始時間順にソートされていること
+        self.assertEqual(content['scenes'][0]['start_time'], 0.0)
+        self.assertEqual(content['scenes'][1]['transcript'], "こんにちは 山です")
+        self.assertEqual(content['scenes'][1]['keywords'], ["歩いている"])
+        self.assertEqual(content['scenes'][1]['topics'], ["登山"])
+
+    def test_crawl_threads_keeps_order(self):
+        """スレッド並列クロールが逐次クロールと同じ結果・順序になるかテスト"""
+        serial = ContentCrawler().crawl(self.input_dir)
+        threaded = ContentCrawler(max_workers=4).crawl(self.input_dir)
+
+        self.assertEqual(serial, threaded)
+
+    def test_crawl_processes_keeps_order(self):
+        """プロセスでデコードする場合も逐次クロールと同じ結果・順序になるかテスト"""
+        serial = ContentCrawler().crawl(self.input_dir)
+        processed = ContentCrawler(max_workers=2, use_processes=True).crawl(self.input_dir)
+
+        self.assertEqual(serial, processed)
+
+    def test_iter_contents_matches_crawl(self):
+        """iter_contentsが先読みの有無にかかわらずcrawlと同じ順序で返すかテスト"""
+        crawler = ContentCrawler()
+        expected = crawler.crawl(self.input_dir)
+
+        self.assertEqual(list(crawler.iter_contents(self.input_dir)), expected)
+        self.assertEqual(list(crawler.iter_contents(self.input_dir, read_ahead=3)), expected)
+
+    def test_iter_contents_can_stop_early(self):
+        """iter_contentsを途中で打ち切れるかテスト"""
+        iterator = ContentCrawler(max_workers=2).iter_contents(self.input_dir, read_ahead=2)
+        first = next(iterator)
+        iterator.close()
+
+        self.assertIn('scenes', first)
+
+    def test_crawl_compact(self):
+        """compactモードでもシーンを従来と同じように参照できるかテスト"""
+        expected = ContentCrawler().crawl(self.input_dir)
+        contents = ContentCrawler(compact=True).crawl(self.input_dir)
+
+        self.assertEqual(len(contents), len(expected))
+        for content, plain in zip(contents, expected):
+            self.assertEqual(content['content_id'], plain['content_id'])
+            self.assertEqual(list(content['scenes']), plain['scenes'])
+
+    def test_crawl_recursive(self):
+        """DirectoryScannerを指定すると入れ子のディレクトリも読み込むかテスト"""
+        nested_root = os.path.join(self.input_dir, "2024-05-01", "100GOPRO")
+        write_nodes(nested_root, "video_nodes_GH019999", [{"start": 0.0, "end": 3.0}])
+
+        flat = ContentCrawler().crawl(self.input_dir)
+        nested = ContentCrawler(scanner=DirectoryScanner()).crawl(self.input_dir)
+
+        self.assertEqual(len(flat), 6)
+        self.assertEqual(len(nested), 7)
+        self.assertIn("video_nodes_GH019999", [c['content_id'] for c in nested])
+
+    def test_crawl_missing_input_dir(self):
+        """存在しないディレクトリの場合は空のリストを返すかテスト"""
+        contents = ContentCrawler(max_workers=4).crawl(os.path.join(self.input_dir, "missing"))
+
+        self.assertEqual(contents, [])
+
+
+class TestContentCrawlerIndex(unittest.TestCase):
+    """クロールインデックスを使ったContentCrawlerのテスト"""
+
+    def setUp(self):
+        self.input_dir = tempfile.mkdtemp()
+        self.output_dir = tempfile.mkdtemp()
+        self.index_path = os.path.join(self.output_dir, 'crawl_index.json')
+        self.scenes = [{"start": 0.0, "end": 5.0, "transcripts": [{"text": "出発"}]}]
+        for name in ("video_nodes_A", "video_nodes_B"):
+            write_nodes(self.input_dir, name, self.scenes)
+
+    def tearDown(self):
+        shutil.rmtree(self.input_dir)
+        shutil.rmtree(self.output_dir)
+
+    def test_first_crawl_reports_added(self):
+        """初回クロールで全ディレクトリが追加として報告されるかテスト"""
+        crawler = ContentCrawler(index_path=self.index_path)
+        contents = crawler.crawl(self.input_dir)
+
+        self.assertEqual(len(contents), 2)
+        self.assertEqual(sorted(crawler.last_changes['added']), ["video_nodes_A", "video_nodes_B"])
+        self.assertTrue(os.path.exists(self.index_path))
+
+    def test_unchanged_crawl_skips_decoding(self):
+        """変更がない場合はデコードせずにインデックスの内容を返すかテスト"""
+        expected = ContentCrawler(index_path=self.index_path).crawl(self.input_dir)
+
+        crawler = ContentCrawler(index_path=self.index_path)
+        with patch("src.content_crawler._build_content") as mock_build:
+            contents = crawler.crawl(self.input_dir)
+
+        mock_build.assert_not_called()
+        self.assertEqual(contents, expected)
+        self.assertEqual(crawler.last_changes, {'added': [], 'modified': [], 'removed': []})
+
+    def test_touched_file_with_same_content_is_not_modified(self):
+        """更新時刻だけが変わった場合は変更として扱わないかテスト"""
+        ContentCrawler(index_path=self.index_path).crawl(self.input_dir)
+        nodes_file = os.path.join(self.input_dir, "video_nodes_A", 'nodes.json')
+        os.utime(nodes_file, (0, 0))
+
+        crawler = ContentCrawler(index_path=self.index_path)
+        with patch("src.content_crawler._build_content") as mock_build:
+            crawler.crawl(self.input_dir)
+
+        mock_build.assert_not_called()
+        self.assertEqual(crawler.last_changes['modified'], [])
+
+    def test_reports_modified_and_removed(self):
+        """変更・追加・削除されたディレクトリが報告されるかテスト"""
+        ContentCrawler(index_path=self.index_path).crawl(self.input_dir)
+        write_nodes(self.input_dir, "video_nodes_A", self.scenes + [{"start": 5.0, "end": 9.0}])
+        shutil.rmtree(os.path.join(self.input_dir, "video_nodes_B"))
+        write_nodes(self.input_dir, "video_nodes_C", self.scenes)
+
+        crawler = ContentCrawler(index_path=self.index_path)
+        contents = crawler.crawl(self.input_dir)
+
+        self.assertEqual(crawler.last_changes, {
+            'added': ["video_nodes_C"],
+            'modified': ["video_nodes_A"],
+            'removed': ["video_nodes_B"]
+        })
+        scene_counts = {c['content_id']: len(c['scenes']) for c in contents}
+        self.assertEqual(scene_counts, {"video_nodes_A": 2, "video_nodes_C": 1})
+
+
+
+class TestContentCrawlerLazy(unittest.TestCase):
+    """シーンを遅延読み込みするContentCrawlerのテスト"""
+
+    def setUp(self):
+        self.input_dir = tempfile.mkdtemp()
+        for i in range(3):
+            write_nodes(self.input_dir, f"video_nodes_{i}", [
+                {"start": 5.0, "end": 9.0, "transcripts": [{"text": "到着"}],
+                 "context_analysis": {"activity": ["休憩"]}},
+                {"start": 0.0, "end": 5.0, "transcripts": [{"text": "出発"}]}
+            ], duration=9.0 + i, topics=["登山", f"日{i}"])
+
+    def tearDown(self):
+        shutil.rmtree(self.input_dir)
+
+    def test_header_is_available_without_loading_scenes(self):
+        """シーンを読み込まずにヘッダー情報を参照できるかテスト"""
+        contents = ContentCrawler(lazy=True).crawl(self.input_dir)
+
+        content = contents[0]
+        self.assertIsInstance(content, Content)
+        self.assertFalse(content.is_loaded)
+        self.assertEqual(content.content_id, "video_nodes_0")
+        self.assertEqual(content.scene_count, 2)
+        self.assertEqual(content.topics, ["登山", "日0"])
+        self.assertEqual(content['total_duration'], 9.0)
+        self.assertFalse(content.is_loaded)
+
+    def test_scenes_are_loaded_once_and_releasable(self):
+        """シーンが初回参照時に読み込まれ、解放後は再度読み込まれるかテスト"""
+        expected = ContentCrawler().crawl(self.input_dir)
+        crawler = ContentCrawler(lazy=True)
+        contents = crawler.crawl(self.input_dir)
+
+        with patch.object(crawler, '_read_nodes', wraps=crawler._read_nodes) as mock_read:
+            first = contents[0]['scenes']
+            self.assertIs(contents[0]['scenes'], first)
+            self.assertEqual(mock_read.call_count, 1)
+
+            contents[0].release()
+            self.assertFalse(contents[0].is_loaded)
+            self.assertEqual(contents[0]['scenes'], first)
+            self.assertEqual(mock_read.call_count, 2)
+
+        self.assertEqual(contents, expected)
+
+    def test_lazy_compact_and_index(self):
+        """compactやクロールインデックスと組み合わせられるかテスト"""
+        index_path = os.path.join(self.input_dir, 'crawl_index.json')
+        ContentCrawler(lazy=True, compact=True, index_path=index_path).crawl(self.input_dir)
+        with open(index_path, 'r', encoding='utf-8-sig') as f:
+            self.assertNotIn('"scenes"', f.read())
+
+        crawler = ContentCrawler(lazy=True, compact=True, index_path=index_path)
+        with patch("src.content_crawler._build_header") as mock_build:
+            contents = crawler.crawl(self.input_dir)
+        mock_build.assert_not_called()
+        self.assertEqual(contents[2].scene_count, 2)
+        self.assertIsInstance(contents[2]['scenes'], SceneTable)
+        self.assertEqual(contents[2]['scenes'][0]['transcript'], "出発")
+
+    def test_concept_summary_does_not_load_scenes(self):
+        """コンセプト生成用の概要作成でシーンを読み込まないかテスト"""
+        writer = ScenarioWriter(api_client=MagicMock())
+        expected = writer._format_contents_summary(ContentCrawler().crawl(self.input_dir))
+        contents = ContentCrawler(lazy=True).crawl(self.input_dir)
+
+        self.assertEqual(writer._format_contents_summary(contents), expected)
+        self.assertFalse(any(c.is_loaded for c in contents))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+"""DirectoryScannerのテスト"""
+
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+
+# テスト対象のモジュールパスを追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.content_discovery import DirectoryScanner
+
+
+class TestDirectoryScanner(unittest.TestCase):
+    """DirectoryScannerクラスのテスト"""
+
+    def setUp(self):
+        self.input_dir = tempfile.mkdtemp()
+        for rel_path in (
+            "video_nodes_top",
+            "2024-05-01/100GOPRO/video_nodes_GH010001",
+            "2024-05-01/101GOPRO/video_nodes_GH010002",
+            "2024-05-02/100GOPRO/video_nodes_GH020001",
+            "2024-05-02/100GOPRO/video_nodes_GH020001/frames/video_nodes_nested",
+            "trash/video_nodes_old",
+        ):
+            os.makedirs(os.path.join(self.input_dir, *rel_path.split('/')))
+        with open(os.path.join(self.input_dir, "video_nodes_file"), 'w') as f:
+            f.write("not a directory")
+
+    def tearDown(self):
+        shutil.rmtree(self.input_dir)
+
+    def relative(self, paths):
+        return [os.path.relpath(p, self.input_dir).replace(os.sep, '/') for p in paths]
+
+    def test_default_scans_recursively_in_path_order(self):
+        """再帰的に探索し、コンテンツディレクトリの中には入らないかテスト"""
+        found = self.relative(DirectoryScanner().scan(self.input_dir))
+
+        self.assertEqual(found, [
+            "2024-05-01/100GOPRO/video_nodes_GH010001",
+            "2024-05-01/101GOPRO/video_nodes_GH010002",
+            "2024-05-02/100GOPRO/video_nodes_GH020001",
+            "trash/video_nodes_old",
+            "video_nodes_top",
+        ])
+
+    def test_max_depth(self):
+        """max_depthより深いディレクトリを探索しないかテスト"""
+        self.assertEqual(self.relative(DirectoryScanner(max_depth=1).scan(self.input_dir)),
+                         ["video_nodes_top"])
+        self.assertEqual(len(DirectoryScanner(max_depth=2).scan(self.input_dir)), 2)
+        with self.assertRaises(ValueError):
+            DirectoryScanner(max_depth=0)
+
+    def test_include_and_exclude(self):
+        """include/excludeのglobパターンが名前と相対パスに適用されるかテスト"""
+        scanner = DirectoryScanner(include=["video_nodes_GH01*"], exclude=["101GOPRO"])
+        self.assertEqual(self.relative(scanner.scan(self.input_dir)),
+                         ["2024-05-01/100GOPRO/video_nodes_GH010001"])
+
+        scanner = DirectoryScanner(exclude=["trash", "2024-05-01/*"])
+        self.assertEqual(self.relative(scanner.scan(self.input_dir)), [
+            "2024-05-02/100GOPRO/video_nodes_GH020001",
+            "video_nodes_top",
+        ])
+
+    @unittest.skipIf(not hasattr(os, 'symlink') or os.name == 'nt', "シンボリックリンクが使えない環境")
+    def test_symlink_loop_is_not_followed_twice(self):
+        """シンボリックリンクのループで無限に探索しないかテスト"""
+        card_dir = os.path.join(self.input_dir, "2024-05-01", "100GOPRO")
+        os.symlink(self.input_dir, os.path.join(card_dir, "loop"))
+        os.symlink(card_dir, os.path.join(self.input_dir, "card_link"))
+
+        without_links = DirectoryScanner().scan(self.input_dir)
+        with_links = DirectoryScanner(follow_symlinks=True).scan(self.input_dir)
+
+        self.assertEqual(len(without_links), 5)
+        # card_linkの先は実体側で走査済みのため重複しない
+        self.assertEqual(len(with_links), 5)
+
+    def test_symlinked_content_dir_is_listed(self):
+        """コンテンツディレクトリ自体がシンボリックリンクの場合は列挙されるかテスト"""
+        if not hasattr(os, 'symlink') or os.name == 'nt':
+            self.skipTest("シンボリックリンクが使えない環境")
+        target = os.path.join(self.input_dir, "trash", "video_nodes_old")
+        os.symlink(target, os.path.join(self.input_dir, "video_nodes_link"))
+
+        found = self.relative(DirectoryScanner(max_depth=1).scan(self.input_dir))
+        self.assertEqual(found, ["video_nodes_link", "video_nodes_top"])
+
+    def test_no_extra_stat_for_plain_directories(self):
+        """通常のディレクトリだけの場合、ルート以外でstatしないかテスト"""
+        scanner = DirectoryScanner()
+        scanner.scan(self.input_dir)
+
+        self.assertEqual(scanner.stats['stat_calls'], 1)
+        self.assertEqual(scanner.stats['scanned_dirs'], 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+"""ContentWatcherのテスト"""
+
+import unittest
+import os
+import sys
+import time
+import tempfile
+import shutil
+from unittest.mock import patch
+
+# テスト対象のモジュールパスを追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.content_crawler import ContentCrawler
+from src.content_discovery import DirectoryScanner
+from src.content_watcher import ContentWatcher
+from tests.test_content_crawler import write_nodes
+
+
+class TestContentWatcher(unittest.TestCase):
+    """ContentWatcherクラスのテスト"""
+
+    def setUp(self):
+        self.input_dir = tempfile.mkdtemp()
+        self.scenes = [{"start": 0.0, "end": 5.0, "transcripts": [{"text": "出発"}]}]
+        self.now = time.time() + 60
+        self.watcher = ContentWatcher(ContentCrawler(), self.input_dir,
+                                      settle_seconds=2.0, clock=lambda: self.now)
+
+    def tearDown(self):
+        shutil.rmtree(self.input_dir)
+
+    def test_initial_poll_ingests_existing_dirs(self):
+        """既存のディレクトリが初回の走査で取り込まれるかテスト"""
+        write_nodes(self.input_dir, "video_nodes_A", self.scenes, duration=30.0)
+        write_nodes(self.input_dir, "video_nodes_B", self.scenes, duration=12.5)
+
+        changes = self.watcher.poll()
+
+        self.assertEqual(changes['added'], ["video_nodes_A", "video_nodes_B"])
+        self.assertEqual(self.watcher.get_statistics(),
+                         {'content_count': 2, 'scene_count': 2, 'total_duration': 42.5})
+
+    def test_recently_written_file_is_debounced(self):
+        """書き込み直後のnodes.jsonは待ち時間が経過するまで取り込まないかテスト"""
+        write_nodes(self.input_dir, "video_nodes_A", self.scenes)
+        self.now = os.stat(os.path.join(self.input_dir, "video_nodes_A", 'nodes.json')).st_mtime + 0.5
+
+        self.assertEqual(self.watcher.poll()['added'], [])
+
+        self.now += 5
+        self.assertEqual(self.watcher.poll()['added'], ["video_nodes_A"])
+
+    def test_modified_and_removed(self):
+        """nodes.jsonの更新とディレクトリの削除を検出するかテスト"""
+        write_nodes(self.input_dir, "video_nodes_A", self.scenes)
+        write_nodes(self.input_dir, "video_nodes_B", self.scenes)
+        self.watcher.poll()
+
+        write_nodes(self.input_dir, "video_nodes_A", self.scenes + [{"start": 5.0, "end": 8.0}])
+        shutil.rmtree(os.path.join(self.input_dir, "video_nodes_B"))
+        changes = self.watcher.poll()
+
+        self.assertEqual(changes, {'added': [], 'modified': ["video_nodes_A"],
+                                   'removed': ["video_nodes_B"]})
+        self.assertEqual(len(self.watcher.get_contents()[0]['scenes']), 2)
+
+    def test_unchanged_root_skips_scandir(self):
+        """入力ディレクトリが変わっていなければ一覧を取り直さないかテスト"""
+        write_nodes(self.input_dir, "video_nodes_A", self.scenes)
+        self.watcher.poll()
+
+        with patch("src.content_watcher.os.scandir") as mock_scandir:
+            changes = self.watcher.poll()
+
+        mock_scandir.assert_not_called()
+        self.assertFalse(any(changes.values()))
+
+    def test_uses_crawler_scanner_settings(self):
+        """クローラーと同じ設定（再帰探索・除外パターン）でディレクトリを探索するかテスト"""
+        scanner = DirectoryScanner(max_depth=3, exclude=["archive"])
+        watcher = ContentWatcher(ContentCrawler(scanner=scanner), self.input_dir,
+                                 settle_seconds=2.0, clock=lambda: self.now)
+        write_nodes(self.input_dir, "video_nodes_A", self.scenes)
+        write_nodes(os.path.join(self.input_dir, "day1"), "video_nodes_B", self.scenes)
+        write_nodes(os.path.join(self.input_dir, "archive"), "video_nodes_C", self.scenes)
+
+        self.assertEqual(sorted(watcher.poll()['added']), ["video_nodes_A", "video_nodes_B"])
+
+        # サブディレクトリへの追加は入力ディレクトリの更新時刻に反映されない
+        write_nodes(os.path.join(self.input_dir, "day1"), "video_nodes_D", self.scenes)
+        self.assertEqual(watcher.poll()['added'], ["video_nodes_D"])
+
+
+if __name__ == "__main__":
+    unittest.main()
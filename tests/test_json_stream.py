@@ -0,0 +1,142 @@
+"""ストリーミングでのシーン選択のテスト"""
+
+import unittest
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from unittest.mock import MagicMock
+
+# テスト対象のモジュールパスを追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.edl_generator import EDLGenerator
+from src.json_stream import JSONArrayStream, iter_array_items
+from src.main import VideoEditAgent
+from src.scene_selector import SceneSelector
+from src.srt_generator import SRTGenerator
+from tests.test_scene_ranker import SCENARIO, make_contents
+
+RESPONSE = """```json
+{
+    "note": {"selected_scenes": ["入れ子のキーは無視する"]},
+    "selected_scenes": [
+        {"content_id": "video_nodes_0001", "scene_index": 1, "reason": "括弧 ] や } と \\"引用符\\" を含む"},
+        {"content_id": "video_nodes_0099", "scene_index": 0},
+        {"content_id": "video_nodes_0002", "scene_index": 0, "end_time": 99}
+    ]
+}
+```"""
+
+
+def chunked(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class TestJSONArrayStream(unittest.TestCase):
+    """JSONArrayStreamクラスのテスト"""
+
+    def test_items_are_identical_for_any_chunking(self):
+        """チャンクの区切り方によらず、配列の要素が順に取り出されるかテスト"""
+        expected = json.loads(RESPONSE[7:-3])['selected_scenes']
+        for size in (1, 2, 7, len(RESPONSE)):
+            self.assertEqual(list(iter_array_items(chunked(RESPONSE, size), 'selected_scenes')), expected)
+
+    def test_item_is_emitted_when_closed(self):
+        """要素は閉じ括弧を受け取った時点で返されるかテスト"""
+        parser = JSONArrayStream('selected_scenes')
+
+        self.assertEqual(parser.feed('{"selected_scenes": [{"a": 1'), [])
+        self.assertEqual(parser.feed('}, {"a"'), [{'a': 1}])
+        self.assertEqual(parser.feed(': 2}, 3]'), [{'a': 2}, 3])
+        self.assertTrue(parser.finished)
+
+    def test_broken_item_is_counted(self):
+        """解析できない要素は除かれて数えられるかテスト"""
+        parser = JSONArrayStream('selected_scenes')
+
+        self.assertEqual(parser.feed('{"selected_scenes": [{"a": 1,}, {"b": 2}]}'), [{'b': 2}])
+        self.assertEqual(parser.errors, 1)
+
+
+class TestSelectStream(unittest.TestCase):
+    """SceneSelector.select_streamのテスト"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.consumed = []
+
+        def stream(prompt):
+            for chunk in chunked(RESPONSE, 16):
+                self.consumed.append(chunk)
+                yield chunk
+
+        self.api_client = MagicMock()
+        self.api_client.text_analysis_stream.side_effect = stream
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_first_scene_before_response_completes(self):
+        """応答をすべて受け取る前に最初のシーンが返されるかテスト"""
+        stream = SceneSelector(self.api_client).select_stream(make_contents(3), SCENARIO)
+
+        first = next(stream)
+        self.assertEqual((first['content_id'], first['scene_index']), ('video_nodes_0001', 1))
+        self.assertLess(len(self.consumed), len(chunked(RESPONSE, 16)))
+
+        rest = list(stream)
+        self.assertEqual([(s['content_id'], s['end_time']) for s in rest], [('video_nodes_0002', 10.0)])
+
+    def test_same_result_as_select(self):
+        """ストリーミングしない場合と同じ結果になるかテスト"""
+        self.api_client.text_analysis.return_value = RESPONSE[7:-3]
+        contents = make_contents(3)
+
+        self.assertEqual(list(SceneSelector(self.api_client).select_stream(contents, SCENARIO)),
+                         SceneSelector(self.api_client).select(contents, SCENARIO))
+
+    def test_generators_write_streamed_scenes(self):
+        """EDLとSRTがストリーミングの選択結果からリストと同じ内容を書き出すかテスト"""
+        contents = make_contents(3)
+        scenes = list(SceneSelector(self.api_client).select_stream(contents, SCENARIO))
+        for generator, name in ((EDLGenerator(), 'output.edl'), (SRTGenerator(), 'output.srt')):
+            list_path = os.path.join(self.temp_dir, 'list', name)
+            stream_path = os.path.join(self.temp_dir, 'stream', name)
+            generator.generate(scenes, list_path)
+            generator.generate(SceneSelector(self.api_client).select_stream(contents, SCENARIO), stream_path)
+
+            with open(list_path, encoding='utf-8-sig') as f1, open(stream_path, encoding='utf-8-sig') as f2:
+                self.assertEqual(f1.read(), f2.read())
+
+    def test_stream_outputs_fails_without_hanging(self):
+        """EDLを書き出せない場合も、SRTのスレッドを終了させて例外を伝えるかテスト"""
+        config = {'output_dir': self.temp_dir,
+                  'options': {'response_cache': False, 'selection_cache': False, 'crawl_index': False}}
+        agent = VideoEditAgent(config, llm_backend=MagicMock(requires_api_key=False))
+        agent.scene_selector = SceneSelector(self.api_client)
+        scenario_path = os.path.join(self.temp_dir, 'scenario.json')
+        for path, data in ((scenario_path, SCENARIO), (os.path.join(self.temp_dir, 'contents.json'), make_contents(3))):
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+        # 出力先をディレクトリにしてEDLファイルを開けなくする
+        os.makedirs(os.path.join(self.temp_dir, 'output.edl'))
+        errors = []
+
+        def run():
+            try:
+                agent.stream_outputs(scenario_path)
+            except OSError as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        thread.join(timeout=10)
+
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(len(errors), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
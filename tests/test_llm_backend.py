@@ -0,0 +1,161 @@
+"""生成AIのバックエンドのテスト"""
+
+import unittest
+import json
+import os
+import shutil
+import sys
+import tempfile
+from unittest.mock import patch
+
+# テスト対象のモジュールパスを追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.api_client import GeminiClient
+from src.llm_backend import (HTTPBackend, HTTPBackendError, LLMBackend, LLMResponse, RecordingBackend,
+                             ReplayBackend)
+from src.llm_server import StandInServer
+from src.rate_limiter import RATE_LIMIT, Backoff, classify_error
+
+
+class EchoBackend(LLMBackend):
+    """プロンプトの先頭を含むJSONを返すバックエンド"""
+
+    requires_api_key = False
+
+    def __init__(self):
+        self.calls = 0
+
+    def offline_keys(self):
+        return ['offline-1']
+
+    def generate(self, model_name, prompt, image_hash=None):
+        self.calls += 1
+        return LLMResponse(f'{{"echo": "{prompt[:8]}"}}', total_tokens=42)
+
+
+class TestRecordReplay(unittest.TestCase):
+    """RecordingBackendとReplayBackendのテスト"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'recordings.jsonl')
+        env = patch.dict(os.environ, {'GEMINI_API_KEY': ''})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def client(self, backend, **kwargs):
+        return GeminiClient(backend=backend, backoff=Backoff(base=0.001), **kwargs)
+
+    def record(self, prompts):
+        inner = EchoBackend()
+        client = self.client(RecordingBackend(inner, self.path))
+        return [client.text_analysis(prompt) for prompt in prompts], inner
+
+    def test_replay_returns_recorded_responses(self):
+        """記録した応答が、通常・ストリーミングのどちらでも同じ内容で返されるかテスト"""
+        prompts = ['シーンを選択', 'コンセプトを生成']
+        recorded, inner = self.record(prompts)
+        self.assertEqual(inner.calls, 2)
+
+        replay = ReplayBackend(self.path)
+        client = self.client(replay)
+        self.assertEqual(client.api_keys, ['offline-1'])
+        self.assertEqual([client.text_analysis(prompt) for prompt in prompts], recorded)
+        self.assertEqual(''.join(client.text_analysis_stream(prompts[0])), recorded[0])
+        self.assertEqual(replay.stats['hits'], 3)
+
+    def test_injected_errors_are_retried_deterministically(self):
+        """注入したエラーが再試行され、同じ設定では同じ回数だけ発生するかテスト"""
+        prompts = [f'プロンプト{i}' for i in range(20)]
+        recorded, _ = self.record(prompts)
+
+        runs = []
+        for _ in range(2):
+            replay = ReplayBackend(self.path, error_rate=0.3, rate_limit_rate=0.1, retry_after=0.0, seed=7,
+                                   key_count=2, sleep=lambda seconds: None)
+            client = self.client(replay, max_attempts=10)
+            self.assertEqual([client.text_analysis(prompt) for prompt in prompts], recorded)
+            runs.append(dict(replay.stats))
+        self.assertEqual(runs[0], runs[1])
+        self.assertGreater(runs[0]['errors'] + runs[0]['rate_limits'], 0)
+        self.assertEqual(runs[0]['hits'], len(prompts))
+
+    def test_blocked_response_is_recorded_as_empty(self):
+        """テキストのない応答（ブロックされた応答）も失敗にせず、空の応答として記録されるかテスト"""
+        class BlockedResponse:
+            usage_metadata = None
+
+            @property
+            def text(self):
+                raise ValueError("The response was blocked")
+
+        class BlockedModel:
+            def generate_content(self, contents, stream=False):
+                return [BlockedResponse()] if stream else BlockedResponse()
+
+        inner = EchoBackend()
+        inner.create_model = lambda api_key, model_name: BlockedModel()
+        client = self.client(RecordingBackend(inner, self.path))
+
+        self.assertEqual(client.text_analysis('ブロックされるプロンプト'), '{}')
+        self.assertEqual(''.join(client.text_analysis_stream('ブロックされるプロンプト')), '{}')
+        with open(self.path, encoding='utf-8') as f:
+            self.assertEqual({json.loads(line)['response'] for line in f}, {''})
+
+    def test_missing_recording_is_not_retried(self):
+        """記録にないリクエストは再試行せずに失敗するかテスト"""
+        replay = ReplayBackend(sleep=lambda seconds: None)
+        client = self.client(replay)
+
+        self.assertEqual(client.text_analysis('記録にないプロンプト'), '{}')
+        self.assertEqual(replay.stats['requests'], 1)
+
+    def test_latency_is_injected(self):
+        """指定した遅延だけ待つかテスト"""
+        sleeps = []
+        replay = ReplayBackend(latency=0.5, latency_jitter=0.1, sleep=sleeps.append)
+        replay.add(GeminiClient.DEFAULT_MODEL, 'prompt', '{}')
+        replay.generate(GeminiClient.DEFAULT_MODEL, 'prompt')
+
+        self.assertEqual(len(sleeps), 1)
+        self.assertTrue(0.5 <= sleeps[0] <= 0.6)
+
+
+class TestStandInServer(unittest.TestCase):
+    """StandInServerとHTTPBackendのテスト"""
+
+    def setUp(self):
+        self.replay = ReplayBackend(sleep=lambda seconds: None)
+        self.replay.add('model', 'prompt', '{"ok": true}', total_tokens=12)
+        self.server = StandInServer(self.replay).start()
+        self.addCleanup(self.server.stop)
+        self.backend = HTTPBackend(self.server.url, timeout=5)
+
+    def test_generate_over_http(self):
+        """サーバー経由で記録した応答が返されるかテスト"""
+        response = self.backend.generate('model', 'prompt')
+
+        self.assertEqual(response.text, '{"ok": true}')
+        self.assertEqual(response.usage_metadata.total_token_count, 12)
+
+    def test_errors_keep_status_and_retry_after(self):
+        """注入した上限エラーと記録にないリクエストがHTTPステータスで伝わるかテスト"""
+        self.replay.rate_limit_rate = 1.0
+        self.replay.retry_after = 3.0
+        with self.assertRaises(HTTPBackendError) as context:
+            self.backend.generate('model', 'prompt')
+        self.assertEqual(context.exception.code, 429)
+        self.assertEqual(context.exception.retry_after, 3.0)
+        self.assertEqual(classify_error(context.exception), RATE_LIMIT)
+
+        self.replay.rate_limit_rate = 0.0
+        with self.assertRaises(HTTPBackendError) as context:
+            self.backend.generate('model', 'other prompt')
+        self.assertEqual(context.exception.code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+"""NodesDecoderのテスト"""
+
+import unittest
+import json
+import os
+import sys
+
+# テスト対象のモジュールパスを追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.nodes_decoder import NodesDecoder
+
+TEST_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'test_data')
+
+
+class TestNodesDecoder(unittest.TestCase):
+    """NodesDecoderクラスのテスト"""
+
+    def setUp(self):
+        with open(os.path.join(TEST_DATA_DIR, 'video_nodes_GH012562', 'nodes.json'), 'rb') as f:
+            self.raw = f.read()
+
+    def test_projection_drops_unused_fields(self):
+        """使用しないフィールドが取り除かれるかテスト"""
+        data = NodesDecoder('json').decode(self.raw)
+
+        self.assertEqual(set(data), {'metadata', 'summary', 'scenes'})
+        self.assertEqual(set(data['metadata']), {'duration'})
+        scene = data['scenes'][0]
+        self.assertNotIn('editing_suggestions', scene)
+        self.assertEqual(set(scene['transcripts'][0]), {'text'})
+        self.assertEqual(set(scene['context_analysis']), {'activity'})
+
+    def test_backends_return_same_projection(self):
+        """利用可能なすべてのバックエンドが同じ結果を返すかテスト"""
+        expected = NodesDecoder('json').decode(self.raw)
+        for backend in NodesDecoder.BACKENDS:
+            if NodesDecoder.is_available(backend):
+                with self.subTest(backend=backend):
+                    self.assertEqual(NodesDecoder(backend).decode(self.raw), expected)
+
+    def test_detailed_projection(self):
+        """detailedの場合に区間とコンテキスト分析が含まれ、バックエンド間で一致するかテスト"""
+        expected = NodesDecoder('json', detailed=True).decode(self.raw)
+
+        self.assertIn('title', expected['summary'])
+        scene = expected['scenes'][0]
+        self.assertEqual(set(scene['transcripts'][0]), {'start', 'end', 'text'})
+        self.assertIn('environment', scene['context_analysis'])
+        self.assertNotIn('editing_suggestions', scene)
+        for backend in NodesDecoder.BACKENDS:
+            if NodesDecoder.is_available(backend):
+                with self.subTest(backend=backend):
+                    self.assertEqual(NodesDecoder(backend, detailed=True).decode(self.raw), expected)
+
+    def test_bom_and_missing_fields(self):
+        """BOM付きで一部のフィールドがないnodes.jsonもデコードできるかテスト"""
+        raw = '\ufeff{"scenes": [{"start": 1, "transcripts": [{}]}]}'.encode('utf-8')
+        for backend in NodesDecoder.BACKENDS:
+            if NodesDecoder.is_available(backend):
+                with self.subTest(backend=backend):
+                    data = NodesDecoder(backend).decode(raw)
+                    self.assertEqual(data, {'scenes': [{'start': 1, 'transcripts': [{}]}]})
+
+    def test_null_sections_are_empty(self):
+        """nullのセクションやリストを空として扱い、すべてのバックエンドで同じ結果になるかテスト"""
+        raw = (b'{"metadata": null, "summary": {"topics": null}, '
+               b'"scenes": [{"start": 1, "transcripts": null, "context_analysis": null}]}')
+        expected = {'metadata': {}, 'summary': {'topics': []},
+                    'scenes': [{'start': 1.0, 'transcripts': [], 'context_analysis': {}}]}
+        for backend in NodesDecoder.BACKENDS:
+            if NodesDecoder.is_available(backend):
+                for detailed in (False, True):
+                    with self.subTest(backend=backend, detailed=detailed):
+                        decoder = NodesDecoder(backend, detailed=detailed)
+                        self.assertEqual(decoder.decode(raw), expected)
+                        self.assertEqual(decoder.decode_header(raw), {'summary': {'topics': []}, 'scene_count': 1})
+
+    def test_wrong_types_are_rejected(self):
+        """型が合わないセクションや値は、すべてのバックエンドでValueErrorになるかテスト"""
+        payloads = [
+            b'{"metadata": "30s"}',
+            b'{"scenes": {"start": 0}}',
+            b'{"scenes": [null]}',
+            b'{"scenes": [{"context_analysis": {"activity": "walking"}}]}',
+            b'{"scenes": [{"start": "soon"}]}',
+            b'{"summary": {"topics": [1, 2]}}',
+        ]
+        for backend in NodesDecoder.BACKENDS:
+            if NodesDecoder.is_available(backend):
+                for raw in payloads:
+                    with self.subTest(backend=backend, raw=raw):
+                        with self.assertRaises(ValueError):
+                            NodesDecoder(backend).decode(raw)
+
+    def test_invalid_json_raises(self):
+        """不正なJSONでは例外が発生するかテスト"""
+        for backend in NodesDecoder.BACKENDS:
+            if NodesDecoder.is_available(backend):
+                with self.subTest(backend=backend):
+                    with self.assertRaises(Exception):
+                        NodesDecoder(backend).decode(b'{"scenes": [')
+
+    def test_unknown_backend(self):
+        """未対応のバックエンド名でValueErrorになるかテスト"""
+        with self.assertRaises(ValueError):
+            NodesDecoder('yaml')
+
+
+if __name__ == "__main__":
+    unittest.main()
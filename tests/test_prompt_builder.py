@@ -0,0 +1,186 @@
+"""PromptBuilderのテスト"""
+
+import unittest
+import json
+import os
+import sys
+from unittest.mock import MagicMock
+
+# テスト対象のモジュールパスを追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.prompt_builder import MapReduceError, PromptBuilder, estimate_tokens
+from src.scenario_writer import ScenarioWriter
+from src.scene_selector import SceneSelector
+from tests.test_scene_ranker import SCENARIO, make_contents
+
+
+class TestPromptBuilder(unittest.TestCase):
+    """PromptBuilderクラスのテスト"""
+
+    def test_estimate_tokens(self):
+        """非ASCII文字は1文字1トークン、ASCII文字は4文字1トークンとして数えるかテスト"""
+        self.assertEqual(estimate_tokens(""), 0)
+        self.assertEqual(estimate_tokens("山頂"), 2)
+        self.assertEqual(estimate_tokens("abcde"), 2)
+        self.assertEqual(estimate_tokens("山頂 GoPro"), 4)
+
+    def test_pack_keeps_order_within_budget(self):
+        """ブロックが順番を保ったまま予算内のチャンクに詰められるかテスト"""
+        builder = PromptBuilder(token_budget=10)
+        chunks = builder.pack(["あいう", "えお", "かきくけ", "さしすせそたち"], overhead=2)
+
+        self.assertEqual(chunks, [["あいう", "えお"], ["かきくけ"], ["さしすせそたち"]])
+        for chunk in chunks:
+            self.assertLessEqual(sum(estimate_tokens(b) for b in chunk) + 2, 10)
+
+    def test_pack_truncates_oversized_block(self):
+        """予算を超えるブロックが切り詰められるかテスト"""
+        builder = PromptBuilder(token_budget=5)
+        chunks = builder.pack(["あいうえおかきくけこ"])
+
+        self.assertEqual(chunks, [["あいうえ…"]])
+        with self.assertRaises(ValueError):
+            builder.pack(["あ"], overhead=5)
+
+    def test_map_reduce_drops_failed_chunks(self):
+        """失敗したチャンクを除いてreduceされるかテスト"""
+        def map_fn(chunk):
+            if chunk == 'error':
+                raise RuntimeError("API error")
+            return chunk.upper()
+
+        builder = PromptBuilder(token_budget=100, max_workers=2)
+        self.assertEqual(builder.map_reduce(['a', 'error', 'b'], map_fn, list), ['A', 'B'])
+
+    def test_map_reduce_raises_when_every_chunk_fails(self):
+        """すべてのチャンクが失敗した場合はreduceせずに例外を送出するかテスト"""
+        def map_fn(chunk):
+            raise RuntimeError("API error")
+
+        reduce_fn = MagicMock()
+        builder = PromptBuilder(token_budget=100, max_workers=2)
+        with self.assertRaises(MapReduceError):
+            builder.map_reduce(['a', 'b'], map_fn, reduce_fn)
+        reduce_fn.assert_not_called()
+
+
+class TestPromptBudget(unittest.TestCase):
+    """トークン予算を超える場合のmap-reduceのテスト"""
+
+    def test_selector_shortlists_before_selection(self):
+        """シーンをチャンクごとに絞り込んでから最終的な選択を行うかテスト"""
+        contents = make_contents(40)
+        requests = []
+
+        def text_analysis(prompt):
+            requests.append(prompt)
+            if prompt.startswith("以下のシナリオに使えそうなシーン"):
+                # チャンクに含まれる山頂のシーンだけを候補に残す
+                ids = [line.split(' / ')[0].split(': ')[1] for line in prompt.splitlines()
+                       if line.startswith('コンテンツID: ') and line.endswith('シーン 1:')]
+                return json.dumps({'selected_scenes': [
+                    {'content_id': cid, 'scene_index': 1, 'section_id': 'main_1'} for cid in ids[:1]
+                ] + [{'content_id': 'unknown', 'scene_index': 0, 'section_id': 'main_1'}]})
+            return json.dumps({'selected_scenes': [
+                {'content_id': 'video_nodes_0000', 'scene_index': 1, 'section_id': 'main_1'}
+            ]})
+
+        api_client = MagicMock()
+        api_client.text_analysis.side_effect = text_analysis
+        builder = PromptBuilder(token_budget=2000, max_workers=4)
+        selector = SceneSelector(api_client, prompt_builder=builder)
+
+        selected = selector.select(contents, SCENARIO)
+
+        self.assertEqual([(s['content_id'], s['scene_index']) for s in selected],
+                         [('video_nodes_0000', 1)])
+        map_requests, final_prompt = requests[:-1], requests[-1]
+        self.assertGreater(len(map_requests), 1)
+        for prompt in requests:
+            self.assertTrue(builder.fits(prompt))
+        # 存在しないシーンは候補から除かれる
+        self.assertNotIn('unknown', final_prompt)
+        self.assertIn("セクション main_1 の候補シーン", final_prompt)
+
+    def test_selector_falls_back_when_shortlist_fails(self):
+        """すべてのチャンクの絞り込みに失敗した場合は、絞り込み前のシーンで選択するかテスト"""
+        requests = []
+
+        def text_analysis(prompt):
+            requests.append(prompt)
+            if prompt.startswith("以下のシナリオに使えそうなシーン"):
+                raise RuntimeError("API error")
+            return json.dumps({'selected_scenes': [
+                {'content_id': 'video_nodes_0039', 'scene_index': 1, 'section_id': 'main_1'}
+            ]})
+
+        api_client = MagicMock()
+        api_client.text_analysis.side_effect = text_analysis
+        selector = SceneSelector(api_client, prompt_builder=PromptBuilder(token_budget=2000, max_workers=4))
+
+        selected = selector.select(make_contents(40), SCENARIO)
+
+        self.assertEqual([(s['content_id'], s['scene_index']) for s in selected],
+                         [('video_nodes_0039', 1)])
+        # 候補が空のプロンプトではなく、全シーンを含むプロンプトで選択する
+        self.assertIn("video_nodes_0039", requests[-1])
+        self.assertIn("video_nodes_0000", requests[-1])
+
+    def test_empty_responses_count_as_failed_chunks(self):
+        """API呼び出しの失敗で"{}"が返された場合も、絞り込み・要約前の内容を使うかテスト"""
+        requests = []
+
+        def text_analysis(prompt):
+            requests.append(prompt)
+            return '{}'
+
+        api_client = MagicMock()
+        api_client.text_analysis.side_effect = text_analysis
+        builder = PromptBuilder(token_budget=3000, max_workers=4)
+
+        selected = SceneSelector(api_client, prompt_builder=builder).select(make_contents(100), SCENARIO)
+        self.assertEqual(selected, [])
+        self.assertIn("video_nodes_0000", requests[-1])
+        self.assertIn("video_nodes_0099", requests[-1])
+
+        requests.clear()
+        ScenarioWriter(api_client, prompt_builder=builder).generate_concept(make_contents(100))
+        self.assertIn("video_nodes_0000", requests[-1])
+        self.assertNotIn("要約（", requests[-1])
+
+    def test_selector_without_budget_sends_single_request(self):
+        """予算を指定しない場合は1回のリクエストで選択するかテスト"""
+        api_client = MagicMock()
+        api_client.text_analysis.return_value = json.dumps({'selected_scenes': []})
+
+        SceneSelector(api_client).select(make_contents(40), SCENARIO)
+
+        self.assertEqual(api_client.text_analysis.call_count, 1)
+
+    def test_writer_digests_contents_summary(self):
+        """コンテンツ概要をチャンクごとに要約してからコンセプトを生成するかテスト"""
+        requests = []
+
+        def text_analysis(prompt):
+            requests.append(prompt)
+            if prompt.startswith("以下の映像コンテンツの概要を"):
+                return json.dumps({'summary': "登山の記録", 'themes': ["登山"]})
+            return json.dumps({'title': "山行記", 'concept': "登山の記録", 'themes': []})
+
+        api_client = MagicMock()
+        api_client.text_analysis.side_effect = text_analysis
+        builder = PromptBuilder(token_budget=1000)
+        writer = ScenarioWriter(api_client, prompt_builder=builder)
+
+        concept = writer.generate_concept(make_contents(100))
+
+        self.assertEqual(concept['title'], "山行記")
+        self.assertGreater(len(requests), 2)
+        for prompt in requests:
+            self.assertTrue(builder.fits(prompt))
+        self.assertIn("要約（", requests[-1])
+        self.assertNotIn("video_nodes_0000", requests[-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
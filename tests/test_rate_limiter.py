@@ -0,0 +1,234 @@
+"""レート制限と再試行のテスト"""
+
+import unittest
+import os
+import random
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+from google.api_core import exceptions as api_exceptions
+
+# テスト対象のモジュールパスを追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.api_client import GeminiClient
+from src.rate_limiter import (FATAL, RATE_LIMIT, TRANSIENT, Backoff, KeyRateLimiter, TokenBucket,
+                              classify_error, is_api_error, retry_after_seconds)
+
+
+class FakeClock:
+    """sleepで進む時計"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestErrorClassification(unittest.TestCase):
+    """classify_errorとretry_after_secondsのテスト"""
+
+    def test_classify(self):
+        """例外の種類やメッセージから分類できるかテスト"""
+        self.assertEqual(classify_error(api_exceptions.ResourceExhausted("quota")), RATE_LIMIT)
+        self.assertEqual(classify_error(api_exceptions.ServiceUnavailable("down")), TRANSIENT)
+        self.assertEqual(classify_error(api_exceptions.DeadlineExceeded("slow")), TRANSIENT)
+        self.assertEqual(classify_error(api_exceptions.InvalidArgument("bad")), FATAL)
+        self.assertEqual(classify_error(api_exceptions.PermissionDenied("key")), FATAL)
+        self.assertEqual(classify_error(RuntimeError("429 Too Many Requests")), RATE_LIMIT)
+        self.assertEqual(classify_error(ConnectionResetError()), TRANSIENT)
+
+    def test_is_api_error(self):
+        """APIの例外だけを再試行の対象とし、プログラムの誤りは対象にしないかテスト"""
+        self.assertTrue(is_api_error(api_exceptions.ResourceExhausted("quota")))
+        self.assertTrue(is_api_error(ConnectionResetError()))
+        self.assertTrue(is_api_error(TimeoutError()))
+        error = RuntimeError("503")
+        error.code = 503
+        self.assertTrue(is_api_error(error))
+        self.assertFalse(is_api_error(TypeError("unsupported operand")))
+        self.assertFalse(is_api_error(AttributeError("'NoneType' object has no attribute 'text'")))
+        self.assertFalse(is_api_error(ValueError("bad value")))
+
+    def test_retry_after(self):
+        """再試行までの待ち時間を読み取れるかテスト"""
+        self.assertEqual(retry_after_seconds(RuntimeError("Please retry in 12.5s")), 12.5)
+        self.assertEqual(retry_after_seconds(RuntimeError("retry_delay { seconds: 30 }")), 30.0)
+        error = RuntimeError("429")
+        error.response = MagicMock(headers={'Retry-After': '7'})
+        self.assertEqual(retry_after_seconds(error), 7.0)
+        self.assertIsNone(retry_after_seconds(RuntimeError("503")))
+
+    def test_backoff(self):
+        """待ち時間が指数関数的に伸び、指定された待ち時間より短くならないかテスト"""
+        backoff = Backoff(base=1.0, max_delay=8.0, rng=random.Random(0))
+        for attempt in range(6):
+            self.assertLessEqual(backoff.delay(attempt), min(8.0, 2 ** attempt))
+        self.assertGreaterEqual(backoff.delay(0, retry_after=20), 20)
+
+
+class TestKeyRateLimiter(unittest.TestCase):
+    """TokenBucketとKeyRateLimiterのテスト"""
+
+    def test_token_bucket_refills(self):
+        """トークンが一定の速度で補充されるかテスト"""
+        clock = FakeClock()
+        bucket = TokenBucket(60, capacity=2, clock=clock)
+        bucket.consume(1)
+        bucket.consume(1)
+
+        self.assertAlmostEqual(bucket.wait_time(1), 1.0)
+        clock.sleep(0.5)
+        self.assertAlmostEqual(bucket.wait_time(1), 0.5)
+
+    def test_picks_available_key(self):
+        """上限に達したキーやブロックしたキーを避けるかテスト"""
+        clock = FakeClock()
+        limiter = KeyRateLimiter(2, rpm=60, tpm=1000, burst=1, clock=clock)
+
+        self.assertEqual(limiter.reserve(100, preferred=0), (0, 0.0))
+        self.assertEqual(limiter.reserve(100, preferred=0), (1, 0.0))
+        key_index, wait = limiter.reserve(100, preferred=0)
+        self.assertGreater(wait, 0)
+
+        clock.sleep(1)
+        limiter.block(0, 30)
+        self.assertEqual(limiter.reserve(100, preferred=0), (1, 0.0))
+        self.assertEqual(limiter.blocked_keys(), [0])
+
+    def test_tpm_uses_actual_usage(self):
+        """実際のトークン使用量を反映するかテスト"""
+        clock = FakeClock()
+        limiter = KeyRateLimiter(1, tpm=600, clock=clock)
+        limiter.reserve(100)
+        limiter.record_usage(0, 100, 600)
+
+        self.assertAlmostEqual(limiter.reserve(100)[1], 10.0)
+
+
+class TestGeminiClientRateLimit(unittest.TestCase):
+    """レート制限を使うGeminiClientのテスト"""
+
+    def make_client(self, keys, generate=None, **kwargs):
+        """generate(キーの番号, プロンプト)で応答するキーごとのモデルを使うクライアントを作成"""
+        def create_model(api_key, model_name):
+            model = MagicMock()
+            model.generate_content.side_effect = lambda contents, **_: generate(keys.index(api_key), contents)
+            self.models.append(model)
+            return model
+
+        self.models = []
+        backend = MagicMock(requires_api_key=True)
+        backend.create_model.side_effect = create_model
+        env = {f'GEMINI_API_KEY_{i + 1}': key for i, key in enumerate(keys)}
+        with patch.dict(os.environ, env, clear=True):
+            return GeminiClient(backend=backend, **kwargs)
+
+    def call_count(self):
+        return sum(model.generate_content.call_count for model in self.models)
+
+    def test_rate_limited_key_is_skipped(self):
+        """429を返したキーを待ち時間の間は使わず、別のキーで再試行するかテスト"""
+        clock = FakeClock()
+        used = []
+
+        def generate(key_index, prompt):
+            used.append(key_index)
+            if key_index == 0:
+                raise api_exceptions.ResourceExhausted("quota exceeded, retry in 30s")
+            return MagicMock(text='{"ok": true}')
+
+        client = self.make_client(['k1', 'k2'], generate, rate_limiter=KeyRateLimiter(2, clock=clock),
+                                  backoff=Backoff(rng=random.Random(0)))
+        with patch('src.api_client.time.sleep', clock.sleep):
+            self.assertEqual(client.text_analysis("a"), '{"ok": true}')
+            self.assertEqual(client.text_analysis("b"), '{"ok": true}')
+
+        self.assertEqual(used, [0, 1, 1])
+        self.assertEqual(clock.now, 0.0)
+
+    def test_fatal_error_is_not_retried(self):
+        """再試行しても成功しないエラーはすぐに中止するかテスト"""
+        def generate(key_index, prompt):
+            raise api_exceptions.InvalidArgument("bad request")
+
+        client = self.make_client(['k1', 'k2'], generate)
+
+        self.assertEqual(client.text_analysis("a"), "{}")
+        self.assertEqual(self.call_count(), 1)
+
+    def test_programming_error_is_raised(self):
+        """APIの例外でないエラーは再試行せず、呼び出し元に伝えるかテスト"""
+        def generate(key_index, prompt):
+            raise TypeError("unsupported operand")
+
+        client = self.make_client(['k1', 'k2'], generate)
+
+        with self.assertRaises(TypeError):
+            client.text_analysis("a")
+        self.assertEqual(self.call_count(), 1)
+
+    def test_stream_records_usage(self):
+        """ストリーミングでも、最後の断片の使用量をキーに記録するかテスト"""
+        def generate(key_index, prompt):
+            return [MagicMock(text='{"ok"', usage_metadata=None),
+                    MagicMock(text=': true}', usage_metadata=MagicMock(total_token_count=500))]
+
+        limiter = MagicMock(wraps=KeyRateLimiter(2))
+        client = self.make_client(['k1', 'k2'], generate, rate_limiter=limiter)
+
+        self.assertEqual(''.join(client.text_analysis_stream("a")), '{"ok": true}')
+        self.assertEqual(limiter.record_usage.call_args[0][2], 500)
+
+    def test_concurrent_calls_use_their_own_key(self):
+        """複数のスレッドから呼び出しても、リクエストを送ったキーに上限エラーを記録するかテスト"""
+        barrier = threading.Barrier(2)
+
+        def generate(key_index, prompt):
+            barrier.wait(timeout=5)
+            if key_index == 0:
+                raise api_exceptions.ResourceExhausted("quota exceeded, retry in 30s")
+            return MagicMock(text='{"ok": true}')
+
+        limiter = KeyRateLimiter(2)
+        client = self.make_client(['k1', 'k2'], generate, rate_limiter=limiter)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [executor.submit(client.text_analysis, prompt) for prompt in ("a", "b")]
+            results = [future.result(timeout=10) for future in futures]
+
+        self.assertEqual(results, ['{"ok": true}', '{"ok": true}'])
+        self.assertEqual(limiter.blocked_keys(), [0])
+
+    def test_goodput_stays_near_quota(self):
+        """サーバーの上限より少し低いRPMを指定すると、429を受けずに上限に近い速度で処理できるかテスト"""
+        clock = FakeClock()
+        sent = {0: [], 1: []}
+        rejected = []
+
+        def generate(key_index, prompt):
+            # サーバー側はキーごとに直近60秒で60件を超えるリクエストを拒否する
+            window = [t for t in sent[key_index] if t > clock.now - 60]
+            if len(window) >= 60:
+                rejected.append(clock.now)
+                raise api_exceptions.ResourceExhausted("quota exceeded")
+            sent[key_index] = window + [clock.now]
+            clock.sleep(0.01)
+            return MagicMock(text='{}')
+
+        client = self.make_client(['k1', 'k2'], generate, rate_limiter=KeyRateLimiter(2, rpm=58, clock=clock))
+        with patch('src.api_client.time.sleep', clock.sleep):
+            for i in range(360):
+                client.text_analysis(f"p{i}")
+
+        self.assertEqual(rejected, [])
+        # 2キー x 58RPMで、360件は約186秒（サーバーの上限の速度なら180秒）
+        self.assertLess(clock.now, 190)
+
+
+if __name__ == '__main__':
+    unittest.main()
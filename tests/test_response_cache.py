@@ -0,0 +1,138 @@
+"""生成AIの応答キャッシュのテスト"""
+
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+from unittest.mock import MagicMock, patch
+
+from google.api_core import exceptions as api_exceptions
+
+# テスト対象のモジュールパスを追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.api_client import GeminiClient
+from src.rate_limiter import Backoff
+from src.response_cache import ResponseCache
+
+
+class TestResponseCache(unittest.TestCase):
+    """ResponseCacheクラスのテスト"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, 'cache', 'responses.sqlite3')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_key_depends_on_model_prompt_and_image(self):
+        """キーがモデル名・プロンプト・画像の内容で変わるかテスト"""
+        image_path = os.path.join(self.temp_dir, 'frame.jpg')
+        with open(image_path, 'wb') as f:
+            f.write(b'\xff\xd8frame')
+        image_hash = ResponseCache.hash_file(image_path)
+        key = ResponseCache.make_key('gemini-1.5-flash', "分析して", image_hash)
+
+        self.assertEqual(key, ResponseCache.make_key('gemini-1.5-flash', "分析して", image_hash))
+        self.assertNotEqual(key, ResponseCache.make_key('gemini-1.5-pro', "分析して", image_hash))
+        self.assertNotEqual(key, ResponseCache.make_key('gemini-1.5-flash', "分析して"))
+        with open(image_path, 'wb') as f:
+            f.write(b'\xff\xd8other')
+        self.assertNotEqual(key, ResponseCache.make_key('gemini-1.5-flash', "分析して",
+                                                        ResponseCache.hash_file(image_path)))
+
+    def test_persists_and_counts(self):
+        """保存した応答を別のインスタンスから読み込め、ヒット・ミスを数えるかテスト"""
+        cache = ResponseCache(self.db_path)
+        self.assertIsNone(cache.get('a'))
+        cache.put('a', '{"ok": true}', 'gemini-1.5-flash')
+        cache.close()
+
+        cache = ResponseCache(self.db_path)
+        self.assertEqual(cache.get('a'), '{"ok": true}')
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['entries'], 1)
+        cache.close()
+
+    def test_least_recently_used_is_evicted(self):
+        """合計サイズが上限を超えた場合に、最後に参照した時刻が古いものから削除するかテスト"""
+        cache = ResponseCache(self.db_path, max_bytes=25)
+        with patch('src.response_cache.time.time', side_effect=[1, 2, 3, 4]):
+            cache.put('a', 'x' * 10)
+            cache.put('b', 'y' * 10)
+            cache.get('a')
+            cache.put('c', 'z' * 10)
+
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 'x' * 10)
+        self.assertEqual(cache.get('c'), 'z' * 10)
+        self.assertEqual(cache.evictions, 1)
+        cache.close()
+
+    def test_expired_entry_is_removed(self):
+        """有効期間を過ぎた応答を使わずに削除するかテスト"""
+        cache = ResponseCache(self.db_path, ttl=60)
+        with patch('src.response_cache.time.time', side_effect=[100, 150, 200]):
+            cache.put('a', 'x')
+            self.assertEqual(cache.get('a'), 'x')
+            self.assertIsNone(cache.get('a'))
+
+        self.assertEqual(cache.stats()['entries'], 0)
+        cache.close()
+
+
+class TestGeminiClientCache(unittest.TestCase):
+    """応答キャッシュを使うGeminiClientのテスト"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache = ResponseCache(os.path.join(self.temp_dir, 'responses.sqlite3'))
+        self.model = MagicMock()
+        self.model.generate_content.return_value = MagicMock(text='```json\n{"ok": true}\n```')
+        backend = MagicMock(requires_api_key=True)
+        backend.create_model.return_value = self.model
+        with patch.dict(os.environ, {'GEMINI_API_KEY': 'key'}, clear=True):
+            self.client = GeminiClient(response_cache=self.cache, backoff=Backoff(base=0.001), backend=backend)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_identical_prompt_is_not_sent_twice(self):
+        """同じプロンプトはAPIを呼び出さずにキャッシュから返すかテスト"""
+        self.assertEqual(self.client.text_analysis("分析して"), '{"ok": true}')
+        self.assertEqual(self.client.text_analysis("分析して"), '{"ok": true}')
+        self.assertEqual(self.model.generate_content.call_count, 1)
+
+        self.client.text_analysis("別の分析")
+        self.assertEqual(self.model.generate_content.call_count, 2)
+
+    def test_cached_response_without_api_keys(self):
+        """APIキーがなくてもキャッシュされた応答を返すかテスト"""
+        self.client.text_analysis("分析して")
+        self.client.api_keys = []
+
+        self.assertEqual(self.client.text_analysis("分析して"), '{"ok": true}')
+
+    def test_failure_is_not_cached(self):
+        """失敗した応答は保存しないかテスト"""
+        self.model.generate_content.side_effect = api_exceptions.ServiceUnavailable("down")
+
+        self.assertEqual(self.client.text_analysis("分析して"), "{}")
+
+        self.assertEqual(self.cache.stats()['entries'], 0)
+
+    def test_stream_is_cached(self):
+        """ストリーミングの応答を保存し、同じプロンプトはキャッシュから返すかテスト"""
+        self.model.generate_content.return_value = [MagicMock(text='```json\n{"ok"'),
+                                                    MagicMock(text=': true}\n```')]
+
+        self.assertEqual(''.join(self.client.text_analysis_stream("分析して")), '```json\n{"ok": true}\n```')
+        self.assertEqual(list(self.client.text_analysis_stream("分析して")), ['{"ok": true}'])
+        self.assertEqual(self.client.text_analysis("分析して"), '{"ok": true}')
+        self.assertEqual(self.model.generate_content.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
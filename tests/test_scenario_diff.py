@@ -0,0 +1,130 @@
+"""シナリオの差分と再選択のテスト"""
+
+import unittest
+import copy
+import json
+import os
+import sys
+from unittest.mock import MagicMock
+
+# テスト対象のモジュールパスを追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.scenario_diff import diff_scenarios
+from src.scene_selector import SceneSelector
+from tests.test_scene_ranker import make_contents
+from tests.test_scene_selector import SCENARIO
+
+
+def respond_by_section(prompt):
+    """プロンプトに含まれるセクションごとに、対応するシーンを1つ選んだ応答を返す"""
+    picks = {'intro': ('video_nodes_0000', 0), 'main_1': ('video_nodes_0001', 1), 'outro': ('video_nodes_0002', 2)}
+    scenes = [{'content_id': cid, 'scene_index': idx, 'section_id': section_id}
+              for section_id, (cid, idx) in picks.items() if f'"section_id": "{section_id}"' in prompt]
+    return json.dumps({'selected_scenes': scenes})
+
+
+class TestScenarioDiff(unittest.TestCase):
+    """diff_scenariosのテスト"""
+
+    def test_detects_changed_added_and_removed_sections(self):
+        """変更・追加・削除されたセクションを検出するかテスト"""
+        current = copy.deepcopy(SCENARIO)
+        current['sections'][1]['description'] = "山頂で昼食をとる"
+        current['sections'][2]['section_id'] = 'ending'
+
+        diff = diff_scenarios(SCENARIO, current)
+
+        self.assertEqual(diff['changed'], ['main_1', 'ending'])
+        self.assertEqual(diff['unchanged'], ['intro'])
+        self.assertEqual(diff['removed'], ['outro'])
+        self.assertFalse(diff['global_changed'])
+
+    def test_formatting_changes_are_ignored(self):
+        """キーの順序や前後の空白だけの違いは変更としないかテスト"""
+        current = copy.deepcopy(SCENARIO)
+        current['sections'][0] = dict(reversed(list(current['sections'][0].items())))
+        current['sections'][0]['title'] += "  "
+
+        diff = diff_scenarios(SCENARIO, current)
+
+        self.assertEqual(diff['changed'], [])
+        self.assertFalse(diff['global_changed'])
+        self.assertTrue(diff_scenarios(SCENARIO, dict(SCENARIO, title="夏の登山"))['global_changed'])
+
+
+class TestReselect(unittest.TestCase):
+    """SceneSelector.reselectのテスト"""
+
+    def setUp(self):
+        self.contents = make_contents(3)
+        self.api_client = MagicMock()
+        self.api_client.text_analysis.side_effect = respond_by_section
+        self.selector = SceneSelector(self.api_client)
+        scenes = self.selector.select(self.contents, SCENARIO)
+        self.previous = self.selector.selection_record(self.contents, SCENARIO, scenes)
+        self.api_client.text_analysis.reset_mock()
+
+    def test_only_changed_section_is_reselected(self):
+        """変更したセクションだけを選択し直し、セクション順に結合するかテスト"""
+        current = copy.deepcopy(SCENARIO)
+        current['sections'][1]['description'] = "山頂で昼食をとる"
+
+        selected = self.selector.reselect(self.contents, current, self.previous)
+
+        self.assertEqual(self.api_client.text_analysis.call_count, 1)
+        prompt = self.api_client.text_analysis.call_args[0][0]
+        self.assertIn('"section_id": "main_1"', prompt)
+        self.assertNotIn('"section_id": "intro"', prompt)
+        self.assertEqual([s['section_id'] for s in selected], ['intro', 'main_1', 'outro'])
+        self.assertEqual(selected[0], self.previous['scenes'][0])
+
+    def test_unchanged_scenario_makes_no_request(self):
+        """シナリオが変わらない場合は生成AIを呼び出さないかテスト"""
+        selected = self.selector.reselect(self.contents, SCENARIO, self.previous)
+
+        self.api_client.text_analysis.assert_not_called()
+        self.assertEqual(selected, self.previous['scenes'])
+
+    def test_changed_contents_reselect_everything(self):
+        """コンテンツが変わった場合はすべてを選択し直すかテスト"""
+        self.contents[0]['scenes'][0]['transcript'] = "バスで出発します"
+
+        selected = self.selector.reselect(self.contents, SCENARIO, self.previous)
+
+        self.assertEqual(self.api_client.text_analysis.call_count, 1)
+        self.assertIn('"section_id": "intro"', self.api_client.text_analysis.call_args[0][0])
+        self.assertEqual(len(selected), 3)
+
+    def test_section_without_id_keeps_its_position(self):
+        """section_idのないセクションを選択し直した場合も、元の位置のセクションとして結合するかテスト"""
+        scenario = copy.deepcopy(SCENARIO)
+        for section in scenario['sections']:
+            del section['section_id']
+        picks = {"駅から出発する": 0, "山頂の景色": 1, "下山する": 2, "日の入りを眺めて下山する": 2}
+
+        def respond(prompt):
+            scenes = [{'content_id': f'video_nodes_000{index}', 'scene_index': index}
+                      for description, index in picks.items() if description in prompt]
+            return json.dumps({'selected_scenes': scenes})
+
+        self.api_client.text_analysis.side_effect = respond
+        selector = SceneSelector(self.api_client, per_section=True)
+        scenes = selector.select(self.contents, scenario)
+        previous = selector.selection_record(self.contents, scenario, scenes)
+        self.assertEqual([s['section_id'] for s in scenes], ['0', '1', '2'])
+
+        current = copy.deepcopy(scenario)
+        current['sections'][2]['description'] = "日の入りを眺めて下山する"
+        selected = selector.reselect(self.contents, current, previous)
+
+        self.assertEqual([(s['section_id'], s['content_id']) for s in selected],
+                         [('0', 'video_nodes_0000'), ('1', 'video_nodes_0001'), ('2', 'video_nodes_0002')])
+
+        current['sections'][1]['description'] = "山頂の景色を撮る"
+        selected = selector.reselect(self.contents, current, previous)
+
+        self.assertEqual([s['section_id'] for s in selected], ['0', '1', '2'])
+
+
+if __name__ == '__main__':
+    unittest.main()
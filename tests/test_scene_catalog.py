@@ -0,0 +1,110 @@
+"""SceneCatalogのテスト"""
+
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+
+# テスト対象のモジュールパスを追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.content_crawler import ContentCrawler
+from src.scene_catalog import SceneCatalog
+from tests.test_content_crawler import write_nodes
+
+
+class TestSceneCatalog(unittest.TestCase):
+    """SceneCatalogクラスのテスト"""
+
+    def setUp(self):
+        self.input_dir = tempfile.mkdtemp()
+        write_nodes(self.input_dir, "video_nodes_A", [
+            {"start": 0.0, "end": 10.0, "description": "出発の準備",
+             "transcripts": [{"start": 0.5, "end": 3.0, "text": "おはようございます"},
+                             {"start": 3.0, "end": 6.0, "text": "今日は山に登ります"}],
+             "context_analysis": {"activity": ["話している"], "weather": ["晴れ"],
+                                  "time_of_day": "朝"}},
+            {"start": 10.0, "end": 40.0,
+             "transcripts": [{"start": 12.0, "end": 15.0, "text": "山頂が見えてきました"}],
+             "context_analysis": {"activity": ["歩いている"], "weather": ["雪"]}}
+        ], duration=40.0, topics=["冬の登山"])
+        write_nodes(self.input_dir, "video_nodes_B", [
+            {"start": 0.0, "end": 5.0,
+             "transcripts": [{"start": 0.0, "end": 5.0, "text": "下山します"}],
+             "context_analysis": {"activity": ["歩いている"]}}
+        ], duration=5.0, topics=["下山"])
+        self.contents = ContentCrawler(detailed=True).crawl(self.input_dir)
+        self.catalog = SceneCatalog()
+        self.catalog.load(self.contents)
+
+    def tearDown(self):
+        self.catalog.close()
+        shutil.rmtree(self.input_dir)
+
+    def test_load_creates_rows(self):
+        """クリップ・シーン・区間・タグが登録されるかテスト"""
+        statistics = self.catalog.get_statistics()
+
+        self.assertEqual(statistics['content_count'], 2)
+        self.assertEqual(statistics['scene_count'], 3)
+        self.assertEqual(statistics['segment_count'], 4)
+        self.assertEqual(statistics['tag_count'], 6)
+        clip = self.catalog.get_clips()[0]
+        self.assertEqual(clip['content_id'], "video_nodes_A")
+        self.assertEqual(clip['topics'], ["冬の登山"])
+        self.assertEqual(clip['scene_count'], 2)
+
+    def test_search_transcripts(self):
+        """長い語は全文検索、短い語は部分一致で検索できるかテスト"""
+        results = self.catalog.search_transcripts("山頂が見え")
+        self.assertEqual([(r['content_id'], r['scene_index'], r['start_time']) for r in results],
+                         [("video_nodes_A", 1, 12.0)])
+
+        results = self.catalog.search_transcripts("山")
+        self.assertEqual(len(results), 3)
+        self.assertEqual(self.catalog.search_transcripts("山 今日"), [results[0]])
+        self.assertEqual(self.catalog.search_transcripts("存在しない言葉"), [])
+
+    def test_find_scenes_by_tag_and_time(self):
+        """タグ・トピック・時間範囲・長さでシーンを絞り込めるかテスト"""
+        walking = self.catalog.find_scenes(tag="歩いている")
+        self.assertEqual([(s['content_id'], s['scene_index']) for s in walking],
+                         [("video_nodes_A", 1), ("video_nodes_B", 0)])
+        self.assertEqual(walking[0]['keywords'], ["歩いている"])
+        self.assertEqual(walking[0]['tags']['weather'], ["雪"])
+
+        self.assertEqual(len(self.catalog.find_scenes(category="time_of_day")), 1)
+        self.assertEqual(len(self.catalog.find_scenes(topic="下山")), 1)
+        self.assertEqual(len(self.catalog.find_scenes(content_id="video_nodes_A",
+                                                      start_time=5.0, end_time=12.0)), 2)
+        self.assertEqual(len(self.catalog.find_scenes(min_duration=20.0)), 1)
+        self.assertEqual(self.catalog.get_tags("weather")[0]['scene_count'], 1)
+
+    def test_reload_replaces_and_removes_clips(self):
+        """再登録で置き換え、含まれないクリップが削除されるかテスト"""
+        self.catalog.load(self.contents[:1])
+
+        self.assertEqual(self.catalog.get_statistics()['content_count'], 1)
+        self.assertEqual(self.catalog.search_transcripts("下山します"), [])
+        self.assertEqual(len(self.catalog.search_transcripts("おはよう")), 1)
+
+    def test_plain_and_compact_contents(self):
+        """detailedでないクローラー出力からも区間とタグを補って登録できるかテスト"""
+        for crawler in (ContentCrawler(), ContentCrawler(compact=True)):
+            with SceneCatalog() as catalog:
+                catalog.load(crawler.crawl(self.input_dir))
+                self.assertEqual(catalog.get_statistics()['segment_count'], 3)
+                self.assertEqual(len(catalog.find_scenes(tag="歩いている", category="activity")), 2)
+
+    def test_persists_to_file(self):
+        """ファイルに保存したカタログを開き直して検索できるかテスト"""
+        db_path = os.path.join(self.input_dir, "scene_catalog.db")
+        with SceneCatalog(db_path) as catalog:
+            catalog.load(self.contents)
+        with SceneCatalog(db_path) as catalog:
+            self.assertEqual(catalog.get_statistics()['scene_count'], 3)
+            self.assertEqual(len(catalog.search_transcripts("ございます")), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
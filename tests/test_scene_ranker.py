@@ -0,0 +1,110 @@
+"""SceneRankerのテスト"""
+
+import unittest
+import json
+import os
+import sys
+from unittest.mock import MagicMock
+
+# テスト対象のモジュールパスを追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.scene_ranker import SceneRanker, tokenize
+from src.scene_selector import SceneSelector
+
+
+def make_contents(clip_count):
+    """テスト用のコンテンツを作成（各クリップに出発・山頂・下山のシーンを含む）"""
+    contents = []
+    for i in range(clip_count):
+        contents.append({
+            'content_id': f"video_nodes_{i:04d}",
+            'total_duration': 30.0,
+            'scenes': [
+                {'start_time': 0.0, 'end_time': 10.0, 'transcript': "駅から出発します",
+                 'keywords': ["歩いている"], 'topics': ["登山"]},
+                {'start_time': 10.0, 'end_time': 20.0, 'transcript': "山頂に到着しました。景色が最高",
+                 'keywords': ["景色を見る"], 'topics': ["登山"]},
+                {'start_time': 20.0, 'end_time': 30.0, 'transcript': "これから下山します",
+                 'keywords': ["歩いている"], 'topics': ["登山"]},
+            ]
+        })
+    return contents
+
+
+SCENARIO = {
+    'sections': [
+        {'section_id': 'intro', 'title': "出発", 'description': "駅から出発するシーン",
+         'key_messages': ["出発の様子"]},
+        {'section_id': 'main_1', 'title': "山頂", 'description': "山頂に到着して景色を楽しむ",
+         'key_messages': ["山頂からの景色"]},
+    ]
+}
+
+
+class TestSceneRanker(unittest.TestCase):
+    """SceneRankerクラスのテスト"""
+
+    def test_tokenize(self):
+        """日本語は文字bigram、英数字は単語に分割されるかテスト"""
+        self.assertEqual(tokenize("山頂へ GoPro!"), ["山頂", "頂へ", "gopro"])
+        self.assertEqual(tokenize("雪、晴れ"), ["雪", "晴れ"])
+
+    def test_rank_sections_prefers_matching_scenes(self):
+        """セクションの内容に一致するシーンが上位になるかテスト"""
+        ranker = SceneRanker().fit(make_contents(3))
+        candidates = ranker.rank_sections(SCENARIO, top_k=3)
+
+        self.assertEqual([c['scene_index'] for c in candidates['intro']], [0, 0, 0])
+        self.assertEqual([c['scene_index'] for c in candidates['main_1']], [1, 1, 1])
+        self.assertGreater(candidates['main_1'][0]['score'], 0)
+
+    def test_rank_sections_keys_empty_section_id_by_position(self):
+        """section_idが空またはnullのセクションの候補が、位置の文字列をキーにするかテスト"""
+        scenario = {'sections': [dict(SCENARIO['sections'][0], section_id=''),
+                                 dict(SCENARIO['sections'][1], section_id=None)]}
+        candidates = SceneRanker().fit(make_contents(3)).rank_sections(scenario, top_k=3)
+
+        self.assertEqual(list(candidates), ['0', '1'])
+
+    def test_rank_fills_with_spread_scenes(self):
+        """一致するシーンが足りない場合はライブラリ全体から補うかテスト"""
+        ranker = SceneRanker().fit(make_contents(4))
+        ranked = ranker.rank("関係のない言葉", top_k=4)
+
+        self.assertEqual(len(ranked), 4)
+        self.assertEqual(len({c['content_id'] for c in ranked}), 4)
+        self.assertEqual(len(ranker.rank("山頂", top_k=100)), 12)
+
+
+class TestSceneSelectorPreRanking(unittest.TestCase):
+    """事前ランキングを使ったSceneSelectorのテスト"""
+
+    def select(self, contents, candidates_per_section):
+        api_client = MagicMock()
+        api_client.text_analysis.return_value = json.dumps({'selected_scenes': [
+            {'content_id': "video_nodes_0001", 'scene_index': 1, 'section_id': 'main_1'}
+        ]})
+        selector = SceneSelector(api_client, candidates_per_section=candidates_per_section)
+        selected = selector.select(contents, SCENARIO)
+        return selected, api_client.text_analysis.call_args[0][0]
+
+    def test_prompt_size_does_not_grow_with_library(self):
+        """候補数を指定するとプロンプトの大きさがクリップ数に依存しないかテスト"""
+        _, small_prompt = self.select(make_contents(10), candidates_per_section=2)
+        _, large_prompt = self.select(make_contents(200), candidates_per_section=2)
+        _, full_prompt = self.select(make_contents(200), candidates_per_section=None)
+
+        self.assertAlmostEqual(len(large_prompt), len(small_prompt), delta=50)
+        self.assertLess(len(large_prompt) * 10, len(full_prompt))
+
+    def test_selection_uses_original_scene_index(self):
+        """候補から選ばれたシーンが元のシーン情報で解決されるかテスト"""
+        selected, prompt = self.select(make_contents(5), candidates_per_section=3)
+
+        self.assertIn("セクション main_1 の候補シーン", prompt)
+        self.assertEqual(selected[0]['transcript'], "山頂に到着しました。景色が最高")
+        self.assertEqual(selected[0]['start_time'], 10.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+"""SceneSelectorのテスト"""
+
+import unittest
+import json
+import os
+import sys
+import threading
+import time
+from unittest.mock import MagicMock
+
+# テスト対象のモジュールパスを追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.scene_index import SceneIndex
+from src.scene_selector import SceneSelector
+from tests.test_scene_ranker import make_contents
+
+SCENARIO = {
+    'title': "冬の登山",
+    'sections': [
+        {'section_id': 'intro', 'title': "出発", 'description': "駅から出発する", 'key_messages': []},
+        {'section_id': 'main_1', 'title': "山頂", 'description': "山頂の景色", 'key_messages': []},
+        {'section_id': 'outro', 'title': "下山", 'description': "下山する", 'key_messages': []},
+    ]
+}
+
+
+def section_of(prompt):
+    """プロンプトに含まれるシナリオのセクションIDを取得"""
+    for section in SCENARIO['sections']:
+        if f'"section_id": "{section["section_id"]}"' in prompt:
+            yield section['section_id']
+
+
+class TestSceneSelectorPerSection(unittest.TestCase):
+    """セクションごとに並行して選択するSceneSelectorのテスト"""
+
+    def setUp(self):
+        self.contents = make_contents(3)
+        self.api_client = MagicMock()
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def respond(self, prompt):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.05)
+        with self.lock:
+            self.active -= 1
+
+        sections = list(section_of(prompt))
+        self.assertEqual(len(sections), 1)
+        if sections[0] == 'intro':
+            scenes = [{'content_id': "video_nodes_0000", 'scene_index': 0}]
+        elif sections[0] == 'main_1':
+            scenes = [{'content_id': "video_nodes_0000", 'scene_index': 0},
+                      {'content_id': "video_nodes_0001", 'scene_index': 1}]
+        else:
+            raise RuntimeError("タイムアウト")
+        return json.dumps({'selected_scenes': scenes})
+
+    def test_sections_are_selected_concurrently_and_merged(self):
+        """セクションごとに並行してリクエストし、重複を除いて結合するかテスト"""
+        self.api_client.text_analysis.side_effect = self.respond
+        selector = SceneSelector(self.api_client, per_section=True)
+
+        selected = selector.select(self.contents, SCENARIO)
+
+        self.assertEqual(self.api_client.text_analysis.call_count, 3)
+        self.assertGreater(self.max_active, 1)
+        self.assertEqual([(s['section_id'], s['content_id'], s['scene_index']) for s in selected], [
+            ('intro', "video_nodes_0000", 0),
+            ('main_1', "video_nodes_0001", 1),
+        ])
+
+    def test_section_workers_limit(self):
+        """同時リクエスト数を制限できるかテスト"""
+        self.api_client.text_analysis.side_effect = self.respond
+        selector = SceneSelector(self.api_client, candidates_per_section=2,
+                                 per_section=True, section_workers=1)
+
+        selected = selector.select(self.contents, SCENARIO)
+
+        self.assertEqual(self.max_active, 1)
+        self.assertEqual(len(selected), 2)
+
+    def test_single_prompt_failure_loses_everything(self):
+        """従来の一括選択では応答に失敗すると何も選択されないことを確認"""
+        self.api_client.text_analysis.side_effect = RuntimeError("タイムアウト")
+
+        self.assertEqual(SceneSelector(self.api_client).select(self.contents, SCENARIO), [])
+
+
+class TestSceneIndex(unittest.TestCase):
+    """選択シーンを解決するSceneIndexのテスト"""
+
+    def setUp(self):
+        self.index = SceneIndex(make_contents(3))
+
+    def test_resolve_keeps_order_and_scene_info(self):
+        """選択順を保ち、シーンのトランスクリプトなどを付加するかテスト"""
+        selected, stats = self.index.resolve([
+            {'content_id': 'video_nodes_0002', 'scene_index': 1, 'section_id': 'main_1', 'reason': "景色"},
+            {'content_id': 'video_nodes_0000', 'scene_index': 0},
+        ])
+
+        self.assertEqual([(s['content_id'], s['scene_index']) for s in selected],
+                         [('video_nodes_0002', 1), ('video_nodes_0000', 0)])
+        self.assertEqual(selected[0]['transcript'], "山頂に到着しました。景色が最高")
+        self.assertEqual((selected[1]['start_time'], selected[1]['end_time']), (0.0, 10.0))
+        self.assertEqual(stats, {'resolved': 2, 'clamped': 0, 'hallucinated': []})
+
+    def test_resolve_clamps_times_to_scene_bounds(self):
+        """開始・終了時間がシーンの範囲に収められるかテスト"""
+        selected, stats = self.index.resolve([
+            {'content_id': 'video_nodes_0000', 'scene_index': 1, 'start_time': 12, 'end_time': 45},
+            {'content_id': 'video_nodes_0000', 'scene_index': 1, 'start_time': 25, 'end_time': 28},
+            {'content_id': 'video_nodes_0000', 'scene_index': 1, 'start_time': "不明"},
+        ])
+
+        self.assertEqual([(s['start_time'], s['end_time']) for s in selected],
+                         [(12.0, 20.0), (10.0, 20.0), (10.0, 20.0)])
+        self.assertEqual(stats['clamped'], 3)
+
+    def test_resolve_flags_hallucinated_ids(self):
+        """存在しないコンテンツやシーン番号が除外されて記録されるかテスト"""
+        selected, stats = self.index.resolve([
+            {'content_id': 'video_nodes_9999', 'scene_index': 0},
+            {'content_id': 'video_nodes_0001', 'scene_index': 3},
+            {'content_id': 'video_nodes_0001', 'scene_index': -1},
+            {'content_id': 'video_nodes_0001', 'scene_index': "1"},
+            {'content_id': 'video_nodes_0001', 'scene_index': 2},
+        ])
+
+        self.assertEqual([(s['content_id'], s['scene_index']) for s in selected], [('video_nodes_0001', 2)])
+        self.assertEqual([h['scene_index'] for h in stats['hallucinated']], [0, 3, -1, "1"])
+
+    def test_selector_drops_hallucinated_scenes(self):
+        """SceneSelectorが存在しないシーンを除いた結果を返すかテスト"""
+        api_client = MagicMock()
+        api_client.text_analysis.return_value = json.dumps({'selected_scenes': [
+            {'content_id': 'video_nodes_0001', 'scene_index': 1, 'end_time': 99},
+            {'content_id': 'video_nodes_0042', 'scene_index': 1},
+        ]})
+
+        selected = SceneSelector(api_client).select(make_contents(3), SCENARIO)
+
+        self.assertEqual([(s['content_id'], s['end_time']) for s in selected], [('video_nodes_0001', 20.0)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+"""SceneSolverのテスト"""
+
+import unittest
+import os
+import sys
+import time
+from unittest.mock import MagicMock
+
+# テスト対象のモジュールパスを追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.scene_selector import SceneSelector
+from src.scene_solver import SceneSolver
+from tests.test_scene_ranker import make_contents
+
+SCENARIO = {
+    'sections': [
+        {'section_id': 'intro', 'title': "出発", 'description': "駅から出発する", 'key_messages': [],
+         'duration': 20, 'scene_requirements': {'min_duration': 5.0, 'max_duration': 10.0}},
+        {'section_id': 'main_1', 'title': "山頂", 'description': "山頂の景色", 'key_messages': [],
+         'duration': 25, 'scene_requirements': {'min_duration': 5.0, 'max_duration': 8.0,
+                                                'required_elements': ["景色"]}},
+    ]
+}
+
+
+def total_length(scenes):
+    return sum(s['end_time'] - s['start_time'] for s in scenes)
+
+
+class TestSceneSolver(unittest.TestCase):
+    """SceneSolverクラスのテスト"""
+
+    def test_fills_sections_with_relevant_scenes(self):
+        """セクションの尺を関連するシーンで埋め、max_durationで切り出すかテスト"""
+        selected = SceneSolver().solve(make_contents(5), SCENARIO)
+        intro = [s for s in selected if s['section_id'] == 'intro']
+        main = [s for s in selected if s['section_id'] == 'main_1']
+
+        self.assertEqual([s['scene_index'] for s in intro], [0, 0])
+        self.assertEqual(total_length(intro), 20.0)
+        self.assertEqual([s['scene_index'] for s in main], [1, 1, 1])
+        self.assertTrue(all(s['end_time'] - s['start_time'] == 8.0 for s in main))
+        self.assertLessEqual(total_length(main), 25.0)
+
+    def test_chronological_and_no_overlaps(self):
+        """セクション内が撮影順に並び、同じシーンが重複して選ばれないかテスト"""
+        contents = make_contents(3)
+        scenario = {'sections': [dict(SCENARIO['sections'][0], duration=60,
+                                      scene_requirements={'min_duration': 5.0, 'max_duration': 10.0})] * 2}
+        scenario['sections'][1] = dict(scenario['sections'][1], section_id='main_1')
+
+        selected = SceneSolver().solve(contents, scenario)
+        keys = [(s['content_id'], s['scene_index']) for s in selected]
+
+        self.assertEqual(len(keys), len(set(keys)))
+        self.assertEqual(len(keys), 9)
+        for section_id in ('intro', 'main_1'):
+            picks = [(s['content_id'], s['start_time']) for s in selected if s['section_id'] == section_id]
+            self.assertEqual(picks, sorted(picks))
+
+    def test_skips_scenes_shorter_than_min_duration(self):
+        """min_duration未満のシーンが選ばれないかテスト"""
+        scenario = {'sections': [dict(SCENARIO['sections'][0],
+                                      scene_requirements={'min_duration': 12.0, 'max_duration': 20.0})]}
+
+        self.assertEqual(SceneSolver().solve(make_contents(3), scenario), [])
+
+    def test_empty_section_id_uses_position(self):
+        """section_idが空またはnullのセクションは、位置の文字列で選択結果に記録されるかテスト"""
+        scenario = {'sections': [dict(SCENARIO['sections'][0], section_id=''),
+                                 dict(SCENARIO['sections'][1], section_id=None)]}
+        selected = SceneSolver().solve(make_contents(5), scenario)
+
+        self.assertEqual({s['section_id'] for s in selected}, {'0', '1'})
+
+    def test_thousands_of_scenes(self):
+        """数千シーンでも1秒未満で解けるかテスト"""
+        contents = make_contents(1500)
+        scenario = {'sections': [dict(SCENARIO['sections'][i % 2], section_id=f"s{i}", duration=120)
+                                 for i in range(6)]}
+
+        start = time.perf_counter()
+        selected = SceneSolver().solve(contents, scenario)
+        elapsed = time.perf_counter() - start
+
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual(len(selected), len({(s['content_id'], s['scene_index']) for s in selected}))
+
+    def test_selector_solver_strategy_skips_llm(self):
+        """selection_strategyがsolverの場合は生成AIを呼び出さないかテスト"""
+        api_client = MagicMock()
+        selector = SceneSelector(api_client, strategy='solver')
+
+        selected = selector.select(make_contents(3), SCENARIO)
+
+        self.assertTrue(selected)
+        api_client.text_analysis.assert_not_called()
+        with self.assertRaises(ValueError):
+            SceneSelector(api_client, strategy='random')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+"""SceneTableのテスト"""
+
+import unittest
+import json
+import os
+import sys
+import threading
+
+# テスト対象のモジュールパスを追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.scene_table import SceneTable, StringPool
+
+
+class TestSceneTable(unittest.TestCase):
+    """SceneTableクラスのテスト"""
+
+    def setUp(self):
+        self.scenes = [
+            {'start_time': 0.0, 'end_time': 4.5, 'transcript': "出発します",
+             'keywords': ["歩いている", "話している"], 'topics': ["冬の登山", "健康維持"]},
+            {'start_time': 4.5, 'end_time': 10.0, 'transcript': "",
+             'keywords': [], 'topics': ["冬の登山", "健康維持"]},
+            {'start_time': 10.0, 'end_time': 12.0, 'transcript': "到着",
+             'keywords': ["歩いている"], 'topics': ["冬の登山", "健康維持"]}
+        ]
+        self.pool = StringPool()
+        self.table = SceneTable.from_scenes(self.scenes, self.pool)
+
+    def test_views_match_scene_dicts(self):
+        """各行のビューが元のシーン辞書と等しいかテスト"""
+        self.assertEqual(len(self.table), 3)
+        self.assertEqual(list(self.table), self.scenes)
+        self.assertEqual(self.table[-1]['transcript'], "到着")
+        self.assertEqual(self.table[0].get('keywords'), ["歩いている", "話している"])
+        self.assertEqual(self.table[1].get('effects', []), [])
+
+    def test_columns(self):
+        """開始・終了・長さが配列として保持されるかテスト"""
+        self.assertEqual(self.table.duration.tolist(), [4.5, 5.5, 2.0])
+        self.assertEqual(self.table.start.dtype.kind, 'f')
+
+    def test_strings_are_interned(self):
+        """キーワードとトピックがプール内で共有されるかテスト"""
+        SceneTable.from_scenes(self.scenes, self.pool)
+
+        # 「歩いている」「話している」「冬の登山」「健康維持」の4語のみ
+        self.assertEqual(len(self.pool), 4)
+
+    def test_to_list_is_json_serializable(self):
+        """to_listの結果をJSONに変換できるかテスト"""
+        restored = json.loads(json.dumps(self.table.to_list(), ensure_ascii=False))
+
+        self.assertEqual(restored, self.scenes)
+
+    def test_extra_fields_round_trip(self):
+        """列に持たないフィールドや先頭と異なるトピックも、元のシーン辞書に戻せるかテスト"""
+        scenes = [dict(scene) for scene in self.scenes]
+        scenes[0].update({'description': "山道を歩く", 'tags': ["屋外"],
+                          'segments': [{'start': 0.0, 'end': 2.0, 'text': "出発"}]})
+        scenes[2]['topics'] = ["到着"]
+        table = SceneTable.from_scenes(scenes, self.pool)
+
+        self.assertEqual(table[0]['description'], "山道を歩く")
+        self.assertEqual(table[2]['topics'], ["到着"])
+        self.assertEqual(len(table[0]), len(scenes[0]))
+        self.assertIsNone(table.extras[1])
+        self.assertEqual(json.loads(json.dumps(table.to_list(), ensure_ascii=False)), scenes)
+
+    def test_intern_from_threads(self):
+        """複数のスレッドから同じ文字列を登録しても、1つのIDになるかテスト"""
+        pool = StringPool()
+        words = [f"語{i}" for i in range(200)]
+        results = []
+
+        def intern_all():
+            results.append([pool.intern(word) for word in words])
+
+        threads = [threading.Thread(target=intern_all) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(pool), len(words))
+        self.assertTrue(all(ids == results[0] for ids in results))
+        self.assertEqual([pool.lookup(i) for i in results[0]], words)
+
+    def test_index_out_of_range(self):
+        """範囲外のインデックスでIndexErrorになるかテスト"""
+        with self.assertRaises(IndexError):
+            self.table[3]
+        self.assertEqual(len(self.table[1:]), 2)
+
+    def test_empty_scenes(self):
+        """シーンがない場合も空のテーブルを作成できるかテスト"""
+        table = SceneTable.from_scenes([])
+
+        self.assertEqual(len(table), 0)
+        self.assertEqual(table.topics(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+"""SceneVectorIndexのテスト"""
+
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+from unittest.mock import MagicMock
+
+import numpy as np
+
+# テスト対象のモジュールパスを追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.scene_selector import SceneSelector
+from src.scene_vectors import SceneVectorIndex
+from tests.test_scene_ranker import SCENARIO, make_contents
+
+
+class TestSceneVectorIndex(unittest.TestCase):
+    """SceneVectorIndexクラスのテスト"""
+
+    def setUp(self):
+        self.contents = make_contents(5)
+        self.index = SceneVectorIndex().fit(self.contents)
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_matrix_is_normalized(self):
+        """全シーンのベクトルが1つの正規化された行列になっているかテスト"""
+        self.assertEqual(self.index.matrix.shape, (15, 512))
+        self.assertEqual(self.index.matrix.dtype, np.float32)
+        np.testing.assert_allclose(np.linalg.norm(self.index.matrix, axis=1), 1.0, rtol=1e-5)
+
+    def test_search_matches_paraphrase(self):
+        """言い換えた検索語でも関連するシーンが上位になるかテスト"""
+        results = self.index.search(["景色がきれいな山のてっぺん", "駅から歩いて出発する"], top_k=5)
+
+        self.assertEqual([r['scene_index'] for r in results[0]], [1] * 5)
+        self.assertEqual([r['scene_index'] for r in results[1]], [0] * 5)
+        scores = [r['score'] for r in results[0]]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_rank_sections(self):
+        """SceneRankerと同じ形式でセクションごとの候補を返すかテスト"""
+        candidates = self.index.rank_sections(SCENARIO, top_k=3)
+
+        self.assertEqual(list(candidates), ['intro', 'main_1'])
+        self.assertEqual([c['scene_index'] for c in candidates['main_1']], [1, 1, 1])
+
+    def test_save_and_load_with_mmap(self):
+        """保存した行列がメモリマップで読み込まれ、同じ検索結果になるかテスト"""
+        path = os.path.join(self.temp_dir, 'scene_vectors.npy')
+        self.index.save(path)
+        loaded = SceneVectorIndex.load(path)
+
+        self.assertIsInstance(loaded.matrix, np.memmap)
+        self.assertEqual(loaded.search(["山頂"], 3), self.index.search(["山頂"], 3))
+
+    def test_load_or_fit_rebuilds_when_contents_change(self):
+        """コンテンツが変わった場合だけインデックスを作り直すかテスト"""
+        path = os.path.join(self.temp_dir, 'scene_vectors.npy')
+        SceneVectorIndex.load_or_fit(path, self.contents)
+
+        reused = SceneVectorIndex.load_or_fit(path, self.contents)
+        self.assertIsInstance(reused.matrix, np.memmap)
+
+        self.contents[0]['scenes'][0]['transcript'] = "バスで移動します"
+        rebuilt = SceneVectorIndex.load_or_fit(path, self.contents)
+        self.assertNotIsInstance(rebuilt.matrix, np.memmap)
+
+    def test_selector_uses_vector_ranking(self):
+        """SceneSelectorのrankingにvectorを指定すると候補の絞り込みに使われるかテスト"""
+        api_client = MagicMock()
+        api_client.text_analysis.return_value = '{"selected_scenes": []}'
+        selector = SceneSelector(api_client, candidates_per_section=2, ranking='vector')
+
+        selector.select(self.contents, SCENARIO)
+
+        prompt = api_client.text_analysis.call_args[0][0]
+        self.assertIn("セクション main_1 の候補シーン", prompt)
+        self.assertEqual(prompt.count("/ シーン 1:"), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+"""SelectionCacheのテスト"""
+
+import unittest
+import json
+import os
+import shutil
+import sys
+import tempfile
+from unittest.mock import MagicMock
+
+# テスト対象のモジュールパスを追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.scene_selector import SceneSelector
+from src.selection_cache import SelectionCache
+from tests.test_scene_ranker import SCENARIO, make_contents
+
+RESPONSE = json.dumps({'selected_scenes': [
+    {'content_id': 'video_nodes_0001', 'scene_index': 1, 'section_id': 'main_1', 'reason': "山頂"}
+]})
+
+
+class TestSelectionCache(unittest.TestCase):
+    """SelectionCacheクラスのテスト"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache = SelectionCache(os.path.join(self.temp_dir, 'selection_cache'))
+        self.contents = make_contents(3)
+        self.api_client = MagicMock()
+        self.api_client.model_name = 'gemini-1.5-flash'
+        self.api_client.text_analysis.return_value = RESPONSE
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_key_ignores_key_order_and_whitespace(self):
+        """キーの順序や文字列の前後の空白が違っても同じキーになるかテスト"""
+        fingerprint = SelectionCache.fingerprint(self.contents)
+        reordered = {'sections': [dict(reversed(list(s.items()))) for s in SCENARIO['sections']]}
+        reordered['sections'][0]['title'] = f" {reordered['sections'][0]['title']}\n"
+
+        self.assertEqual(self.cache.make_key(SCENARIO, fingerprint, 'gemini-1.5-flash'),
+                         self.cache.make_key(reordered, fingerprint, 'gemini-1.5-flash'))
+        self.assertNotEqual(self.cache.make_key(SCENARIO, fingerprint, 'gemini-1.5-flash'),
+                            self.cache.make_key(SCENARIO, fingerprint, 'gemini-1.5-pro'))
+
+    def test_fingerprint_changes_with_scenes(self):
+        """シーンの内容が変わるとフィンガープリントが変わるかテスト"""
+        before = SelectionCache.fingerprint(self.contents)
+        self.contents[2]['scenes'][0]['transcript'] = "バスで出発します"
+
+        self.assertNotEqual(before, SelectionCache.fingerprint(self.contents))
+
+    def test_repeat_select_uses_cache(self):
+        """同じ入力で選択を繰り返すと生成AIを呼び出さずに同じ結果を返すかテスト"""
+        first = SceneSelector(self.api_client, cache=self.cache).select(self.contents, SCENARIO)
+        second = SceneSelector(self.api_client, cache=self.cache).select(self.contents, SCENARIO)
+
+        self.assertEqual(self.api_client.text_analysis.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_bypass_and_changed_contents_call_llm(self):
+        """bypass_cacheを指定した場合やコンテンツが変わった場合は生成AIを呼び出すかテスト"""
+        SceneSelector(self.api_client, cache=self.cache).select(self.contents, SCENARIO)
+        SceneSelector(self.api_client, cache=self.cache, bypass_cache=True).select(self.contents, SCENARIO)
+        self.assertEqual(self.api_client.text_analysis.call_count, 2)
+
+        self.contents[0]['scenes'][1]['end_time'] = 18.0
+        SceneSelector(self.api_client, cache=self.cache).select(self.contents, SCENARIO)
+        self.assertEqual(self.api_client.text_analysis.call_count, 3)
+
+    def test_empty_result_is_not_cached(self):
+        """失敗して空になった結果はキャッシュしないかテスト"""
+        self.api_client.text_analysis.return_value = "{}"
+        SceneSelector(self.api_client, cache=self.cache).select(self.contents, SCENARIO)
+        SceneSelector(self.api_client, cache=self.cache).select(self.contents, SCENARIO)
+
+        self.assertEqual(self.api_client.text_analysis.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+"""起動時に読み込むモジュールのテスト"""
+
+import unittest
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 起動時に読み込まず、使う処理で初めて読み込む重い依存
+HEAVY_MODULES = ['torch', 'faster_whisper', 'PIL', 'google.generativeai', 'tkinter', 'numpy']
+
+
+class TestStartupImports(unittest.TestCase):
+    """CLIの起動時に重い依存を読み込まないかのテスト"""
+
+    def loaded_modules(self, statement):
+        code = f"import sys\n{statement}\nprint('\\n'.join(sorted(sys.modules)))"
+        output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout
+        return set(output.split())
+
+    def test_cli_does_not_import_heavy_modules(self):
+        """CLIとAPIクライアントの読み込みで重い依存を読み込まないかテスト"""
+        modules = self.loaded_modules("import src.cli\nfrom src.api_client import GeminiClient")
+        self.assertIn('src.main', modules)
+        for name in HEAVY_MODULES:
+            self.assertNotIn(name, modules)
+
+    def test_package_exports_are_lazy(self):
+        """パッケージから公開クラスを参照したときに定義モジュールを読み込むかテスト"""
+        modules = self.loaded_modules("import src\nsrc.SceneSelector")
+        self.assertIn('src.scene_selector', modules)
+        self.assertNotIn('src.ui_manager', modules)
@@ -0,0 +1,151 @@
+"""タイムライン組み立てのテスト"""
+
+import unittest
+import os
+import random
+import sys
+import tempfile
+import shutil
+import time
+
+# テスト対象のモジュールパスを追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.edl_generator import EDLGenerator
+from src.srt_generator import SRTGenerator
+from src.timeline import IntervalSet, TimelineAssembler
+
+SCENARIO = {
+    'title': "冬の登山",
+    'sections': [
+        {'section_id': 'intro', 'title': "出発", 'duration': 10},
+        {'section_id': 'main_1', 'title': "山頂", 'duration': 20},
+    ]
+}
+
+
+def scene(content_id, start, end, section_id='intro', transcript=''):
+    return {'content_id': content_id, 'start_time': start, 'end_time': end,
+            'section_id': section_id, 'transcript': transcript}
+
+
+class TestIntervalSet(unittest.TestCase):
+    """IntervalSetクラスのテスト"""
+
+    def test_uncovered_and_merge(self):
+        """使われていない部分の取得と、隣接・重なる区間の結合をテスト"""
+        intervals = IntervalSet()
+        intervals.add(10, 20)
+        intervals.add(30, 40)
+
+        self.assertEqual(intervals.uncovered(5, 45), [(5, 10), (20, 30), (40, 45)])
+        self.assertEqual(intervals.uncovered(12, 18), [])
+
+        intervals.add(20, 30)
+        self.assertEqual(len(intervals), 1)
+        self.assertEqual(intervals.uncovered(0, 50), [(0, 10), (40, 50)])
+
+    def test_matches_brute_force(self):
+        """ランダムな区間で総当たりと同じ結果になるかテスト"""
+        rng = random.Random(0)
+        intervals = IntervalSet()
+        used = set()
+        for _ in range(300):
+            start = rng.randrange(0, 200)
+            end = start + rng.randrange(1, 20)
+            expected = [t for t in range(start, end) if t not in used]
+            covered = [t for s, e in intervals.uncovered(start, end) for t in range(s, e)]
+            self.assertEqual(covered, expected)
+            intervals.add(start, end)
+            used.update(range(start, end))
+
+
+class TestTimelineAssembler(unittest.TestCase):
+    """TimelineAssemblerクラスのテスト"""
+
+    def test_overlaps_are_trimmed_and_duplicates_dropped(self):
+        """同じクリップの重なりを切り詰め、重複を除くかテスト"""
+        assembler = TimelineAssembler()
+        timeline = assembler.assemble([
+            scene('a', 0, 5), scene('a', 3, 8), scene('a', 1, 4), scene('b', 0, 5), scene('a', 2, 8.3),
+        ])
+
+        self.assertEqual([(e['content_id'], e['start_time'], e['end_time']) for e in timeline],
+                         [('a', 0, 5), ('a', 5, 8), ('b', 0, 5)])
+        self.assertEqual(assembler.stats['trimmed'], 1)
+        self.assertEqual(assembler.stats['duplicates'], 2)
+
+    def test_record_timeline_is_contiguous(self):
+        """編集後のタイムラインの位置が連続するかテスト"""
+        timeline = TimelineAssembler().assemble([scene('a', 10, 14), scene('b', 3, 5), scene('a', 20, 21)])
+
+        self.assertEqual([(e['record_start'], e['record_end']) for e in timeline], [(0, 4), (4, 6), (6, 7)])
+
+    def test_sections_are_fitted_to_duration(self):
+        """セクションの尺を超えるシーンを切り詰め・除き、不足を報告するかテスト"""
+        assembler = TimelineAssembler(SCENARIO)
+        timeline = assembler.assemble([
+            scene('a', 0, 6), scene('b', 0, 6), scene('c', 0, 6),
+            scene('a', 10, 18, 'main_1'),
+        ])
+
+        self.assertEqual([(e['content_id'], e['end_time']) for e in timeline], [('a', 6), ('b', 4), ('a', 18)])
+        self.assertEqual(assembler.stats['shortened'], 1)
+        self.assertEqual(assembler.stats['overflow'], 1)
+        self.assertEqual([(s['section_id'], s['gap']) for s in assembler.section_report()],
+                         [('intro', 0.0), ('main_1', 12.0)])
+
+    def test_invalid_times_are_skipped(self):
+        """時間が不正なシーンを除くかテスト"""
+        assembler = TimelineAssembler()
+        timeline = assembler.assemble([{'content_id': 'a'}, scene('a', 5, 5), scene('a', 'x', 3), scene('a', 0, 1)])
+
+        self.assertEqual(len(timeline), 1)
+        self.assertEqual(assembler.stats['invalid'], 3)
+
+    def test_large_timeline(self):
+        """10,000件のタイムラインをすぐに組み立てられるかテスト"""
+        rng = random.Random(0)
+        scenes = []
+        for _ in range(10000):
+            start = rng.uniform(0, 3000)
+            scenes.append(scene(f"clip_{rng.randrange(20)}", start, start + rng.uniform(1, 10)))
+
+        started = time.perf_counter()
+        timeline = TimelineAssembler().assemble(scenes)
+        self.assertLess(time.perf_counter() - started, 2.0)
+
+        by_clip = {}
+        for entry in timeline:
+            by_clip.setdefault(entry['content_id'], []).append((entry['start_time'], entry['end_time']))
+        for spans in by_clip.values():
+            spans.sort()
+            self.assertTrue(all(a[1] <= b[0] for a, b in zip(spans, spans[1:])))
+
+
+class TestGeneratorsWithTimeline(unittest.TestCase):
+    """組み立てたタイムラインを使う出力のテスト"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_record_times_are_used(self):
+        """EDLのレコード側とSRTの時間に編集後の位置を使うかテスト"""
+        timeline = TimelineAssembler().assemble([scene('a', 60, 62, transcript="出発"), scene('b', 5, 8)])
+        edl_path = os.path.join(self.temp_dir, 'output.edl')
+        srt_path = os.path.join(self.temp_dir, 'output.srt')
+        EDLGenerator().generate(timeline, edl_path)
+        SRTGenerator().generate(timeline, srt_path)
+
+        with open(edl_path, encoding='utf-8-sig') as f:
+            edl = f.read()
+        self.assertIn("00:01:00:00 00:01:02:00 00:00:00:00 00:00:02:00", edl)
+        self.assertIn("00:00:05:00 00:00:08:00 00:00:02:00 00:00:05:00", edl)
+        with open(srt_path, encoding='utf-8-sig') as f:
+            self.assertTrue(f.read().startswith("1\n00:00:00,000 --> 00:00:02,000\n出発\n"))
+
+
+if __name__ == '__main__':
+    unittest.main()
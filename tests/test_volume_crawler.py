@@ -0,0 +1,137 @@
+"""VolumeCrawlerのテスト"""
+
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+import time
+from unittest.mock import patch
+
+# テスト対象のモジュールパスを追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.content_crawler import ContentCrawler
+from src.volume_crawler import VolumeCrawler
+from tests.test_content_crawler import write_nodes
+
+
+class TestVolumeCrawler(unittest.TestCase):
+    """VolumeCrawlerクラスのテスト"""
+
+    def setUp(self):
+        self.roots = [tempfile.mkdtemp() for _ in range(3)]
+        for r, root in enumerate(self.roots):
+            for i in range(r + 2):
+                write_nodes(root, f"video_nodes_R{r}_{i}", [
+                    {"start": 0.0, "end": 4.0, "transcripts": [{"text": f"{r}-{i}"}]}
+                ])
+
+    def tearDown(self):
+        for root in self.roots:
+            shutil.rmtree(root, ignore_errors=True)
+
+    def test_merges_roots_in_order_with_source_root(self):
+        """入力ディレクトリの順に結合され、source_rootが付与されるかテスト"""
+        volume_crawler = VolumeCrawler(ContentCrawler(), device_workers=2)
+        contents = volume_crawler.crawl(self.roots)
+
+        self.assertEqual(len(contents), 2 + 3 + 4)
+        expected = []
+        for root in self.roots:
+            expected.extend(dict(c, source_root=root) for c in ContentCrawler().crawl(root))
+        self.assertEqual(contents, expected)
+        self.assertEqual([s['content_count'] for s in volume_crawler.last_stats], [2, 3, 4])
+        self.assertEqual(volume_crawler.last_stats[0]['scene_count'], 2)
+
+    def test_device_limits(self):
+        """同じデバイスの入力ディレクトリが1つのプールを共有し、上限が適用されるかテスト"""
+        volume_crawler = VolumeCrawler(ContentCrawler(), device_workers=1,
+                                       device_limits={self.roots[1]: 3})
+        volume_crawler.crawl(self.roots)
+
+        # 一時ディレクトリはすべて同じデバイス上にあるため、最大値の3が使われる
+        self.assertEqual({s['workers'] for s in volume_crawler.last_stats}, {3})
+        self.assertEqual(len({s['device'] for s in volume_crawler.last_stats}), 1)
+
+    def test_separate_pools_per_device(self):
+        """異なるデバイスの入力ディレクトリには別々の上限が適用されるかテスト"""
+        devices = {self.roots[0]: 1, self.roots[1]: 2, self.roots[2]: 1}
+        volume_crawler = VolumeCrawler(ContentCrawler(), device_workers=1,
+                                       device_limits={self.roots[1]: 4})
+        with patch.object(VolumeCrawler, '_group_by_device', return_value=devices):
+            contents = volume_crawler.crawl(self.roots)
+
+        self.assertEqual(len(contents), 9)
+        self.assertEqual([s['workers'] for s in volume_crawler.last_stats], [1, 4, 1])
+
+    def test_missing_root_and_lazy_contents(self):
+        """参照できない入力ディレクトリを除き、遅延読み込みのコンテンツにもsource_rootが付くかテスト"""
+        shutil.rmtree(self.roots[0])
+        contents = VolumeCrawler(ContentCrawler(lazy=True)).crawl(self.roots)
+
+        self.assertEqual(len(contents), 7)
+        self.assertEqual(contents[0]['source_root'], self.roots[1])
+        self.assertFalse(contents[0].is_loaded)
+        self.assertIn('source_root', dict(contents[-1]))
+
+    def test_index_changes_are_merged(self):
+        """クロールインデックスの変更内容が全入力ディレクトリ分まとめられるかテスト"""
+        index_path = os.path.join(self.roots[0], 'crawl_index.json')
+        crawler = ContentCrawler(index_path=index_path, max_workers=2)
+        VolumeCrawler(crawler).crawl(self.roots)
+
+        self.assertEqual(len(crawler.last_changes['added']), 9)
+        VolumeCrawler(crawler).crawl(self.roots)
+        self.assertEqual(crawler.last_changes, {'added': [], 'modified': [], 'removed': []})
+
+
+    def counting_crawler(self, produced, fail_root=None):
+        """読み込んだ件数を入力ディレクトリごとに記録するContentCrawler"""
+        crawler = ContentCrawler()
+
+        def iter_contents(root, read_ahead=0, io_pool=None):
+            for i in range(20):
+                if root == fail_root and i == 3:
+                    raise OSError('読み込みに失敗しました')
+                produced[root] = produced.get(root, 0) + 1
+                yield {'content_id': f"video_nodes_{i}", 'scenes': []}
+
+        crawler.iter_contents = iter_contents
+        return crawler
+
+    def test_contents_are_streamed_through_bounded_buffer(self):
+        """入力ディレクトリの読み込みが終わる前に返され、先読みがbuffer_size件までに抑えられるかテスト"""
+        produced = {}
+        volume_crawler = VolumeCrawler(self.counting_crawler(produced), buffer_size=2)
+        contents = volume_crawler.iter_contents(self.roots)
+
+        self.assertEqual(next(contents)['source_root'], self.roots[0])
+        time.sleep(0.2)
+        # キューの2件と、キューの空きを待っている1件より先には読み込まない
+        for root in self.roots:
+            self.assertLessEqual(produced.get(root, 0), 4)
+        self.assertEqual(volume_crawler.last_stats, [])
+
+        self.assertEqual(len(list(contents)), 20 * 3 - 1)
+        self.assertEqual([s['content_count'] for s in volume_crawler.last_stats], [20, 20, 20])
+
+    def test_stopping_early_does_not_hang(self):
+        """途中で返すのをやめても、読み込み中のスレッドが中止されるかテスト"""
+        produced = {}
+        contents = VolumeCrawler(self.counting_crawler(produced), buffer_size=1).iter_contents(self.roots)
+        next(contents)
+        contents.close()
+
+        self.assertTrue(all(count < 20 for count in produced.values()))
+
+    def test_root_error_is_raised(self):
+        """入力ディレクトリの読み込み中の例外が呼び出し元に伝わるかテスト"""
+        produced = {}
+        volume_crawler = VolumeCrawler(self.counting_crawler(produced, fail_root=self.roots[1]))
+
+        with self.assertRaises(OSError):
+            volume_crawler.crawl(self.roots)
+
+
+if __name__ == "__main__":
+    unittest.main()